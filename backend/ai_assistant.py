@@ -1,6 +1,6 @@
 import google.generativeai as genai
 import os
-from typing import List, Dict, Optional, ClassVar, Union, Any
+from typing import List, Dict, Optional, ClassVar, Union, Any, Iterator
 from dotenv import load_dotenv
 from github import Github
 from github.GithubException import GithubException
@@ -306,30 +306,11 @@ def format_chat_response(text: str) -> str:
     formatted = formatted.lstrip('\n')
     return formatted
 
-def get_chat_response(history: List[Dict], model_type: str = 'fast') -> str:
-    """
-    Generates a chat response using the specified model, including context from the latest repository analysis.
-
-    Args:
-        history: A list of previous chat messages.
-        model_type: The type of model to use ('fast' or 'smart').
-
-    Returns:
-        A formatted string containing the AI's response.
-    """
-    # Check rate limits first
-    can_proceed, rate_limit_message = check_rate_limit()
-    if not can_proceed:
-        return f"⏱️ **Rate Limit:** {rate_limit_message}\n\nThe Gemini API has usage limits on the free tier. Please wait a moment and try again."
-    
-    model = get_model(model_type)
-    if model is None:
-        return f"❌ **AI model ({model_type}) is not available**"
-
-    try:
-        # Define base context based on the selected model type
-        if model_type == 'smart':
-            context = """You are GitHub Copilot, an expert cybersecurity consultant and code analysis specialist. You provide comprehensive, detailed security analysis with:
+def _prepare_chat_history(history: List[Dict], model_type: str) -> tuple:
+    """Build the model-format chat history (system context + prior turns) and the message to answer."""
+    # Define base context based on the selected model type
+    if model_type == 'smart':
+        context = """You are GitHub Copilot, an expert cybersecurity consultant and code analysis specialist. You provide comprehensive, detailed security analysis with:
 
 🛡️ **Advanced Security Analysis:**
 • Deep threat assessment and risk evaluation
@@ -352,8 +333,8 @@ def get_chat_response(history: List[Dict], model_type: str = 'fast') -> str:
 • Give step-by-step implementation guides
 • Explain the 'why' behind each recommendation
 • Use technical terminology appropriately"""
-        else:  # 'fast' model
-            context = """You are GitHub Copilot, a friendly cybersecurity assistant focused on quick, actionable security guidance:
+    else:  # 'fast' model
+        context = """You are GitHub Copilot, a friendly cybersecurity assistant focused on quick, actionable security guidance:
 
 🔒 **Quick Security Analysis:**
 • Fast vulnerability identification and prioritization
@@ -370,28 +351,28 @@ def get_chat_response(history: List[Dict], model_type: str = 'fast') -> str:
 • Give practical examples and code snippets
 • Be encouraging and supportive"""
 
-        # Append the latest repository analysis to the context, if it exists
-        if RepoAnalysis.latest_analysis:
-            if isinstance(RepoAnalysis.latest_analysis, dict):
-                # Handle new comprehensive analysis format from /analyze-repo
-                analysis_context = format_analysis_for_context(RepoAnalysis.latest_analysis)
-                context += "\n\n📂 **CURRENT REPOSITORY ANALYSIS:**\n" + analysis_context
-            else:
-                # Handle legacy RepoAnalysis format
-                context += f"""
+    # Append the latest repository analysis to the context, if it exists
+    if RepoAnalysis.latest_analysis:
+        if isinstance(RepoAnalysis.latest_analysis, dict):
+            # Handle new comprehensive analysis format from /analyze-repo
+            analysis_context = format_analysis_for_context(RepoAnalysis.latest_analysis)
+            context += "\n\n📂 **CURRENT REPOSITORY ANALYSIS:**\n" + analysis_context
+        else:
+            # Handle legacy RepoAnalysis format
+            context += f"""
 
 📂 **REPOSITORY CONTEXT:**
 **Repository:** {RepoAnalysis.latest_analysis.repo_name}
 **Language:** {RepoAnalysis.latest_analysis.language}
 **Security Findings:** {len(RepoAnalysis.latest_analysis.security_findings)} issues found
 **Recent Findings:** {', '.join(RepoAnalysis.latest_analysis.security_findings[:3])}"""
-        
-        # Also add website scan context if available
-        if WebsiteScan.latest_scan:
-            website_data = WebsiteScan.latest_scan
-            if isinstance(website_data, dict):
-                scan_data = website_data.get('scan_result', {})
-                context += f"""
+    
+    # Also add website scan context if available
+    if WebsiteScan.latest_scan:
+        website_data = WebsiteScan.latest_scan
+        if isinstance(website_data, dict):
+            scan_data = website_data.get('scan_result', {})
+            context += f"""
 
 🌐 **WEBSITE SECURITY SCAN:**
 • Target: {scan_data.get('url', 'N/A')}
@@ -399,69 +380,94 @@ def get_chat_response(history: List[Dict], model_type: str = 'fast') -> str:
 • HTTPS: {'✅ Enabled' if scan_data.get('https', False) else '❌ Disabled'}
 • Vulnerabilities: {len(scan_data.get('flags', []))} issues found"""
 
-        # Prepare the chat history in the format required by the Generative AI model.
-        # The history always starts with the model's context.
-        new_history = [{"role": "model", "parts": [context]}]
-        
-        for message in history:
-            try:
-                # Extract content ensuring it's always a string
-                content = ""
-                
-                if isinstance(message, dict):
-                    # Method 1: Check for 'parts' field
-                    if 'parts' in message and isinstance(message['parts'], list) and len(message['parts']) > 0:
-                        first_part = message['parts'][0]
-                        if isinstance(first_part, str):
-                            content = first_part
-                        elif isinstance(first_part, dict) and 'text' in first_part:
-                            content = first_part['text']
-                        else:
-                            content = str(first_part)
-                    
-                    # Method 2: Check for direct message content
-                    elif 'message' in message:
-                        content = str(message['message'])
-                    elif 'content' in message:
-                        content = str(message['content'])
-                    elif 'text' in message:
-                        content = str(message['text'])
-                    
-                    # Method 3: Fallback - convert entire message to string
+    # Prepare the chat history in the format required by the Generative AI model.
+    # The history always starts with the model's context.
+    new_history = [{"role": "model", "parts": [context]}]
+    
+    for message in history:
+        try:
+            # Extract content ensuring it's always a string
+            content = ""
+            
+            if isinstance(message, dict):
+                # Method 1: Check for 'parts' field
+                if 'parts' in message and isinstance(message['parts'], list) and len(message['parts']) > 0:
+                    first_part = message['parts'][0]
+                    if isinstance(first_part, str):
+                        content = first_part
+                    elif isinstance(first_part, dict) and 'text' in first_part:
+                        content = first_part['text']
                     else:
-                        content = str(message)
-                else:
-                    # If message is not a dict, convert to string
-                    content = str(message)
+                        content = str(first_part)
                 
-                # Ensure content is not empty and is a string
-                if not content or not isinstance(content, str):
-                    content = "No message content"
+                # Method 2: Check for direct message content
+                elif 'message' in message:
+                    content = str(message['message'])
+                elif 'content' in message:
+                    content = str(message['content'])
+                elif 'text' in message:
+                    content = str(message['text'])
                 
-                # Determine role
-                role = 'user'
-                if isinstance(message, dict):
-                    if message.get('type') == 'assistant' or message.get('type') == 'model':
-                        role = 'model'
-                    elif message.get('role') == 'model' or message.get('role') == 'assistant':
-                        role = 'model'
-                
-                new_history.append({
-                    "role": role,
-                    "parts": [content]  # Always a single string in a list
-                })
-                
-            except Exception as e:
-                print(f"Warning: Error processing message in history: {e}")
-                continue
+                # Method 3: Fallback - convert entire message to string
+                else:
+                    content = str(message)
+            else:
+                # If message is not a dict, convert to string
+                content = str(message)
+            
+            # Ensure content is not empty and is a string
+            if not content or not isinstance(content, str):
+                content = "No message content"
+            
+            # Determine role
+            role = 'user'
+            if isinstance(message, dict):
+                if message.get('type') == 'assistant' or message.get('type') == 'model':
+                    role = 'model'
+                elif message.get('role') == 'model' or message.get('role') == 'assistant':
+                    role = 'model'
+            
+            new_history.append({
+                "role": role,
+                "parts": [content]  # Always a single string in a list
+            })
+            
+        except Exception as e:
+            print(f"Warning: Error processing message in history: {e}")
+            continue
 
-        # The last message is what the model needs to respond to.
-        if len(new_history) > 1:
-            chat_history_for_model = new_history[:-1]
-            last_user_message = new_history[-1]['parts'][0]
-        else:
-            chat_history_for_model = [{"role": "model", "parts": [context]}]
-            last_user_message = "Please help with security analysis."
+    # The last message is what the model needs to respond to.
+    if len(new_history) > 1:
+        chat_history_for_model = new_history[:-1]
+        last_user_message = new_history[-1]['parts'][0]
+    else:
+        chat_history_for_model = [{"role": "model", "parts": [context]}]
+        last_user_message = "Please help with security analysis."
+
+    return chat_history_for_model, last_user_message
+
+def get_chat_response(history: List[Dict], model_type: str = 'fast') -> str:
+    """
+    Generates a chat response using the specified model, including context from the latest repository analysis.
+
+    Args:
+        history: A list of previous chat messages.
+        model_type: The type of model to use ('fast' or 'smart').
+
+    Returns:
+        A formatted string containing the AI's response.
+    """
+    # Check rate limits first
+    can_proceed, rate_limit_message = check_rate_limit()
+    if not can_proceed:
+        return f"⏱️ **Rate Limit:** {rate_limit_message}\n\nThe Gemini API has usage limits on the free tier. Please wait a moment and try again."
+    
+    model = get_model(model_type)
+    if model is None:
+        return f"❌ **AI model ({model_type}) is not available**"
+
+    try:
+        chat_history_for_model, last_user_message = _prepare_chat_history(history, model_type)
 
         # Update rate limit state before making request
         update_rate_limit_state()
@@ -472,20 +478,25 @@ def get_chat_response(history: List[Dict], model_type: str = 'fast') -> str:
 
         # Format and return the final response
         formatted_response = format_chat_response(response.text.strip())
-        
-        if model_type == 'smart':
-            return f"🧠 **Comprehensive Analysis** (Smart Model)\n\n{formatted_response}"
-        else:
-            return f"⚡ **Quick Analysis** (Fast Model)\n\n{formatted_response}"
+        return f"{_chat_response_heading(model_type)}{formatted_response}"
 
     except Exception as e:
         error_message = str(e)
         print(f"An unexpected error occurred in get_chat_response: {e}") # For server-side logging
-        
-        # Handle rate limit errors specifically
-        if "429" in error_message or "quota" in error_message.lower() or "rate" in error_message.lower():
-            handle_rate_limit_error(error_message)
-            return f"""⏱️ **Rate Limit Exceeded**
+        return _chat_error_message(error_message, model_type)
+
+def _chat_response_heading(model_type: str) -> str:
+    """Label that prefixes every successful chat answer"""
+    if model_type == 'smart':
+        return "🧠 **Comprehensive Analysis** (Smart Model)\n\n"
+    return "⚡ **Quick Analysis** (Fast Model)\n\n"
+
+def _chat_error_message(error_message: str, model_type: str) -> str:
+    """User-facing message for a failed chat completion"""
+    # Handle rate limit errors specifically
+    if "429" in error_message or "quota" in error_message.lower() or "rate" in error_message.lower():
+        handle_rate_limit_error(error_message)
+        return f"""⏱️ **Rate Limit Exceeded**
 
 The Gemini API free tier has a limit of 10 requests per minute. You've hit this limit.
 
@@ -495,9 +506,63 @@ The Gemini API free tier has a limit of 10 requests per minute. You've hit this
 • Use the chat less frequently to stay within limits
 
 **Current status:** Requests are temporarily blocked. Please try again in a moment."""
-        
-        # Handle other errors
-        return f"❌ **Chat Error ({model_type} model):** {error_message}"
+    
+    # Handle other errors
+    return f"❌ **Chat Error ({model_type} model):** {error_message}"
+
+def stream_chat_response(history: List[Dict], model_type: str = 'fast', cancel_event=None) -> Iterator[str]:
+    """
+    Streaming variant of get_chat_response that yields raw text chunks as the model produces them.
+
+    This is a blocking generator meant to be driven from a worker thread. Iteration stops early
+    once `cancel_event` (a threading.Event) is set. Rate limit and model errors are yielded as a
+    single chunk with the same message get_chat_response would return; answers start with the
+    same model heading as a separate first chunk.
+    """
+    can_proceed, rate_limit_message = check_rate_limit()
+    if not can_proceed:
+        yield f"⏱️ **Rate Limit:** {rate_limit_message}\n\nThe Gemini API has usage limits on the free tier. Please wait a moment and try again."
+        return
+
+    model = get_model(model_type)
+    if model is None:
+        yield f"❌ **AI model ({model_type}) is not available**"
+        return
+
+    response = None
+    started = False
+    try:
+        chat_history_for_model, last_user_message = _prepare_chat_history(history, model_type)
+        update_rate_limit_state()
+
+        chat = model.start_chat(history=chat_history_for_model)
+        response = chat.send_message(last_user_message, stream=True)
+        for chunk in response:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. safety metadata only)
+                continue
+            if text:
+                if not started:
+                    started = True
+                    yield _chat_response_heading(model_type)
+                yield text
+
+    except Exception as e:
+        error_message = str(e)
+        print(f"An unexpected error occurred in stream_chat_response: {e}")
+        yield _chat_error_message(error_message, model_type)
+    finally:
+        # Release the underlying HTTP stream when abandoned mid-response
+        close = getattr(getattr(response, "_iterator", None), "close", None)
+        if close:
+            try:
+                close()
+            except Exception:
+                pass
 
 # --- Main Analysis Function ---
 def analyze_github_repo(repo_url: str, model_type: str = 'smart', existing_clone_path: str = None) -> str:
@@ -8,6 +8,8 @@ Enhanced Features:
 - CWE (Common Weakness Enumeration) mapping
 - Detailed remediation guidance
 - Performance optimized with async operations
+- Project scans: per-file results cached by content hash, only changed files
+  are re-scanned, and files are analyzed concurrently (AI_SCAN_MAX_CONCURRENCY)
 """
 
 import os
@@ -16,6 +18,8 @@ import json
 import re
 import asyncio
 import hashlib
+import sqlite3
+import threading
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
@@ -23,6 +27,8 @@ from concurrent.futures import ThreadPoolExecutor
 import requests
 from urllib.parse import urlparse
 
+from rule_engine import Rule, get_rule_set, line_index
+
 # Try to import Gemini
 try:
     import google.generativeai as genai
@@ -34,6 +40,96 @@ except ImportError:
 # Thread pool for parallel operations
 _executor = ThreadPoolExecutor(max_workers=4)
 
+# Project scan configuration
+AI_SCAN_CACHE_PATH = os.getenv(
+    "AI_SCAN_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "ai_scan_cache.sqlite3"),
+)
+AI_SCAN_CACHE_MAX_ENTRIES = int(os.getenv("AI_SCAN_CACHE_MAX_ENTRIES", "5000"))
+AI_SCAN_MAX_CONCURRENCY = int(os.getenv("AI_SCAN_MAX_CONCURRENCY", "4"))
+# Bump when the AI prompt or alert normalization changes so cached AI findings are redone
+AI_SCAN_PROMPT_VERSION = "1"
+SCANNABLE_EXTENSIONS = {
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".mjs": "javascript",
+    ".ts": "typescript",
+    ".tsx": "typescript",
+    ".py": "python",
+    ".html": "html",
+}
+
+# Shared across scanner instances - bounds concurrent Gemini calls per process
+_ai_scan_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_ai_scan_semaphore() -> asyncio.Semaphore:
+    global _ai_scan_semaphore
+    if _ai_scan_semaphore is None:
+        _ai_scan_semaphore = asyncio.Semaphore(AI_SCAN_MAX_CONCURRENCY)
+    return _ai_scan_semaphore
+
+
+class ScanResultCache:
+    """Per-file scan findings keyed by content hash + scanner configuration (SQLite)"""
+
+    def __init__(self, path: str = AI_SCAN_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS file_scans ("
+                "cache_key TEXT PRIMARY KEY, alerts TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[Dict]]:
+        if not keys:
+            return {}
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT cache_key, alerts FROM file_scans WHERE cache_key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update({key: json.loads(alerts) for key, alerts in rows})
+        return found
+
+    def put(self, key: str, alerts: List[Dict]):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO file_scans (cache_key, alerts, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(alerts), time.time()),
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                conn.execute(
+                    "DELETE FROM file_scans WHERE cache_key NOT IN "
+                    "(SELECT cache_key FROM file_scans ORDER BY created_at DESC LIMIT ?)",
+                    (AI_SCAN_CACHE_MAX_ENTRIES,),
+                )
+            conn.commit()
+
+
+# Global per-file scan cache
+scan_result_cache = ScanResultCache()
+
 
 class ScanType(Enum):
     QUICK = "quick"          # Fast scan - basic checks
@@ -81,6 +177,8 @@ class ScanResult:
     scan_duration_seconds: float
     error: Optional[str] = None
     owasp_mapping: Optional[Dict[str, List[Dict]]] = None
+    # Project scans only: {"total", "scanned", "cached"} file counts
+    files: Optional[Dict[str, int]] = None
 
 
 class AISecurityScanner:
@@ -622,6 +720,16 @@ class AISecurityScanner:
         """
         self.api_key = gemini_api_key or os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
         self.model = None
+        # Cached file findings are only reused while the pattern set is unchanged
+        patterns = json.dumps(self.VULNERABILITY_PATTERNS, sort_keys=True, default=str)
+        self.rules_version = hashlib.sha256(patterns.encode("utf-8")).hexdigest()[:12]
+        # Compiled once per process and shared by every scanner instance
+        self.pattern_rules = get_rule_set(
+            (Rule(vuln_type, pattern, data=vuln_info)
+             for vuln_type, vuln_info in self.VULNERABILITY_PATTERNS.items()
+             for pattern in vuln_info["patterns"]),
+            name="vulnerability",
+        )
         
         if GEMINI_AVAILABLE and self.api_key:
             genai.configure(api_key=self.api_key)
@@ -642,54 +750,50 @@ class AISecurityScanner:
             List of vulnerability findings
         """
         alerts = []
-        alert_id = 0
+        index = line_index(code)
         
-        for vuln_type, vuln_info in self.VULNERABILITY_PATTERNS.items():
-            for pattern in vuln_info["patterns"]:
-                try:
-                    matches = re.finditer(pattern, code, re.IGNORECASE | re.MULTILINE)
-                    for match in matches:
-                        # Get surrounding context (more context for better understanding)
-                        start = max(0, match.start() - 100)
-                        end = min(len(code), match.end() + 100)
-                        context = code[start:end]
-                        
-                        # Get line number
-                        line_num = code[:match.start()].count('\n') + 1
-                        
-                        # Get the actual line of code
-                        lines = code.split('\n')
-                        actual_line = lines[line_num - 1] if line_num <= len(lines) else ""
-                        
-                        alert_id += 1
-                        
-                        # Use enriched description and solution from pattern info
-                        description = vuln_info.get("description", f"Potential {vuln_info['name']} vulnerability detected.")
-                        description = f"{description} Found at line {line_num}."
-                        
-                        solution = vuln_info.get("solution", f"Review and fix the code pattern that may cause {vuln_info['name']}")
-                        
-                        alerts.append({
-                            "alert_id": f"PATTERN-{vuln_type.upper()[:8]}-{alert_id:04d}",
-                            "alert": vuln_info["name"],
-                            "risk": vuln_info["risk"],
-                            "confidence": "Medium",
-                            "description": description,
-                            "solution": solution,
-                            "evidence": match.group()[:150],
-                            "url": f"line:{line_num}",
-                            "cwe_id": vuln_info.get("cwe", ""),
-                            "owasp": vuln_info.get("owasp", ""),
-                            "context": context.strip(),
-                            "line_content": actual_line.strip()[:200],
-                            "source": "Pattern Analysis"
-                        })
-                except Exception as e:
-                    continue
+        for alert_id, found in enumerate(self.pattern_rules.scan(code), start=1):
+            vuln_type, vuln_info = found.rule.id, found.rule.data
+            # Get surrounding context (more context for better understanding)
+            start = max(0, found.start - 100)
+            end = min(len(code), found.end + 100)
+            context = code[start:end]
+            
+            # Get line number and the actual line of code
+            line_num = index.line_of(found.start)
+            actual_line = index.line_text(line_num)
+            
+            # Use enriched description and solution from pattern info
+            description = vuln_info.get("description", f"Potential {vuln_info['name']} vulnerability detected.")
+            description = f"{description} Found at line {line_num}."
+            
+            solution = vuln_info.get("solution", f"Review and fix the code pattern that may cause {vuln_info['name']}")
+            
+            alerts.append({
+                "alert_id": f"PATTERN-{vuln_type.upper()[:8]}-{alert_id:04d}",
+                "alert": vuln_info["name"],
+                "risk": vuln_info["risk"],
+                "confidence": "Medium",
+                "description": description,
+                "solution": solution,
+                "evidence": found.text[:150],
+                "url": f"line:{line_num}",
+                "cwe_id": vuln_info.get("cwe", ""),
+                "owasp": vuln_info.get("owasp", ""),
+                "context": context.strip(),
+                "line_content": actual_line.strip()[:200],
+                "source": "Pattern Analysis"
+            })
         
         return alerts
     
-    async def _ai_scan(self, code: str, language: str = "javascript", scan_type: ScanType = ScanType.STANDARD) -> List[Dict]:
+    async def _ai_scan(
+        self,
+        code: str,
+        language: str = "javascript",
+        scan_type: ScanType = ScanType.STANDARD,
+        raise_errors: bool = False
+    ) -> List[Dict]:
         """
         Perform AI-powered security analysis using Gemini.
         
@@ -697,6 +801,7 @@ class AISecurityScanner:
             code: Source code to scan
             language: Programming language
             scan_type: Type of scan to perform
+            raise_errors: Re-raise model/parse errors instead of returning [] (so callers don't cache a failed scan)
             
         Returns:
             List of vulnerability findings from AI analysis
@@ -810,6 +915,8 @@ Return ONLY a JSON array of findings. If no vulnerabilities found, return: []
             return []
             
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"❌ AI scan error: {e}")
             return []
     
@@ -831,31 +938,45 @@ Return ONLY a JSON array of findings. If no vulnerabilities found, return: []
             ScanResult with all findings
         """
         start_time = time.time()
-        all_alerts = []
         
         print(f"🔍 Starting {scan_type.value} security scan...")
         
         # Step 1: Pattern-based scanning (fast)
         print("📊 Running pattern-based analysis...")
         pattern_alerts = self._pattern_scan(code, language)
-        all_alerts.extend(pattern_alerts)
         print(f"   Found {len(pattern_alerts)} potential issues from patterns")
         
         # Step 2: AI-powered scanning (if available)
+        ai_alerts = []
         if self.model:
             print("🤖 Running AI-powered analysis...")
             ai_alerts = await self._ai_scan(code, language, scan_type)
-            
-            # Deduplicate - avoid counting same issue twice
-            existing_alerts = {(a.get("alert"), a.get("evidence", "")[:50]) for a in all_alerts}
-            for alert in ai_alerts:
-                key = (alert.get("alert"), alert.get("evidence", "")[:50])
-                if key not in existing_alerts:
-                    all_alerts.append(alert)
-                    existing_alerts.add(key)
-            
             print(f"   Found {len(ai_alerts)} issues from AI analysis")
         
+        all_alerts = self._merge_alerts(pattern_alerts, ai_alerts)
+        return self._build_result(all_alerts, scan_type, "code_analysis", time.time() - start_time)
+    
+    @staticmethod
+    def _merge_alerts(pattern_alerts: List[Dict], ai_alerts: List[Dict]) -> List[Dict]:
+        """Pattern findings plus AI findings that don't repeat one (same name + evidence)"""
+        all_alerts = list(pattern_alerts)
+        existing_alerts = {(a.get("alert"), a.get("evidence", "")[:50]) for a in all_alerts}
+        for alert in ai_alerts:
+            key = (alert.get("alert"), alert.get("evidence", "")[:50])
+            if key not in existing_alerts:
+                all_alerts.append(alert)
+                existing_alerts.add(key)
+        return all_alerts
+    
+    def _build_result(
+        self,
+        all_alerts: List[Dict],
+        scan_type: ScanType,
+        target: str,
+        duration: float,
+        files: Optional[Dict[str, int]] = None
+    ) -> ScanResult:
+        """Categorize findings by risk and map them to OWASP Top 10"""
         # Categorize by risk
         critical = [a for a in all_alerts if a.get('risk') == 'Critical']
         high = [a for a in all_alerts if a.get('risk') == 'High']
@@ -866,8 +987,6 @@ Return ONLY a JSON array of findings. If no vulnerabilities found, return: []
         # Map to OWASP Top 10
         owasp_mapping = self._map_to_owasp(all_alerts)
         
-        duration = time.time() - start_time
-        
         print(f"\n📋 Scan Complete - {len(all_alerts)} total findings")
         print(f"   🔴 Critical: {len(critical)}")
         print(f"   🟠 High: {len(high)}")
@@ -877,7 +996,7 @@ Return ONLY a JSON array of findings. If no vulnerabilities found, return: []
         
         return ScanResult(
             success=True,
-            target_url="code_analysis",
+            target_url=target,
             scan_type=scan_type.value,
             alerts=all_alerts,
             critical_count=len(critical),
@@ -886,7 +1005,89 @@ Return ONLY a JSON array of findings. If no vulnerabilities found, return: []
             low_risk_count=len(low),
             informational_count=len(info),
             scan_duration_seconds=duration,
-            owasp_mapping=owasp_mapping
+            owasp_mapping=owasp_mapping,
+            files=files
+        )
+    
+    def _file_cache_key(self, content: str, language: str, scan_type: ScanType) -> str:
+        """Content hash plus everything else that changes a file's findings"""
+        engine = f"ai:{AI_SCAN_PROMPT_VERSION}" if self.model else "patterns-only"
+        digest = hashlib.sha256()
+        digest.update(f"{self.rules_version}\0{engine}\0{language}\0{scan_type.value}\0".encode("utf-8"))
+        digest.update(content.encode("utf-8", errors="replace"))
+        return digest.hexdigest()
+    
+    async def _scan_file(self, path: str, content: str, language: str, scan_type: ScanType) -> Tuple[List[Dict], bool]:
+        """Pattern + AI findings for one file; returns (alerts, cacheable)"""
+        pattern_alerts = await asyncio.to_thread(self._pattern_scan, content, language)
+        ai_alerts = []
+        cacheable = True
+        if self.model:
+            async with _get_ai_scan_semaphore():
+                try:
+                    ai_alerts = await self._ai_scan(content, language, scan_type, raise_errors=True)
+                except Exception as e:
+                    # Keep the pattern findings, but retry the AI pass next scan
+                    print(f"❌ AI scan error for {path}: {e}")
+                    cacheable = False
+        return self._merge_alerts(pattern_alerts, ai_alerts), cacheable
+    
+    async def scan_project(
+        self,
+        files: Dict[str, str],
+        scan_type: ScanType = ScanType.STANDARD,
+        project_name: str = "project"
+    ) -> ScanResult:
+        """
+        Scan a whole project file by file.
+        
+        Findings are cached per file by content hash, so a re-scan only analyzes
+        files that changed since the last scan. Uncached files are scanned
+        concurrently, with Gemini calls bounded by AI_SCAN_MAX_CONCURRENCY.
+        
+        Args:
+            files: Mapping of project-relative path -> file content
+            scan_type: Type of scan to perform
+            project_name: Used as the result's target
+            
+        Returns:
+            ScanResult with findings from every file (each alert carries its "file")
+        """
+        start_time = time.time()
+        scannable = {}
+        for path, content in files.items():
+            language = SCANNABLE_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+            if language and isinstance(content, str) and content.strip():
+                scannable[path] = (content, language, self._file_cache_key(content, language, scan_type))
+        
+        cached = await asyncio.to_thread(scan_result_cache.get_many, [key for _, _, key in scannable.values()])
+        to_scan = [path for path, (_, _, key) in scannable.items() if key not in cached]
+        print(f"🔍 Project scan {project_name}: {len(scannable)} files, {len(scannable) - len(to_scan)} cached, {len(to_scan)} to scan")
+        
+        async def scan_one(path: str):
+            content, language, key = scannable[path]
+            alerts, cacheable = await self._scan_file(path, content, language, scan_type)
+            if cacheable:
+                await asyncio.to_thread(scan_result_cache.put, key, alerts)
+            return path, alerts
+        
+        fresh = dict(await asyncio.gather(*(scan_one(path) for path in to_scan)))
+        
+        all_alerts = []
+        for path in sorted(scannable):
+            file_alerts = fresh[path] if path in fresh else cached[scannable[path][2]]
+            for alert in file_alerts:
+                alert = dict(alert)
+                alert["file"] = path
+                alert["url"] = f"{path}:{alert.get('url', '')}"
+                all_alerts.append(alert)
+        
+        return self._build_result(
+            all_alerts,
+            scan_type,
+            f"project:{project_name}",
+            time.time() - start_time,
+            files={"total": len(scannable), "scanned": len(to_scan), "cached": len(scannable) - len(to_scan)}
         )
     
     async def scan_url(
@@ -3,8 +3,13 @@ Authentication utilities
 Handles password hashing, JWT tokens, and authentication
 """
 import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional
 import bcrypt
 from jose import JWTError, jwt
 from dotenv import load_dotenv
@@ -16,6 +21,12 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-this-in-product
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
+# Password hashing: bcrypt work factor and the bounded pool it runs on
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+LOGIN_MAX_CONCURRENT_PER_ACCOUNT = int(os.getenv("LOGIN_MAX_CONCURRENT_PER_ACCOUNT", "2"))
+
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
@@ -25,7 +36,7 @@ def hash_password(password: str) -> str:
         password_bytes = password_bytes[:72]
     
     # Generate salt and hash
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
@@ -42,6 +53,123 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(password_bytes, hashed_bytes)
 
 
+def needs_rehash(hashed_password: str) -> bool:
+    """True if the hash was created with a lower work factor than BCRYPT_ROUNDS"""
+    try:
+        # Format: $2b$<cost>$<salt+hash>
+        return int(hashed_password.split("$")[2]) < BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+class PasswordHasherBusyError(Exception):
+    """Raised when the hashing queue is full; callers should answer 503"""
+
+
+class LoginThrottledError(Exception):
+    """Raised when an account already has too many logins in flight"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated, size-limited thread pool.
+    
+    bcrypt costs 100-300 ms of CPU by design and releases the GIL while it
+    works, so moving it off the event loop keeps other endpoints responsive
+    during a login burst. At most `workers` hashes run at once and at most
+    `max_queue` more may wait; beyond that requests are rejected instead of
+    piling up.
+    """
+    
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._account_slots: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.in_flight = 0
+        self.peak_queue_depth = 0
+        self.completed = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.rehashed = 0
+        self._total_seconds = 0.0
+    
+    async def _run(self, func, *args):
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusyError("Password hashing queue is full")
+        
+        self.pending += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth)
+        
+        def timed():
+            # Runs on a pool thread, i.e. the job has left the queue
+            with self._lock:
+                self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                    self._total_seconds += time.perf_counter() - started
+        
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+    
+    @property
+    def queue_depth(self) -> int:
+        """Submitted jobs still waiting for a pool thread"""
+        return max(self.pending - self.in_flight, 0)
+    
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+    
+    @asynccontextmanager
+    async def account_slot(self, account: str):
+        """Cap concurrent login attempts per account (LOGIN_MAX_CONCURRENT_PER_ACCOUNT)"""
+        key = account.lower()
+        if self._account_slots.get(key, 0) >= LOGIN_MAX_CONCURRENT_PER_ACCOUNT:
+            self.throttled += 1
+            raise LoginThrottledError("Too many concurrent login attempts for this account")
+        self._account_slots[key] = self._account_slots.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            remaining = self._account_slots.get(key, 1) - 1
+            if remaining > 0:
+                self._account_slots[key] = remaining
+            else:
+                self._account_slots.pop(key, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "peak_queue_depth": self.peak_queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "throttled_logins": self.throttled,
+            "rehashed": self.rehashed,
+            "avg_hash_ms": round(self._total_seconds / self.completed * 1000, 1) if self.completed else 0.0,
+            "accounts_in_flight": len(self._account_slots)
+        }
+
+
+password_hasher = PasswordHasher()
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
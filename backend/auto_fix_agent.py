@@ -18,7 +18,7 @@ genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
 model = genai.GenerativeModel('gemini-1.5-flash')
 
 # Reuse central S3 client configured with a larger connection pool
-from backend.s3_storage import s3_client
+from backend.s3_storage import s3_client, upload_project_to_s3
 S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
 
 
@@ -334,26 +334,21 @@ Return ONLY the fixed code:"""
         file_path: str,
         content: str
     ) -> bool:
-        """Upload fixed file back to S3"""
+        """Upload fixed file back to S3 (recorded as a new project version)"""
         try:
-            # Construct S3 key
-            if not file_path.startswith('projects/'):
-                s3_key = f"projects/{user_id}/{project_slug}/{file_path}"
-            else:
-                s3_key = file_path
+            # Accept full S3 keys as well as project-relative paths
+            prefix = f"projects/{user_id}/{project_slug}/"
+            if file_path.startswith(prefix):
+                file_path = file_path[len(prefix):]
             
-            s3_client.put_object(
-                Bucket=S3_BUCKET_NAME,
-                Key=s3_key,
-                Body=content.encode('utf-8'),
-                ContentType='application/javascript',
-                Metadata={
-                    'auto_fixed': 'true',
-                    'fixed_at': __import__('datetime').datetime.now().isoformat()
-                }
+            upload_project_to_s3(
+                project_slug,
+                [{'path': file_path, 'content': content}],
+                user_id,
+                message=f"Auto-fixed {file_path}"
             )
             
-            print(f"✅ Uploaded fixed file to S3: {s3_key}")
+            print(f"✅ Uploaded fixed file to S3: {prefix}{file_path}")
             return True
             
         except Exception as e:
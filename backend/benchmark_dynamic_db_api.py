@@ -0,0 +1,98 @@
+"""
+Load benchmark for the Dynamic Database API (/api/db)
+
+Seeds a throwaway project collection on a local mongod, then hammers the
+list/get/search/stats endpoints with concurrent clients and reports requests
+per second and latency percentiles. Run it against the server before and
+after a change to compare throughput:
+
+    uvicorn main:app --port 8000
+    python benchmark_dynamic_db_api.py --base-url http://localhost:8000 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+PROJECT = "bench-dynamic-db"
+COLLECTION = "products"
+
+
+async def seed(client: httpx.AsyncClient, base_url: str, count: int):
+    """Insert `count` synthetic products in bulk batches."""
+    url = f"{base_url}/api/db/{PROJECT}/{COLLECTION}/bulk"
+    batch = 500
+    for start in range(0, count, batch):
+        items = [
+            {
+                "name": f"Product {i}",
+                "description": f"Benchmark item number {i}",
+                "category": f"cat-{i % 20}",
+                "price": round(1 + (i % 500) * 0.5, 2),
+                "in_stock": i % 3 != 0,
+            }
+            for i in range(start, min(start + batch, count))
+        ]
+        response = await client.post(url, json=items)
+        response.raise_for_status()
+    print(f"🌱 Seeded {count} items into {PROJECT}_{COLLECTION}")
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, url: str, requests_total: int, concurrency: int):
+    """Fire `requests_total` GETs at `url` with `concurrency` in flight."""
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.get(url)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests_total)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    print(f"{name:<18} {requests_total / elapsed:8.1f} req/s   p50 {p50:7.1f} ms   p95 {p95:7.1f} ms   errors {errors}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dynamic DB API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=20000, help="Items to seed (0 to skip)")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        if args.seed:
+            await seed(client, args.base_url, args.seed)
+
+        base = f"{args.base_url}/api/db/{PROJECT}"
+        scenarios = {
+            "list page 1": f"{base}/{COLLECTION}?limit=50",
+            "list deep page": f"{base}/{COLLECTION}?limit=50&skip={max(args.seed - 100, 0)}",
+            "search": f"{base}/{COLLECTION}/search?q=Product%201",
+            "stats": f"{base}/stats",
+        }
+
+        print(f"\n📊 {args.requests} requests per scenario, concurrency {args.concurrency}\n")
+        for name, url in scenarios.items():
+            await run_scenario(client, name, url, args.requests, args.concurrency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,238 @@
+"""
+Persisted Chat History
+======================
+Server-side conversation store for /api/chat and /ws/chat, so clients send a
+conversation_id instead of re-uploading the whole history with every message.
+
+Turns are appended (never rewritten) to a local SQLite file (CHAT_HISTORY_DB_PATH).
+Prompts only ever see a capped window: the last CHAT_HISTORY_WINDOW turns verbatim
+plus a compact summary of everything older. Once more than CHAT_SUMMARY_TRIGGER
+turns sit outside the window they are folded into the summary, which is kept under
+CHAT_SUMMARY_MAX_CHARS, so prompt size stays flat no matter how long a session runs.
+
+Summaries are extractive (first sentence of each old turn, clipped) - cheap,
+deterministic and free of extra model calls on the request path.
+
+Usage:
+    from chat_history_store import chat_history_store
+
+    conversation_id = chat_history_store.create_conversation("my-project", user_id)
+    chat_history_store.append(conversation_id, "user", "How do I add auth?")
+    summary, window = chat_history_store.get_prompt_context(conversation_id)
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+CHAT_HISTORY_DB_PATH = os.getenv(
+    "CHAT_HISTORY_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "chat_history.sqlite3"),
+)
+CHAT_HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "10"))
+CHAT_SUMMARY_TRIGGER = int(os.getenv("CHAT_SUMMARY_TRIGGER", "10"))
+CHAT_SUMMARY_MAX_CHARS = int(os.getenv("CHAT_SUMMARY_MAX_CHARS", "2000"))
+CHAT_SUMMARY_TURN_CHARS = 160
+CHAT_MAX_TURN_CHARS = int(os.getenv("CHAT_MAX_TURN_CHARS", "20000"))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def summarize_turns(previous_summary: str, turns: List[Dict[str, Any]]) -> str:
+    """Fold turns into the running summary, keeping the newest lines within budget"""
+    lines = [line for line in previous_summary.splitlines() if line.strip()] if previous_summary else []
+    for turn in turns:
+        text = " ".join(turn["content"].split())
+        first_sentence = _SENTENCE_END.split(text, 1)[0]
+        if len(first_sentence) > CHAT_SUMMARY_TURN_CHARS:
+            first_sentence = first_sentence[:CHAT_SUMMARY_TURN_CHARS - 1].rstrip() + "…"
+        speaker = "User" if turn["role"] == "user" else "Assistant"
+        lines.append(f"- {speaker}: {first_sentence}")
+
+    # Drop the oldest lines first once over budget
+    total = sum(len(line) + 1 for line in lines)
+    while lines and total > CHAT_SUMMARY_MAX_CHARS:
+        total -= len(lines.pop(0)) + 1
+    return "\n".join(lines)
+
+
+class ChatHistoryStore:
+    """Append-only conversation turns plus a rolling summary per conversation"""
+
+    def __init__(self, path: str = CHAT_HISTORY_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS conversations (
+                    conversation_id TEXT PRIMARY KEY,
+                    project_name TEXT NOT NULL,
+                    user_id TEXT,
+                    summary TEXT NOT NULL DEFAULT '',
+                    summarized_through INTEGER NOT NULL DEFAULT 0,
+                    turn_count INTEGER NOT NULL DEFAULT 0,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS conversations_project
+                    ON conversations (project_name, updated_at);
+                CREATE INDEX IF NOT EXISTS conversations_owner
+                    ON conversations (user_id, project_name, updated_at);
+                CREATE TABLE IF NOT EXISTS turns (
+                    conversation_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (conversation_id, seq)
+                );
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def create_conversation(self, project_name: str, user_id: Optional[str] = None) -> str:
+        conversation_id = str(uuid.uuid4())
+        now = datetime.now().isoformat()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT INTO conversations (conversation_id, project_name, user_id, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (conversation_id, project_name, user_id, now, now),
+            )
+            conn.commit()
+        return conversation_id
+
+    def get_conversation(self, conversation_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """A conversation by id; when user_id is given, only if that user owns it"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT * FROM conversations WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()
+        if row is None or (user_id is not None and row["user_id"] != user_id):
+            return None
+        return dict(row)
+
+    def ensure_conversation(self, conversation_id: Optional[str], project_name: str, user_id: Optional[str] = None) -> str:
+        """Return conversation_id if it exists for this project and owner, otherwise start a new one
+
+        Anonymous callers (user_id None) can only continue anonymous conversations,
+        and signed-in users only their own.
+        """
+        if conversation_id:
+            conversation = self.get_conversation(conversation_id)
+            if conversation and conversation["project_name"] == project_name and conversation["user_id"] == user_id:
+                return conversation_id
+        return self.create_conversation(project_name, user_id)
+
+    def append(self, conversation_id: str, role: str, content: str) -> int:
+        """Append one turn; returns its sequence number"""
+        role = "assistant" if role in ("assistant", "model") else "user"
+        content = content[:CHAT_MAX_TURN_CHARS]
+        now = datetime.now().isoformat()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT turn_count FROM conversations WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"Unknown conversation: {conversation_id}")
+            seq = row["turn_count"] + 1
+            conn.execute(
+                "INSERT INTO turns (conversation_id, seq, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                (conversation_id, seq, role, content, now),
+            )
+            conn.execute(
+                "UPDATE conversations SET turn_count = ?, updated_at = ? WHERE conversation_id = ?",
+                (seq, now, conversation_id),
+            )
+            conn.commit()
+        self._maybe_summarize(conversation_id)
+        return seq
+
+    def _maybe_summarize(self, conversation_id: str):
+        """Fold turns that fell out of the window into the summary once enough pile up"""
+        with self._lock:
+            conn = self._connection()
+            conversation = conn.execute(
+                "SELECT summary, summarized_through, turn_count FROM conversations WHERE conversation_id = ?",
+                (conversation_id,),
+            ).fetchone()
+            window_start = conversation["turn_count"] - CHAT_HISTORY_WINDOW
+            if window_start - conversation["summarized_through"] < CHAT_SUMMARY_TRIGGER:
+                return
+            rows = conn.execute(
+                "SELECT role, content FROM turns WHERE conversation_id = ? AND seq > ? AND seq <= ? ORDER BY seq",
+                (conversation_id, conversation["summarized_through"], window_start),
+            ).fetchall()
+            summary = summarize_turns(conversation["summary"], [dict(row) for row in rows])
+            conn.execute(
+                "UPDATE conversations SET summary = ?, summarized_through = ? WHERE conversation_id = ?",
+                (summary, window_start, conversation_id),
+            )
+            conn.commit()
+
+    def get_turns(self, conversation_id: str, limit: int = 50, before_seq: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Most recent turns (oldest first), optionally paging backwards from before_seq"""
+        query = "SELECT seq, role, content, created_at FROM turns WHERE conversation_id = ?"
+        params: list = [conversation_id]
+        if before_seq is not None:
+            query += " AND seq < ?"
+            params.append(before_seq)
+        query += " ORDER BY seq DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._connection().execute(query, params).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def get_prompt_context(self, conversation_id: str) -> Tuple[str, List[Dict[str, str]]]:
+        """Summary of older turns plus the capped window of recent turns for a prompt"""
+        conversation = self.get_conversation(conversation_id)
+        if conversation is None:
+            return "", []
+        # Turns between the summary and the window are still verbatim until the next fold
+        unsummarized = conversation["turn_count"] - conversation["summarized_through"]
+        turns = self.get_turns(conversation_id, limit=max(CHAT_HISTORY_WINDOW, unsummarized))
+        window = [{"role": turn["role"], "content": turn["content"]} for turn in turns[-CHAT_HISTORY_WINDOW:]]
+        skipped = turns[:-CHAT_HISTORY_WINDOW] if len(turns) > CHAT_HISTORY_WINDOW else []
+        summary = conversation["summary"]
+        if skipped:
+            summary = summarize_turns(summary, skipped)
+        return summary, window
+
+    def list_conversations(self, project_name: str, user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """A user's conversations for a project, most recently active first"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT conversation_id, turn_count, created_at, updated_at FROM conversations "
+                "WHERE user_id = ? AND project_name = ? ORDER BY updated_at DESC LIMIT ?",
+                (user_id, project_name, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Global store instance
+chat_history_store = ChatHistoryStore()
@@ -0,0 +1,115 @@
+"""
+Streaming Chat Replies
+======================
+Drives one AI reply for /ws/chat: the blocking model stream is read on a bounded
+worker pool (CHAT_STREAM_WORKERS) so a long answer never stalls the event loop,
+and each chunk is forwarded as a chat_delta frame followed by a final
+chat_response carrying the whole formatted text.
+
+Cancelling the task (new message, chat_cancel or disconnect) sets the cancel
+event so the worker stops reading the model stream. Only completed answers are
+handed to `record`; cancelled ones are dropped.
+
+Usage:
+    from chat_stream import stream_chat_reply
+
+    task = asyncio.create_task(
+        stream_chat_reply(send, messages, user_message, request_id, conversation_id, record)
+    )
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Optional
+
+CHAT_STREAM_WORKERS = int(os.getenv("CHAT_STREAM_WORKERS", "16"))
+
+_chat_stream_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=CHAT_STREAM_WORKERS, thread_name_prefix="chat-stream"
+)
+
+
+async def stream_chat_reply(send: Callable[[dict], Awaitable[None]], messages: list, user_message: str,
+                            request_id: str, conversation_id: Optional[str] = None,
+                            record: Optional[Callable[[str, str, str], None]] = None):
+    """Stream one AI reply as chat_delta frames, then a final chat_response.
+
+    `send` queues a frame on the socket's writer (manager.send_to_connection), so
+    replies stay ordered with the broadcasts delivered to the same socket.
+    `record(conversation_id, user_message, ai_response)` persists a completed
+    answer and runs on a worker thread.
+    """
+    from ai_assistant import stream_chat_response, format_chat_response
+
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue()
+    cancel_event = threading.Event()
+
+    def hand_back(item):
+        try:
+            loop.call_soon_threadsafe(chunks.put_nowait, item)
+        except RuntimeError:
+            # Event loop already closed (server shutting down)
+            cancel_event.set()
+
+    def produce():
+        try:
+            for chunk in stream_chat_response(messages, model_type='fast', cancel_event=cancel_event):
+                hand_back(chunk)
+        except Exception as e:
+            hand_back(e)
+        finally:
+            hand_back(None)
+
+    loop.run_in_executor(_chat_stream_executor, produce)
+
+    parts = []
+    try:
+        await send({
+            "type": "chat_typing",
+            "message": "AI is thinking...",
+            "request_id": request_id
+        })
+
+        while True:
+            item = await chunks.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            parts.append(item)
+            await send({
+                "type": "chat_delta",
+                "delta": item,
+                "request_id": request_id
+            })
+
+        ai_response = format_chat_response("".join(parts))
+        await send({
+            "type": "chat_response",
+            "message": ai_response,
+            "user_message": user_message,
+            "request_id": request_id,
+            "conversation_id": conversation_id,
+            "timestamp": time.time()
+        })
+
+        if conversation_id and record:
+            await asyncio.to_thread(record, conversation_id, user_message, ai_response)
+
+    except asyncio.CancelledError:
+        raise
+    except Exception as ai_error:
+        try:
+            await send({
+                "type": "chat_error",
+                "message": f"AI chat error: {str(ai_error)}",
+                "request_id": request_id
+            })
+        except Exception:
+            pass
+    finally:
+        cancel_event.set()
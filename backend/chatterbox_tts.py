@@ -3,10 +3,18 @@ Chatterbox TTS Integration for AltX Voice Chat
 Enhanced text-to-speech with voice cloning capabilities
 """
 import os
+import re
+import time
+import wave
+import struct
+import hashlib
+import shutil
 import tempfile
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, Union
+from typing import AsyncIterator, Dict, List, Optional, Union
 import torch
 import torchaudio as ta
 from fastapi import HTTPException
@@ -15,6 +23,62 @@ import logging
 # Configure logging  
 logger = logging.getLogger(__name__)
 
+# Content-addressed utterance cache
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_MB", "512")) * 1024 * 1024
+# Utterances up to this length are batched into one executor dispatch
+TTS_SHORT_UTTERANCE_CHARS = int(os.getenv("TTS_SHORT_UTTERANCE_CHARS", "120"))
+TTS_MAX_BATCH = int(os.getenv("TTS_MAX_BATCH", "8"))
+TTS_BATCH_WINDOW_SECONDS = float(os.getenv("TTS_BATCH_WINDOW_MS", "25")) / 1000
+TTS_MAINTENANCE_INTERVAL_SECONDS = int(os.getenv("TTS_MAINTENANCE_INTERVAL_SECONDS", "3600"))
+
+LANGUAGE_MAP = {
+    "en": "en",
+    "es": "es", 
+    "fr": "fr",
+    "de": "de",
+    "it": "it",
+    "pt": "pt",
+    "ru": "ru",
+    "ja": "ja",
+    "ko": "ko",
+    "zh": "zh",
+    "ar": "ar",
+    "hi": "hi"
+}
+
+
+@dataclass
+class TTSJob:
+    """One utterance waiting for the TTS executor"""
+    text: str
+    language: str
+    voice_prompt_path: Optional[str]
+    output_path: Path
+    future: asyncio.Future = field(repr=False)
+
+
+def split_into_utterances(text: str, max_chars: int = 200) -> List[str]:
+    """Split text at sentence boundaries, merging short sentences up to max_chars"""
+    sentences = [s.strip() for s in re.split(r'(?<=[.!?。！？])\s+', text.strip()) if s.strip()]
+    chunks: List[str] = []
+    for sentence in sentences:
+        if chunks and len(chunks[-1]) + len(sentence) + 1 <= max_chars:
+            chunks[-1] = f"{chunks[-1]} {sentence}"
+        else:
+            chunks.append(sentence)
+    return chunks or [text]
+
+
+def streaming_wav_header(sample_rate: int, channels: int = 1, bits_per_sample: int = 16) -> bytes:
+    """WAV header with open-ended sizes so players can start before the data ends"""
+    byte_rate = sample_rate * channels * bits_per_sample // 8
+    block_align = channels * bits_per_sample // 8
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, byte_rate, block_align, bits_per_sample)
+        + b"data" + struct.pack("<I", 0xFFFFFFFF - 36)
+    )
+
 class ChatterboxTTSManager:
     """
     Manager class for Chatterbox TTS with fallback options
@@ -37,6 +101,18 @@ class ChatterboxTTSManager:
         # Audio output directory
         self.audio_dir = Path("generated_audio")
         self.audio_dir.mkdir(exist_ok=True)
+        self.cache_dir = self.audio_dir / "cache"
+        self.cache_dir.mkdir(exist_ok=True)
+        
+        # Torch models aren't thread-safe: one dedicated inference thread,
+        # fed by a request queue so short utterances can be batched
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
         
     def _get_device(self, device: str) -> str:
         """Determine the best device to use"""
@@ -53,9 +129,13 @@ class ChatterboxTTSManager:
             
             logger.info(f"🚀 Initializing Chatterbox TTS models on {self.device}")
             
-            # Initialize English model
+            loop = asyncio.get_running_loop()
+            
+            # Initialize English model (loading weights blocks, keep it off the loop)
             try:
-                self.english_model = ChatterboxTTS.from_pretrained(device=self.device)
+                self.english_model = await loop.run_in_executor(
+                    self._executor, lambda: ChatterboxTTS.from_pretrained(device=self.device)
+                )
                 self.sample_rate = self.english_model.sr
                 logger.info("✅ English TTS model loaded successfully")
             except Exception as e:
@@ -63,7 +143,9 @@ class ChatterboxTTSManager:
             
             # Initialize multilingual model
             try:
-                self.multilingual_model = ChatterboxMultilingualTTS.from_pretrained(device=self.device)
+                self.multilingual_model = await loop.run_in_executor(
+                    self._executor, lambda: ChatterboxMultilingualTTS.from_pretrained(device=self.device)
+                )
                 logger.info("✅ Multilingual TTS model loaded successfully")
             except Exception as e:
                 logger.warning(f"⚠️ Failed to load multilingual model: {e}")
@@ -86,11 +168,14 @@ class ChatterboxTTSManager:
         """
         Generate speech from text using Chatterbox TTS
         
+        Repeated (text, language, voice) requests are served from the
+        content-addressed cache; misses are queued for the TTS executor.
+        
         Args:
             text: Text to synthesize
             language: Language code ("en", "fr", "zh", etc.)
             voice_prompt_path: Optional path to voice cloning sample
-            output_filename: Optional custom output filename
+            output_filename: Optional custom output filename (a copy of the cached audio)
             
         Returns:
             Path to generated audio file
@@ -105,66 +190,17 @@ class ChatterboxTTSManager:
             )
         
         try:
-            # Generate unique filename if not provided
-            if not output_filename:
-                timestamp = int(asyncio.get_event_loop().time() * 1000)
-                output_filename = f"tts_output_{timestamp}.wav"
+            cached_path = await self._synthesize_cached(text, language, voice_prompt_path)
             
-            output_path = self.audio_dir / output_filename
+            if output_filename:
+                output_path = self.audio_dir / output_filename
+                await asyncio.to_thread(shutil.copyfile, cached_path, output_path)
+                return str(output_path)
             
-            # Choose model based on language
-            if language == "en" and self.english_model:
-                # Use English model for better quality
-                logger.info(f"🎤 Generating English speech: '{text[:50]}...'")
-                
-                if voice_prompt_path and Path(voice_prompt_path).exists():
-                    # Voice cloning with audio prompt
-                    wav = self.english_model.generate(text, audio_prompt_path=voice_prompt_path)
-                    logger.info("🎭 Generated speech with voice cloning")
-                else:
-                    # Standard synthesis
-                    wav = self.english_model.generate(text)
-                    logger.info("🔊 Generated standard English speech")
-                
-                # Save audio file
-                ta.save(str(output_path), wav, self.sample_rate)
-                
-            elif self.multilingual_model:
-                # Use multilingual model
-                logger.info(f"🌍 Generating {language} speech: '{text[:50]}...'")
-                
-                # Map language codes
-                lang_map = {
-                    "en": "en",
-                    "es": "es", 
-                    "fr": "fr",
-                    "de": "de",
-                    "it": "it",
-                    "pt": "pt",
-                    "ru": "ru",
-                    "ja": "ja",
-                    "ko": "ko",
-                    "zh": "zh",
-                    "ar": "ar",
-                    "hi": "hi"
-                }
-                
-                lang_id = lang_map.get(language, "en")
-                wav = self.multilingual_model.generate(text, language_id=lang_id)
-                
-                # Save audio file
-                ta.save(str(output_path), wav, self.multilingual_model.sr)
-                logger.info(f"🎵 Generated {language} speech successfully")
-                
-            else:
-                raise HTTPException(
-                    status_code=503,
-                    detail="No suitable TTS model available for the requested language"
-                )
-            
-            logger.info(f"💾 Audio saved: {output_path}")
-            return str(output_path)
+            return str(cached_path)
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"❌ TTS generation failed: {e}")
             raise HTTPException(
@@ -172,6 +208,211 @@ class ChatterboxTTSManager:
                 detail=f"Failed to generate speech: {str(e)}"
             )
     
+    async def stream_speech(
+        self,
+        text: str,
+        language: str = "en",
+        voice_prompt_path: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Yield a WAV stream sentence by sentence.
+        
+        All sentences are queued up front; the header and the first sentence's
+        PCM are sent as soon as it is synthesized, so playback can start before
+        the rest of the text is done.
+        """
+        if not self.is_initialized:
+            await self.initialize_models()
+        if not self.is_initialized:
+            raise HTTPException(status_code=503, detail="TTS service not available. Please install chatterbox-tts.")
+        
+        pending = [
+            asyncio.ensure_future(self._synthesize_cached(chunk, language, voice_prompt_path))
+            for chunk in split_into_utterances(text)
+        ]
+        try:
+            header_sent = False
+            for task in pending:
+                path = await task
+                sample_rate, frames = await asyncio.to_thread(self._read_pcm, path)
+                if not header_sent:
+                    yield streaming_wav_header(sample_rate)
+                    header_sent = True
+                yield frames
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    @staticmethod
+    def _read_pcm(path: Path) -> tuple:
+        with wave.open(str(path), "rb") as wav_file:
+            return wav_file.getframerate(), wav_file.readframes(wav_file.getnframes())
+    
+    def _cache_key(self, text: str, language: str, voice_prompt_path: Optional[str]) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{language}\0{text}\0".encode("utf-8"))
+        if voice_prompt_path and Path(voice_prompt_path).exists():
+            # Hash the reference audio itself so uploads with new temp names still hit
+            with open(voice_prompt_path, "rb") as voice_file:
+                for block in iter(lambda: voice_file.read(1 << 20), b""):
+                    digest.update(block)
+        return digest.hexdigest()
+    
+    async def _synthesize_cached(self, text: str, language: str, voice_prompt_path: Optional[str]) -> Path:
+        """Return the cached WAV for this utterance, synthesizing it if needed"""
+        key = await asyncio.to_thread(self._cache_key, text, language, voice_prompt_path)
+        cached_path = self.cache_dir / f"{key}.wav"
+        
+        if cached_path.exists():
+            self.cache_hits += 1
+            cached_path.touch()  # LRU by mtime
+            return cached_path
+        
+        # Identical concurrent requests share one synthesis
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.cache_hits += 1
+            return await asyncio.shield(in_flight)
+        
+        self.cache_misses += 1
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        await self._queue.put(TTSJob(text, language, voice_prompt_path, cached_path, future))
+        return await asyncio.shield(future)
+    
+    def _ensure_worker(self):
+        """Start the queue worker and cache maintenance on the running loop"""
+        if self._worker_task is None or self._worker_task.done():
+            self._queue = asyncio.Queue()
+            self._worker_task = asyncio.create_task(self._worker_loop())
+        if self._maintenance_task is None or self._maintenance_task.done():
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+    
+    async def _worker_loop(self):
+        """Drain the request queue, batching short utterances per executor dispatch"""
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            batch = [job]
+            
+            if len(job.text) <= TTS_SHORT_UTTERANCE_CHARS:
+                deadline = loop.time() + TTS_BATCH_WINDOW_SECONDS
+                while len(batch) < TTS_MAX_BATCH:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            
+            results = await loop.run_in_executor(self._executor, self._synthesize_batch, batch)
+            for queued_job, result in zip(batch, results):
+                if queued_job.future.done():
+                    continue
+                if isinstance(result, Exception):
+                    queued_job.future.set_exception(result)
+                else:
+                    queued_job.future.set_result(result)
+    
+    def _synthesize_batch(self, batch: List[TTSJob]) -> list:
+        """Runs on the TTS thread: synthesize each job, returning paths or exceptions"""
+        results = []
+        with torch.inference_mode():
+            for job in batch:
+                try:
+                    results.append(self._synthesize_to_file(job))
+                except Exception as e:
+                    results.append(e)
+        return results
+    
+    def _synthesize_to_file(self, job: TTSJob) -> Path:
+        """Generate one utterance and atomically write it into the cache as 16-bit PCM"""
+        # Choose model based on language
+        if job.language == "en" and self.english_model:
+            # Use English model for better quality
+            logger.info(f"🎤 Generating English speech: '{job.text[:50]}...'")
+            
+            if job.voice_prompt_path and Path(job.voice_prompt_path).exists():
+                # Voice cloning with audio prompt
+                wav = self.english_model.generate(job.text, audio_prompt_path=job.voice_prompt_path)
+                logger.info("🎭 Generated speech with voice cloning")
+            else:
+                # Standard synthesis
+                wav = self.english_model.generate(job.text)
+                logger.info("🔊 Generated standard English speech")
+            sample_rate = self.sample_rate
+            
+        elif self.multilingual_model:
+            # Use multilingual model
+            logger.info(f"🌍 Generating {job.language} speech: '{job.text[:50]}...'")
+            lang_id = LANGUAGE_MAP.get(job.language, "en")
+            wav = self.multilingual_model.generate(job.text, language_id=lang_id)
+            sample_rate = self.multilingual_model.sr
+            logger.info(f"🎵 Generated {job.language} speech successfully")
+            
+        else:
+            raise HTTPException(
+                status_code=503,
+                detail="No suitable TTS model available for the requested language"
+            )
+        
+        # The .part suffix keeps in-flight renders out of the cache's *.wav accounting
+        tmp_path = job.output_path.with_name(f"{job.output_path.name}.part")
+        ta.save(str(tmp_path), wav.cpu(), sample_rate, format="wav", encoding="PCM_S", bits_per_sample=16)
+        os.replace(tmp_path, job.output_path)
+        logger.info(f"💾 Audio cached: {job.output_path}")
+        return job.output_path
+    
+    def enforce_cache_limit(self) -> int:
+        """Evict least recently used cached utterances above TTS_CACHE_MAX_BYTES"""
+        entries = []
+        for audio_file in self.cache_dir.glob("*.wav"):
+            try:
+                stat = audio_file.stat()
+                entries.append((stat.st_mtime, stat.st_size, audio_file))
+            except FileNotFoundError:
+                continue
+        
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, audio_file in sorted(entries):
+            if total <= TTS_CACHE_MAX_BYTES:
+                break
+            try:
+                audio_file.unlink()
+                total -= size
+                removed += 1
+            except FileNotFoundError:
+                pass
+        if removed:
+            logger.info(f"🗑️ Evicted {removed} cached utterances")
+        return removed
+    
+    async def _maintenance_loop(self):
+        """Periodically clean old output files and keep the cache within its limit"""
+        while True:
+            try:
+                await asyncio.to_thread(self.cleanup_old_files)
+                await asyncio.to_thread(self.enforce_cache_limit)
+                await asyncio.sleep(TTS_MAINTENANCE_INTERVAL_SECONDS)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.warning(f"⚠️ TTS maintenance failed: {e}")
+                await asyncio.sleep(60)
+    
+    def get_cache_stats(self) -> dict:
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "in_flight": len(self._in_flight),
+            "max_bytes": TTS_CACHE_MAX_BYTES
+        }
+    
     async def generate_multilingual_demo(self) -> dict:
         """Generate demo audio files in multiple languages"""
         if not self.is_initialized:
@@ -233,7 +474,6 @@ class ChatterboxTTSManager:
             text=text,
             language="en",  # Voice cloning currently works best with English model
             voice_prompt_path=reference_audio_path,
-            output_filename=f"voice_clone_{int(asyncio.get_event_loop().time() * 1000)}.wav"
         )
     
     def get_supported_languages(self) -> list:
@@ -250,8 +490,7 @@ class ChatterboxTTSManager:
             return []
     
     def cleanup_old_files(self, max_age_hours: int = 24):
-        """Clean up old generated audio files"""
-        import time
+        """Clean up old generated audio files (the cache dir is size-bounded separately)"""
         current_time = time.time()
         
         for audio_file in self.audio_dir.glob("*.wav"):
@@ -0,0 +1,587 @@
+"""
+Project Code Index
+==================
+Symbol-level context selection for /api/ai-project-assistant.
+
+Instead of pasting the first N lines of App.jsx / main.py into every prompt, each
+project is parsed into symbol chunks and only the chunks most relevant to the
+request are sent, within a token budget:
+
+- Python (ast):    routes (decorated with app/router.get/post/...), models
+                   (BaseModel/Base/SQLModel subclasses), functions, classes and a
+                   module header (imports + app setup)
+- JS/JSX/TS:       top-level components, hooks, handlers and helpers, plus inner
+                   handler and render (`return (...)`) sub-chunks of large components
+- CSS:             fixed line windows
+
+Chunks are ranked with BM25 over identifier-aware tokens (camelCase/snake_case
+split) plus structural boosts: symbol name or file path mentioned in the request,
+and chunk kind vs request intent (UI wording favours components/render blocks,
+API wording favours routes/models).
+
+The index refreshes per file by (mtime, size), so only files that changed since
+the last request are re-parsed. Saves that go straight to S3 call update_file()
+so the index reflects them without touching disk.
+
+Usage:
+    from code_index import code_index
+
+    context = code_index.build_context(project_slug, project_path, user_message)
+"""
+
+import ast
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+CODE_CONTEXT_TOKEN_BUDGET = int(os.getenv("CODE_CONTEXT_TOKEN_BUDGET", "6000"))
+CODE_CONTEXT_TOP_K = int(os.getenv("CODE_CONTEXT_TOP_K", "12"))
+CODE_INDEX_MAX_PROJECTS = int(os.getenv("CODE_INDEX_MAX_PROJECTS", "32"))
+CODE_INDEX_MAX_FILE_BYTES = 400 * 1024
+CODE_INDEX_MAX_FILES = 500
+
+# Rough chars-per-token for budget estimates (no tokenizer on the request path)
+CHARS_PER_TOKEN = 4
+# Components longer than this also get handler/render sub-chunks
+LARGE_CHUNK_LINES = 60
+MODULE_HEADER_MAX_LINES = 40
+CSS_WINDOW_LINES = 60
+# Chunks scoring below this fraction of the best match are left out
+MIN_RELATIVE_SCORE = 0.15
+
+SKIP_DIRS = {"node_modules", ".git", "__pycache__", "dist", "build", ".vite", "venv", ".venv"}
+PYTHON_EXTENSIONS = {".py"}
+SCRIPT_EXTENSIONS = {".js", ".jsx", ".ts", ".tsx"}
+STYLE_EXTENSIONS = {".css"}
+INDEXED_EXTENSIONS = PYTHON_EXTENSIONS | SCRIPT_EXTENSIONS | STYLE_EXTENSIONS
+
+HTTP_DECORATORS = {"get", "post", "put", "patch", "delete", "head", "options", "websocket", "route", "api_route"}
+MODEL_BASES = {"BaseModel", "Base", "SQLModel", "Model", "Document", "DeclarativeBase"}
+
+# Request wording that points at a layer of the app
+FRONTEND_INTENT = {
+    "button", "color", "colour", "style", "styling", "page", "component", "ui", "layout", "design",
+    "display", "show", "view", "click", "form", "modal", "navbar", "nav", "header", "footer", "card",
+    "theme", "dark", "font", "image", "icon", "responsive", "animation", "input", "menu", "sidebar",
+}
+BACKEND_INTENT = {
+    "api", "endpoint", "route", "database", "db", "model", "schema", "backend", "server", "auth",
+    "login", "signup", "token", "query", "crud", "field", "validation", "mongo", "sql",
+}
+KIND_INTENT = {
+    "component": "frontend", "render": "frontend", "handler": "frontend", "hook": "frontend",
+    "style": "frontend", "route": "backend", "model": "backend",
+}
+
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "make", "please", "can", "you",
+    "want", "would", "add", "change", "update", "fix", "should", "when", "then", "there",
+    "are", "was", "its", "all", "any", "some", "more", "less", "new", "use", "using", "our", "my",
+    "me", "to", "of", "in", "on", "it", "is", "be", "a", "an", "or", "so", "do", "as", "at", "by",
+    "const", "let", "var", "return", "import", "export", "default", "def", "self", "none", "true",
+    "false", "null", "undefined", "function", "async", "await", "class", "classname", "div", "span",
+}
+
+_IDENTIFIER = re.compile(r"[A-Za-z_$][A-Za-z0-9_$]*|\d+")
+_CAMEL_PARTS = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+_JS_DECLARATIONS = [
+    re.compile(r"^(?:export\s+(?:default\s+)?)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)"),
+    re.compile(r"^(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*(?::[^=]+)?="),
+    re.compile(r"^(?:export\s+(?:default\s+)?)?class\s+([A-Za-z_$][\w$]*)"),
+    re.compile(r"^(?:export\s+)?(?:interface|type)\s+([A-Za-z_$][\w$]*)"),
+]
+_JS_INNER_DECLARATION = re.compile(
+    r"^(\s+)(?:const|let|function|async function)\s+((?:handle|on)[A-Z][\w$]*|use[A-Z][\w$]*|fetch[A-Z][\w$]*|load[A-Z][\w$]*)\b"
+)
+_JS_RENDER = re.compile(r"^(\s+)return\s*\(\s*$")
+_JS_MODULE_LINE = re.compile(r"^(?:import\b|export\s+\*|export\s+\{|['\"]use )")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms with identifiers split on camelCase and snake_case"""
+    terms = []
+    for identifier in _IDENTIFIER.findall(text):
+        parts = [p for chunk in identifier.split("_") for p in _CAMEL_PARTS.findall(chunk)]
+        whole = identifier.strip("_$").lower()
+        if len(parts) > 1 and whole not in STOPWORDS and len(whole) > 2:
+            terms.append(whole)
+        for part in parts:
+            part = part.lower()
+            if len(part) > 1 and part not in STOPWORDS:
+                terms.append(part)
+    return terms
+
+
+@dataclass
+class CodeChunk:
+    file_path: str
+    kind: str  # component, hook, handler, render, function, route, model, class, module, style
+    name: str
+    start_line: int  # 1-based, inclusive
+    end_line: int
+    text: str
+    terms: Counter = field(default_factory=Counter, repr=False)
+    name_terms: frozenset = field(default_factory=frozenset, repr=False)
+
+    @property
+    def token_estimate(self) -> int:
+        return len(self.text) // CHARS_PER_TOKEN + 1
+
+
+def _make_chunk(file_path: str, kind: str, name: str, lines: List[str], start: int, end: int) -> CodeChunk:
+    """Chunk for 0-based [start, end] line indices (trailing blank lines trimmed)"""
+    while end > start and not lines[end].strip():
+        end -= 1
+    text = "\n".join(lines[start:end + 1])
+    return CodeChunk(
+        file_path=file_path,
+        kind=kind,
+        name=name,
+        start_line=start + 1,
+        end_line=end + 1,
+        text=text,
+        terms=Counter(tokenize(text) + tokenize(file_path)),
+        name_terms=frozenset(tokenize(name)) | {name.lower()},
+    )
+
+
+def _window_chunks(file_path: str, kind: str, lines: List[str], size: int) -> List[CodeChunk]:
+    chunks = []
+    base = os.path.basename(file_path)
+    for start in range(0, len(lines), size):
+        end = min(start + size, len(lines)) - 1
+        if any(line.strip() for line in lines[start:end + 1]):
+            chunks.append(_make_chunk(file_path, kind, f"{base}:{start + 1}", lines, start, end))
+    return chunks
+
+
+# --- Python -------------------------------------------------------------------
+
+def _decorator_kind(node) -> str:
+    for decorator in node.decorator_list:
+        target = decorator.func if isinstance(decorator, ast.Call) else decorator
+        if isinstance(target, ast.Attribute) and target.attr in HTTP_DECORATORS:
+            return "route"
+    return "function"
+
+
+def _base_names(node: ast.ClassDef) -> Iterable[str]:
+    for base in node.bases:
+        if isinstance(base, ast.Name):
+            yield base.id
+        elif isinstance(base, ast.Attribute):
+            yield base.attr
+
+
+def parse_python(file_path: str, source: str) -> List[CodeChunk]:
+    lines = source.split("\n")
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return _window_chunks(file_path, "module", lines, LARGE_CHUNK_LINES)
+
+    chunks = []
+    first_symbol_line = len(lines)
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        start = min([node.lineno] + [d.lineno for d in node.decorator_list]) - 1
+        end = (node.end_lineno or node.lineno) - 1
+        first_symbol_line = min(first_symbol_line, start)
+
+        if isinstance(node, ast.ClassDef):
+            kind = "model" if any(name in MODEL_BASES for name in _base_names(node)) else "class"
+            chunks.append(_make_chunk(file_path, kind, node.name, lines, start, end))
+            if end - start > LARGE_CHUNK_LINES:
+                for child in node.body:
+                    if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        child_start = min([child.lineno] + [d.lineno for d in child.decorator_list]) - 1
+                        child_end = (child.end_lineno or child.lineno) - 1
+                        chunks.append(_make_chunk(file_path, "function", f"{node.name}.{child.name}", lines, child_start, child_end))
+        else:
+            chunks.append(_make_chunk(file_path, _decorator_kind(node), node.name, lines, start, end))
+
+    header_end = min(first_symbol_line, MODULE_HEADER_MAX_LINES) - 1
+    if header_end >= 0 and any(line.strip() for line in lines[:header_end + 1]):
+        chunks.append(_make_chunk(file_path, "module", os.path.basename(file_path), lines, 0, header_end))
+    return chunks
+
+
+# --- JavaScript / JSX ---------------------------------------------------------
+
+def _js_kind(name: str) -> str:
+    if re.match(r"use[A-Z]", name):
+        return "hook"
+    if re.match(r"(?:handle|on)[A-Z]", name):
+        return "handler"
+    if name[:1].isupper() and not name.isupper():
+        return "component"
+    return "function"
+
+
+def _is_top_level_start(line: str) -> bool:
+    """A column-0 line that begins a new statement (not a closing bracket or JSX continuation)"""
+    return bool(line) and not line[0].isspace() and line[0] not in "})]<>*/,.;:?|&+-="
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+
+def _block_end(lines: List[str], start: int, limit: int) -> int:
+    """End of an indented block opened at `start`: the first closer back at its indentation"""
+    base = _indent(lines[start])
+    for index in range(start + 1, limit + 1):
+        line = lines[index]
+        if not line.strip():
+            continue
+        if _indent(line) < base:
+            return index - 1
+        if _indent(line) == base:
+            stripped = line.strip()
+            if stripped[0] in "})]":
+                return index
+            return index - 1
+    return limit
+
+
+def _inner_chunks(file_path: str, component: str, lines: List[str], start: int, end: int) -> List[CodeChunk]:
+    chunks = []
+    for index in range(start + 1, end + 1):
+        line = lines[index]
+        match = _JS_INNER_DECLARATION.match(line)
+        if match:
+            block_end = _block_end(lines, index, end)
+            if block_end > index:
+                chunks.append(_make_chunk(file_path, _js_kind(match.group(2)), f"{component}.{match.group(2)}", lines, index, block_end))
+            continue
+        if _JS_RENDER.match(line):
+            block_end = _block_end(lines, index, end)
+            if block_end > index:
+                chunks.append(_make_chunk(file_path, "render", f"{component}.render", lines, index, block_end))
+    return chunks
+
+
+def parse_script(file_path: str, source: str) -> List[CodeChunk]:
+    lines = source.split("\n")
+    starts = [index for index, line in enumerate(lines) if _is_top_level_start(line)]
+    chunks = []
+    module_end = -1
+
+    # Comments directly above a declaration belong to it, not to the previous chunk
+    chunk_starts = []
+    for start in starts:
+        while start > 0 and lines[start - 1].lstrip().startswith(("//", "/*", "*")):
+            start -= 1
+        chunk_starts.append(start)
+
+    for position, start in enumerate(starts):
+        next_start = chunk_starts[position + 1] if position + 1 < len(starts) else len(lines)
+        end = max(next_start - 1, start)
+        chunk_start = chunk_starts[position]
+        line = lines[start]
+
+        if _JS_MODULE_LINE.match(line):
+            # Leading imports form the module header
+            if not chunks:
+                module_end = end
+            continue
+
+        name = None
+        for pattern in _JS_DECLARATIONS:
+            match = pattern.match(line)
+            if match:
+                name = match.group(1)
+                break
+        if name is None:
+            # Top-level statements (export default App;, ReactDOM.createRoot(...)) only matter if substantial
+            if end - start < 2:
+                continue
+            name = f"{os.path.basename(file_path)}:{start + 1}"
+            kind = "function"
+        else:
+            kind = _js_kind(name)
+
+        chunks.append(_make_chunk(file_path, kind, name, lines, chunk_start, end))
+        if kind == "component" and end - start > LARGE_CHUNK_LINES:
+            chunks.extend(_inner_chunks(file_path, name, lines, start, end))
+
+    if module_end >= 0:
+        module_end = min(module_end, MODULE_HEADER_MAX_LINES - 1)
+        chunks.append(_make_chunk(file_path, "module", os.path.basename(file_path), lines, 0, module_end))
+    return chunks
+
+
+def parse_file(file_path: str, source: str) -> List[CodeChunk]:
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in PYTHON_EXTENSIONS:
+        return parse_python(file_path, source)
+    if extension in SCRIPT_EXTENSIONS:
+        return parse_script(file_path, source)
+    if extension in STYLE_EXTENSIONS:
+        return _window_chunks(file_path, "style", source.split("\n"), CSS_WINDOW_LINES)
+    return []
+
+
+# --- Index --------------------------------------------------------------------
+
+@dataclass
+class IndexedFile:
+    # (mtime_ns, size) of the disk copy the chunks correspond to, None if not on disk
+    stat_key: Optional[Tuple[int, int]]
+    chunks: List[CodeChunk]
+
+
+class ProjectCodeIndex:
+    """Chunks for one project, refreshed per file as files change"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.files: Dict[str, IndexedFile] = {}
+        self._lock = threading.Lock()
+        self._doc_freq: Optional[Counter] = None
+        self._avg_length = 1.0
+        self.parses = 0
+
+    def _disk_files(self) -> Dict[str, Tuple[int, int]]:
+        found = {}
+        if not self.root.exists():
+            return found
+        for directory, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith(".")]
+            for filename in filenames:
+                if os.path.splitext(filename)[1].lower() not in INDEXED_EXTENSIONS:
+                    continue
+                full_path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(full_path)
+                except OSError:
+                    continue
+                if stat.st_size > CODE_INDEX_MAX_FILE_BYTES:
+                    continue
+                rel_path = os.path.relpath(full_path, self.root).replace(os.sep, "/")
+                found[rel_path] = (stat.st_mtime_ns, stat.st_size)
+                if len(found) >= CODE_INDEX_MAX_FILES:
+                    return found
+        return found
+
+    def refresh(self):
+        """Re-parse files whose (mtime, size) changed; drop files deleted from disk"""
+        disk = self._disk_files()
+        with self._lock:
+            for rel_path in [p for p, entry in self.files.items() if p not in disk and entry.stat_key is not None]:
+                del self.files[rel_path]
+                self._doc_freq = None
+            for rel_path, stat_key in disk.items():
+                entry = self.files.get(rel_path)
+                if entry is not None and entry.stat_key == stat_key:
+                    continue
+                try:
+                    with open(self.root / rel_path, "r", encoding="utf-8", errors="replace") as f:
+                        source = f.read()
+                except OSError:
+                    continue
+                self.files[rel_path] = IndexedFile(stat_key, parse_file(rel_path, source))
+                self._doc_freq = None
+                self.parses += 1
+
+    def update_file(self, rel_path: str, content: str):
+        """Index new content for one file (e.g. a save that only went to S3)"""
+        rel_path = rel_path.lstrip("/")
+        if os.path.splitext(rel_path)[1].lower() not in INDEXED_EXTENSIONS:
+            return
+        try:
+            stat = os.stat(self.root / rel_path)
+            stat_key = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stat_key = None
+        with self._lock:
+            self.files[rel_path] = IndexedFile(stat_key, parse_file(rel_path, content))
+            self._doc_freq = None
+            self.parses += 1
+
+    def remove_file(self, rel_path: str):
+        with self._lock:
+            if self.files.pop(rel_path.lstrip("/"), None) is not None:
+                self._doc_freq = None
+
+    def chunks(self) -> List[CodeChunk]:
+        with self._lock:
+            return [chunk for entry in self.files.values() for chunk in entry.chunks]
+
+    def _statistics(self, chunks: List[CodeChunk]) -> Tuple[Counter, float]:
+        with self._lock:
+            if self._doc_freq is None:
+                doc_freq = Counter()
+                total = 0
+                for chunk in chunks:
+                    doc_freq.update(chunk.terms.keys())
+                    total += sum(chunk.terms.values())
+                self._doc_freq = doc_freq
+                self._avg_length = total / len(chunks) if chunks else 1.0
+            return self._doc_freq, self._avg_length
+
+    def rank(self, query: str) -> List[Tuple[float, CodeChunk]]:
+        """Chunks ordered by BM25 + structural relevance to the request"""
+        chunks = self.chunks()
+        if not chunks:
+            return []
+        doc_freq, avg_length = self._statistics(chunks)
+        query_terms = set(tokenize(query))
+        query_lower = query.lower()
+        words = set(re.findall(r"[a-z]+", query_lower))
+        frontend_intent = len(words & FRONTEND_INTENT)
+        backend_intent = len(words & BACKEND_INTENT)
+        mentioned_files = {path for path in {c.file_path for c in chunks} if os.path.basename(path).lower() in query_lower}
+
+        k1, b = 1.2, 0.75
+        total = len(chunks)
+        scored = []
+        for chunk in chunks:
+            length = sum(chunk.terms.values()) or 1
+            score = 0.0
+            for term in query_terms:
+                frequency = chunk.terms.get(term)
+                if not frequency:
+                    continue
+                idf = math.log(1 + (total - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / avg_length))
+
+            # Structural relevance
+            if chunk.name.lower() in query_lower and len(chunk.name) > 2:
+                score += 5.0
+            score += 2.0 * len(chunk.name_terms & query_terms)
+            if chunk.file_path in mentioned_files:
+                score += 3.0
+            if score > 0:
+                layer = KIND_INTENT.get(chunk.kind)
+                if layer == "frontend" and frontend_intent > backend_intent:
+                    score += 1.0
+                elif layer == "backend" and backend_intent > frontend_intent:
+                    score += 1.0
+            # Entry points are the best guess for vague requests
+            if chunk.name == "App" or (chunk.kind == "render" and chunk.name.startswith("App.")):
+                score += 0.5
+            scored.append((score, chunk))
+
+        scored.sort(key=lambda item: (-item[0], item[1].token_estimate))
+        return scored
+
+    def _entry_chunks(self) -> List[CodeChunk]:
+        """Top-level symbols of App.* and backend main.py, App component first"""
+        entry_files = {"app.jsx", "app.tsx", "app.js", "main.py"}
+        chunks = [
+            chunk for chunk in self.chunks()
+            if os.path.basename(chunk.file_path).lower() in entry_files and "." not in chunk.name
+        ]
+        return sorted(chunks, key=lambda c: (c.name != "App", c.file_path, c.start_line))
+
+    def select(self, query: str, token_budget: int = CODE_CONTEXT_TOKEN_BUDGET, top_k: int = CODE_CONTEXT_TOP_K) -> List[CodeChunk]:
+        """Top-K non-overlapping chunks that fit the budget, most relevant first"""
+        selected: List[CodeChunk] = []
+        used = 0
+        ranked = self.rank(query)
+        if not ranked or ranked[0][0] < 1.0:
+            # Nothing in the request points anywhere specific: fall back to the entry files
+            ranked = [(1.0, chunk) for chunk in self._entry_chunks()]
+        # Weak matches only add noise to the prompt
+        cutoff = ranked[0][0] * MIN_RELATIVE_SCORE if ranked else 0
+        for score, chunk in ranked:
+            if len(selected) >= top_k:
+                break
+            if selected and (score <= 0 or score < cutoff):
+                break
+            if used + chunk.token_estimate > token_budget:
+                continue
+            if any(
+                other.file_path == chunk.file_path
+                and other.start_line <= chunk.end_line and chunk.start_line <= other.end_line
+                for other in selected
+            ):
+                continue
+            selected.append(chunk)
+            used += chunk.token_estimate
+        return selected
+
+
+def format_chunks(chunks: List[CodeChunk]) -> str:
+    """Prompt block: selected chunks grouped by file, in file order, verbatim"""
+    if not chunks:
+        return ""
+    by_file: Dict[str, List[CodeChunk]] = {}
+    for chunk in chunks:
+        by_file.setdefault(chunk.file_path, []).append(chunk)
+
+    fences = {".py": "python", ".jsx": "jsx", ".js": "javascript", ".ts": "typescript", ".tsx": "tsx", ".css": "css"}
+    parts = ["\n\nRELEVANT PROJECT CODE (excerpts copied verbatim from the files, most relevant symbols only):"]
+    for file_path, file_chunks in by_file.items():
+        fence = fences.get(os.path.splitext(file_path)[1].lower(), "")
+        for chunk in sorted(file_chunks, key=lambda c: c.start_line):
+            parts.append(
+                f"\n{file_path} (lines {chunk.start_line}-{chunk.end_line}, {chunk.kind} {chunk.name}):\n"
+                f"```{fence}\n{chunk.text}\n```"
+            )
+    return "\n".join(parts) + "\n"
+
+
+class CodeIndexRegistry:
+    """LRU of per-project indexes keyed by project slug"""
+
+    def __init__(self, max_projects: int = CODE_INDEX_MAX_PROJECTS):
+        self.max_projects = max_projects
+        self._projects: "OrderedDict[str, ProjectCodeIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, project_slug: str, root: Optional[Path] = None) -> ProjectCodeIndex:
+        key = project_slug.lower()
+        with self._lock:
+            index = self._projects.get(key)
+            if index is None:
+                index = ProjectCodeIndex(root or Path("generated_projects") / key)
+                self._projects[key] = index
+            elif root is not None and Path(root) != index.root:
+                index.root = Path(root)
+            self._projects.move_to_end(key)
+            while len(self._projects) > self.max_projects:
+                self._projects.popitem(last=False)
+            return index
+
+    def update_file(self, project_slug: str, rel_path: str, content: str):
+        self.get(project_slug).update_file(rel_path, content)
+
+    def invalidate(self, project_slug: str):
+        with self._lock:
+            self._projects.pop(project_slug.lower(), None)
+
+    def build_context(
+        self,
+        project_slug: str,
+        root: Path,
+        query: str,
+        token_budget: int = CODE_CONTEXT_TOKEN_BUDGET,
+        top_k: int = CODE_CONTEXT_TOP_K,
+    ) -> str:
+        """Refresh the project's index and format the most relevant chunks for a prompt"""
+        index = self.get(project_slug, root)
+        index.refresh()
+        return format_chunks(index.select(query, token_budget, top_k))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            projects = list(self._projects.values())
+        return {
+            "projects": len(projects),
+            "files": sum(len(p.files) for p in projects),
+            "chunks": sum(len(e.chunks) for p in projects for e in p.files.values()),
+            "parses": sum(p.parses for p in projects),
+        }
+
+
+# Global index registry
+code_index = CodeIndexRegistry()
@@ -14,7 +14,8 @@ applications are secure and privacy-compliant by design.
 """
 
 import json
-from dataclasses import dataclass, field
+import hashlib
+from dataclasses import dataclass, field, asdict
 from typing import Dict, List, Optional, Any
 from enum import Enum
 from datetime import datetime
@@ -95,6 +96,8 @@ class ComplianceFramework:
     def __init__(self):
         self.requirements = self._load_compliance_requirements()
         self.code_patterns = self._load_code_patterns()
+        # Identifies the loaded requirements; responses built from them are cached per version
+        self.version = self.generate_hash()
         
     def _load_compliance_requirements(self) -> Dict[str, ComplianceRequirement]:
         """Load all compliance requirements"""
@@ -1410,6 +1413,14 @@ schedule.every().day.at("03:00").do(retention_manager.run_all_retention_policies
 ''',
         }
     
+    def generate_hash(self) -> str:
+        """Hash of the requirements and code patterns, for cache invalidation"""
+        content = json.dumps({
+            "requirements": {req_id: asdict(req) for req_id, req in sorted(self.requirements.items())},
+            "code_patterns": self.code_patterns,
+        }, sort_keys=True, default=lambda value: value.value if isinstance(value, Enum) else str(value))
+        return hashlib.sha256(content.encode()).hexdigest()
+    
     def get_compliance_prompt_injection(
         self,
         standards: List[ComplianceStandard] = None
@@ -1693,10 +1704,8 @@ compliance_framework = ComplianceFramework()
 
 def get_compliance_requirements() -> Dict[str, Any]:
     """Get all compliance requirements for documentation"""
-    framework = ComplianceFramework()
-    
     requirements_by_standard = {}
-    for req_id, req in framework.requirements.items():
+    for req_id, req in compliance_framework.requirements.items():
         standard_name = req.standard.value
         if standard_name not in requirements_by_standard:
             requirements_by_standard[standard_name] = []
@@ -1716,5 +1725,4 @@ def get_compliance_requirements() -> Dict[str, Any]:
 
 def get_compliance_code_patterns() -> Dict[str, str]:
     """Get all compliant code patterns"""
-    framework = ComplianceFramework()
-    return framework.code_patterns
+    return compliance_framework.code_patterns
@@ -3,8 +3,12 @@ MongoDB Database Configuration and Models
 Handles user authentication and storage
 """
 import os
+import copy
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Optional
 from pymongo import MongoClient, ASCENDING
 from pymongo.errors import DuplicateKeyError
 from dotenv import load_dotenv
@@ -15,6 +19,10 @@ load_dotenv()
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017/")
 DATABASE_NAME = os.getenv("MONGODB_DATABASE", "altx_db")
 
+# Authenticated-user cache (keyed by JWT `sub`)
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "2048"))
+
 class MongoDB:
     """MongoDB connection manager"""
     
@@ -52,6 +60,80 @@ class MongoDB:
             cls._db = None
 
 
+class UserPrincipalCache:
+    """
+    Short-lived, size-bounded LRU cache of user documents keyed by user id.
+    
+    Used by the request auth dependency so repeated calls from the same
+    session don't each hit MongoDB. Entries expire after USER_CACHE_TTL_SECONDS
+    and are invalidated by UserModel.update_user (and therefore
+    verify_user/deactivate_user). Callers get a copy, so mutating the returned
+    dict (e.g. popping hashed_password) never touches the cached entry.
+    """
+    
+    def __init__(self, ttl_seconds: float = USER_CACHE_TTL_SECONDS, max_size: int = USER_CACHE_MAX_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, user_id: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+        return copy.deepcopy(user)
+    
+    def put(self, user_id: str, user: dict) -> None:
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(user))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, user_id: Any) -> None:
+        with self._lock:
+            if self._entries.pop(str(user_id), None) is not None:
+                self.invalidations += 1
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "db_lookups_saved": self.hits,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+user_cache = UserPrincipalCache()
+
+
 class UserModel:
     """User database operations"""
     
@@ -130,6 +212,8 @@ class UserModel:
             return result.modified_count > 0
         except:
             return False
+        finally:
+            user_cache.invalidate(user_id)
     
     def verify_user(self, user_id: str) -> bool:
         """Mark user as verified"""
@@ -0,0 +1,387 @@
+"""
+Shared Dependency Store
+=======================
+Content-addressed cache for the npm / pip installs behind /api/install-dependencies.
+
+Generated projects share almost the same dependency sets, so installs are built
+once per manifest hash and reused:
+
+- npm: DEPENDENCY_STORE_DIR/npm/<hash>/node_modules is built with a real
+       `npm install` the first time a package.json (+ lockfile) is seen, then
+       materialized into each project by hardlinking the tree (copy fallback
+       across filesystems). A marker file makes repeat installs a no-op.
+- pip: wheels are built into a scratch dir, moved into one shared wheelhouse
+       (DEPENDENCY_STORE_DIR/pip/wheels), and each requirements hash records the
+       wheel set it needs (the scratch dir's listing). Projects install
+       from the wheelhouse with --no-index, so nothing is downloaded twice.
+
+Setting DEPENDENCY_MIRROR_DIR switches the store to offline mode: npm resolves
+only from DEPENDENCY_MIRROR_DIR/npm (an npm cache directory) and pip only from
+the wheels/sdists in DEPENDENCY_MIRROR_DIR/pip.
+
+Hashes normalize away formatting (key order, comments, blank lines) and include
+the platform, so only real dependency changes trigger a build. Least recently
+used store entries beyond DEPENDENCY_STORE_MAX_ENTRIES are pruned; projects keep
+their hardlinked files.
+
+Usage:
+    from dependency_store import dependency_store
+
+    async def emit(message):
+        await manager.send_to_project(project_name, message)
+
+    result = await dependency_store.install_npm(frontend_path, emit, owner=project_slug)
+    result = await dependency_store.install_pip(backend_path, emit, owner=project_slug)
+"""
+
+import asyncio
+import errno
+import hashlib
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from process_supervisor import Emitter, LineCallback, process_supervisor
+
+DEPENDENCY_STORE_DIR = Path(os.getenv(
+    "DEPENDENCY_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "dependency_store"),
+))
+DEPENDENCY_MIRROR_DIR = os.getenv("DEPENDENCY_MIRROR_DIR", "")
+DEPENDENCY_STORE_MAX_ENTRIES = int(os.getenv("DEPENDENCY_STORE_MAX_ENTRIES", "50"))
+DEPENDENCY_INSTALL_TIMEOUT_SECONDS = int(os.getenv("DEPENDENCY_INSTALL_TIMEOUT_SECONDS", "600"))
+
+# Marker written into a project's node_modules recording which store entry it came from
+NPM_MARKER = ".altx-deps-key"
+# package.json fields that affect what ends up in node_modules
+NPM_DEPENDENCY_FIELDS = (
+    "dependencies", "devDependencies", "optionalDependencies",
+    "peerDependencies", "overrides", "resolutions",
+)
+ERROR_TAIL_LINES = 20
+
+@dataclass
+class InstallResult:
+    success: bool
+    ecosystem: str
+    key: str
+    cache_hit: bool
+    seconds: float
+    error: Optional[str] = None
+    details: Dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "success": self.success,
+            "ecosystem": self.ecosystem,
+            "key": self.key,
+            "cache_hit": self.cache_hit,
+            "seconds": round(self.seconds, 2),
+            "error": self.error,
+            **self.details,
+        }
+
+
+def _platform_tag() -> str:
+    return f"{sys.platform}-{platform.machine()}"
+
+
+def npm_key(package_json: str, lockfile: Optional[str] = None) -> str:
+    """Hash of the dependency-relevant parts of package.json (+ lockfile)"""
+    try:
+        manifest = json.loads(package_json)
+    except ValueError:
+        manifest = {"raw": package_json}
+    relevant = {name: manifest.get(name) for name in NPM_DEPENDENCY_FIELDS if manifest.get(name)}
+    digest = hashlib.sha256()
+    digest.update(f"npm\0{_platform_tag()}\0".encode("utf-8"))
+    digest.update(json.dumps(relevant, sort_keys=True).encode("utf-8"))
+    if lockfile:
+        digest.update(b"\0")
+        digest.update(lockfile.encode("utf-8"))
+    return digest.hexdigest()[:24]
+
+
+def normalize_requirements(requirements: str) -> List[str]:
+    lines = set()
+    for line in requirements.splitlines():
+        line = line.split(" #", 1)[0].strip()
+        if line and not line.startswith("#"):
+            lines.add(" ".join(line.split()).lower())
+    return sorted(lines)
+
+
+def pip_key(requirements: str) -> str:
+    """Hash of the normalized requirement lines for this interpreter/platform"""
+    digest = hashlib.sha256()
+    python_tag = f"cp{sys.version_info.major}{sys.version_info.minor}"
+    digest.update(f"pip\0{python_tag}\0{_platform_tag()}\0".encode("utf-8"))
+    digest.update("\n".join(normalize_requirements(requirements)).encode("utf-8"))
+    return digest.hexdigest()[:24]
+
+
+def link_tree(source: Path, target: Path) -> int:
+    """Recreate source under target with hardlinks (copies across devices); returns files linked"""
+    linked = 0
+    can_link = True
+    for root, dirs, files in os.walk(source, followlinks=False):
+        relative = Path(root).relative_to(source)
+        destination = target / relative
+        destination.mkdir(parents=True, exist_ok=True)
+        for name in dirs + files:
+            src = Path(root) / name
+            dst = destination / name
+            if src.is_symlink():
+                # node_modules/.bin entries are relative symlinks - keep them as links
+                os.symlink(os.readlink(src), dst)
+                continue
+            if name in dirs:
+                continue
+            if can_link:
+                try:
+                    os.link(src, dst)
+                    linked += 1
+                    continue
+                except OSError as e:
+                    if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                        raise
+                    can_link = False
+            shutil.copy2(src, dst)
+            linked += 1
+    return linked
+
+
+async def stream_process(
+    args: List[str],
+    cwd: Path,
+    owner: str,
+    emit: Optional[Emitter] = None,
+    on_line: Optional[LineCallback] = None,
+) -> tuple:
+    """Run an install command under the process supervisor; returns (returncode, output tail)"""
+    result = await process_supervisor.run(
+        owner, "install", args, cwd,
+        emit=emit,
+        on_line=on_line,
+        timeout=DEPENDENCY_INSTALL_TIMEOUT_SECONDS,
+    )
+    tail = "\n".join(result.output.splitlines()[-ERROR_TAIL_LINES:])
+    if result.cancelled:
+        return -1, tail + "\nCancelled"
+    if result.timed_out:
+        return -1, tail
+    return result.returncode, tail
+
+
+class DependencyStore:
+    """Builds each dependency set once and shares it across generated projects"""
+
+    def __init__(self, root: Path = DEPENDENCY_STORE_DIR, mirror_dir: str = DEPENDENCY_MIRROR_DIR):
+        self.root = Path(root)
+        self.mirror_dir = Path(mirror_dir) if mirror_dir else None
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.hits = 0
+        self.builds = 0
+
+    @property
+    def npm_dir(self) -> Path:
+        return self.root / "npm"
+
+    @property
+    def wheelhouse(self) -> Path:
+        return self.root / "pip" / "wheels"
+
+    @property
+    def pip_sets_dir(self) -> Path:
+        return self.root / "pip" / "sets"
+
+    def _lock(self, key: str) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    # ------------------------------------------------------------------ npm
+
+    def _npm_args(self, has_lockfile: bool) -> List[str]:
+        args = ["npm", "ci" if has_lockfile else "install", "--no-audit", "--no-fund"]
+        if self.mirror_dir:
+            args += ["--offline", "--cache", str(self.mirror_dir / "npm")]
+        else:
+            args += ["--prefer-offline", "--cache", str(self.root / "npm-cache")]
+        return args
+
+    async def _build_npm(self, key: str, package_json: str, lockfile: Optional[str], emit: Optional[Emitter], owner: str):
+        entry = self.npm_dir / key
+        staging = self.npm_dir / f".tmp-{key}-{uuid.uuid4().hex[:8]}"
+        staging.mkdir(parents=True)
+        try:
+            (staging / "package.json").write_text(package_json, encoding="utf-8")
+            if lockfile:
+                (staging / "package-lock.json").write_text(lockfile, encoding="utf-8")
+            returncode, tail = await stream_process(self._npm_args(bool(lockfile)), staging, owner, emit)
+            if returncode != 0:
+                raise RuntimeError(f"npm install failed ({returncode}):\n{tail}")
+            (staging / "node_modules").mkdir(exist_ok=True)
+            os.replace(staging, entry)
+            self.builds += 1
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    async def install_npm(self, project_dir: Path, emit: Optional[Emitter] = None, owner: str = "dependency-store") -> InstallResult:
+        """Materialize node_modules for project_dir from the store, building it if needed"""
+        started = time.time()
+        project_dir = Path(project_dir)
+        package_json = (project_dir / "package.json").read_text(encoding="utf-8")
+        lock_path = project_dir / "package-lock.json"
+        lockfile = lock_path.read_text(encoding="utf-8") if lock_path.exists() else None
+        key = npm_key(package_json, lockfile)
+        node_modules = project_dir / "node_modules"
+
+        marker = node_modules / NPM_MARKER
+        if marker.exists() and marker.read_text(encoding="utf-8").strip() == key:
+            self.hits += 1
+            return InstallResult(True, "npm", key, True, time.time() - started)
+
+        try:
+            async with self._lock(f"npm:{key}"):
+                entry = self.npm_dir / key
+                cache_hit = entry.exists()
+                if not cache_hit:
+                    await self._build_npm(key, package_json, lockfile, emit, owner)
+                else:
+                    self.hits += 1
+                os.utime(entry)
+
+                if node_modules.exists() or node_modules.is_symlink():
+                    await asyncio.to_thread(shutil.rmtree, node_modules, True)
+                linked = await asyncio.to_thread(link_tree, entry / "node_modules", node_modules)
+                marker.write_text(key, encoding="utf-8")
+        except Exception as e:
+            return InstallResult(False, "npm", key, False, time.time() - started, error=str(e))
+
+        await asyncio.to_thread(self.prune)
+        return InstallResult(True, "npm", key, cache_hit, time.time() - started, details={"files_linked": linked})
+
+    # ------------------------------------------------------------------ pip
+
+    def _pip_find_links(self) -> List[str]:
+        args = ["--find-links", str(self.wheelhouse)]
+        if self.mirror_dir:
+            args = ["--no-index", "--find-links", str(self.mirror_dir / "pip")] + args
+        return args
+
+    def _adopt_wheels(self, build_dir: Path) -> List[str]:
+        """Move freshly built wheels into the wheelhouse; returns the set's wheel names"""
+        wheels = sorted(wheel.name for wheel in build_dir.glob("*.whl"))
+        for name in wheels:
+            target = self.wheelhouse / name
+            if target.exists():
+                # Wheel filenames pin name, version and tags: the shared copy is the same wheel
+                (build_dir / name).unlink()
+            else:
+                os.replace(build_dir / name, target)
+        return wheels
+
+    async def install_pip(self, project_dir: Path, emit: Optional[Emitter] = None, owner: str = "dependency-store") -> InstallResult:
+        """Install requirements.txt from the shared wheelhouse, building missing wheels once"""
+        started = time.time()
+        project_dir = Path(project_dir)
+        requirements_path = project_dir / "requirements.txt"
+        key = pip_key(requirements_path.read_text(encoding="utf-8"))
+        set_path = self.pip_sets_dir / f"{key}.json"
+
+        try:
+            async with self._lock(f"pip:{key}"):
+                cache_hit = set_path.exists()
+                if not cache_hit:
+                    self.wheelhouse.mkdir(parents=True, exist_ok=True)
+                    self.pip_sets_dir.mkdir(parents=True, exist_ok=True)
+                    # pip copies wheels it already finds in the wheelhouse into -w as well,
+                    # so an empty scratch dir ends up holding exactly this set's wheels
+                    build_dir = self.pip_sets_dir / f".build-{key}-{uuid.uuid4().hex[:8]}"
+                    build_dir.mkdir()
+                    try:
+                        returncode, tail = await stream_process(
+                            [sys.executable, "-m", "pip", "wheel", "-r", str(requirements_path),
+                             "-w", str(build_dir), *self._pip_find_links()],
+                            project_dir,
+                            owner,
+                            emit,
+                        )
+                        if returncode != 0:
+                            raise RuntimeError(f"pip wheel failed ({returncode}):\n{tail}")
+                        wheels = await asyncio.to_thread(self._adopt_wheels, build_dir)
+                    finally:
+                        await asyncio.to_thread(shutil.rmtree, build_dir, True)
+                    report_path = self.pip_sets_dir / f".tmp-{key}-{uuid.uuid4().hex[:8]}.json"
+                    report_path.write_text(json.dumps({"key": key, "wheels": wheels}), encoding="utf-8")
+                    os.replace(report_path, set_path)
+                    self.builds += 1
+                else:
+                    self.hits += 1
+                    os.utime(set_path)
+
+                returncode, tail = await stream_process(
+                    [sys.executable, "-m", "pip", "install", "--no-index",
+                     "--find-links", str(self.wheelhouse), "-r", str(requirements_path)],
+                    project_dir,
+                    owner,
+                    emit,
+                )
+                if returncode != 0:
+                    if cache_hit:
+                        # The recorded set may point at pruned or broken wheels: rebuild next time
+                        set_path.unlink(missing_ok=True)
+                    raise RuntimeError(f"pip install failed ({returncode}):\n{tail}")
+        except Exception as e:
+            return InstallResult(False, "pip", key, False, time.time() - started, error=str(e))
+
+        await asyncio.to_thread(self.prune)
+        return InstallResult(True, "pip", key, cache_hit, time.time() - started)
+
+    # ------------------------------------------------------------------ maintenance
+
+    def prune(self, max_entries: int = DEPENDENCY_STORE_MAX_ENTRIES):
+        """Drop least recently used npm entries / pip sets and wheels no set references"""
+        try:
+            npm_entries = [p for p in self.npm_dir.iterdir() if p.is_dir() and not p.name.startswith(".")] if self.npm_dir.exists() else []
+            for stale in sorted(npm_entries, key=lambda p: p.stat().st_mtime, reverse=True)[max_entries:]:
+                shutil.rmtree(stale, ignore_errors=True)
+
+            pip_sets = list(self.pip_sets_dir.glob("*.json")) if self.pip_sets_dir.exists() else []
+            pip_sets.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+            for stale in pip_sets[max_entries:]:
+                stale.unlink(missing_ok=True)
+            if len(pip_sets) > max_entries:
+                referenced = set()
+                for set_path in pip_sets[:max_entries]:
+                    referenced.update(json.loads(set_path.read_text(encoding="utf-8")).get("wheels", []))
+                for wheel in self.wheelhouse.glob("*.whl"):
+                    if wheel.name not in referenced:
+                        wheel.unlink(missing_ok=True)
+        except OSError as e:
+            print(f"⚠️ Dependency store prune failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        npm_entries = sum(1 for p in self.npm_dir.iterdir() if p.is_dir() and not p.name.startswith(".")) if self.npm_dir.exists() else 0
+        pip_sets = sum(1 for _ in self.pip_sets_dir.glob("*.json")) if self.pip_sets_dir.exists() else 0
+        wheels = sum(1 for _ in self.wheelhouse.glob("*.whl")) if self.wheelhouse.exists() else 0
+        return {
+            "npm_entries": npm_entries,
+            "pip_sets": pip_sets,
+            "wheels": wheels,
+            "hits": self.hits,
+            "builds": self.builds,
+        }
+
+
+# Global store instance
+dependency_store = DependencyStore()
@@ -14,7 +14,11 @@ Also integrates with website_analyzer.py for "build a website like X" feature.
 
 import requests
 from bs4 import BeautifulSoup
+import asyncio
 import json
+import os
+import tempfile
+import threading
 import time
 import random
 from typing import Dict, List, Any, Optional
@@ -22,6 +26,12 @@ from dataclasses import dataclass, asdict
 from urllib.parse import urljoin, urlparse
 import re
 
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
 # Import website analyzer for integration
 try:
     from website_analyzer import (
@@ -104,6 +114,59 @@ class DesignTrendScraper:
         print(f"✅ Live scraping complete: {len(all_trends)} design trends extracted")
         return all_trends
     
+    async def scrape_live_design_data_async(self) -> List[DesignTrend]:
+        """Scrape all sources concurrently instead of one after another."""
+        print("🌐 Starting concurrent live scraping of award-winning design sites...")
+        
+        results = await asyncio.gather(
+            self._scrape_awwwards_live_async(),
+            asyncio.to_thread(self._scrape_css_design_awards),
+            asyncio.to_thread(self._scrape_dribbble_public),
+            return_exceptions=True
+        )
+        
+        all_trends = []
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"   ⚠️ Source failed during concurrent scrape: {result}")
+                continue
+            all_trends.extend(result)
+        
+        print(f"✅ Concurrent scraping complete: {len(all_trends)} design trends extracted")
+        return all_trends
+    
+    async def _scrape_awwwards_live_async(self) -> List[DesignTrend]:
+        """Fetch the Awwwards listing pages concurrently."""
+        if not HTTPX_AVAILABLE:
+            return await asyncio.to_thread(self._scrape_awwwards_live)
+        
+        print("🏆 Live scraping Awwwards (async)...")
+        urls = self.scraping_targets['awwwards'][:2]  # Try first 2 URLs
+        
+        async with httpx.AsyncClient(
+            headers=dict(self.session.headers),
+            timeout=15,
+            follow_redirects=True
+        ) as client:
+            async def fetch(url: str) -> List[DesignTrend]:
+                try:
+                    await asyncio.sleep(random.uniform(0, 1))  # Respectful jitter
+                    response = await client.get(url)
+                    if response.status_code != 200:
+                        print(f"   ⚠️ HTTP {response.status_code} for {url}")
+                        return []
+                    # Parsing is CPU-bound, keep it off the event loop
+                    return await asyncio.to_thread(self._parse_awwwards_page, response.content, url)
+                except Exception as e:
+                    print(f"   ⚠️ Error scraping {url}: {str(e)[:80]}...")
+                    return []
+            
+            pages = await asyncio.gather(*(fetch(url) for url in urls))
+        
+        trends = [trend for page in pages for trend in page]
+        print(f"   ✅ Awwwards: {len(trends)} live trends")
+        return trends
+    
     def _scrape_awwwards_live(self) -> List[DesignTrend]:
         """Live scrape Awwwards for actual design data."""
         trends = []
@@ -117,53 +180,7 @@ class DesignTrendScraper:
                     response = self.session.get(url, timeout=15)
                     
                     if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        
-                        # Find all collectable site items
-                        site_items = soup.find_all('li', class_='js-collectable')
-                        print(f"   📦 Found {len(site_items)} sites at {url}")
-                        
-                        for item in site_items[:5]:  # Process first 5 sites
-                            try:
-                                # Extract site name
-                                title_el = item.find('h2') or item.find('h3') or item.find(class_='title')
-                                site_name = title_el.get_text(strip=True) if title_el else "Award-Winning Site"
-                                
-                                # Extract link
-                                link_el = item.find('a', href=True)
-                                site_url = link_el['href'] if link_el else url
-                                
-                                # Try to get design tags/categories
-                                tags = item.find_all(class_='tag') or item.find_all(class_='badge')
-                                tag_texts = [t.get_text(strip=True) for t in tags[:3]]
-                                
-                                # Create trend from site
-                                trend = DesignTrend(
-                                    site_name=f"Awwwards SOTD: {site_name[:50]}",
-                                    layout_type="Award-Winning Layout",
-                                    color_scheme="Modern Color Palette",
-                                    typography_style="Contemporary Typography",
-                                    navigation_pattern="Innovative Navigation",
-                                    grid_system="Advanced CSS Grid",
-                                    animation_style="Smooth Micro-interactions",
-                                    visual_effects=["Glass Morphism", "Gradient Overlays", "3D Elements"],
-                                    responsive_approach="Mobile-First Adaptive",
-                                    interaction_patterns=["Scroll Animations", "Hover Effects", "Parallax"],
-                                    css_techniques=["CSS Grid", "Flexbox", "Custom Properties"],
-                                    design_principles=tag_texts if tag_texts else ["Award-Winning", "User-Centric", "Modern"],
-                                    inspiration_url=site_url if site_url.startswith('http') else f"https://www.awwwards.com{site_url}",
-                                    extracted_at=time.strftime("%Y-%m-%d %H:%M:%S")
-                                )
-                                trends.append(trend)
-                                
-                            except Exception as e:
-                                continue
-                                
-                        # Also extract general page design data
-                        design_data = self._extract_live_design_data(soup, url)
-                        if design_data:
-                            trends.append(design_data)
-                            
+                        trends.extend(self._parse_awwwards_page(response.content, url))
                     else:
                         print(f"   ⚠️ HTTP {response.status_code} for {url}")
                         
@@ -178,6 +195,58 @@ class DesignTrendScraper:
             
         return trends
         
+    def _parse_awwwards_page(self, content: bytes, url: str) -> List[DesignTrend]:
+        """Turn one fetched Awwwards listing page into design trends."""
+        trends = []
+        soup = BeautifulSoup(content, 'html.parser')
+
+        # Find all collectable site items
+        site_items = soup.find_all('li', class_='js-collectable')
+        print(f"   📦 Found {len(site_items)} sites at {url}")
+
+        for item in site_items[:5]:  # Process first 5 sites
+            try:
+                # Extract site name
+                title_el = item.find('h2') or item.find('h3') or item.find(class_='title')
+                site_name = title_el.get_text(strip=True) if title_el else "Award-Winning Site"
+
+                # Extract link
+                link_el = item.find('a', href=True)
+                site_url = link_el['href'] if link_el else url
+
+                # Try to get design tags/categories
+                tags = item.find_all(class_='tag') or item.find_all(class_='badge')
+                tag_texts = [t.get_text(strip=True) for t in tags[:3]]
+
+                # Create trend from site
+                trend = DesignTrend(
+                    site_name=f"Awwwards SOTD: {site_name[:50]}",
+                    layout_type="Award-Winning Layout",
+                    color_scheme="Modern Color Palette",
+                    typography_style="Contemporary Typography",
+                    navigation_pattern="Innovative Navigation",
+                    grid_system="Advanced CSS Grid",
+                    animation_style="Smooth Micro-interactions",
+                    visual_effects=["Glass Morphism", "Gradient Overlays", "3D Elements"],
+                    responsive_approach="Mobile-First Adaptive",
+                    interaction_patterns=["Scroll Animations", "Hover Effects", "Parallax"],
+                    css_techniques=["CSS Grid", "Flexbox", "Custom Properties"],
+                    design_principles=tag_texts if tag_texts else ["Award-Winning", "User-Centric", "Modern"],
+                    inspiration_url=site_url if site_url.startswith('http') else f"https://www.awwwards.com{site_url}",
+                    extracted_at=time.strftime("%Y-%m-%d %H:%M:%S")
+                )
+                trends.append(trend)
+
+            except Exception as e:
+                continue
+
+        # Also extract general page design data
+        design_data = self._extract_live_design_data(soup, url)
+        if design_data:
+            trends.append(design_data)
+        
+        return trends
+    
     def _scrape_css_design_awards(self) -> List[DesignTrend]:
         """Scrape CSS Design Awards for trending layouts."""
         trends = []
@@ -864,7 +933,12 @@ class DesignTrendScraper:
         ]
 
     def save_trends_to_cache(self, trends: List[DesignTrend], filename: str = "design_trends_cache.json"):
-        """Save trends to cache for reuse."""
+        """Save trends to cache for reuse.
+        
+        The JSON is written to a temp file in the same directory and moved into
+        place with os.replace, so concurrent readers/workers never see a partial file.
+        """
+        tmp_path = None
         try:
             cache_data = {
                 "updated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
@@ -872,50 +946,145 @@ class DesignTrendScraper:
                 "trends": [asdict(trend) for trend in trends]
             }
             
-            with open(filename, 'w', encoding='utf-8') as f:
+            cache_dir = os.path.dirname(os.path.abspath(filename))
+            fd, tmp_path = tempfile.mkstemp(prefix=".design_trends_", suffix=".tmp", dir=cache_dir)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
                 json.dump(cache_data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, filename)
+            tmp_path = None
                 
             print(f"💾 Saved {len(trends)} trends to {filename}")
             
         except Exception as e:
             print(f"❌ Failed to save trends cache: {e}")
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def refresh_cache_async(self, filename: str = "design_trends_cache.json") -> List[DesignTrend]:
+        """Background refresh job: scrape all sources concurrently and rewrite the cache."""
+        trends = await self.scrape_live_design_data_async()
+        trends.extend(self._get_curated_2025_trends())
+        if trends:
+            await asyncio.to_thread(self.save_trends_to_cache, trends, filename)
+        return trends
 
 # Global scraper instance
 design_scraper = DesignTrendScraper()
 
+# Cache is considered fresh for this long; older entries are served stale while refreshing
+CACHE_MAX_AGE_HOURS = 24
+
+_refresh_lock = threading.Lock()
+_refreshing_files: set = set()
+
+
+def _run_refresh(cache_file: str) -> None:
+    """Run one refresh job to completion on its own event loop."""
+    try:
+        asyncio.run(design_scraper.refresh_cache_async(cache_file))
+    except Exception as e:
+        print(f"❌ Background design trend refresh failed: {e}")
+    finally:
+        with _refresh_lock:
+            _refreshing_files.discard(cache_file)
+
+
+def schedule_design_trends_refresh(cache_file: str = "design_trends_cache.json") -> bool:
+    """
+    Start a background refresh of the trends cache unless one is already running.
+    
+    Returns:
+        True if a new refresh job was started
+    """
+    with _refresh_lock:
+        if cache_file in _refreshing_files:
+            return False
+        _refreshing_files.add(cache_file)
+    
+    thread = threading.Thread(
+        target=_run_refresh,
+        args=(cache_file,),
+        name="design-trends-refresh",
+        daemon=True
+    )
+    thread.start()
+    print("🔄 Design trends cache is stale, refreshing in background")
+    return True
+
+
+def _load_cached_trends(cache_file: str) -> Optional[tuple]:
+    """Read the cache file, returning (trends, age_hours) or None if missing/invalid."""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache_data = json.load(f)
+        
+        cache_time = time.strptime(cache_data['updated_at'], "%Y-%m-%d %H:%M:%S")
+        cache_age_hours = (time.time() - time.mktime(cache_time)) / 3600
+        trends = [DesignTrend(**trend_data) for trend_data in cache_data['trends']]
+        return trends, cache_age_hours
+        
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return None  # Cache doesn't exist or is invalid
+
+
 def get_latest_design_trends(use_cache: bool = True, cache_file: str = "design_trends_cache.json") -> List[DesignTrend]:
     """
-    Get the latest design trends, using cache if available and recent.
+    Get the latest design trends with stale-while-revalidate semantics.
+    
+    A cached copy is always returned immediately; if it is older than
+    CACHE_MAX_AGE_HOURS a background refresh is scheduled. With no cache at
+    all the curated trends are returned while the first scrape runs.
+    
+    Sync-only: with use_cache=False the scrape runs via asyncio.run(), so
+    code already on an event loop (e.g. FastAPI handlers) must use
+    get_latest_design_trends_async() instead.
     
     Args:
-        use_cache: Whether to use cached trends if available
+        use_cache: Whether to use cached trends if available. When False the
+            scrape runs in the calling thread and its result is returned.
         cache_file: Path to cache file
         
     Returns:
         List of DesignTrend objects
     """
-    # Try to load from cache first
-    if use_cache:
+    if not use_cache:
         try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-                
-            # Check if cache is recent (less than 24 hours old)
-            cache_time = time.strptime(cache_data['updated_at'], "%Y-%m-%d %H:%M:%S")
-            cache_age_hours = (time.time() - time.mktime(cache_time)) / 3600
-            
-            if cache_age_hours < 24:
-                print(f"📋 Using cached trends ({cache_data['trends_count']} trends, {cache_age_hours:.1f}h old)")
-                return [DesignTrend(**trend_data) for trend_data in cache_data['trends']]
-                
-        except (FileNotFoundError, json.JSONDecodeError, KeyError):
-            pass  # Cache doesn't exist or is invalid
-    
-    # Fetch fresh trends
-    fresh_trends = design_scraper.get_fresh_design_trends()
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(design_scraper.refresh_cache_async(cache_file))
+        raise RuntimeError(
+            "get_latest_design_trends(use_cache=False) called from a running event loop; "
+            "use 'await get_latest_design_trends_async(use_cache=False)' instead"
+        )
+    return _cached_or_curated_trends(cache_file)
+
+
+async def get_latest_design_trends_async(use_cache: bool = True, cache_file: str = "design_trends_cache.json") -> List[DesignTrend]:
+    """
+    Async variant of get_latest_design_trends() for code running on an event loop.
     
-    # Save to cache
-    if fresh_trends:
-        design_scraper.save_trends_to_cache(fresh_trends, cache_file)
+    With use_cache=False the scrape is awaited directly; otherwise the cache
+    file is read off the loop and the same stale-while-revalidate rules apply.
+    """
+    if not use_cache:
+        return await design_scraper.refresh_cache_async(cache_file)
+    return await asyncio.to_thread(_cached_or_curated_trends, cache_file)
+
+
+def _cached_or_curated_trends(cache_file: str) -> List[DesignTrend]:
+    cached = _load_cached_trends(cache_file)
+    if cached is not None:
+        trends, cache_age_hours = cached
+        if cache_age_hours < CACHE_MAX_AGE_HOURS:
+            print(f"📋 Using cached trends ({len(trends)} trends, {cache_age_hours:.1f}h old)")
+        else:
+            print(f"📋 Using stale cached trends ({len(trends)} trends, {cache_age_hours:.1f}h old)")
+            schedule_design_trends_refresh(cache_file)
+        return trends
     
-    return fresh_trends
\ No newline at end of file
+    # No usable cache yet - never block the caller on a scrape
+    schedule_design_trends_refresh(cache_file)
+    return design_scraper._get_curated_2025_trends()
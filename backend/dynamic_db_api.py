@@ -4,13 +4,20 @@ Provides universal CRUD operations that any generated app can use
 """
 
 import os
+import re
+import json
+import base64
+import asyncio
 from datetime import datetime
-from typing import Any, Dict, List, Optional
-from bson import ObjectId
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from bson import ObjectId, json_util
 from bson.errors import InvalidId
-from pymongo import MongoClient, ASCENDING, DESCENDING
-from pymongo.errors import DuplicateKeyError
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
@@ -20,12 +27,66 @@ load_dotenv()
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017/")
 DATABASE_NAME = os.getenv("MONGODB_DATABASE", "altx_db")
 
+# Connection pool tuning - generated apps share this pool from the preview
+MAX_POOL_SIZE = int(os.getenv("DYNAMIC_DB_MAX_POOL_SIZE", "100"))
+MIN_POOL_SIZE = int(os.getenv("DYNAMIC_DB_MIN_POOL_SIZE", "10"))
+MAX_IDLE_TIME_MS = int(os.getenv("DYNAMIC_DB_MAX_IDLE_TIME_MS", "60000"))
+WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("DYNAMIC_DB_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("DYNAMIC_DB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+
+# Documents pulled from the cursor per round trip while streaming a response
+STREAM_BATCH_SIZE = int(os.getenv("DYNAMIC_DB_STREAM_BATCH_SIZE", "200"))
+
+# Index advisor: how often a query shape must be seen before it gets an index,
+# and how many advisor-managed indexes a single collection may accumulate
+INDEX_ADVISOR_MIN_OBSERVATIONS = int(os.getenv("DYNAMIC_DB_INDEX_MIN_OBSERVATIONS", "3"))
+INDEX_ADVISOR_MAX_INDEXES = int(os.getenv("DYNAMIC_DB_MAX_AUTO_INDEXES", "8"))
+# A collection has a single text index; cap the fields one search may put in it
+INDEX_ADVISOR_MAX_TEXT_FIELDS = int(os.getenv("DYNAMIC_DB_MAX_TEXT_FIELDS", "4"))
+ADVISOR_INDEX_PREFIX = "altx_auto_"
+ADVISOR_TEXT_INDEX_PREFIX = "altx_text_"
+
+# Per-project collection registry used by the stats endpoint
+REGISTRY_COLLECTION = "_altx_collection_registry"
+STATS_RECONCILE_INTERVAL_SECONDS = int(os.getenv("DYNAMIC_DB_STATS_RECONCILE_SECONDS", "900"))
+
+# Names the API itself creates: generated project slugs use hyphens, never
+# underscores, so the first underscore in `{project}_{collection}` splits the two
+PROJECT_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9-]{0,99}$")
+COLLECTION_NAME_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9_-]{0,63}$")
+
 # Create router
 router = APIRouter(prefix="/api/db", tags=["Dynamic Database"])
+security = HTTPBearer()
+
+
+def is_api_collection_name(project_name: str, collection: str) -> bool:
+    """True for `{project}_{collection}` pairs the API could have created"""
+    return bool(PROJECT_NAME_PATTERN.match(project_name) and COLLECTION_NAME_PATTERN.match(collection))
+
+
+async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
+    """User id (JWT sub) of the caller"""
+    from auth import verify_token
+    payload = verify_token(credentials.credentials)
+    user_id = payload.get("sub") if payload else None
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    return str(user_id)
+
+
+async def require_project_owner(project_name: str, user_id: str = Depends(get_current_user_id)) -> str:
+    """Only the user whose S3 folder holds the project may run destructive operations on its data"""
+    from s3_storage import user_has_project
+    if not PROJECT_NAME_PATTERN.match(project_name):
+        raise HTTPException(status_code=400, detail="Invalid project name")
+    if not await asyncio.to_thread(user_has_project, project_name, user_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return user_id
 
 
 class DynamicDB:
-    """Dynamic MongoDB operations for any collection"""
+    """Dynamic MongoDB operations for any collection (async Motor driver)"""
     
     _client = None
     _db = None
@@ -33,10 +94,25 @@ class DynamicDB:
     @classmethod
     def get_database(cls):
         if cls._db is None:
-            cls._client = MongoClient(MONGODB_URL)
+            cls._client = AsyncIOMotorClient(
+                MONGODB_URL,
+                maxPoolSize=MAX_POOL_SIZE,
+                minPoolSize=MIN_POOL_SIZE,
+                maxIdleTimeMS=MAX_IDLE_TIME_MS,
+                waitQueueTimeoutMS=WAIT_QUEUE_TIMEOUT_MS,
+                serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+            )
             cls._db = cls._client[DATABASE_NAME]
         return cls._db
     
+    @classmethod
+    def close(cls):
+        """Close the connection pool"""
+        if cls._client:
+            cls._client.close()
+            cls._client = None
+            cls._db = None
+    
     @classmethod
     def get_collection(cls, project_name: str, collection_name: str):
         """Get a project-specific collection"""
@@ -46,6 +122,348 @@ class DynamicDB:
         return db[full_collection_name]
 
 
+class IndexAdvisor:
+    """
+    Observes query/sort shapes per `{project}_{collection}` and creates the
+    matching indexes in the background once a shape recurs.
+    
+    Compound keys follow the equality-sort-range rule. Every collection also
+    gets a `(created_at, _id)` index for the default keyset sort. Word searches
+    get a text index over exactly the fields they search, once that field set
+    recurs; it is only rebuilt for another field set that is requested at
+    least twice as often, so varying `fields` can't churn the index.
+    """
+    
+    FIELD_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_.]{0,63}$")
+    
+    RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$regex", "$exists"}
+    
+    def __init__(self):
+        self.observations: Dict[str, Dict[tuple, int]] = {}
+        self._index_keys: Dict[str, set] = {}
+        self._text_fields: Dict[str, Optional[tuple]] = {}
+        self._text_requests: Dict[str, Dict[tuple, int]] = {}
+        self._pending: set = set()
+        self._failed: set = set()
+        self._tasks: set = set()
+        self._lock = asyncio.Lock()
+    
+    @classmethod
+    def shape_from_query(
+        cls,
+        filter_query: Optional[Dict[str, Any]] = None,
+        sort: Optional[List[tuple]] = None
+    ) -> tuple:
+        """Build an index key list (ESR order) from a filter and sort spec"""
+        equality, ranges = [], []
+        for field, value in (filter_query or {}).items():
+            if field.startswith("$"):
+                continue  # $or/$and/$text can't be served by a simple compound index
+            if isinstance(value, dict) and any(op in cls.RANGE_OPERATORS for op in value):
+                ranges.append(field)
+            else:
+                equality.append(field)
+        
+        keys = [(field, ASCENDING) for field in sorted(equality)]
+        seen = set(equality)
+        for field, direction in sort or []:
+            if field not in seen:
+                keys.append((field, DESCENDING if direction == DESCENDING else ASCENDING))
+                seen.add(field)
+        keys.extend((field, ASCENDING) for field in sorted(ranges) if field not in seen)
+        return tuple(keys)
+    
+    async def _load_existing(self, coll) -> None:
+        """Cache the collection's current index keys and text index fields"""
+        if coll.name in self._index_keys:
+            return
+        async with self._lock:
+            if coll.name in self._index_keys:
+                return
+            keys, text_fields = set(), None
+            try:
+                info = await coll.index_information()
+            except OperationFailure:
+                info = {}  # Collection does not exist yet
+            for name, spec in info.items():
+                key = tuple(spec["key"])
+                if any(direction == TEXT for _, direction in key):
+                    text_fields = tuple(sorted(spec.get("weights", {}).keys()))
+                else:
+                    keys.add(key)
+            self._index_keys[coll.name] = keys
+            self._text_fields[coll.name] = text_fields
+    
+    def _auto_index_count(self, name: str) -> int:
+        return sum(1 for key in self._index_keys.get(name, ()) if key != (("_id", ASCENDING),))
+    
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    def _is_covered(self, name: str, keys: tuple) -> bool:
+        """An existing index whose key starts with `keys` already serves the shape"""
+        return any(existing[:len(keys)] == keys for existing in self._index_keys.get(name, ()))
+    
+    async def observe(
+        self,
+        coll,
+        filter_query: Optional[Dict[str, Any]] = None,
+        sort: Optional[List[tuple]] = None
+    ) -> None:
+        """Record one query against `coll`; create its index once it recurs"""
+        try:
+            await self._load_existing(coll)
+        except Exception as e:
+            print(f"⚠️ Index advisor could not read indexes for {coll.name}: {e}")
+            return
+        
+        self.ensure_index(coll, (("created_at", DESCENDING), ("_id", DESCENDING)))
+        
+        keys = self.shape_from_query(filter_query, sort)
+        if not keys or keys == (("_id", ASCENDING),):
+            return
+        shapes = self.observations.setdefault(coll.name, {})
+        shapes[keys] = shapes.get(keys, 0) + 1
+        if shapes[keys] >= INDEX_ADVISOR_MIN_OBSERVATIONS:
+            self.ensure_index(coll, keys)
+    
+    def ensure_index(self, coll, keys: tuple) -> None:
+        """Schedule creation of a compound index unless it exists or is over budget"""
+        marker = (coll.name, keys)
+        if marker in self._pending or marker in self._failed or self._is_covered(coll.name, keys):
+            return
+        if self._auto_index_count(coll.name) >= INDEX_ADVISOR_MAX_INDEXES:
+            return
+        self._pending.add(marker)
+        self._spawn(self._create_index(coll, keys, marker))
+    
+    async def _create_index(self, coll, keys: tuple, marker: tuple) -> None:
+        name = ADVISOR_INDEX_PREFIX + "_".join(f"{field}_{direction}" for field, direction in keys)
+        try:
+            await coll.create_index(list(keys), name=name[:120], background=True)
+            self._index_keys.setdefault(coll.name, set()).add(keys)
+            print(f"📇 Index advisor created {name} on {coll.name}")
+        except Exception as e:
+            self._failed.add(marker)
+            print(f"⚠️ Index advisor failed to create {name} on {coll.name}: {e}")
+        finally:
+            self._pending.discard(marker)
+    
+    async def text_index_ready(self, coll, fields: List[str]) -> bool:
+        """
+        True when the collection's text index covers exactly `fields`, so a
+        $text query matches nothing outside the fields the caller asked for.
+        Otherwise the request is counted and, once the field set recurs, an
+        index is scheduled; the caller uses a substring scan meanwhile.
+        """
+        await self._load_existing(coll)
+        wanted = tuple(sorted(set(fields)))
+        current = self._text_fields.get(coll.name)
+        if current == wanted:
+            return True
+        if not wanted or len(wanted) > INDEX_ADVISOR_MAX_TEXT_FIELDS:
+            return False
+        
+        requests = self._text_requests.setdefault(coll.name, {})
+        requests[wanted] = requests.get(wanted, 0) + 1
+        if requests[wanted] < INDEX_ADVISOR_MIN_OBSERVATIONS:
+            return False
+        if current and requests[wanted] < 2 * max(requests.get(current, 0), INDEX_ADVISOR_MIN_OBSERVATIONS):
+            return False  # Replacing the index needs a clearly more popular field set
+        
+        marker = (coll.name, ("$text",) + wanted)
+        if marker in self._pending or marker in self._failed:
+            return False
+        self._pending.add(marker)
+        self._spawn(self._create_text_index(coll, wanted, current, marker))
+        return False
+    
+    async def _create_text_index(self, coll, fields: tuple, current: Optional[tuple], marker: tuple) -> None:
+        # A collection can only have one text index, so an older one is replaced
+        name = ADVISOR_TEXT_INDEX_PREFIX + "_".join(fields)
+        try:
+            if current:
+                info = await coll.index_information()
+                for existing_name, spec in info.items():
+                    if any(direction == TEXT for _, direction in spec["key"]):
+                        if not existing_name.startswith(ADVISOR_TEXT_INDEX_PREFIX):
+                            raise RuntimeError(f"text index {existing_name} is not advisor-managed")
+                        await coll.drop_index(existing_name)
+            await coll.create_index([(field, TEXT) for field in fields], name=name[:120], background=True)
+            self._text_fields[coll.name] = fields
+            print(f"📇 Index advisor created text index {name} on {coll.name}")
+        except Exception as e:
+            self._failed.add(marker)
+            print(f"⚠️ Index advisor failed to create text index on {coll.name}: {e}")
+        finally:
+            self._pending.discard(marker)
+    
+    def forget(self, collection_name: str) -> None:
+        """Drop cached state for a collection (e.g. after it was dropped)"""
+        self.observations.pop(collection_name, None)
+        self._index_keys.pop(collection_name, None)
+        self._text_fields.pop(collection_name, None)
+        self._text_requests.pop(collection_name, None)
+
+
+index_advisor = IndexAdvisor()
+
+
+class CollectionRegistry:
+    """
+    Per-project registry of collections with incrementally maintained counts.
+    
+    One document per `{project}_{collection}` lives in REGISTRY_COLLECTION and
+    is `$inc`-ed by the write endpoints, so stats are a single indexed lookup
+    instead of listing every collection in the shared database. A periodic
+    reconciliation recounts registered collections, registers ones created
+    outside the API and removes entries whose collection is gone.
+    """
+    
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._indexed = False
+        self.last_reconciled_at: Optional[datetime] = None
+    
+    async def _registry(self):
+        registry = DynamicDB.get_database()[REGISTRY_COLLECTION]
+        if not self._indexed:
+            await registry.create_index([("project", ASCENDING)])
+            self._indexed = True
+        return registry
+    
+    async def _apply(self, action: str, project_name: str, collection: str, update) -> None:
+        """
+        Run a registry update after a write has already been committed.
+        
+        Failures are logged rather than raised: the data write succeeded, and
+        failing the request would make clients retry (and duplicate) it. The
+        reconcile loop recounts the collection and repairs the entry.
+        """
+        try:
+            registry = await self._registry()
+            await update(registry)
+        except Exception as e:
+            print(f"⚠️ Collection registry {action} failed for {project_name}_{collection} (reconcile will repair): {e}")
+    
+    async def record_insert(self, project_name: str, collection: str, count: int = 1) -> None:
+        """Register the collection (if new) and add `count` documents"""
+        now = datetime.utcnow()
+        await self._apply("insert", project_name, collection, lambda registry: registry.update_one(
+            {"_id": f"{project_name}_{collection}"},
+            {
+                "$inc": {"count": count},
+                "$set": {"updated_at": now},
+                "$setOnInsert": {"project": project_name, "collection": collection, "created_at": now}
+            },
+            upsert=True
+        ))
+    
+    async def record_delete(self, project_name: str, collection: str, count: int = 1) -> None:
+        await self._apply("delete", project_name, collection, lambda registry: registry.update_one(
+            {"_id": f"{project_name}_{collection}"},
+            {"$inc": {"count": -count}, "$set": {"updated_at": datetime.utcnow()}}
+        ))
+    
+    async def unregister(self, project_name: str, collection: str) -> None:
+        await self._apply("unregister", project_name, collection, lambda registry: registry.delete_one(
+            {"_id": f"{project_name}_{collection}"}
+        ))
+    
+    async def get_project_counts(self, project_name: str) -> Dict[str, int]:
+        registry = await self._registry()
+        entries = await registry.find(
+            {"project": project_name}, {"collection": 1, "count": 1}
+        ).to_list(length=None)
+        return {entry["collection"]: max(entry.get("count", 0), 0) for entry in entries}
+    
+    async def reconcile(self) -> Dict[str, int]:
+        """Recount every registered collection and sync the registry with the database"""
+        db = DynamicDB.get_database()
+        registry = await self._registry()
+        
+        existing = {
+            name for name in await db.list_collection_names()
+            if name != REGISTRY_COLLECTION and not name.startswith("system.")
+        }
+        entries = await registry.find({}, {"_id": 1, "project": 1}).to_list(length=None)
+        registered = {entry["_id"] for entry in entries}
+        projects = {entry.get("project") for entry in entries}
+        
+        # Collections of known projects created before the registry existed. The
+        # database is shared with the rest of the app (users, audit_logs, ...), so
+        # only API-shaped names of projects already in the registry are adopted.
+        adopted = set()
+        for name in existing - registered:
+            project_name, _, collection = name.partition("_")
+            if project_name not in projects or not is_api_collection_name(project_name, collection):
+                continue
+            adopted.add(name)
+            await registry.update_one(
+                {"_id": name},
+                {"$setOnInsert": {"project": project_name, "collection": collection,
+                                  "count": 0, "created_at": datetime.utcnow()}},
+                upsert=True
+            )
+        
+        removed = registered - existing
+        if removed:
+            await registry.delete_many({"_id": {"$in": list(removed)}})
+        
+        semaphore = asyncio.Semaphore(8)
+        corrected = 0
+        
+        async def recount(name: str) -> None:
+            nonlocal corrected
+            async with semaphore:
+                actual = await db[name].count_documents({})
+                result = await registry.update_one(
+                    {"_id": name, "count": {"$ne": actual}},
+                    {"$set": {"count": actual, "reconciled_at": datetime.utcnow()}}
+                )
+                corrected += result.modified_count
+        
+        tracked = (registered & existing) | adopted
+        await asyncio.gather(*(recount(name) for name in tracked))
+        self.last_reconciled_at = datetime.utcnow()
+        return {"collections": len(tracked), "corrected": corrected, "removed": len(removed)}
+    
+    async def start(self):
+        """Start the periodic reconciliation loop"""
+        if self._running:
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._reconcile_loop())
+    
+    async def stop(self):
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+    
+    async def _reconcile_loop(self):
+        while self._running:
+            try:
+                result = await self.reconcile()
+                if result["corrected"] or result["removed"]:
+                    print(f"📊 Stats reconciliation corrected {result['corrected']} counts, removed {result['removed']} entries")
+                await asyncio.sleep(STATS_RECONCILE_INTERVAL_SECONDS)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"⚠️ Stats reconciliation failed: {e}")
+                await asyncio.sleep(60)
+
+
+collection_registry = CollectionRegistry()
+
+
 class CreateItemRequest(BaseModel):
     """Request model for creating an item"""
     data: Dict[str, Any]
@@ -86,6 +504,205 @@ def serialize_doc(doc: dict) -> dict:
     return result
 
 
+async def stream_cursor_response(
+    cursor,
+    meta: Optional[Dict[str, Any]] = None,
+    total: Optional[Awaitable[int]] = None,
+    total_key: Optional[str] = "total",
+    trailer: Optional[Callable[[Optional[dict], int], Dict[str, Any]]] = None
+) -> StreamingResponse:
+    """
+    Stream a cursor as the usual {"success": true, "data": [...], ...} envelope.
+    
+    Documents are serialized batch by batch as they arrive from MongoDB instead
+    of being collected into a list first. The first batch is fetched before the
+    response starts so query errors still surface as a normal 500. If `total`
+    is given it is awaited after the data; otherwise the streamed count is used.
+    Pass total_key=None to leave the count out of the envelope. `trailer` is
+    called with the last raw document and the streamed count and its fields
+    are appended after the data (used for continuation tokens).
+    """
+    total_task = asyncio.ensure_future(total) if total is not None else None
+    try:
+        first_batch = await cursor.to_list(length=STREAM_BATCH_SIZE)
+    except Exception:
+        if total_task:
+            total_task.cancel()
+        raise
+    
+    async def body() -> AsyncIterator[bytes]:
+        head = {"success": True, **(meta or {})}
+        yield json.dumps(head, default=str)[:-1].encode() + b', "data": ['
+        
+        count = 0
+        last_doc = None
+        batch = first_batch
+        while batch:
+            chunk = ", ".join(json.dumps(serialize_doc(doc), default=str) for doc in batch)
+            yield (", " if count else "").encode() + chunk.encode()
+            count += len(batch)
+            last_doc = batch[-1]
+            if len(batch) < STREAM_BATCH_SIZE:
+                break
+            batch = await cursor.to_list(length=STREAM_BATCH_SIZE)
+        
+        try:
+            tail = trailer(last_doc, count) if trailer else {}
+            if total_key is not None:
+                tail[total_key] = await total_task if total_task else count
+            tail_json = json.dumps(tail, default=str)
+            yield b"]" + (b", " + tail_json[1:].encode() if tail else b"}")
+        finally:
+            if total_task and not total_task.done():
+                total_task.cancel()
+    
+    return StreamingResponse(body(), media_type="application/json")
+
+
+async def stream_ndjson_response(cursor) -> StreamingResponse:
+    """
+    Stream a cursor as newline-delimited JSON, one document per line (bulk export).
+    
+    As with stream_cursor_response, the first batch is fetched before the
+    response starts so query errors surface as a normal 500.
+    """
+    first_batch = await cursor.to_list(length=STREAM_BATCH_SIZE)
+    
+    async def body() -> AsyncIterator[bytes]:
+        batch = first_batch
+        while batch:
+            yield "".join(json.dumps(serialize_doc(doc), default=str) + "\n" for doc in batch).encode()
+            if len(batch) < STREAM_BATCH_SIZE:
+                break
+            batch = await cursor.to_list(length=STREAM_BATCH_SIZE)
+    
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+# ==================== KEYSET PAGINATION ====================
+
+KEYSET_SORT_FIELDS = ("created_at", "_id")
+
+
+def encode_page_token(sort_field: str, sort_order: int, doc: dict) -> str:
+    """Build an opaque continuation token from the last document of a page"""
+    state = {"f": sort_field, "o": sort_order, "id": doc["_id"]}
+    if sort_field != "_id":
+        state["v"] = doc.get(sort_field)
+    return base64.urlsafe_b64encode(json_util.dumps(state).encode()).decode().rstrip("=")
+
+
+def decode_page_token(token: str) -> Dict[str, Any]:
+    """Decode a continuation token; raises HTTPException(400) if it is malformed"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        state = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if state["f"] not in KEYSET_SORT_FIELDS or state["o"] not in (ASCENDING, DESCENDING):
+            raise ValueError("unsupported sort")
+        return state
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def keyset_filter(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Filter selecting documents strictly after the token position"""
+    op = "$lt" if state["o"] == DESCENDING else "$gt"
+    if state["f"] == "_id":
+        return {"_id": {op: state["id"]}}
+    field, value = state["f"], state["v"]
+    return {"$or": [
+        {field: {op: value}},
+        {field: value, "_id": {op: state["id"]}}
+    ]}
+
+
+def parse_projection(fields: Optional[str], sort_field: str) -> Optional[Dict[str, int]]:
+    """Turn `fields=name,price` into a projection; the sort key is kept for tokens"""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    if any(name.startswith("$") for name in names):
+        raise HTTPException(status_code=400, detail="Invalid field name in projection")
+    projection = {name: 1 for name in names}
+    projection[sort_field] = 1
+    return projection
+
+
+# ==================== ADMIN ENDPOINTS ====================
+# Admin and stats routes are registered before the CRUD routes so
+# `/{project_name}/{collection}` doesn't shadow them
+
+@router.get("/admin/{project_name}/indexes")
+async def get_index_usage(project_name: str):
+    """List indexes, their usage counters and observed query shapes per collection"""
+    try:
+        db = DynamicDB.get_database()
+        prefix = f"{project_name}_"
+        project_collections = await db.list_collection_names(
+            filter={"name": {"$regex": f"^{re.escape(prefix)}"}}
+        )
+        
+        async def describe(coll_name: str) -> Dict[str, Any]:
+            coll = db[coll_name]
+            usage = await coll.aggregate([{"$indexStats": {}}]).to_list(length=None)
+            shapes = index_advisor.observations.get(coll_name, {})
+            return {
+                "collection": coll_name[len(prefix):],
+                "indexes": [
+                    {
+                        "name": stat["name"],
+                        "key": dict(stat["key"]),
+                        "ops": stat.get("accesses", {}).get("ops", 0),
+                        "since": stat.get("accesses", {}).get("since"),
+                        "auto_created": stat["name"].startswith((ADVISOR_INDEX_PREFIX, ADVISOR_TEXT_INDEX_PREFIX))
+                    }
+                    for stat in usage
+                ],
+                "observed_shapes": [
+                    {"key": [list(k) for k in key], "count": count}
+                    for key, count in sorted(shapes.items(), key=lambda item: -item[1])
+                ]
+            }
+        
+        collections = await asyncio.gather(*(describe(name) for name in sorted(project_collections)))
+        
+        return {
+            "success": True,
+            "project": project_name,
+            "collections": collections
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ==================== STATS ENDPOINT ====================
+
+@router.get("/{project_name}/stats")
+async def get_project_stats(project_name: str):
+    """Get statistics for a project's data (served from the collection registry)"""
+    try:
+        stats = await collection_registry.get_project_counts(project_name)
+        
+        return {
+            "success": True,
+            "project": project_name,
+            "collections": stats,
+            "total_documents": sum(stats.values())
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/admin/stats/reconcile")
+async def reconcile_stats(user_id: str = Depends(get_current_user_id)):
+    """Recount all registered collections now instead of waiting for the periodic job"""
+    try:
+        result = await collection_registry.reconcile()
+        return {"success": True, **result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ==================== CRUD ENDPOINTS ====================
 
 @router.post("/{project_name}/{collection}")
@@ -103,8 +720,9 @@ async def create_item(
         data["created_at"] = datetime.utcnow()
         data["updated_at"] = datetime.utcnow()
         
-        result = coll.insert_one(data)
+        result = await coll.insert_one(data)
         data["_id"] = str(result.inserted_id)
+        await collection_registry.record_insert(project_name, collection)
         
         return {
             "success": True,
@@ -119,34 +737,128 @@ async def create_item(
 async def get_items(
     project_name: str,
     collection: str,
-    limit: int = Query(100, ge=1, le=1000),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size (default 100; unlimited for ndjson)"),
     skip: int = Query(0, ge=0),
     sort_by: Optional[str] = None,
-    sort_order: int = Query(-1, ge=-1, le=1)
+    sort_order: int = Query(-1, ge=-1, le=1),
+    cursor: Optional[str] = Query(None, description="Continuation token from a previous page's next_cursor"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams every remaining item")
 ):
-    """Get all items from a collection with pagination"""
+    """
+    Get items from a collection with pagination.
+    
+    Sorting on created_at (default) or _id supports keyset pagination: each
+    page carries `next_cursor`, which is passed back as `cursor` instead of
+    `skip`. Other sort fields fall back to skip/limit.
+    
+    format=ndjson honours cursor, skip and an explicit limit, and otherwise
+    streams everything after that point.
+    """
     try:
         coll = DynamicDB.get_collection(project_name, collection)
         
-        cursor = coll.find()
+        sort_field = sort_by or "created_at"
+        if not sort_by:
+            sort_order = DESCENDING
+        sort_order = DESCENDING if sort_order == DESCENDING else ASCENDING
+        keyset = sort_field in KEYSET_SORT_FIELDS
         
-        if sort_by:
-            cursor = cursor.sort(sort_by, sort_order)
-        else:
-            cursor = cursor.sort("created_at", DESCENDING)
+        filter_query: Dict[str, Any] = {}
+        if cursor:
+            if not keyset:
+                raise HTTPException(status_code=400, detail="cursor pagination requires sort_by created_at or _id")
+            state = decode_page_token(cursor)
+            if (state["f"], state["o"]) != (sort_field, sort_order):
+                raise HTTPException(status_code=400, detail="cursor does not match the requested sort")
+            filter_query = keyset_filter(state)
         
-        cursor = cursor.skip(skip).limit(limit)
+        sort_spec = [(sort_field, sort_order)]
+        if sort_field != "_id":
+            sort_spec.append(("_id", sort_order))  # Tiebreaker keeps pages stable
+        await index_advisor.observe(coll, sort=sort_spec)
         
-        items = [serialize_doc(doc) for doc in cursor]
-        total = coll.count_documents({})
+        db_cursor = coll.find(filter_query, parse_projection(fields, sort_field)).sort(sort_spec)
         
-        return {
-            "success": True,
-            "data": items,
-            "total": total,
-            "limit": limit,
-            "skip": skip
-        }
+        if not cursor:
+            db_cursor = db_cursor.skip(skip)
+        
+        if format == "ndjson":
+            if limit is not None:
+                db_cursor = db_cursor.limit(limit)
+            return await stream_ndjson_response(db_cursor.batch_size(STREAM_BATCH_SIZE))
+        
+        limit = limit or 100
+        db_cursor = db_cursor.limit(limit).batch_size(STREAM_BATCH_SIZE)
+        
+        def page_trailer(last_doc: Optional[dict], count: int) -> Dict[str, Any]:
+            has_more = keyset and last_doc is not None and count == limit
+            return {"next_cursor": encode_page_token(sort_field, sort_order, last_doc) if has_more else None}
+        
+        # Unfiltered total: collection metadata is exact enough and O(1)
+        return await stream_cursor_response(
+            db_cursor,
+            meta={"limit": limit, "skip": 0 if cursor else skip},
+            total=coll.estimated_document_count(),
+            trailer=page_trailer
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{project_name}/{collection}/search")
+async def search_items(
+    project_name: str,
+    collection: str,
+    q: str = Query(..., min_length=1),
+    fields: str = Query("name,title,description", description="Comma-separated fields to search"),
+    match: str = Query(
+        "substring",
+        pattern="^(substring|words)$",
+        description="substring: case-insensitive partial match; words: whole-word search ranked by relevance"
+    )
+):
+    """
+    Search items by text in specified fields.
+    
+    match=words uses a text index over exactly these fields once the index
+    advisor has built one (relevance-ranked, no collection scan); until then,
+    and for match=substring, fields are matched as case-insensitive substrings.
+    """
+    try:
+        coll = DynamicDB.get_collection(project_name, collection)
+        
+        search_fields = [f.strip() for f in fields.split(",") if f.strip()]
+        if not search_fields or not all(IndexAdvisor.FIELD_NAME_PATTERN.match(f) for f in search_fields):
+            raise HTTPException(status_code=400, detail="Invalid field name in fields")
+        
+        if match == "words" and await index_advisor.text_index_ready(coll, search_fields):
+            cursor = coll.find(
+                {"$text": {"$search": q}},
+                {"score": {"$meta": "textScore"}}
+            ).sort([("score", {"$meta": "textScore"})]).limit(50)
+            return await stream_cursor_response(
+                cursor,
+                meta={"query": q, "searched_fields": search_fields, "search_mode": "text"},
+                total_key=None
+            )
+        
+        # Substring match (also serves match=words while its index is not built)
+        or_conditions = []
+        for field in search_fields:
+            or_conditions.append({field: {"$regex": q, "$options": "i"}})
+        
+        cursor = coll.find({"$or": or_conditions}).limit(50)
+        
+        return await stream_cursor_response(
+            cursor,
+            meta={"query": q, "searched_fields": search_fields, "search_mode": "regex"},
+            total_key=None
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -162,10 +874,10 @@ async def get_item(
         coll = DynamicDB.get_collection(project_name, collection)
         
         try:
-            doc = coll.find_one({"_id": ObjectId(item_id)})
+            doc = await coll.find_one({"_id": ObjectId(item_id)})
         except InvalidId:
             # Try finding by string ID field
-            doc = coll.find_one({"id": item_id})
+            doc = await coll.find_one({"id": item_id})
         
         if not doc:
             raise HTTPException(status_code=404, detail="Item not found")
@@ -196,12 +908,12 @@ async def update_item(
         data["updated_at"] = datetime.utcnow()
         
         try:
-            result = coll.update_one(
+            result = await coll.update_one(
                 {"_id": ObjectId(item_id)},
                 {"$set": data}
             )
         except InvalidId:
-            result = coll.update_one(
+            result = await coll.update_one(
                 {"id": item_id},
                 {"$set": data}
             )
@@ -211,9 +923,9 @@ async def update_item(
         
         # Get updated document
         try:
-            doc = coll.find_one({"_id": ObjectId(item_id)})
+            doc = await coll.find_one({"_id": ObjectId(item_id)})
         except InvalidId:
-            doc = coll.find_one({"id": item_id})
+            doc = await coll.find_one({"id": item_id})
         
         return {
             "success": True,
@@ -237,13 +949,15 @@ async def delete_item(
         coll = DynamicDB.get_collection(project_name, collection)
         
         try:
-            result = coll.delete_one({"_id": ObjectId(item_id)})
+            result = await coll.delete_one({"_id": ObjectId(item_id)})
         except InvalidId:
-            result = coll.delete_one({"id": item_id})
+            result = await coll.delete_one({"id": item_id})
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Item not found")
         
+        await collection_registry.record_delete(project_name, collection)
+        
         return {
             "success": True,
             "message": "Item deleted"
@@ -264,22 +978,19 @@ async def query_items(
     try:
         coll = DynamicDB.get_collection(project_name, collection)
         
-        cursor = coll.find(request.filter or {})
+        filter_query = request.filter or {}
+        sort_list = [(k, v) for k, v in request.sort.items()] if request.sort else None
+        await index_advisor.observe(coll, filter_query, sort_list)
         
-        if request.sort:
-            sort_list = [(k, v) for k, v in request.sort.items()]
-            cursor = cursor.sort(sort_list)
+        cursor = coll.find(filter_query)
         
-        cursor = cursor.skip(request.skip or 0).limit(request.limit or 100)
+        if sort_list:
+            cursor = cursor.sort(sort_list)
         
-        items = [serialize_doc(doc) for doc in cursor]
-        total = coll.count_documents(request.filter or {})
+        cursor = cursor.skip(request.skip or 0).limit(request.limit or 100).batch_size(STREAM_BATCH_SIZE)
         
-        return {
-            "success": True,
-            "data": items,
-            "total": total
-        }
+        total = coll.count_documents(filter_query) if filter_query else coll.estimated_document_count()
+        return await stream_cursor_response(cursor, total=total)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -299,7 +1010,8 @@ async def bulk_create(
             item["created_at"] = now
             item["updated_at"] = now
         
-        result = coll.insert_many(items)
+        result = await coll.insert_many(items)
+        await collection_registry.record_insert(project_name, collection, len(result.inserted_ids))
         
         return {
             "success": True,
@@ -310,32 +1022,23 @@ async def bulk_create(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/{project_name}/{collection}/search")
-async def search_items(
+@router.delete("/{project_name}/{collection}")
+async def drop_collection(
     project_name: str,
     collection: str,
-    q: str = Query(..., min_length=1),
-    fields: str = Query("name,title,description", description="Comma-separated fields to search")
+    user_id: str = Depends(require_project_owner)
 ):
-    """Search items by text in specified fields"""
+    """Drop a whole collection and remove it from the registry (project owner only)"""
+    if not is_api_collection_name(project_name, collection) or f"{project_name}_{collection}" == REGISTRY_COLLECTION:
+        raise HTTPException(status_code=400, detail="Invalid collection name")
     try:
-        coll = DynamicDB.get_collection(project_name, collection)
-        
-        search_fields = [f.strip() for f in fields.split(",")]
-        
-        # Build OR query for text search
-        or_conditions = []
-        for field in search_fields:
-            or_conditions.append({field: {"$regex": q, "$options": "i"}})
-        
-        cursor = coll.find({"$or": or_conditions}).limit(50)
-        items = [serialize_doc(doc) for doc in cursor]
+        await DynamicDB.get_database().drop_collection(f"{project_name}_{collection}")
+        await collection_registry.unregister(project_name, collection)
+        index_advisor.forget(f"{project_name}_{collection}")
         
         return {
             "success": True,
-            "data": items,
-            "query": q,
-            "searched_fields": search_fields
+            "message": f"Dropped {collection}"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -366,14 +1069,11 @@ async def get_products(
         if in_stock is not None:
             filter_query["in_stock"] = in_stock
         
+        await index_advisor.observe(coll, filter_query)
         cursor = coll.find(filter_query).limit(limit)
-        products = [serialize_doc(doc) for doc in cursor]
         
-        return {
-            "success": True,
-            "data": products,
-            "total": len(products)
-        }
+        # total is the number of products returned, as before
+        return await stream_cursor_response(cursor)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -401,8 +1101,9 @@ async def create_order(
                 for item in order["items"]
             )
         
-        result = coll.insert_one(order)
+        result = await coll.insert_one(order)
         order["_id"] = str(result.inserted_id)
+        await collection_registry.record_insert(project_name, "orders")
         
         return {
             "success": True,
@@ -422,39 +1123,9 @@ async def get_user_orders(
     try:
         coll = DynamicDB.get_collection(project_name, "orders")
         
-        cursor = coll.find({"user_id": user_id}).sort("created_at", DESCENDING)
-        orders = [serialize_doc(doc) for doc in cursor]
-        
-        return {
-            "success": True,
-            "data": orders
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-# ==================== STATS ENDPOINT ====================
-
-@router.get("/{project_name}/stats")
-async def get_project_stats(project_name: str):
-    """Get statistics for a project's data"""
-    try:
-        db = DynamicDB.get_database()
-        
-        # Find all collections for this project
-        all_collections = db.list_collection_names()
-        project_collections = [c for c in all_collections if c.startswith(f"{project_name}_")]
-        
-        stats = {}
-        for coll_name in project_collections:
-            short_name = coll_name.replace(f"{project_name}_", "")
-            stats[short_name] = db[coll_name].count_documents({})
+        await index_advisor.observe(coll, {"user_id": user_id}, [("created_at", DESCENDING)])
+        cursor = coll.find({"user_id": user_id}).sort("created_at", DESCENDING).batch_size(STREAM_BATCH_SIZE)
         
-        return {
-            "success": True,
-            "project": project_name,
-            "collections": stats,
-            "total_documents": sum(stats.values())
-        }
+        return await stream_cursor_response(cursor, total_key=None)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
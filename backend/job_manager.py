@@ -1,21 +1,47 @@
 """
 Asynchronous Job Manager for Long-Running Tasks
 Handles AI project generation without holding HTTP connections open
+
+Jobs are executed by a pool of JOB_WORKERS concurrent workers. Pending jobs are
+kept in one FIFO per user and dispatched round-robin, with at most
+JOB_MAX_PER_USER running jobs per user, so one user queueing several
+generations can't starve everybody else. Job state is written through to a
+local SQLite file (JOB_DB_PATH) so status and logs survive restarts: pending
+jobs are re-queued on startup and jobs that were running when the process died
+are marked failed. Finished jobs are pruned after JOB_RETENTION_HOURS.
+
+Every state change is pushed to the project's WebSocket subscribers as a
+``job_progress`` message, so clients don't have to poll /api/jobs/{job_id}.
 """
 
 import asyncio
+import json
+import os
+import sqlite3
+import threading
 import uuid
 import time
-from typing import Dict, Optional, Any
-from datetime import datetime
+from collections import deque
+from typing import Deque, Dict, List, Optional, Any
+from datetime import datetime, timedelta
 from enum import Enum
 
+JOB_WORKERS = max(1, int(os.getenv("JOB_WORKERS", "4")))
+JOB_MAX_PER_USER = max(1, int(os.getenv("JOB_MAX_PER_USER", "1")))
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.sqlite3"))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "72"))
+JOB_MAX_FINISHED_IN_MEMORY = int(os.getenv("JOB_MAX_FINISHED_IN_MEMORY", "500"))
+JOB_CLEANUP_INTERVAL_SECONDS = int(os.getenv("JOB_CLEANUP_INTERVAL_SECONDS", "600"))
+JOB_MAX_LOGS = 200
+
 class JobStatus(str, Enum):
     PENDING = "pending"
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
 
+FINISHED_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED)
+
 class Job:
     def __init__(self, job_id: str, job_type: str, params: Dict[str, Any], user_email: str):
         self.job_id = job_id
@@ -31,6 +57,12 @@ class Job:
         self.completed_at = None
         self.logs = []
     
+    def log(self, message: str):
+        """Append a log line, keeping only the most recent JOB_MAX_LOGS entries"""
+        self.logs.append(message)
+        if len(self.logs) > JOB_MAX_LOGS:
+            del self.logs[:-JOB_MAX_LOGS]
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "job_id": self.job_id,
@@ -45,49 +77,316 @@ class Job:
             "logs": self.logs[-10:]  # Last 10 log entries
         }
 
+    def to_row(self) -> Dict[str, Any]:
+        """Serialize the full job for the SQLite store"""
+        return {
+            "job_id": self.job_id,
+            "job_type": self.job_type,
+            "user_email": self.user_email,
+            "status": self.status.value,
+            "progress": self.progress,
+            "params": json.dumps(self.params, default=str),
+            "result": json.dumps(self.result, default=str) if self.result is not None else None,
+            "error": self.error,
+            "logs": json.dumps(self.logs),
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+        }
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Job":
+        job = cls(row["job_id"], row["job_type"], json.loads(row["params"] or "{}"), row["user_email"])
+        job.status = JobStatus(row["status"])
+        job.progress = row["progress"]
+        job.result = json.loads(row["result"]) if row["result"] else None
+        job.error = row["error"]
+        job.logs = json.loads(row["logs"] or "[]")
+        job.created_at = datetime.fromisoformat(row["created_at"])
+        job.started_at = datetime.fromisoformat(row["started_at"]) if row["started_at"] else None
+        job.completed_at = datetime.fromisoformat(row["completed_at"]) if row["completed_at"] else None
+        return job
+
+class JobStore:
+    """Durable job state in a local SQLite file (one row per job, upserted on change)"""
+
+    COLUMNS = (
+        "job_id", "job_type", "user_email", "status", "progress", "params", "result",
+        "error", "logs", "created_at", "started_at", "completed_at",
+    )
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    job_type TEXT NOT NULL,
+                    user_email TEXT,
+                    status TEXT NOT NULL,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    params TEXT,
+                    result TEXT,
+                    error TEXT,
+                    logs TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    completed_at TEXT
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, completed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def save(self, job: Job):
+        row = job.to_row()
+        placeholders = ", ".join(f":{column}" for column in self.COLUMNS)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in self.COLUMNS if column != "job_id")
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(self.COLUMNS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT(job_id) DO UPDATE SET {updates}",
+                row,
+            )
+            conn.commit()
+
+    def load(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._connection().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def load_unfinished(self) -> List[Job]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JobStatus.PENDING.value, JobStatus.RUNNING.value),
+            ).fetchall()
+        return [Job.from_row(row) for row in rows]
+
+    def delete_finished_before(self, cutoff: datetime) -> int:
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND completed_at < ?",
+                (JobStatus.COMPLETED.value, JobStatus.FAILED.value, cutoff.isoformat()),
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
 class JobManager:
-    def __init__(self):
+    def __init__(self, store: Optional[JobStore] = None, workers: int = JOB_WORKERS, max_per_user: int = JOB_MAX_PER_USER):
         self.jobs: Dict[str, Job] = {}
-        self.queue: asyncio.Queue = asyncio.Queue()
-        self.worker_task = None
+        self.store = store or JobStore()
+        self.worker_count = workers
+        self.max_per_user = max_per_user
+        self.worker_tasks: List[asyncio.Task] = []
+        self.cleanup_task: Optional[asyncio.Task] = None
+        # Per-user FIFOs of pending job ids, visited round-robin
+        self._pending: Dict[str, Deque[str]] = {}
+        self._user_rotation: Deque[str] = deque()
+        self._running_per_user: Dict[str, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
     
-    def create_job(self, job_type: str, params: Dict[str, Any], user_email: str) -> str:
-        """Create a new job and add it to the queue"""
+    async def create_job(self, job_type: str, params: Dict[str, Any], user_email: str) -> str:
+        """Create a new job, persist it off the event loop and add it to the queue"""
         job_id = str(uuid.uuid4())
         job = Job(job_id, job_type, params, user_email)
         self.jobs[job_id] = job
+        await asyncio.to_thread(self.store.save, job)
         
         # Add to queue for processing
-        asyncio.create_task(self.queue.put(job))
+        self._enqueue(job)
         
         return job_id
     
     def get_job(self, job_id: str) -> Optional[Job]:
-        """Get job status"""
-        return self.jobs.get(job_id)
+        """Get job status (from memory, falling back to the durable store)"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            try:
+                job = self.store.load(job_id)
+            except sqlite3.Error as e:
+                print(f"⚠️ Job store lookup failed: {e}")
+        return job
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """Position of a pending job within its user's queue (0 = next up)"""
+        job = self.jobs.get(job_id)
+        if job is None or job.status != JobStatus.PENDING:
+            return None
+        queue = self._pending.get(job.user_email or "")
+        if not queue or job_id not in queue:
+            return None
+        return list(queue).index(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.worker_count,
+            "max_per_user": self.max_per_user,
+            "pending": sum(len(queue) for queue in self._pending.values()),
+            "running": sum(self._running_per_user.values()),
+            "jobs_in_memory": len(self.jobs),
+        }
     
     async def start_worker(self):
-        """Start background worker to process jobs"""
-        if self.worker_task is None:
-            self.worker_task = asyncio.create_task(self._process_jobs())
+        """Recover persisted jobs and start the worker pool and retention loop"""
+        if self.worker_tasks:
+            return
+        self._wakeup = asyncio.Event()
+        await self._recover_jobs()
+        self.worker_tasks = [
+            asyncio.create_task(self._process_jobs(index)) for index in range(self.worker_count)
+        ]
+        self.cleanup_task = asyncio.create_task(self._cleanup_loop())
+        self._wakeup.set()
     
-    async def _process_jobs(self):
+    async def stop(self):
+        """Stop workers; running jobs stay RUNNING in the store and are marked interrupted on next start"""
+        tasks = self.worker_tasks + ([self.cleanup_task] if self.cleanup_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.worker_tasks = []
+        self.cleanup_task = None
+        self.store.close()
+
+    async def _recover_jobs(self):
+        """Re-queue pending jobs and fail jobs interrupted by the last shutdown"""
+        try:
+            unfinished = await asyncio.to_thread(self.store.load_unfinished)
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not load persisted jobs: {e}")
+            return
+
+        requeued = interrupted = 0
+        for job in unfinished:
+            if job.job_id in self.jobs:
+                continue
+            self.jobs[job.job_id] = job
+            if job.status == JobStatus.RUNNING:
+                job.status = JobStatus.FAILED
+                job.error = "Interrupted by a server restart. Please try creating your project again."
+                job.completed_at = datetime.now()
+                job.log(job.error)
+                await asyncio.to_thread(self.store.save, job)
+                interrupted += 1
+            else:
+                self._enqueue(job)
+                requeued += 1
+        if requeued or interrupted:
+            print(f"♻️ Recovered jobs: {requeued} re-queued, {interrupted} marked interrupted")
+
+    def _enqueue(self, job: Job):
+        user = job.user_email or ""
+        queue = self._pending.get(user)
+        if queue is None:
+            queue = self._pending[user] = deque()
+            self._user_rotation.append(user)
+        queue.append(job.job_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _next_job(self) -> Optional[Job]:
+        """Pick the next pending job round-robin across users under their running cap"""
+        for _ in range(len(self._user_rotation)):
+            user = self._user_rotation[0]
+            self._user_rotation.rotate(-1)
+            if self._running_per_user.get(user, 0) >= self.max_per_user:
+                continue
+            queue = self._pending[user]
+            job_id = queue.popleft()
+            if not queue:
+                del self._pending[user]
+                self._user_rotation.remove(user)
+            job = self.jobs.get(job_id)
+            if job is None or job.status != JobStatus.PENDING:
+                continue
+            self._running_per_user[user] = self._running_per_user.get(user, 0) + 1
+            return job
+        return None
+
+    def _release(self, job: Job):
+        user = job.user_email or ""
+        remaining = self._running_per_user.get(user, 0) - 1
+        if remaining > 0:
+            self._running_per_user[user] = remaining
+        else:
+            self._running_per_user.pop(user, None)
+        # A slot freed up - that user's next job may now be runnable
+        self._wakeup.set()
+
+    async def _process_jobs(self, worker_index: int = 0):
         """Background worker that processes jobs from the queue"""
         while True:
+            job = self._next_job()
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
             try:
-                job = await self.queue.get()
                 await self._execute_job(job)
-                self.queue.task_done()
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                print(f"❌ Worker error: {e}")
+                print(f"❌ Worker {worker_index} error: {e}")
                 await asyncio.sleep(1)
+            finally:
+                self._release(job)
+
+    async def _persist_and_publish(self, job: Job):
+        """Write job state through to the store and push it to project subscribers"""
+        try:
+            await asyncio.to_thread(self.store.save, job)
+        except sqlite3.Error as e:
+            print(f"⚠️ Failed to persist job {job.job_id}: {e}")
+
+        project_name = job.params.get("project_name")
+        if not project_name:
+            return
+        try:
+            import main
+            await main.manager.send_to_project(project_name, {
+                "type": "job_progress",
+                "job": job.to_dict()
+            })
+        except Exception as e:
+            print(f"⚠️ Failed to publish progress for job {job.job_id}: {e}")
+
+    async def update_progress(self, job: Job, progress: int, message: str):
+        """Record a progress step, persist it and notify subscribers"""
+        job.progress = progress
+        job.log(message)
+        await self._persist_and_publish(job)
     
     async def _execute_job(self, job: Job):
         """Execute a job"""
         try:
             job.status = JobStatus.RUNNING
             job.started_at = datetime.now()
-            job.logs.append(f"Started at {job.started_at.isoformat()}")
+            queued_seconds = (job.started_at - job.created_at).total_seconds()
+            job.log(f"Started at {job.started_at.isoformat()} (queued {queued_seconds:.1f}s)")
+            await self._persist_and_publish(job)
             
             # Route to appropriate handler
             if job.job_type == "project_generation":
@@ -98,14 +397,46 @@ class JobManager:
             job.status = JobStatus.COMPLETED
             job.completed_at = datetime.now()
             job.progress = 100
-            job.logs.append(f"Completed at {job.completed_at.isoformat()}")
+            job.log(f"Completed at {job.completed_at.isoformat()}")
             
+        except asyncio.CancelledError:
+            # Shutdown: leave the job RUNNING in the store so restart recovery flags it
+            raise
         except Exception as e:
             job.status = JobStatus.FAILED
             job.error = str(e)
             job.completed_at = datetime.now()
-            job.logs.append(f"Failed: {str(e)}")
+            job.log(f"Failed: {str(e)}")
             print(f"❌ Job {job.job_id} failed: {e}")
+
+        await self._persist_and_publish(job)
+
+    async def _cleanup_loop(self):
+        """Periodically apply the retention policy"""
+        while True:
+            await asyncio.sleep(JOB_CLEANUP_INTERVAL_SECONDS)
+            try:
+                await self.cleanup_finished_jobs()
+            except Exception as e:
+                print(f"⚠️ Job cleanup error: {e}")
+
+    async def cleanup_finished_jobs(self) -> int:
+        """Drop finished jobs past retention; keep only the newest finished jobs in memory"""
+        cutoff = datetime.now() - timedelta(hours=JOB_RETENTION_HOURS)
+        removed = await asyncio.to_thread(self.store.delete_finished_before, cutoff)
+
+        finished = sorted(
+            (job for job in self.jobs.values() if job.status in FINISHED_STATUSES),
+            key=lambda job: job.completed_at or job.created_at,
+        )
+        overflow = max(0, len(finished) - JOB_MAX_FINISHED_IN_MEMORY)
+        for index, job in enumerate(finished):
+            if index < overflow or (job.completed_at and job.completed_at < cutoff):
+                self.jobs.pop(job.job_id, None)
+
+        if removed:
+            print(f"🧹 Pruned {removed} finished jobs older than {JOB_RETENTION_HOURS:g}h")
+        return removed
     
     async def _handle_project_generation(self, job: Job):
         """Handle AI project generation"""
@@ -129,8 +460,7 @@ class JobManager:
         
         try:
             # Step 1: Create project structure
-            job.progress = 10
-            job.logs.append("Creating project structure with AI...")
+            await self.update_progress(job, 10, "Creating project structure with AI...")
             
             # Send WebSocket update
             await main.manager.send_to_project(project_name, {
@@ -156,8 +486,7 @@ class JobManager:
                 raise Exception(f"Project creation failed: {create_resp.get('error', 'Unknown error')}")
             
             # Step 2: Install dependencies
-            job.progress = 40
-            job.logs.append("Installing dependencies...")
+            await self.update_progress(job, 40, "Installing dependencies...")
             
             await main.manager.send_to_project(project_name, {
                 "type": "status",
@@ -171,8 +500,7 @@ class JobManager:
             })
             
             # Step 3: Validate and fix
-            job.progress = 60
-            job.logs.append("Validating project files...")
+            await self.update_progress(job, 60, "Validating project files...")
             
             await main.manager.send_to_project(project_name, {
                 "type": "status",
@@ -188,7 +516,7 @@ class JobManager:
             
             errors = check1.get("errors", []) if check1.get("success") else []
             if errors:
-                job.logs.append(f"Auto-fixing {len(errors)} issues...")
+                await self.update_progress(job, job.progress, f"Auto-fixing {len(errors)} issues...")
                 
                 await main.manager.send_to_project(project_name, {
                     "type": "status",
@@ -207,8 +535,7 @@ class JobManager:
                 errors = check2.get("errors", []) if check2.get("success") else errors
             
             # Step 4: Run project
-            job.progress = 80
-            job.logs.append("Starting development servers...")
+            await self.update_progress(job, 80, "Starting development servers...")
             
             await main.manager.send_to_project(project_name, {
                 "type": "status",
@@ -237,8 +564,13 @@ class JobManager:
             })
             
             # Step 5: Complete
-            job.progress = 95
-            job.logs.append("Project generation complete!")
+            job.result = {
+                "success": True,
+                "project_name": project_name,
+                "preview_url": preview_url,
+                "errors": errors
+            }
+            await self.update_progress(job, 95, "Project generation complete!")
             
             await main.manager.send_to_project(project_name, {
                 "type": "status",
@@ -248,15 +580,8 @@ class JobManager:
                 "errors_remaining": errors
             })
             
-            job.result = {
-                "success": True,
-                "project_name": project_name,
-                "preview_url": preview_url,
-                "errors": errors
-            }
-            
         except Exception as e:
-            job.logs.append(f"Error: {str(e)}")
+            job.log(f"Error: {str(e)}")
             raise
 
 # Global job manager instance
@@ -138,12 +138,20 @@ except ImportError as e:
 
 # Import job manager for async processing (safe - no routes)
 from job_manager import job_manager, JobStatus
+from ws_broadcaster import ConnectionManager, create_pubsub_backend
+from chat_history_store import chat_history_store
+from chat_stream import stream_chat_reply
+from preview_bundles import preview_bundle_cache, etag_matches
+from code_index import code_index
+from patch_engine import EditHunk, apply_hunks
 
 # Import authentication modules (safe - no routes)
-from database import UserModel
+from database import UserModel, user_cache
 from auth import (
-    hash_password, 
-    verify_password, 
+    needs_rehash,
+    password_hasher,
+    PasswordHasherBusyError,
+    LoginThrottledError,
     create_access_token, 
     verify_token,
     validate_email,
@@ -192,6 +200,10 @@ class ProjectPreviewCache:
             self.cache.popitem(last=False)
         self.cache[project_slug] = (data, datetime.now())
     
+    def invalidate(self, project_slug):
+        """Drop a project's cached data (e.g. after its files change)"""
+        self.cache.pop(project_slug, None)
+    
     def clear_expired(self):
         """Remove all expired entries"""
         now = datetime.now()
@@ -253,7 +265,7 @@ security = HTTPBearer()
 # IMPORT ROUTERS AFTER CORS
 # ==========================================
 from voice_chat_api import router as voice_chat_router
-from dynamic_db_api import router as dynamic_db_router
+from dynamic_db_api import router as dynamic_db_router, DynamicDB, collection_registry
 
 # Import sandbox deployment service
 try:
@@ -375,8 +387,21 @@ if OBSERVABILITY_AVAILABLE and observability_router:
 @app.on_event("startup")
 async def startup_event():
     """Start background job processor and sandbox service"""
+    # WebSocket broadcaster (subscribes to the pub/sub backend)
+    await manager.start()
+    
     await job_manager.start_worker()
-    print("✅ Job manager worker started")
+    print(f"✅ Job manager started ({job_manager.worker_count} workers, {job_manager.max_per_user} per user)")
+    
+    # Keep dynamic DB stats counts in sync with the collections
+    await collection_registry.start()
+    
+    # Prune old project versions and unreferenced blobs in the background
+    try:
+        from project_versions import version_store
+        await version_store.start()
+    except Exception as e:
+        print(f"⚠️ Version history GC not started: {e}")
     
     # Initialize cleanup manager first (other services depend on it)
     cleanup_manager = None
@@ -463,6 +488,32 @@ async def shutdown_event():
             print("✅ Sandbox deployment service stopped")
         except Exception as e:
             print(f"⚠️ Error stopping sandbox service: {e}")
+    
+    # Stop job workers (unfinished jobs are recovered from the job store on next start)
+    await job_manager.stop()
+    await manager.stop()
+    
+    # Stop stats reconciliation and close the dynamic DB connection pool
+    await collection_registry.stop()
+    DynamicDB.close()
+    
+    try:
+        from project_versions import version_store
+        await version_store.stop()
+    except Exception as e:
+        print(f"⚠️ Error stopping version history GC: {e}")
+    
+    try:
+        from process_supervisor import process_supervisor
+        await process_supervisor.stop_all()
+    except Exception as e:
+        print(f"⚠️ Error stopping project processes: {e}")
+    
+    try:
+        from soc2_readiness import readiness_service
+        readiness_service.shutdown()
+    except Exception as e:
+        print(f"⚠️ Error stopping SOC2 readiness refresh: {e}")
 
 # Job management endpoints
 @app.post("/api/jobs/create")
@@ -486,7 +537,7 @@ async def create_job_endpoint(
             raise HTTPException(status_code=400, detail="job_type is required")
         
         # Create job
-        job_id = job_manager.create_job(job_type, params, user_email)
+        job_id = await job_manager.create_job(job_type, params, user_email)
         
         return {
             "success": True,
@@ -516,10 +567,10 @@ async def get_job_status(
         # Get job
         job = job_manager.get_job(job_id)
         if not job:
-            # Job not found - may have been lost due to server restart
+            # Job not found - unknown id or pruned by the retention policy
             return {
                 "success": False,
-                "error": "Job not found - server may have restarted. Please try creating your project again.",
+                "error": "Job not found - it may have expired. Please try creating your project again.",
                 "job": {
                     "status": "not_found",
                     "message": "This job is no longer available"
@@ -533,7 +584,8 @@ async def get_job_status(
         
         return {
             "success": True,
-            "job": job.to_dict()
+            "job": job.to_dict(),
+            "queue_position": job_manager.queue_position(job_id)
         }
     
     except HTTPException:
@@ -599,10 +651,9 @@ class UserResponse(BaseModel):
     created_at: datetime
 
 from fastapi import Query, WebSocket, WebSocketDisconnect
-from fastapi.websockets import WebSocketState
 import asyncio
 import websockets
-from typing import Dict, Set
+from typing import Dict
 
 # Helper function to normalize project names/slugs while preserving path structure
 def normalize_project_slug(project_name: str) -> str:
@@ -705,8 +756,12 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
     
-    user_model = UserModel()
-    user = user_model.get_user_by_id(user_id)
+    user = user_cache.get(user_id)
+    if user is None:
+        # Cache miss: the pymongo lookup is blocking, keep it off the event loop
+        user = await asyncio.to_thread(lambda: UserModel().get_user_by_id(user_id))
+        if user:
+            user_cache.put(user_id, user)
     
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
@@ -754,13 +809,17 @@ async def signup(request: SignupRequest):
         if not is_valid:
             raise HTTPException(status_code=400, detail=error_msg)
         
-        # Hash password
-        hashed_password = hash_password(request.password)
+        # Hash password on the bounded bcrypt pool
+        try:
+            hashed_password = await password_hasher.hash(request.password)
+        except PasswordHasherBusyError:
+            raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
         
         # Create user
         user_model = UserModel()
         try:
-            user = user_model.create_user(
+            user = await asyncio.to_thread(
+                user_model.create_user,
                 email=request.email,
                 username=request.username,
                 hashed_password=hashed_password
@@ -794,6 +853,26 @@ async def signup(request: SignupRequest):
         raise HTTPException(status_code=500, detail="Failed to create account")
 
 
+# Strong references to in-flight hash upgrades so they aren't garbage collected mid-run
+_password_upgrade_tasks: set = set()
+
+
+def _schedule_password_upgrade(user_id: str, password: str):
+    task = asyncio.create_task(_upgrade_password_hash(user_id, password))
+    _password_upgrade_tasks.add(task)
+    task.add_done_callback(_password_upgrade_tasks.discard)
+
+
+async def _upgrade_password_hash(user_id: str, password: str):
+    """Re-hash a password with the current BCRYPT_ROUNDS after a successful login"""
+    try:
+        new_hash = await password_hasher.hash(password)
+        if await asyncio.to_thread(UserModel().update_user, user_id, {"hashed_password": new_hash}):
+            password_hasher.rehashed += 1
+    except Exception as e:
+        print(f"⚠️ Password hash upgrade failed for {user_id}: {e}")
+
+
 @app.post("/api/auth/login")
 async def login(request: LoginRequest):
     """
@@ -804,7 +883,7 @@ async def login(request: LoginRequest):
         
         # Get user by email
         user_model = UserModel()
-        user = user_model.get_user_by_email(request.email)
+        user = await asyncio.to_thread(user_model.get_user_by_email, request.email)
         
         if not user:
             print(f"❌ User not found for email: {request.email}")
@@ -812,8 +891,16 @@ async def login(request: LoginRequest):
         
         print(f"✅ User found: {user.get('username', 'unknown')}")
         
-        # Verify password
-        if not verify_password(request.password, user["hashed_password"]):
+        # Verify password on the bounded bcrypt pool, capped per account
+        try:
+            async with password_hasher.account_slot(request.email):
+                password_ok = await password_hasher.verify(request.password, user["hashed_password"])
+        except LoginThrottledError:
+            raise HTTPException(status_code=429, detail="Too many login attempts in progress, please retry", headers={"Retry-After": "1"})
+        except PasswordHasherBusyError:
+            raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+        
+        if not password_ok:
             print(f"❌ Password verification failed for: {request.email}")
             raise HTTPException(status_code=401, detail="Invalid email or password - incorrect password")
         
@@ -824,6 +911,10 @@ async def login(request: LoginRequest):
             print(f"❌ Account is deactivated: {request.email}")
             raise HTTPException(status_code=403, detail="Account is deactivated")
         
+        # Transparently upgrade hashes created under an older work factor
+        if needs_rehash(user["hashed_password"]):
+            _schedule_password_upgrade(user["_id"], request.password)
+        
         # Create access token
         access_token = create_access_token(data={"sub": user["_id"]})
         
@@ -1433,6 +1524,7 @@ async def stripe_webhook(request: Request):
                             {"_id": user["_id"]},
                             {"$set": update_fields}
                         )
+                        user_cache.invalidate(user["_id"])
         
         return {"success": True, "event_type": event_type}
         
@@ -1557,8 +1649,31 @@ async def get_compliance_standards():
     }
 
 
+# Compliance documentation responses, serialized once per data version
+# key -> (version, etag, body)
+_compliance_json_cache: Dict[tuple, tuple] = {}
+COMPLIANCE_JSON_CACHE_MAX_ENTRIES = 256
+
+def _compliance_json_response(request: Request, key: tuple, version: str, build) -> Response:
+    """Serve build()'s JSON from the cache while version is unchanged, with an ETag"""
+    cached = _compliance_json_cache.get(key)
+    if cached is None or cached[0] != version:
+        body = json.dumps(build(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        etag = '"' + hashlib.sha256(f"{version}:{key!r}".encode("utf-8")).hexdigest()[:32] + '"'
+        if len(_compliance_json_cache) >= COMPLIANCE_JSON_CACHE_MAX_ENTRIES:
+            # Keys include query filters; don't let odd values grow this forever
+            _compliance_json_cache.clear()
+        cached = _compliance_json_cache[key] = (version, etag, body)
+    
+    headers = {'ETag': cached[1], 'Cache-Control': 'no-cache'}
+    if etag_matches(request.headers.get('If-None-Match'), cached[1]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached[2], media_type="application/json", headers=headers)
+
+
 @app.get("/api/compliance/requirements")
 async def get_all_compliance_requirements(
+    request: Request,
     standard: Optional[str] = None,
     category: Optional[str] = None
 ):
@@ -1569,30 +1684,34 @@ async def get_all_compliance_requirements(
         standard: Filter by standard (gdpr, nist_800_53, soc2)
         category: Filter by category (data_protection, access_control, etc.)
     """
-    all_requirements = get_compliance_requirements()
-    
-    # Filter by standard if specified
-    if standard:
-        standard_lower = standard.lower()
-        all_requirements = {
-            k: v for k, v in all_requirements.items() 
-            if k.lower() == standard_lower
+    def build():
+        all_requirements = get_compliance_requirements()
+        
+        # Filter by standard if specified
+        if standard:
+            standard_lower = standard.lower()
+            all_requirements = {
+                k: v for k, v in all_requirements.items() 
+                if k.lower() == standard_lower
+            }
+        
+        # Filter by category if specified
+        if category:
+            for std_name, reqs in all_requirements.items():
+                all_requirements[std_name] = [
+                    r for r in reqs 
+                    if r["category"].lower() == category.lower()
+                ]
+        
+        return {
+            "success": True,
+            "requirements": all_requirements,
+            "total_count": sum(len(v) for v in all_requirements.values()),
+            "categories": [c.value for c in ComplianceCategory]
         }
     
-    # Filter by category if specified
-    if category:
-        for std_name, reqs in all_requirements.items():
-            all_requirements[std_name] = [
-                r for r in reqs 
-                if r["category"].lower() == category.lower()
-            ]
-    
-    return {
-        "success": True,
-        "requirements": all_requirements,
-        "total_count": sum(len(v) for v in all_requirements.values()),
-        "categories": [c.value for c in ComplianceCategory]
-    }
+    key = ("requirements", (standard or "").lower(), (category or "").lower())
+    return _compliance_json_response(request, key, compliance_framework.version, build)
 
 
 @app.get("/api/compliance/requirements/{requirement_id}")
@@ -1655,78 +1774,83 @@ async def get_code_patterns(pattern_name: Optional[str] = None):
     }
 
 
+# Static category documentation; its response is serialized once
+COMPLIANCE_CATEGORIES = {
+    "data_protection": {
+        "name": "Data Protection",
+        "description": "Measures to protect personal and sensitive data",
+        "related_standards": ["GDPR", "ISO 27001", "SOC 2"],
+        "key_controls": ["Encryption", "Access controls", "Data classification"]
+    },
+    "access_control": {
+        "name": "Access Control",
+        "description": "Mechanisms to restrict and manage access to systems and data",
+        "related_standards": ["ISO 27001", "SOC 2"],
+        "key_controls": ["RBAC", "Authentication", "Authorization"]
+    },
+    "encryption": {
+        "name": "Encryption",
+        "description": "Cryptographic protection of data at rest and in transit",
+        "related_standards": ["GDPR", "ISO 27001", "SOC 2"],
+        "key_controls": ["TLS/HTTPS", "AES encryption", "Key management"]
+    },
+    "audit_logging": {
+        "name": "Audit Logging",
+        "description": "Recording of security-relevant events for monitoring and forensics",
+        "related_standards": ["GDPR", "ISO 27001", "SOC 2"],
+        "key_controls": ["Event logging", "Log integrity", "Log retention"]
+    },
+    "consent_management": {
+        "name": "Consent Management",
+        "description": "Obtaining and managing user consent for data processing",
+        "related_standards": ["GDPR", "SOC 2"],
+        "key_controls": ["Consent collection", "Consent records", "Withdrawal mechanism"]
+    },
+    "data_retention": {
+        "name": "Data Retention",
+        "description": "Policies and procedures for data lifecycle management",
+        "related_standards": ["GDPR", "SOC 2"],
+        "key_controls": ["Retention periods", "Automatic cleanup", "Secure disposal"]
+    },
+    "incident_response": {
+        "name": "Incident Response",
+        "description": "Procedures for detecting, responding to, and recovering from security incidents",
+        "related_standards": ["GDPR", "ISO 27001"],
+        "key_controls": ["Breach detection", "Notification procedures", "Incident logging"]
+    },
+    "secure_development": {
+        "name": "Secure Development",
+        "description": "Security practices throughout the software development lifecycle",
+        "related_standards": ["ISO 27001"],
+        "key_controls": ["Input validation", "Secure coding", "Security testing"]
+    },
+    "privacy_by_design": {
+        "name": "Privacy by Design",
+        "description": "Integrating privacy into the design and operation of systems",
+        "related_standards": ["GDPR", "SOC 2"],
+        "key_controls": ["Data minimization", "Privacy defaults", "User controls"]
+    },
+    "data_minimization": {
+        "name": "Data Minimization",
+        "description": "Collecting only necessary data for specified purposes",
+        "related_standards": ["GDPR"],
+        "key_controls": ["Purpose limitation", "Necessary data only", "Regular review"]
+    }
+}
+COMPLIANCE_CATEGORIES_VERSION = hashlib.sha256(json.dumps(COMPLIANCE_CATEGORIES, sort_keys=True).encode()).hexdigest()
+
+
 @app.get("/api/compliance/categories")
-async def get_compliance_categories():
+async def get_compliance_categories(request: Request):
     """
     Get all compliance categories with descriptions.
     """
-    categories = {
-        "data_protection": {
-            "name": "Data Protection",
-            "description": "Measures to protect personal and sensitive data",
-            "related_standards": ["GDPR", "ISO 27001", "SOC 2"],
-            "key_controls": ["Encryption", "Access controls", "Data classification"]
-        },
-        "access_control": {
-            "name": "Access Control",
-            "description": "Mechanisms to restrict and manage access to systems and data",
-            "related_standards": ["ISO 27001", "SOC 2"],
-            "key_controls": ["RBAC", "Authentication", "Authorization"]
-        },
-        "encryption": {
-            "name": "Encryption",
-            "description": "Cryptographic protection of data at rest and in transit",
-            "related_standards": ["GDPR", "ISO 27001", "SOC 2"],
-            "key_controls": ["TLS/HTTPS", "AES encryption", "Key management"]
-        },
-        "audit_logging": {
-            "name": "Audit Logging",
-            "description": "Recording of security-relevant events for monitoring and forensics",
-            "related_standards": ["GDPR", "ISO 27001", "SOC 2"],
-            "key_controls": ["Event logging", "Log integrity", "Log retention"]
-        },
-        "consent_management": {
-            "name": "Consent Management",
-            "description": "Obtaining and managing user consent for data processing",
-            "related_standards": ["GDPR", "SOC 2"],
-            "key_controls": ["Consent collection", "Consent records", "Withdrawal mechanism"]
-        },
-        "data_retention": {
-            "name": "Data Retention",
-            "description": "Policies and procedures for data lifecycle management",
-            "related_standards": ["GDPR", "SOC 2"],
-            "key_controls": ["Retention periods", "Automatic cleanup", "Secure disposal"]
-        },
-        "incident_response": {
-            "name": "Incident Response",
-            "description": "Procedures for detecting, responding to, and recovering from security incidents",
-            "related_standards": ["GDPR", "ISO 27001"],
-            "key_controls": ["Breach detection", "Notification procedures", "Incident logging"]
-        },
-        "secure_development": {
-            "name": "Secure Development",
-            "description": "Security practices throughout the software development lifecycle",
-            "related_standards": ["ISO 27001"],
-            "key_controls": ["Input validation", "Secure coding", "Security testing"]
-        },
-        "privacy_by_design": {
-            "name": "Privacy by Design",
-            "description": "Integrating privacy into the design and operation of systems",
-            "related_standards": ["GDPR", "SOC 2"],
-            "key_controls": ["Data minimization", "Privacy defaults", "User controls"]
-        },
-        "data_minimization": {
-            "name": "Data Minimization",
-            "description": "Collecting only necessary data for specified purposes",
-            "related_standards": ["GDPR"],
-            "key_controls": ["Purpose limitation", "Necessary data only", "Regular review"]
-        }
-    }
-    
-    return {
-        "success": True,
-        "categories": categories
-    }
+    return _compliance_json_response(
+        request,
+        ("categories",),
+        COMPLIANCE_CATEGORIES_VERSION,
+        lambda: {"success": True, "categories": COMPLIANCE_CATEGORIES}
+    )
 
 
 @app.get("/api/compliance/ai-enforcement")
@@ -1905,231 +2029,33 @@ async def get_compliance_documentation():
 @app.get("/api/projects/{project_name}/compliance")
 async def get_project_compliance(
     project_name: str,
+    request: Request,
     current_user: dict = Depends(get_current_user_optional)
 ):
-    """SOC2 READINESS Assessment - NOT a compliance certification."""
+    """SOC2 READINESS Assessment - NOT a compliance certification.
+
+    Served from stored assessments keyed by project content (see soc2_readiness.py);
+    clients polling with If-None-Match get 304 while nothing changed.
+    """
     try:
-        from s3_storage import get_project_from_s3, get_cached_user_id_for_project
-        import re as regex
+        from fastapi.responses import JSONResponse
+        from soc2_readiness import readiness_service
         
         user_id = current_user.get('email') or current_user.get('_id') if current_user else 'anonymous'
         project_slug = normalize_project_slug(project_name)
         
-        # Try to load project from S3
-        project_data = get_project_from_s3(project_slug=project_slug, user_id=user_id)
-        if not project_data:
-            project_data = get_project_from_s3(project_slug=project_slug, user_id='anonymous')
-        if not project_data:
-            cached_user_id = get_cached_user_id_for_project(project_slug)
-            if cached_user_id and cached_user_id not in [user_id, 'anonymous']:
-                project_data = get_project_from_s3(project_slug=project_slug, user_id=cached_user_id)
-        if not project_data:
-            try:
-                from s3_storage import s3_client, S3_BUCKET_NAME
-                response = s3_client.list_objects_v2(Bucket=S3_BUCKET_NAME, Prefix='projects/', Delimiter='/')
-                for prefix_obj in response.get('CommonPrefixes', []):
-                    potential_user = prefix_obj.get('Prefix', '').replace('projects/', '').rstrip('/')
-                    if potential_user and potential_user not in [user_id, 'anonymous']:
-                        project_data = get_project_from_s3(project_slug=project_slug, user_id=potential_user)
-                        if project_data:
-                            break
-            except:
-                pass
-        
-        if not project_data:
+        found = await asyncio.to_thread(readiness_service.get_assessment, project_slug, user_id or 'anonymous')
+        if not found:
             raise HTTPException(status_code=404, detail=f"Project '{project_name}' not found")
-        
-        files = project_data.get('files', [])
-        
-        # STRICT Security Vulnerability Patterns - catches real issues
-        security_vulns = {
-            'secret_with_fallback': {
-                'pattern': r'(os\.getenv|os\.environ\.get|process\.env)[^,]*,\s*["\'"][^\"\'"]{4,}["\'"]',
-                'severity': 'CRITICAL', 'category': 'Secrets Management', 'control': 'CC6.1',
-                'description': 'Secret with hardcoded fallback - SOC2 violation',
-                'why': 'Default values mean secrets ARE in code. SOC2 requires no production secrets in code.',
-                'fix': 'Use os.environ["KEY"] to crash if missing, or use secrets manager'
-            },
-            'hardcoded_secret': {
-                'pattern': r'(password|secret|api_key|jwt_secret|secret_key|private_key)\s*[=:]\s*["\'"][^\"\'"]{8,}["\'"]',
-                'severity': 'CRITICAL', 'category': 'Secrets Management', 'control': 'CC6.1',
-                'description': 'Hardcoded secret in code',
-                'why': 'Can be extracted from repos, logs, or compiled binaries',
-                'fix': 'Move to environment variables or secrets manager'
-            },
-            'eval_exec': {
-                'pattern': r'\b(eval|exec)\s*\(',
-                'severity': 'CRITICAL', 'category': 'Code Injection', 'control': 'CC6.6',
-                'description': 'Dynamic code execution - allows arbitrary code injection',
-                'why': 'eval() is the most dangerous function in any language',
-                'fix': 'Remove eval/exec. Use JSON.parse() for data parsing'
-            },
-            'xss': {
-                'pattern': r'dangerouslySetInnerHTML|innerHTML\s*=',
-                'severity': 'HIGH', 'category': 'XSS', 'control': 'CC6.6',
-                'description': 'XSS vulnerability - direct HTML injection',
-                'why': 'Can steal sessions, credentials, execute malicious actions',
-                'fix': 'Use DOMPurify.sanitize() before rendering HTML'
-            },
-            'ssl_disabled': {
-                'pattern': r'verify\s*=\s*False|rejectUnauthorized\s*:\s*false',
-                'severity': 'CRITICAL', 'category': 'TLS', 'control': 'CC6.7',
-                'description': 'SSL/TLS verification disabled',
-                'why': 'Makes MITM attacks trivial',
-                'fix': 'Never disable certificate verification'
-            },
-            'http_plaintext': {
-                'pattern': r'["\'"]http://(?!localhost|127\.0\.0\.1)[^\s"\']+["\'"]',
-                'severity': 'HIGH', 'category': 'TLS', 'control': 'CC6.7',
-                'description': 'Plaintext HTTP URL',
-                'why': 'Data transmitted unencrypted',
-                'fix': 'Use HTTPS for all external communications'
-            },
-            'localstorage_auth': {
-                'pattern': r'localStorage\.(set|get)Item\([^)]*(?:token|auth|secret)',
-                'severity': 'HIGH', 'category': 'Data Protection', 'control': 'CC6.1',
-                'description': 'Auth tokens in localStorage',
-                'why': 'Any XSS vulnerability can steal localStorage data',
-                'fix': 'Use httpOnly cookies for auth tokens'
-            },
-            'empty_catch': {
-                'pattern': r'catch\s*\([^)]*\)\s*\{\s*\}|except:\s*pass',
-                'severity': 'MEDIUM', 'category': 'Error Handling', 'control': 'CC7.2',
-                'description': 'Swallowed errors - silent failure',
-                'why': 'Hides security incidents and bugs',
-                'fix': 'Log errors: catch(e) { logger.error(e); throw e; }'
-            },
-            'debug_code': {
-                'pattern': r'debugger;|console\.debug',
-                'severity': 'LOW', 'category': 'Code Quality', 'control': 'CC8.1',
-                'description': 'Debug code in codebase',
-                'why': 'Can expose internal state',
-                'fix': 'Remove before production deployment'
-            },
-        }
-        
-        # Operational controls - CANNOT be verified from code alone
-        ops_controls = {
-            'CC6.1': {'name': 'Access Control', 'needs': ['IAM policies', 'Access reviews', 'MFA config']},
-            'CC6.6': {'name': 'System Protection', 'needs': ['WAF config', 'Firewall rules']},
-            'CC6.7': {'name': 'Transmission Security', 'needs': ['TLS 1.2+ config', 'HSTS', 'Cert management']},
-            'CC7.1': {'name': 'Vulnerability Management', 'needs': ['Scan reports', 'Pen test results']},
-            'CC7.2': {'name': 'Security Monitoring', 'needs': ['SIEM config', 'Alerts', 'Log retention policy']},
-            'CC7.3': {'name': 'Incident Response', 'needs': ['IR plan', 'Postmortems', 'Communication procedures']},
-            'CC8.1': {'name': 'Change Management', 'needs': ['Change policy', 'Code review requirements']},
-            'CC9.1': {'name': 'Vendor Risk', 'needs': ['Vendor inventory', 'Security assessments']},
-        }
-        
-        issues = []
-        files_scanned = 0
-        files_with_issues = set()
-        
-        for file in files:
-            path = file.get('path', '')
-            content_str = file.get('content', '')
-            if not content_str or path.endswith(('.md','.json','.lock','.txt','.svg','.png','.jpg','.gif','.ico')):
-                continue
-            files_scanned += 1
-            lines = content_str.split('\n')
-            
-            for vname, vinfo in security_vulns.items():
-                try:
-                    for match in regex.finditer(vinfo['pattern'], content_str, regex.IGNORECASE|regex.MULTILINE):
-                        line_num = content_str[:match.start()].count('\n') + 1
-                        s = max(0, line_num - 3)
-                        e = min(len(lines), line_num + 3)
-                        snippet_lines = []
-                        for i in range(e - s):
-                            actual_line = s + i + 1
-                            marker = ">>>" if actual_line == line_num else "   "
-                            snippet_lines.append(f"{actual_line:4d} {marker} {lines[s + i]}")
-                        snippet = '\n'.join(snippet_lines)
-                        
-                        issues.append({
-                            'id': f"VULN-{len(issues)+1:04d}",
-                            'type': vname,
-                            'file': path,
-                            'line': line_num,
-                            'severity': vinfo['severity'],
-                            'category': vinfo['category'],
-                            'control': vinfo['control'],
-                            'description': vinfo['description'],
-                            'why_critical': vinfo['why'],
-                            'remediation': vinfo['fix'],
-                            'code_snippet': snippet,
-                            'matched': match.group()[:80]
-                        })
-                        files_with_issues.add(path)
-                except Exception as scan_err:
-                    pass
-        
-        # Calculate score (max 50 from code alone - code cannot prove compliance)
-        crit = len([i for i in issues if i['severity']=='CRITICAL'])
-        high = len([i for i in issues if i['severity']=='HIGH'])
-        med = len([i for i in issues if i['severity']=='MEDIUM'])
-        low = len([i for i in issues if i['severity']=='LOW'])
-        
-        code_score = max(0, 50 - (crit*15 + high*8 + med*4 + low))
-        total = code_score  # No ops evidence = no additional points
-        
-        level = 'NOT_READY'
-        if total >= 40: level = 'PARTIAL_READINESS'
-        elif total >= 25: level = 'EARLY_STAGE'
-        
-        # Build controls assessment
-        ctrl_assess = {}
-        for cid, cinfo in ops_controls.items():
-            ctrl_issues = [i for i in issues if i['control']==cid]
-            ctrl_assess[cid] = {
-                'name': cinfo['name'],
-                'code_status': 'HAS_ISSUES' if ctrl_issues else 'NOT_VERIFIED',
-                'ops_status': 'MISSING',
-                'overall': 'FAILING' if ctrl_issues else 'NOT_VERIFIED',
-                'findings': len(ctrl_issues),
-                'required_evidence': cinfo['needs'],
-            }
-        
-        secrets_issues = len([i for i in issues if i['category']=='Secrets Management'])
-        
-        gaps = []
-        if secrets_issues > 0:
-            gaps.append({"priority": 1, "gap": "Secrets Management", "count": secrets_issues, "fix": "Use os.environ[] or secrets manager"})
-        gaps.append({"priority": 2, "gap": "Operational Evidence", "issue": "8 controls missing evidence", "fix": "Prepare IAM, monitoring, IR docs"})
-        gaps.append({"priority": 3, "gap": "TLS Enforcement", "issue": "No HSTS/TLS config evidence", "fix": "Configure TLS 1.2+, HSTS"})
-        gaps.append({"priority": 4, "gap": "Monitoring", "issue": "No SIEM/alerting detected", "fix": "Implement centralized logging"})
-        
-        return {
-            "success": True,
-            "project_name": project_name,
-            "assessment_type": "SOC2_READINESS_SCAN",
-            "assessment_timestamp": datetime.utcnow().isoformat(),
-            
-            "disclaimer": {
-                "title": "⚠️ READINESS Assessment - NOT Compliance Certification",
-                "text": "SOC2 is an operational trust framework requiring evidence artifacts, not just code scanning.",
-                "checks": ["Code vulnerabilities", "Hardcoded secrets (incl. fallback defaults)", "Dangerous patterns (eval, XSS, SQLi)"],
-                "cannot_verify": ["IAM policies", "TLS enforcement in prod", "Monitoring/alerting", "Incident response", "Change management"]
-            },
-            
-            "readiness_score": round(total, 1),
-            "readiness_level": level,
-            "max_possible_score": 50,
-            "audit_ready": False,
-            
-            "score_breakdown": {
-                "code_security": {"score": code_score, "max": 50, "deductions": f"Critical:-{crit*15} High:-{high*8} Med:-{med*4} Low:-{low}"},
-                "operational_evidence": {"score": 0, "max": 50, "reason": "No evidence artifacts provided - upload IAM, monitoring, IR docs"}
-            },
-            
-            "findings_summary": {"critical": crit, "high": high, "medium": med, "low": low, "total": len(issues)},
-            "code_vulnerabilities": issues[:25],
-            "controls_assessment": ctrl_assess,
-            "critical_gaps": gaps,
-            
-            "files_analyzed": files_scanned,
-            "files_with_issues": len(files_with_issues),
-            "limitations": ["Cannot verify runtime behavior", "Cannot verify production configs", "Cannot verify operational procedures", "Pattern matching may have false positives"]
-        }
+        result, etag = found
+        
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(
+            content={"success": True, "project_name": project_name, **result},
+            headers=headers
+        )
         
     except HTTPException:
         raise
@@ -2369,52 +2295,9 @@ async def get_project_preview_url(project_name: str = Query(...)):
     return {"success": True, "url": url}
 
 # --- WebSocket Connection Manager ---
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
-        self.project_connections: Dict[str, Set[str]] = {}
-
-    async def connect(self, websocket: WebSocket, connection_id: str, project_name: str):
-        await websocket.accept()
-        self.active_connections[connection_id] = websocket
-        
-        if project_name not in self.project_connections:
-            self.project_connections[project_name] = set()
-        self.project_connections[project_name].add(connection_id)
-
-    def disconnect(self, connection_id: str, project_name: str):
-        if connection_id in self.active_connections:
-            del self.active_connections[connection_id]
-        
-        if project_name in self.project_connections:
-            self.project_connections[project_name].discard(connection_id)
-            if not self.project_connections[project_name]:
-                del self.project_connections[project_name]
-
-    async def send_to_project(self, project_name: str, message: dict):
-        """Send message to all connections for a specific project"""
-        if project_name in self.project_connections:
-            disconnected = []
-            for connection_id in list(self.project_connections[project_name]):
-                websocket = self.active_connections.get(connection_id)
-                if websocket:
-                    try:
-                        # Only send when CONNECTED
-                        if websocket.client_state == WebSocketState.CONNECTED:
-                            await websocket.send_json(message)
-                        else:
-                            disconnected.append(connection_id)
-                    except Exception:
-                        # Any send error, schedule cleanup
-                        disconnected.append(connection_id)
-                else:
-                    disconnected.append(connection_id)
-            
-            # Clean up disconnected connections
-            for connection_id in disconnected:
-                self.disconnect(connection_id, project_name)
-
-manager = ConnectionManager()
+# Broadcasts fan out through per-connection send queues (see ws_broadcaster.py);
+# set WS_PUBSUB_URL to share them across uvicorn workers
+manager = ConnectionManager(create_pubsub_backend())
 
 # --- WebSocket Endpoint ---
 @app.websocket("/ws/project/{project_name}")
@@ -2423,12 +2306,8 @@ async def websocket_endpoint(websocket: WebSocket, project_name: str):
     connection_id = str(uuid.uuid4())
     
     try:
-        # Add to connection manager
-        manager.active_connections[connection_id] = websocket
-        # Ensure this connection is tracked under the project for broadcasts
-        if project_name not in manager.project_connections:
-            manager.project_connections[project_name] = set()
-        manager.project_connections[project_name].add(connection_id)
+        # Subscribe this connection to the project's broadcasts
+        await manager.connect(websocket, connection_id, project_name)
         print(f"✅ WebSocket connected: {project_name} ({connection_id})")
         
         # Send welcome message
@@ -2444,8 +2323,8 @@ async def websocket_endpoint(websocket: WebSocket, project_name: str):
                 # Just wait for any message or disconnection
                 data = await websocket.receive_text()
                 
-                # Echo back to confirm connection is alive
-                await websocket.send_json({
+                # Echo back to confirm connection is alive (queued behind broadcasts)
+                await manager.send_to_connection(connection_id, {
                     "type": "echo",
                     "data": data,
                     "timestamp": datetime.now().isoformat()
@@ -2468,29 +2347,78 @@ async def websocket_endpoint(websocket: WebSocket, project_name: str):
             print(f"🔌 WebSocket cleaned up: {project_name}")
 
 # --- WebSocket Chat Endpoint ---
+def _build_chat_messages(user_message: str, chat_history: list, context: dict, summary: str = "") -> list:
+    """Assemble the system prompt, recent history and the new user message"""
+    system_context = """You are an expert full-stack developer and helpful coding assistant. 
+Provide clear, practical, and actionable responses. Be concise but thorough."""
+
+    # Add project context
+    if context:
+        tech_stack = context.get("tech_stack", [])
+        if tech_stack:
+            system_context += f"\n\nProject uses: {', '.join(tech_stack)}"
+    
+    if summary:
+        system_context += f"\n\nEarlier in this conversation:\n{summary}"
+    
+    messages = [{"role": "system", "content": system_context}]
+    
+    # Add recent history
+    recent_history = chat_history[-8:] if chat_history else []
+    for msg in recent_history:
+        if msg.get("role") and msg.get("content"):
+            messages.append(msg)
+    
+    # Add current message
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
 @app.websocket("/ws/chat/{project_name}")
 async def chat_websocket_endpoint(websocket: WebSocket, project_name: str):
-    """Dedicated WebSocket endpoint for real-time AI chat during development."""
+    """Dedicated WebSocket endpoint for real-time AI chat during development.
+
+    Replies stream as chat_delta frames followed by a chat_response with the full
+    text. Sending a new chat_message (or chat_cancel) cancels the reply in flight.
+    History is kept server-side: send conversation_id (or pass it as a query
+    parameter) instead of the full history array.
+    """
     await websocket.accept()
     connection_id = str(uuid.uuid4())
+    active_reply: Optional[asyncio.Task] = None
+    active_request_id: Optional[str] = None
+    conversation_id: Optional[str] = websocket.query_params.get("conversation_id")
+    # Browsers can't set headers on a WebSocket, so the JWT comes as ?token=
+    token_payload = verify_token(websocket.query_params.get("token", "")) if websocket.query_params.get("token") else None
+    user_id: Optional[str] = token_payload.get("sub") if token_payload else None
+    
+    async def send(message: dict):
+        # Every frame goes through the connection's writer task, ordered with broadcasts
+        await manager.send_to_connection(connection_id, message)
+    
+    async def cancel_active_reply(notify: bool = True):
+        nonlocal active_reply
+        if active_reply and not active_reply.done():
+            active_reply.cancel()
+            await asyncio.gather(active_reply, return_exceptions=True)
+            if notify:
+                await send({"type": "chat_cancelled", "request_id": active_request_id})
+        active_reply = None
     
     try:
         # Add to connection manager with chat prefix
         chat_project_name = f"chat_{project_name}"
-        manager.active_connections[connection_id] = websocket
-        if chat_project_name not in manager.project_connections:
-            manager.project_connections[chat_project_name] = set()
-        manager.project_connections[chat_project_name].add(connection_id)
+        await manager.connect(websocket, connection_id, chat_project_name)
         print(f"💬 Chat WebSocket connected: {project_name} ({connection_id})")
         
         # Send welcome message
-        await websocket.send_json({
+        await send({
             "type": "chat_connected",
             "message": "AI chat assistant ready! Ask me anything about development.",
             "connection_id": connection_id
         })
         
-        # Chat message loop
+        # Chat message loop - keeps receiving while a reply streams so new
+        # messages and disconnects are seen immediately
         while True:
             try:
                 # Wait for chat message
@@ -2502,78 +2430,60 @@ async def chat_websocket_endpoint(websocket: WebSocket, project_name: str):
                     context = data.get("context", {})
                     
                     if user_message:
-                        # Send typing indicator
-                        await websocket.send_json({
-                            "type": "chat_typing",
-                            "message": "AI is thinking..."
-                        })
+                        # A new question supersedes the answer still streaming
+                        await cancel_active_reply()
                         
-                        try:
-                            # Process chat using the same logic as the HTTP endpoint
-                            system_context = """You are an expert full-stack developer and helpful coding assistant. 
-Provide clear, practical, and actionable responses. Be concise but thorough."""
-
-                            # Add project context
-                            if context:
-                                tech_stack = context.get("tech_stack", [])
-                                if tech_stack:
-                                    system_context += f"\n\nProject uses: {', '.join(tech_stack)}"
-                            
-                            messages = [{"role": "system", "content": system_context}]
-                            
-                            # Add recent history
-                            recent_history = chat_history[-8:] if chat_history else []
-                            for msg in recent_history:
-                                if msg.get("role") and msg.get("content"):
-                                    messages.append(msg)
-                            
-                            # Add current message
-                            messages.append({"role": "user", "content": user_message})
-                            
-                            # Get AI response
-                            from ai_assistant import get_chat_response
-                            ai_response = get_chat_response(messages, model_type='fast')
-                            
-                            # Send response
-                            await websocket.send_json({
-                                "type": "chat_response",
-                                "message": ai_response,
-                                "user_message": user_message,
-                                "timestamp": time.time()
-                            })
-                            
-                        except Exception as ai_error:
-                            await websocket.send_json({
-                                "type": "chat_error", 
-                                "message": f"AI chat error: {str(ai_error)}"
-                            })
+                        # Prefer the server-side conversation; a client-sent history still works
+                        conversation_id = await asyncio.to_thread(
+                            chat_history_store.ensure_conversation,
+                            data.get("conversation_id") or conversation_id,
+                            project_name,
+                            user_id
+                        )
+                        summary = ""
+                        if not chat_history:
+                            summary, chat_history = await asyncio.to_thread(
+                                chat_history_store.get_prompt_context, conversation_id
+                            )
+                        
+                        active_request_id = data.get("request_id") or str(uuid.uuid4())
+                        messages = _build_chat_messages(user_message, chat_history, context, summary)
+                        active_reply = asyncio.create_task(
+                            stream_chat_reply(send, messages, user_message, active_request_id, conversation_id,
+                                              record_chat_exchange)
+                        )
+                
+                elif data.get("type") == "chat_cancel":
+                    await cancel_active_reply()
                     
                 elif data.get("type") == "ping":
-                    await websocket.send_json({"type": "pong"})
+                    await send({"type": "pong"})
                     
             except WebSocketDisconnect:
                 print(f"Chat WebSocket disconnected: {project_name}")
                 break
             except Exception as e:
                 print(f"Chat WebSocket error: {e}")
-                await websocket.send_json({
+                await send({
                     "type": "error",
                     "message": f"Connection error: {str(e)}"
                 })
+                # Let the writer deliver the error before the connection is torn down
+                await manager.flush(connection_id)
                 break
                 
     except Exception as e:
         print(f"Chat WebSocket setup error: {e}")
     finally:
+        # Stop any reply still streaming to this socket
+        try:
+            await cancel_active_reply(notify=False)
+        except Exception:
+            pass
+        
         # Clean up connection
         try:
-            chat_project_name = f"chat_{project_name}"
-            if connection_id in manager.active_connections:
-                del manager.active_connections[connection_id]
-            if chat_project_name in manager.project_connections:
-                manager.project_connections[chat_project_name].discard(connection_id)
-                if not manager.project_connections[chat_project_name]:
-                    del manager.project_connections[chat_project_name]
+            manager.disconnect(connection_id, f"chat_{project_name}")
         finally:
             print(f"💬 Chat WebSocket cleaned up: {project_name}")
 
@@ -2890,6 +2800,34 @@ async def create_complete_project_structure(project_path: Path, project_spec: di
     return files_created
 
 # --- Sandboxed Preview Endpoint ---
+def _preview_session_alive(session_id: Optional[str]) -> bool:
+    """Whether the auto-deployed sandbox backend a bundle points at is still up"""
+    if not session_id:
+        return True
+    try:
+        from preview_orchestrator import get_orchestrator, OrchestrationStage
+        progress = get_orchestrator().get_progress(session_id)
+        return progress is not None and progress.stage != OrchestrationStage.FAILED
+    except Exception:
+        return False
+
+def _preview_bundle_response(bundle, request: Request, source: str) -> Response:
+    """Serve a preview bundle with a strong ETag; browsers revalidate and get 304 when unchanged"""
+    headers = {
+        'ETag': bundle.etag,
+        'Cache-Control': 'no-cache',
+        'X-Preview-Bundle': source
+    }
+    if etag_matches(request.headers.get('If-None-Match'), bundle.etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=bundle.html, headers=headers)
+
+def invalidate_project_preview(project_name: str):
+    """Drop cached previews after project files change"""
+    for slug in {normalize_project_slug(project_name), project_name.lower().replace(" ", "-")}:
+        preview_bundle_cache.invalidate(slug)
+        preview_cache.invalidate(slug)
+
 @app.get("/api/sandbox-preview/{project_name:path}")
 async def get_sandbox_preview(
     project_name: str, 
@@ -2944,6 +2882,16 @@ async def get_sandbox_preview(
         project_slug = normalize_project_slug(project_name)
         print(f"🔍 Normalized to slug: '{project_slug}'")
         
+        # Fast path: the prebuilt bundle for this project's current content
+        requested_backend_url = backend_url or request.headers.get('X-Backend-URL') or ''
+        cached_bundle = preview_bundle_cache.lookup(project_slug, user_id, requested_backend_url)
+        if cached_bundle:
+            bundle, pointer = cached_bundle
+            if _preview_session_alive(pointer.session_id):
+                return _preview_bundle_response(bundle, request, "hit")
+            # The sandbox backend baked into this bundle is gone; rebuild
+            preview_bundle_cache.forget_pointer(project_slug, user_id, requested_backend_url)
+        
         project_data = None
         
         # Check cached user_id for this project (most reliable way to find it)
@@ -3021,7 +2969,8 @@ async def get_sandbox_preview(
             )
         
         # Get backend URL from query param, header, or default
-        effective_backend_url = backend_url or request.headers.get('X-Backend-URL') or 'http://localhost:8000/api'
+        effective_backend_url = requested_backend_url or 'http://localhost:8000/api'
+        deployed_session_id = None
         print(f"🔗 Backend URL for sandbox (initial): {effective_backend_url}")
 
         # If the project includes backend files, attempt to auto-deploy a Docker sandbox
@@ -3074,12 +3023,16 @@ async def get_sandbox_preview(
                             generate_backend=False
                         )
 
-                        print(f"🔁 Starting orchestrator.start_preview for project {project_slug}...")
-                        result = await orchestrator.start_preview(preview_request)
+                        # Reuse the project's running sandbox when there is one
+                        result = await orchestrator.hot_update_preview(project_slug, backend_files)
+                        if result is None:
+                            print(f"🔁 Starting orchestrator.start_preview for project {project_slug}...")
+                            result = await orchestrator.start_preview(preview_request)
 
                         if result and getattr(result, 'backend_url', None):
                             effective_backend_url = result.backend_url
                             session_id = getattr(result, 'session_id', None)
+                            deployed_session_id = session_id
                             print(f"✅ Auto-deployed backend at: {effective_backend_url} (session: {session_id})")
                         else:
                             print(f"⚠️ Orchestrator returned no backend_url, falling back to {effective_backend_url}")
@@ -3092,18 +3045,18 @@ async def get_sandbox_preview(
 
         print(f"🔗 Backend URL for sandbox (final): {effective_backend_url}")
 
-        # Generate the sandbox HTML with backend URL injected
-        sandbox_html = generate_sandbox_html(files_content, project_name, effective_backend_url)
-        
-        # Add cache-busting headers to force fresh reload
-        return HTMLResponse(
-            content=sandbox_html,
-            headers={
-                'Cache-Control': 'no-cache, no-store, must-revalidate, max-age=0',
-                'Pragma': 'no-cache',
-                'Expires': '0'
-            }
+        # Build the sandbox HTML (backend URL injected) once per content hash
+        bundle = await preview_bundle_cache.get_or_build(
+            project_slug,
+            user_id,
+            requested_backend_url,
+            files_content,
+            project_name,
+            effective_backend_url,
+            build=lambda: asyncio.to_thread(generate_sandbox_html, files_content, project_name, effective_backend_url),
+            session_id=deployed_session_id
         )
+        return _preview_bundle_response(bundle, request, "built")
         
     except HTTPException as http_ex:
         # Re-raise HTTPExceptions (like 404) with their original status
@@ -6961,7 +6914,7 @@ async def build_with_ai(
         unique_project_name = ensure_unique_project_name(project_name.lower().replace(" ", "-"))
         
         # Create async job
-        job_id = job_manager.create_job(
+        job_id = await job_manager.create_job(
             job_type="project_generation",
             params={
                 "project_name": unique_project_name,
@@ -6983,7 +6936,7 @@ async def build_with_ai(
             "success": True,
             "job_id": job_id,
             "project_name": unique_project_name,  # Return the actual unique name used
-            "message": "Project generation started. Poll /api/jobs/{job_id} for progress."
+            "message": "Project generation started. Progress is pushed as job_progress messages on /ws/project/{project_name}; /api/jobs/{job_id} returns the latest state."
         }
 
     except HTTPException:
@@ -6994,7 +6947,7 @@ async def build_with_ai(
 
 # --- AI Chat Endpoint ---
 @app.post("/api/chat")
-async def ai_chat(request: dict = Body(...)):
+async def ai_chat(request: dict = Body(...), current_user: Optional[dict] = Depends(get_current_user_optional)):
     """General AI chat endpoint for development assistance and questions."""
     try:
         project_name = request.get("project_name")
@@ -7005,6 +6958,20 @@ async def ai_chat(request: dict = Body(...)):
         if not user_message:
             raise HTTPException(status_code=400, detail="user_message is required")
         
+        # History lives server-side; clients only need to send the conversation_id back.
+        # A chat_history array is still honoured for older clients.
+        conversation_id = await asyncio.to_thread(
+            chat_history_store.ensure_conversation,
+            request.get("conversation_id"),
+            project_name or "default",
+            current_user["_id"] if current_user else None
+        )
+        conversation_summary = ""
+        if not chat_history:
+            conversation_summary, chat_history = await asyncio.to_thread(
+                chat_history_store.get_prompt_context, conversation_id
+            )
+        
         # Optional: Send typing indicator if project_name is provided
         if project_name:
             await manager.send_to_project(project_name, {
@@ -7036,6 +7003,9 @@ Provide clear, practical, and actionable responses. When discussing code, be spe
                 system_context += f"\nCurrent files: {', '.join(current_files[:10])}"  # Limit to first 10
             if errors:
                 system_context += f"\nActive errors: {len(errors)} issues found"
+        
+        if conversation_summary:
+            system_context += f"\n\nEarlier in this conversation:\n{conversation_summary}"
 
         # Prepare chat messages for AI
         messages = [{"role": "system", "content": system_context}]
@@ -7055,19 +7025,22 @@ Provide clear, practical, and actionable responses. When discussing code, be spe
         # Get AI response
         try:
             from ai_assistant import get_chat_response
-            ai_response = get_chat_response(messages, model_type='smart')
+            ai_response = await run_in_threadpool(get_chat_response, messages, 'smart')
+            await asyncio.to_thread(record_chat_exchange, conversation_id, user_message, ai_response)
             
             # Send response via WebSocket if project connected
             if project_name:
                 await manager.send_to_project(project_name, {
                     "type": "chat_response",
                     "message": ai_response,
-                    "user_message": user_message
+                    "user_message": user_message,
+                    "conversation_id": conversation_id
                 })
             
             return {
                 "success": True,
                 "response": ai_response,
+                "conversation_id": conversation_id,
                 "timestamp": time.time()
             }
             
@@ -7090,17 +7063,54 @@ Provide clear, practical, and actionable responses. When discussing code, be spe
         return {"success": False, "error": str(e)}
 
 # --- Chat History Endpoint ---
+def record_chat_exchange(conversation_id: str, user_message: str, ai_response: str):
+    """Append a question/answer pair to the persisted conversation"""
+    try:
+        chat_history_store.append(conversation_id, "user", user_message)
+        chat_history_store.append(conversation_id, "assistant", ai_response)
+    except Exception as e:
+        print(f"⚠️ Failed to persist chat turns for {conversation_id}: {e}")
+
 @app.get("/api/chat/history/{project_name}")
-async def get_chat_history(project_name: str, limit: int = 50):
-    """Get recent chat history for a project (placeholder for now)."""
+async def get_chat_history(
+    project_name: str,
+    limit: int = Query(50, ge=1, le=200),
+    conversation_id: Optional[str] = None,
+    before_seq: Optional[int] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get the signed-in user's recent chat history for a project.
+
+    Without conversation_id this returns the user's most recent conversation.
+    Page further back with before_seq (the seq of the oldest turn you already have).
+    """
     try:
-        # For now, return empty history - in production you'd store/retrieve from database
+        user_id = current_user["_id"]
+        conversations = await asyncio.to_thread(chat_history_store.list_conversations, project_name, user_id)
+        if conversation_id is None and conversations:
+            conversation_id = conversations[0]["conversation_id"]
+        
+        conversation = None
+        if conversation_id:
+            conversation = await asyncio.to_thread(chat_history_store.get_conversation, conversation_id, user_id)
+            if conversation is None or conversation["project_name"] != project_name:
+                raise HTTPException(status_code=404, detail="Conversation not found")
+        
+        history = []
+        if conversation:
+            history = await asyncio.to_thread(chat_history_store.get_turns, conversation_id, limit, before_seq)
+        
         return {
             "success": True,
             "project_name": project_name,
-            "history": [],
-            "message": "Chat history feature coming soon - conversations are not yet persisted"
+            "conversation_id": conversation_id,
+            "summary": conversation["summary"] if conversation else "",
+            "turn_count": conversation["turn_count"] if conversation else 0,
+            "history": history,
+            "conversations": conversations
         }
+    except HTTPException:
+        raise
     except Exception as e:
         return {"success": False, "error": str(e)}
 
@@ -7808,63 +7818,21 @@ ANALYZING PROJECT FILES FOR SPECIFIC FIXES..."""
         
         project_file_tree = get_file_tree(project_path)
         
-        # For editing requests, include relevant file content
+        # For editing requests, include the symbols most relevant to the request
+        # (ranked chunks from the per-project code index, within a token budget)
         file_context = ""
-        
-        # Keywords that suggest frontend changes
-        frontend_keywords = ['change', 'update', 'modify', 'edit', 'fix', 'button', 'color', 'style', 'page', 'component', 'ui', 'layout', 'design', 'display', 'show', 'view']
-        # Keywords that suggest backend changes  
-        backend_keywords = ['api', 'endpoint', 'route', 'database', 'data', 'fetch', 'save', 'delete', 'update', 'create', 'model', 'backend', 'server', 'auth', 'login', 'user']
-        
-        needs_frontend = any(keyword in user_message.lower() for keyword in frontend_keywords)
-        needs_backend = any(keyword in user_message.lower() for keyword in backend_keywords)
-        
-        # Include frontend context
-        if needs_frontend or not needs_backend:
-            # Try to find and include App.jsx content for context
+        try:
+            file_context = await asyncio.to_thread(code_index.build_context, project_slug, project_path, user_message)
+        except Exception as index_error:
+            print(f"⚠️ Code index failed for {project_slug}: {index_error}")
+
+        if not file_context:
             app_file = project_path / "frontend" / "src" / "App.jsx"
             if app_file.exists():
                 try:
                     with open(app_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    # Include first 150 lines (usually contains components and UI)
-                    lines = content.split('\n')[:150]
-                    file_context += f"\n\nFRONTEND FILE CONTENT (App.jsx first 150 lines):\n```jsx\n" + '\n'.join(lines) + "\n```\n"
-                except:
-                    pass
-        
-        # Include backend context when needed
-        if needs_backend:
-            # Try to include backend main.py
-            backend_main = project_path / "backend" / "main.py"
-            if backend_main.exists():
-                try:
-                    with open(backend_main, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    lines = content.split('\n')[:100]
-                    file_context += f"\n\nBACKEND FILE CONTENT (main.py first 100 lines):\n```python\n" + '\n'.join(lines) + "\n```\n"
-                except:
-                    pass
-            
-            # Try to include models.py
-            backend_models = project_path / "backend" / "models.py"
-            if backend_models.exists():
-                try:
-                    with open(backend_models, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    lines = content.split('\n')[:80]
-                    file_context += f"\n\nBACKEND MODELS (models.py first 80 lines):\n```python\n" + '\n'.join(lines) + "\n```\n"
-                except:
-                    pass
-            
-            # Try to include routes.py
-            backend_routes = project_path / "backend" / "routes.py"
-            if backend_routes.exists():
-                try:
-                    with open(backend_routes, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    lines = content.split('\n')[:80]
-                    file_context += f"\n\nBACKEND ROUTES (routes.py first 80 lines):\n```python\n" + '\n'.join(lines) + "\n```\n"
+                        lines = f.read().split('\n')[:150]
+                    file_context = f"\n\nFRONTEND FILE CONTENT (App.jsx first 150 lines):\n```jsx\n" + '\n'.join(lines) + "\n```\n"
                 except:
                     pass
 
@@ -8484,6 +8452,8 @@ RESPOND WITH ONLY JSON NOW:"""
             # Apply the changes with targeted editing
             files_modified = []
             modified_contents = {}  # Track modified content for S3 upload
+            patched_files = set()  # Files whose targeted edits were already applied
+            edit_results = []  # Per-hunk match strategy and confidence
             
             for change in changes:
                 file_path = change.get("file_path", "").lstrip("/")
@@ -8503,33 +8473,47 @@ RESPOND WITH ONLY JSON NOW:"""
                 
                 # Handle different edit types
                 if edit_type == "targeted_edit":
-                    # Targeted edit - modify specific sections
-                    # Support both old/new and search/replace field names
-                    search_pattern = change.get("search", change.get("old_code", ""))
-                    replace_with = change.get("replace", change.get("new_code", ""))
-                    target_section = change.get("target_section", "targeted modification")
-                    
-                    if not search_pattern or replace_with is None:
-                        await manager.send_to_project(project_name, {
-                            "type": "warning",
-                            "message": f"⚠️ Targeted edit for {file_path} missing search/replace patterns"
-                        })
+                    # Targeted edit - all hunks for a file are applied together in one pass
+                    if file_path in patched_files:
                         continue
-                    
-                    # CRITICAL: Preserve trailing punctuation from search pattern
-                    # If search ends with , or ; but replace doesn't, add it
-                    if search_pattern.rstrip().endswith(',') and not replace_with.rstrip().endswith(','):
-                        replace_with = replace_with.rstrip() + ','
-                        print(f"⚠️ Auto-fixed: Added missing comma to replacement in {file_path}")
-                    elif search_pattern.rstrip().endswith(';') and not replace_with.rstrip().endswith(';'):
-                        replace_with = replace_with.rstrip() + ';'
-                        print(f"⚠️ Auto-fixed: Added missing semicolon to replacement in {file_path}")
-                    
-                    # Read existing content - PREFER S3 over local files
+                    patched_files.add(file_path)
+
+                    hunks = []
+                    for hunk_change in changes:
+                        if hunk_change.get("edit_type") != "targeted_edit" or hunk_change.get("file_path", "").lstrip("/") != file_path:
+                            continue
+                        # Support both old/new and search/replace field names
+                        search_pattern = hunk_change.get("search", hunk_change.get("old_code", ""))
+                        replace_with = hunk_change.get("replace", hunk_change.get("new_code", ""))
+                        target_section = hunk_change.get("target_section", "targeted modification")
+
+                        if not search_pattern or replace_with is None:
+                            await manager.send_to_project(project_name, {
+                                "type": "warning",
+                                "message": f"⚠️ Targeted edit for {file_path} missing search/replace patterns"
+                            })
+                            continue
+
+                        # CRITICAL: Preserve trailing punctuation from search pattern
+                        # If search ends with , or ; but replace doesn't, add it
+                        if search_pattern.rstrip().endswith(',') and not replace_with.rstrip().endswith(','):
+                            replace_with = replace_with.rstrip() + ','
+                            print(f"⚠️ Auto-fixed: Added missing comma to replacement in {file_path}")
+                        elif search_pattern.rstrip().endswith(';') and not replace_with.rstrip().endswith(';'):
+                            replace_with = replace_with.rstrip() + ';'
+                            print(f"⚠️ Auto-fixed: Added missing semicolon to replacement in {file_path}")
+
+                        hunks.append(EditHunk(search_pattern, replace_with, target_section))
+
+                    if not hunks:
+                        continue
+
+                    # Read existing content - earlier edits first, then S3, then local files
                     existing_content = None
-                    
-                    # Try S3 first (primary source)
-                    if file_path in s3_files_map:
+
+                    if file_path in modified_contents:
+                        existing_content = modified_contents[file_path]
+                    elif file_path in s3_files_map:
                         existing_content = s3_files_map[file_path]
                         print(f"☁️ Reading {file_path} from S3")
                     elif target.exists():
@@ -8537,34 +8521,42 @@ RESPOND WITH ONLY JSON NOW:"""
                         with open(target, 'r', encoding='utf-8') as f:
                             existing_content = f.read()
                         print(f"📁 Reading {file_path} from local (not in S3)")
-                    
+
                     if existing_content:
-                        # Apply targeted edit
-                        if search_pattern in existing_content:
-                            updated_content = existing_content.replace(search_pattern, replace_with, 1)
+                        # Apply targeted edits (exact, whitespace-tolerant or fuzzy matching)
+                        updated_content, hunk_results = apply_hunks(existing_content, hunks)
+                        for hunk, hunk_result in zip(hunks, hunk_results):
+                            edit_results.append({"file_path": file_path, "target_section": hunk.label, **hunk_result.to_dict()})
+                            if hunk_result.applied:
+                                print(f"✏️ Applied edit to {file_path}:{hunk_result.start_line} ({hunk_result.strategy}, confidence {hunk_result.confidence:.2f})")
+                            else:
+                                print(f"❌ Search pattern not found in {file_path}")
+                                print(f"🔍 Looking for: {repr(hunk.search[:100])}")
+
+                        if any(hunk_result.applied for hunk_result in hunk_results):
                             cleaned = _clean_ai_generated_content(updated_content, target.name)
-                            
+
                             # Save to local file
                             target.parent.mkdir(parents=True, exist_ok=True)
                             with open(target, 'w', encoding='utf-8', newline='\n') as f:
                                 f.write(cleaned)
-                            
+
                             # Track for S3 upload
-                            files_modified.append(file_path)
+                            if file_path not in files_modified:
+                                files_modified.append(file_path)
                             modified_contents[file_path] = cleaned
-                            
+
                             await manager.send_to_project(project_name, {
                                 "type": "file_changed",
                                 "file_path": file_path,
                                 "message": f"✏️ Updated your project"
                             })
-                        else:
+
+                        if not all(hunk_result.applied for hunk_result in hunk_results):
                             await manager.send_to_project(project_name, {
                                 "type": "warning",
                                 "message": f"⚠️ I couldn't make that change. Can you be more specific about what you'd like me to update?"
                             })
-                            print(f"❌ Search pattern not found in {file_path}")
-                            print(f"🔍 Looking for: {repr(search_pattern[:100])}")
                     else:
                         await manager.send_to_project(project_name, {
                             "type": "warning", 
@@ -8799,6 +8791,7 @@ RESPOND WITH ONLY JSON NOW:"""
             remaining_errors = check.get("errors", []) if check.get("success") else []
 
             # Upload modified files to S3 so the preview can see them
+            saved_version = None
             if files_modified and modified_contents:
                 try:
                     await manager.send_to_project(project_name, {
@@ -8829,8 +8822,10 @@ RESPOND WITH ONLY JSON NOW:"""
                         upload_result = upload_project_to_s3(
                             project_slug=project_slug,
                             files=files_to_upload,
-                            user_id=actual_user_id  # Use the user_id where project was found
+                            user_id=actual_user_id,  # Use the user_id where project was found
+                            message=f"AI: {user_message[:120]}"
                         )
+                        saved_version = upload_result.get("version")
                         print(f"✅ AI changes uploaded to S3 (user={actual_user_id}): {list(modified_contents.keys())}")
                     else:
                         # Project not in S3 yet, create it fresh from local files
@@ -8891,6 +8886,8 @@ RESPOND WITH ONLY JSON NOW:"""
                 "success": True,
                 "explanation": explanation,
                 "files_modified": files_modified,
+                "edit_results": edit_results,
+                "version": saved_version,
                 "preview_url": preview_url,
                 "errors": remaining_errors
             }
@@ -9141,10 +9138,14 @@ async def ai_apply_changes(request: dict = Body(...)):
             upload_project_to_s3(
                 project_slug=project_slug,
                 files=files_to_upload,
-                user_id=user_id
+                user_id=user_id,
+                message=f"AI changes to {', '.join(files_modified[:5])}"
             )
             
             print(f"☁️ Uploaded {len(files_to_upload)} AI-modified files to S3")
+            invalidate_project_preview(project_slug)
+            for uploaded in files_to_upload:
+                code_index.update_file(project_slug, uploaded['path'], uploaded['content'])
             
         except Exception as s3_error:
             print(f"❌ S3 upload failed: {s3_error}")
@@ -9386,10 +9387,13 @@ async def save_project_file(request: dict = Body(...)):
             upload_project_to_s3(
                 project_slug=project_slug,
                 files=[{'path': file_path_clean, 'content': cleaned_content}],
-                user_id=user_id
+                user_id=user_id,
+                message=f"Saved {file_path_clean}"
             )
             
             print(f"☁️ Saved {file_path_clean} to S3")
+            invalidate_project_preview(project_slug)
+            code_index.update_file(project_slug, file_path_clean, cleaned_content)
             
             # Notify via WebSocket
             await manager.send_to_project(project_name, {
@@ -10116,8 +10120,10 @@ CODE:
 # --- Install Dependencies Endpoint ---
 @app.post("/api/install-dependencies")
 async def install_dependencies(request: dict = Body(...)):
-    """Install project dependencies"""
+    """Install project dependencies from the shared dependency store"""
     try:
+        from dependency_store import dependency_store
+        
         project_name = request.get("project_name")
         tech_stack = request.get("tech_stack", [])
         
@@ -10128,6 +10134,11 @@ async def install_dependencies(request: dict = Body(...)):
         if not project_path.exists():
             return {"success": False, "error": "Project not found"}
         
+        async def emit(message: dict):
+            await manager.send_to_project(project_name, message)
+        
+        results = {}
+        
         # Install frontend dependencies
         frontend_path = project_path / "frontend"
         if frontend_path.exists() and (frontend_path / "package.json").exists():
@@ -10137,32 +10148,20 @@ async def install_dependencies(request: dict = Body(...)):
                 "level": "info"
             })
             
-            try:
-                process = await asyncio.create_subprocess_shell(
-                    "npm install",
-                    cwd=frontend_path,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                stdout, stderr = await process.communicate()
-                
-                if process.returncode == 0:
-                    await manager.send_to_project(project_name, {
-                        "type": "terminal_output",
-                        "message": "✅ Frontend dependencies installed",
-                        "level": "success"
-                    })
-                else:
-                    await manager.send_to_project(project_name, {
-                        "type": "terminal_output",
-                        "message": f"⚠️ Frontend install issues: {stderr.decode()}",
-                        "level": "warning"
-                    })
-            except Exception as e:
+            result = await dependency_store.install_npm(frontend_path, emit, owner=project_slug)
+            results["frontend"] = result.to_dict()
+            if result.success:
+                source = "from cache" if result.cache_hit else "and cached"
                 await manager.send_to_project(project_name, {
                     "type": "terminal_output",
-                    "message": f"❌ Frontend install failed: {str(e)}",
-                    "level": "error"
+                    "message": f"✅ Frontend dependencies installed {source} in {result.seconds:.1f}s",
+                    "level": "success"
+                })
+            else:
+                await manager.send_to_project(project_name, {
+                    "type": "terminal_output",
+                    "message": f"⚠️ Frontend install issues: {result.error}",
+                    "level": "warning"
                 })
         
         # Install backend dependencies if Python/FastAPI
@@ -10174,35 +10173,23 @@ async def install_dependencies(request: dict = Body(...)):
                 "level": "info"
             })
             
-            try:
-                process = await asyncio.create_subprocess_shell(
-                    "pip install -r requirements.txt",
-                    cwd=backend_path,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                stdout, stderr = await process.communicate()
-                
-                if process.returncode == 0:
-                    await manager.send_to_project(project_name, {
-                        "type": "terminal_output",
-                        "message": "✅ Backend dependencies installed",
-                        "level": "success"
-                    })
-                else:
-                    await manager.send_to_project(project_name, {
-                        "type": "terminal_output",
-                        "message": f"⚠️ Backend install issues: {stderr.decode()}",
-                        "level": "warning"
-                    })
-            except Exception as e:
+            result = await dependency_store.install_pip(backend_path, emit, owner=project_slug)
+            results["backend"] = result.to_dict()
+            if result.success:
+                source = "from cache" if result.cache_hit else "and cached"
                 await manager.send_to_project(project_name, {
                     "type": "terminal_output",
-                    "message": f"❌ Backend install failed: {str(e)}",
-                    "level": "error"
+                    "message": f"✅ Backend dependencies installed {source} in {result.seconds:.1f}s",
+                    "level": "success"
+                })
+            else:
+                await manager.send_to_project(project_name, {
+                    "type": "terminal_output",
+                    "message": f"⚠️ Backend install issues: {result.error}",
+                    "level": "warning"
                 })
         
-        return {"success": True}
+        return {"success": True, "installs": results}
         
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -10309,6 +10296,9 @@ async def run_project(request: dict = Body(...)):
         if not frontend_exists:
             return {"success": False, "error": "Frontend not found"}
         
+        # Frontend edits only need a fresh preview bundle, never a container rebuild
+        invalidate_project_preview(project_slug)
+        
         await manager.send_to_project(project_name, {
             "type": "terminal_output", 
             "message": "🚀 Preparing sandboxed preview...",
@@ -10347,23 +10337,28 @@ async def run_project(request: dict = Body(...)):
                 print(f"🔍 DEBUG: Deployment service: {orchestrator._deployment_service if orchestrator else None}")
                 
                 if orchestrator and orchestrator._deployment_service:
-                    await manager.send_to_project(project_name, {
-                        "type": "terminal_output",
-                        "message": "🐳 Deploying backend Docker container...",
-                        "level": "info"
-                    })
-                    
-                    # Create preview request with backend files
-                    preview_request = PreviewRequest(
-                        project_name=project_slug,
-                        project_files=project_files,
-                        backend_files=backend_files,
-                        ttl_minutes=45,
-                        generate_backend=False  # We already have backend files
-                    )
-                    
-                    # Start the orchestration (deploys Docker container)
-                    result = await orchestrator.start_preview(preview_request)
+                    # Hot path: push changed backend files into the running sandbox
+                    result = await orchestrator.hot_update_preview(project_slug, backend_files)
+                    if result is not None:
+                        print(f"🔥 {result.message}")
+                    else:
+                        await manager.send_to_project(project_name, {
+                            "type": "terminal_output",
+                            "message": "🐳 Deploying backend Docker container...",
+                            "level": "info"
+                        })
+                        
+                        # Create preview request with backend files
+                        preview_request = PreviewRequest(
+                            project_name=project_slug,
+                            project_files=project_files,
+                            backend_files=backend_files,
+                            ttl_minutes=45,
+                            generate_backend=False  # We already have backend files
+                        )
+                        
+                        # Start the orchestration (deploys Docker container)
+                        result = await orchestrator.start_preview(preview_request)
                     
                     if result.success and result.backend_url:
                         backend_url = result.backend_url
@@ -10722,7 +10717,10 @@ async def run_security_scan(request: dict = Body(...)):
 
 # --- AI-Powered Security Scan (NO ZAP REQUIRED) ---
 @app.post("/api/ai-security-scan")
-async def run_ai_security_scan(request: dict = Body(...)):
+async def run_ai_security_scan(
+    request: dict = Body(...),
+    current_user: Optional[dict] = Depends(get_current_user_optional)
+):
     """
     Run an AI-powered security scan WITHOUT requiring OWASP ZAP.
     Uses Gemini AI + pattern matching to detect vulnerabilities.
@@ -10732,11 +10730,16 @@ async def run_ai_security_scan(request: dict = Body(...)):
         - code: (optional) Code to analyze directly
         - language: Programming language (default: javascript)
         - scan_type: "quick", "standard", "deep", or "owasp" (default: standard)
-        - project_name: (optional) Project name to scan from S3/storage
+        - project_name: (optional) One of the caller's projects to scan (requires auth)
         - timeout: (optional) Request timeout in seconds (default: 60)
     """
+    # Findings quote the matched code (including any hardcoded keys), so a
+    # project scan only ever reads the authenticated caller's own files
+    if request.get("project_name") and not request.get("code") and not request.get("target_url") and not current_user:
+        raise HTTPException(status_code=401, detail="Authentication required to scan a project")
+    
     try:
-        from ai_security_scanner import AISecurityScanner, ScanType
+        from ai_security_scanner import AISecurityScanner, ScanType, SCANNABLE_EXTENSIONS
         
         target_url = request.get("target_url")
         code = request.get("code")
@@ -10770,38 +10773,34 @@ async def run_ai_security_scan(request: dict = Body(...)):
             # Scan project from storage
             project_slug = project_name.lower().replace(" ", "-")
             
-            # Try to get code from S3 or local storage
-            all_code = ""
-            try:
-                # Check S3 first
-                from s3_storage import S3ProjectStorage
-                s3_storage = S3ProjectStorage()
-                project_data = await asyncio.to_thread(s3_storage.get_project, project_slug)
-                
-                if project_data and "files" in project_data:
-                    for file_path, content in project_data["files"].items():
-                        if file_path.endswith(('.js', '.jsx', '.ts', '.tsx', '.py', '.html')):
-                            all_code += f"\n// === {file_path} ===\n{content}\n"
-            except Exception as e:
-                print(f"⚠️ Could not fetch from S3: {e}")
-                
-                # Try local storage
-                import os
-                project_dir = os.path.join("generated_apps", project_slug)
-                if os.path.exists(project_dir):
-                    for root, dirs, files in os.walk(project_dir):
-                        for file in files:
-                            if file.endswith(('.js', '.jsx', '.ts', '.tsx', '.py', '.html')):
-                                file_path = os.path.join(root, file)
-                                try:
-                                    with open(file_path, 'r', encoding='utf-8') as f:
-                                        all_code += f"\n// === {file} ===\n{f.read()}\n"
-                                except:
-                                    pass
+            # Collect the caller's project files from S3. The local generated_projects
+            # folder is shared by every user, so it is only used when S3 is not configured.
+            from s3_storage import get_project_from_s3, S3_BUCKET_NAME
+            project_files = {}
+            if S3_BUCKET_NAME:
+                try:
+                    project_data = await asyncio.to_thread(get_project_from_s3, project_slug, str(current_user['_id']))
+                    for f in (project_data or {}).get("files", []):
+                        if f.get("path") and isinstance(f.get("content"), str):
+                            project_files[f["path"]] = f["content"]
+                except Exception as e:
+                    print(f"⚠️ Could not fetch from S3: {e}")
+            else:
+                project_dir = Path("generated_projects") / project_slug
+                if project_dir.resolve().is_relative_to(Path("generated_projects").resolve()) and project_dir.exists():
+                    for file in project_dir.rglob("*"):
+                        if file.suffix.lower() not in SCANNABLE_EXTENSIONS:
+                            continue
+                        if file.is_file() and not any(skip in file.parts for skip in ("node_modules", ".git", "__pycache__", "venv", ".venv")):
+                            try:
+                                project_files[file.relative_to(project_dir).as_posix()] = file.read_text(encoding="utf-8")
+                            except Exception:
+                                pass
             
-            if all_code:
-                print(f"🔍 AI Security Scan: Analyzing project {project_name} ({len(all_code)} chars)")
-                result = await scanner.scan_code(all_code, "javascript", scan_type)
+            if project_files:
+                # Per-file scan: unchanged files are served from the scan cache
+                print(f"🔍 AI Security Scan: Analyzing project {project_name} ({len(project_files)} files)")
+                result = await scanner.scan_project(project_files, scan_type, project_slug)
             else:
                 return {
                     "success": False,
@@ -10828,6 +10827,7 @@ async def run_ai_security_scan(request: dict = Body(...)):
             },
             "alerts": result.alerts[:100],  # Return more results than ZAP endpoint
             "owasp_mapping": result.owasp_mapping,
+            "files": result.files,
             "error": result.error,
             "report": scanner.generate_report(result) if result.success else None,
             "scanner": "AI-Powered (No ZAP Required)"
@@ -11346,7 +11346,7 @@ async def auto_fix_project_errors(
                 user_ids_to_try.append(current_user.get('email'))
         
         # Also try cached user_id and anonymous
-        from s3_storage import get_cached_user_id_for_project, s3_client, S3_BUCKET_NAME
+        from s3_storage import get_cached_user_id_for_project, upload_project_to_s3
         cached_user = get_cached_user_id_for_project(project_slug)
         if cached_user:
             user_ids_to_try.insert(0, cached_user)  # Try cached first
@@ -11384,6 +11384,8 @@ async def auto_fix_project_errors(
             print(f"🔧 Auto-fixing project in S3: {project_slug}")
             fixes_applied = []
             
+            fixed_files = []
+            
             from code_validator import auto_fix_jsx_for_sandbox
             
             for file_info in project_data['files']:
@@ -11399,18 +11401,19 @@ async def auto_fix_project_errors(
                 fixed_content = auto_fix_jsx_for_sandbox(content, file_path.split('/')[-1])
                 
                 if fixed_content != original_content:
-                    # Update file directly in S3 using the working_user_id
-                    s3_key = f"projects/{working_user_id}/{project_slug}/{file_path}"
-                    s3_client.put_object(
-                        Bucket=S3_BUCKET_NAME,
-                        Key=s3_key,
-                        Body=fixed_content.encode('utf-8'),
-                        ContentType='text/javascript'
-                    )
+                    fixed_files.append({'path': file_path, 'content': fixed_content})
                     fixes_applied.append(f"Fixed {file_path}")
                     print(f"  ✅ Fixed {file_path}")
             
-            if fixes_applied:
+            if fixed_files:
+                # Save through upload_project_to_s3 so the fixes are recorded in version history
+                await asyncio.to_thread(
+                    upload_project_to_s3,
+                    project_slug,
+                    fixed_files,
+                    working_user_id,
+                    f"Auto-fixed {len(fixed_files)} file(s)"
+                )
                 print(f"✅ Applied {len(fixes_applied)} fixes to S3")
             
             return {
@@ -11845,8 +11848,8 @@ Storage: {storage_location}
             "error": f"Failed to process error fix: {str(e)}"
         }
 
-# --- Stop Project Endpoint ---
-@app.post("/api/stop-project")
+# --- Error Checking Endpoint ---
+@app.get("/api/check-project-errors")
 async def check_project_errors(project_name: str = Query(...)):
     """Check for errors in the project"""
     try:
@@ -12120,23 +12123,25 @@ async def execute_command(request: dict = Body(...)):
                 except ValueError:
                     return {"success": False, "error": "Cannot navigate outside project directory"}
             
-            # Execute other commands
-            process = await asyncio.create_subprocess_shell(
-                command,
-                cwd=cwd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
+            # Execute other commands (output streams to the project terminal as it arrives)
+            from process_supervisor import process_supervisor
+            
+            async def emit(message: dict):
+                await manager.send_to_project(project_name, message)
             
-            stdout, stderr = await process.communicate()
+            result = await process_supervisor.run(project_slug, "command", command, cwd, emit=emit, shell=True)
             
-            output = stdout.decode('utf-8')
-            if stderr:
-                output += f"\nError: {stderr.decode('utf-8')}"
+            output = result.output
+            if result.timed_out:
+                output += "\nError: command timed out"
+            elif result.cancelled:
+                output += "\nError: command was stopped"
             
             return {
                 "success": True,
                 "output": output,
+                "exit_code": result.returncode,
+                "truncated": result.truncated,
                 "working_directory": working_directory
             }
             
@@ -12545,18 +12550,17 @@ async def stop_project(request: dict = Body(...)):
             "level": "info"
         })
         
-        # In a real implementation, you would track running processes
-        # and terminate them here. For this demo, we'll just simulate.
-        
-        await asyncio.sleep(1)  # Simulate stopping time
+        # Terminate installs, commands and servers still running for this project
+        from process_supervisor import process_supervisor
+        stopped = await process_supervisor.stop_project(project_name.lower().replace(" ", "-"))
         
         await manager.send_to_project(project_name, {
             "type": "terminal_output",
-            "message": "✅ Project servers stopped",
+            "message": f"✅ Project servers stopped ({stopped} process{'es' if stopped != 1 else ''})",
             "level": "success"
         })
         
-        return {"success": True}
+        return {"success": True, "stopped": stopped}
         
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -17354,6 +17358,7 @@ async def github_callback(code: str = None, state: str = None):
                     }}
                 )
                 user_doc = users_collection.find_one({"email": email})
+                user_cache.invalidate(existing_user["_id"])
             else:
                 # Create new user
                 new_user = {
@@ -17602,6 +17607,7 @@ async def google_callback(request: Request):
                     }}
                 )
                 user_doc = users_collection.find_one({"email": email})
+                user_cache.invalidate(existing_user["_id"])
             else:
                 # Create new user
                 new_user = {
@@ -18724,6 +18730,16 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/api/auth/cache-stats")
+async def get_user_cache_stats(current_user: dict = Depends(get_current_user)):
+    """Counters for the authenticated-user cache and the password hashing pool"""
+    return {
+        "success": True,
+        "user_cache": user_cache.stats(),
+        "password_hasher": password_hasher.stats()
+    }
+
+
 from fastapi.staticfiles import StaticFiles
 
 # Add this after your other app configurations but before the endpoints
@@ -20096,6 +20112,111 @@ async def delete_project(project_slug: str, current_user: Optional[dict] = Depen
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete project: {str(e)}")
 
+# --- Project version history ---
+async def _apply_restored_version(project_slug: str, owner: str, result: dict):
+    """Bring local copies in line with a rollback/undo that only touched S3"""
+    from project_versions import version_store
+    invalidate_project_preview(project_slug)
+    try:
+        # The dev server and the code index read generated_projects/<slug>, not S3
+        changes = await asyncio.to_thread(
+            version_store.sync_local_tree, project_slug, owner, result, str(Path("generated_projects") / project_slug)
+        )
+        index = code_index.get(project_slug)
+        for path, content in changes.items():
+            if content is None:
+                index.remove_file(path)
+            else:
+                index.update_file(path, content)
+    except Exception as e:
+        print(f"⚠️ Could not sync restored version of {project_slug} locally: {e}")
+        code_index.invalidate(project_slug)
+
+
+@app.get("/api/projects/{project_slug}/versions")
+async def list_project_versions(
+    project_slug: str,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(get_current_user)
+):
+    """List saved versions of a project, newest first"""
+    try:
+        from project_versions import version_store
+        owner = current_user['_id']
+        versions = await asyncio.to_thread(version_store.list_versions, project_slug, owner, limit)
+        return {"success": True, "versions": versions, "count": len(versions)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to list versions: {str(e)}")
+
+
+@app.get("/api/projects/{project_slug}/versions/diff")
+async def diff_project_versions(
+    project_slug: str,
+    from_version: int = Query(...),
+    to_version: int = Query(...),
+    include_patch: bool = Query(False),
+    current_user: dict = Depends(get_current_user)
+):
+    """Files added/removed/modified between two versions (optionally with unified diffs)"""
+    try:
+        from project_versions import version_store
+        owner = current_user['_id']
+        diff = await asyncio.to_thread(version_store.diff, project_slug, owner, from_version, to_version, include_patch)
+        return {"success": True, **diff}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e).strip("'"))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to diff versions: {str(e)}")
+
+
+@app.post("/api/projects/{project_slug}/versions/{version}/rollback")
+async def rollback_project_version(
+    project_slug: str,
+    version: int,
+    current_user: dict = Depends(get_current_user)
+):
+    """Restore a project to an earlier version (recorded as a new version)"""
+    try:
+        from project_versions import version_store
+        owner = current_user['_id']
+        result = await asyncio.to_thread(version_store.rollback, project_slug, owner, version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e).strip("'"))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to roll back: {str(e)}")
+
+    await _apply_restored_version(project_slug, owner, result)
+    await manager.send_to_project(project_slug, {
+        "type": "file_changed",
+        "file_path": None,
+        "message": f"⏪ Restored version {version}"
+    })
+    return {"success": True, **result}
+
+
+@app.post("/api/projects/{project_slug}/undo")
+async def undo_project_change(
+    project_slug: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Undo the most recent save (e.g. the last AI change)"""
+    try:
+        from project_versions import version_store
+        owner = current_user['_id']
+        result = await asyncio.to_thread(version_store.undo, project_slug, owner)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e).strip("'"))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to undo: {str(e)}")
+
+    await _apply_restored_version(project_slug, owner, result)
+    await manager.send_to_project(project_slug, {
+        "type": "file_changed",
+        "file_path": None,
+        "message": f"↩️ Undid last change (restored version {result['restored_from']})"
+    })
+    return {"success": True, **result}
+
 # Health check endpoints for ALB
 
 
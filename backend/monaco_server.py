@@ -27,6 +27,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from starlette.websockets import WebSocketState
 from pydantic import BaseModel
 
+from patch_engine import EditHunk, apply_hunks
+from process_supervisor import process_supervisor
+
 # Import speech functionality
 try:
     from speechLogic import transcribe_audio_data, process_speech_request, text_to_speech
@@ -813,15 +816,13 @@ async def install_dependencies(request: dict = Body(...)):
             })
             
             try:
-                process = await asyncio.create_subprocess_shell(
-                    "npm install",
-                    cwd=frontend_path,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
+                result = await process_supervisor.run(
+                    project_slug, "install", "npm install", frontend_path,
+                    emit=lambda message: manager.send_to_project(project_name, message),
+                    shell=True
                 )
-                stdout, stderr = await process.communicate()
                 
-                if process.returncode == 0:
+                if result.success:
                     await manager.send_to_project(project_name, {
                         "type": "terminal_output",
                         "message": "✅ Frontend dependencies installed",
@@ -830,7 +831,7 @@ async def install_dependencies(request: dict = Body(...)):
                 else:
                     await manager.send_to_project(project_name, {
                         "type": "terminal_output",
-                        "message": f"⚠️ Frontend install issues: {stderr.decode()}",
+                        "message": f"⚠️ Frontend install issues (exit code {result.returncode})",
                         "level": "warning"
                     })
             except Exception as e:
@@ -865,6 +866,9 @@ async def run_project(request: dict = Body(...)):
         
         preview_urls = []
         
+        async def emit(message: dict):
+            await manager.send_to_project(project_name, message)
+        
         # Start backend if it exists
         if backend_path.exists() and (backend_path / "main.py").exists():
             await manager.send_to_project(project_name, {
@@ -883,20 +887,15 @@ async def run_project(request: dict = Body(...)):
                         "level": "info"
                     })
                     
-                    pip_process = await asyncio.create_subprocess_shell(
-                        "pip install -r requirements.txt",
-                        cwd=backend_path,
-                        stdout=asyncio.subprocess.PIPE,
-                        stderr=asyncio.subprocess.PIPE
+                    await process_supervisor.run(
+                        project_slug, "install", "pip install -r requirements.txt", backend_path,
+                        emit=emit, shell=True
                     )
-                    await pip_process.wait()
                 
-                # Start FastAPI server with uvicorn
-                backend_process = await asyncio.create_subprocess_shell(
-                    "uvicorn main:app --reload --host 0.0.0.0 --port 8000",
-                    cwd=backend_path,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
+                # Start FastAPI server with uvicorn (reused if this project's server is already up)
+                await process_supervisor.spawn(
+                    project_slug, "backend", "uvicorn main:app --reload --host 0.0.0.0 --port 8000", backend_path,
+                    emit=emit, shell=True
                 )
                 
                 # Give backend time to start
@@ -1001,17 +1000,12 @@ export default App;'''
             
             # Install dependencies first
             try:
-                install_process = await asyncio.create_subprocess_shell(
-                    "npm install",
-                    cwd=frontend_path,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
+                install_result = await process_supervisor.run(
+                    project_slug, "install", "npm install", frontend_path,
+                    emit=emit, shell=True
                 )
                 
-                # Wait for installation to complete
-                await install_process.wait()
-                
-                if install_process.returncode == 0:
+                if install_result.success:
                     await manager.send_to_project(project_name, {
                         "type": "terminal_output",
                         "message": "✅ Dependencies installed successfully",
@@ -1109,11 +1103,9 @@ export default App;'''
                     "level": "info"
                 })
                 
-                process = await asyncio.create_subprocess_shell(
-                    start_command,
-                    cwd=frontend_path,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
+                frontend_server = await process_supervisor.spawn(
+                    project_slug, "frontend", start_command, frontend_path,
+                    emit=emit, shell=True
                 )
                 
                 # Give it more time to start and check if server is actually responding
@@ -1130,10 +1122,10 @@ export default App;'''
                                 server_available = True
                 except Exception:
                     # Server might still be starting, check if process is running
-                    if process.returncode is None:
+                    if frontend_server.running:
                         server_available = True  # Process is running, assume it will start soon
                 
-                if server_available and process.returncode is None:  # Still running and responding
+                if server_available and frontend_server.running:  # Still running and responding
                     preview_urls.append("https://xverta.com")
                     await manager.send_to_project(project_name, {
                         "type": "terminal_output",
@@ -1183,18 +1175,16 @@ async def stop_project(request: dict = Body(...)):
             "level": "info"
         })
         
-        # In a real implementation, you would track running processes
-        # and terminate them here. For this demo, we'll just simulate.
-        
-        await asyncio.sleep(1)  # Simulate stopping time
+        # Terminate installs, commands and dev servers still running for this project
+        stopped = await process_supervisor.stop_project(project_name.lower().replace(" ", "-"))
         
         await manager.send_to_project(project_name, {
             "type": "terminal_output",
-            "message": "✅ Project servers stopped",
+            "message": f"✅ Project servers stopped ({stopped} process{'es' if stopped != 1 else ''})",
             "level": "success"
         })
         
-        return {"success": True}
+        return {"success": True, "stopped": stopped}
         
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -1339,23 +1329,24 @@ async def execute_command(request: dict = Body(...)):
                 except ValueError:
                     return {"success": False, "error": "Cannot navigate outside project directory"}
             
-            # Execute other commands
-            process = await asyncio.create_subprocess_shell(
-                command,
-                cwd=cwd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+            # Execute other commands (output streams to the project terminal as it arrives)
+            result = await process_supervisor.run(
+                project_slug, "command", command, cwd,
+                emit=lambda message: manager.send_to_project(project_name, message),
+                shell=True
             )
             
-            stdout, stderr = await process.communicate()
-            
-            output = stdout.decode('utf-8')
-            if stderr:
-                output += f"\nError: {stderr.decode('utf-8')}"
+            output = result.output
+            if result.timed_out:
+                output += "\nError: command timed out"
+            elif result.cancelled:
+                output += "\nError: command was stopped"
             
             return {
                 "success": True,
                 "output": output,
+                "exit_code": result.returncode,
+                "truncated": result.truncated,
                 "working_directory": working_directory
             }
             
@@ -1640,30 +1631,28 @@ async def smart_edit_file(request: dict = Body(...)):
             content = f.read()
         
         original_content = content
-        changes_applied = []
         
-        # Apply each change
+        # Apply all changes in one pass (exact, whitespace-tolerant or fuzzy matching)
+        hunks = []
+        hunk_indexes = []
         for idx, change in enumerate(changes):
             search_pattern = change.get("search", "")
-            replace_with = change.get("replace", "")
-            
             if not search_pattern:
                 continue
-            
-            # Check if pattern exists
-            if search_pattern in content:
-                content = content.replace(search_pattern, replace_with, 1)  # Replace only first occurrence
-                changes_applied.append({
-                    "index": idx,
-                    "search": search_pattern[:100] + "..." if len(search_pattern) > 100 else search_pattern,
-                    "status": "applied"
-                })
-            else:
-                changes_applied.append({
-                    "index": idx,
-                    "search": search_pattern[:100] + "..." if len(search_pattern) > 100 else search_pattern,
-                    "status": "pattern_not_found"
-                })
+            hunks.append(EditHunk(search_pattern, change.get("replace", "")))
+            hunk_indexes.append(idx)
+        
+        content, hunk_results = apply_hunks(content, hunks)
+        changes_applied = []
+        for idx, hunk, hunk_result in zip(hunk_indexes, hunks, hunk_results):
+            search_pattern = hunk.search
+            changes_applied.append({
+                "index": idx,
+                "search": search_pattern[:100] + "..." if len(search_pattern) > 100 else search_pattern,
+                "status": "applied" if hunk_result.applied else "pattern_not_found",
+                "strategy": hunk_result.strategy,
+                "confidence": round(hunk_result.confidence, 3)
+            })
         
         # Only write if changes were actually applied
         if content != original_content:
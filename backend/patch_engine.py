@@ -0,0 +1,378 @@
+"""
+Targeted Edit Patch Engine
+==========================
+Applies AI "targeted_edit" search/replace hunks without requiring the model to
+reproduce the file byte for byte.
+
+Each hunk is located with progressively looser strategies, and the first one
+that succeeds wins:
+
+1. exact         - the search text occurs verbatim (confidence 1.0)
+2. whitespace    - same tokens, any whitespace/indentation between them (0.98)
+3. quotes        - as above, also tolerating ' vs " vs ` drift (0.95)
+4. fuzzy         - whole-line match anchored on the search's most distinctive
+                   line, scored by a bounded Levenshtein distance over
+                   whitespace-normalized text (confidence = 1 - distance / length)
+
+A fuzzy match may only differ from the search in whitespace, quotes and
+structural punctuation (;,()[]{}): identifiers, literals and operators must be
+identical, so `inc` never matches `dec` and `+ 1` never matches `- 1`. Fuzzy
+matches below PATCH_MIN_CONFIDENCE, or ones where two candidate regions score
+about the same, are rejected instead of guessed. Replacement text is
+re-indented to the indentation actually found in the file, with the
+replacement's outermost level lined up with the search's.
+
+All hunks for a file are located against the original content and spliced in
+one pass. Hunks that overlap an earlier one, or that only match text introduced
+by another hunk, get a second sequential pass over the patched content.
+
+Usage:
+    from patch_engine import EditHunk, apply_hunks
+
+    new_content, results = apply_hunks(content, [EditHunk(search, replace)])
+    for result in results:
+        print(result.applied, result.strategy, result.confidence)
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+PATCH_MIN_CONFIDENCE = float(os.getenv("PATCH_MIN_CONFIDENCE", "0.85"))
+PATCH_FUZZY_MAX_CANDIDATES = 5
+# Candidates this close to the best one make a fuzzy match ambiguous
+PATCH_AMBIGUITY_MARGIN = 0.02
+# Lines of slack allowed when aligning the end of a fuzzy window
+PATCH_FUZZY_LINE_SLACK = 2
+
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+# What a fuzzy match must reproduce exactly: identifiers/literals and operators
+_SIGNIFICANT = re.compile(r"\w+|[-+*/%<>=!&|^~?:.@]+")
+
+
+@dataclass
+class EditHunk:
+    search: str
+    replace: str
+    label: str = ""
+
+
+@dataclass
+class HunkResult:
+    index: int
+    applied: bool
+    strategy: Optional[str] = None  # exact, whitespace, quotes, fuzzy
+    confidence: float = 0.0
+    start_line: Optional[int] = None  # 1-based line of the match in the content it was applied to
+    message: str = ""
+
+    def to_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "applied": self.applied,
+            "strategy": self.strategy,
+            "confidence": round(self.confidence, 3),
+            "start_line": self.start_line,
+            "message": self.message,
+        }
+
+
+@dataclass
+class _Match:
+    start: int
+    end: int
+    replacement: str
+    strategy: str
+    confidence: float
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _indent_of(line: str) -> str:
+    return line[:len(line) - len(line.lstrip())]
+
+
+def _base_indent(lines: List[str]) -> str:
+    return min((_indent_of(line) for line in lines if line.strip()), key=len, default="")
+
+
+def _reindent(text: str, search: str, matched: str) -> str:
+    """Give replacement lines the indentation the file actually uses around the match
+
+    Lines carried over unchanged from the search keep the indentation of the line
+    they matched; new lines are shifted the way the search lines were. A
+    replacement whose outermost level sits left of the search's (e.g. search
+    "  <p>Hi</p>", replace "<p>Yo</p>") is first moved right to line up with it.
+    """
+    search_lines = [line for line in search.strip("\n").split("\n") if line.strip()]
+    matched_lines = [line for line in matched.split("\n") if line.strip()]
+    if not search_lines or not matched_lines:
+        return text
+    # A search whose first line lost its indentation (copied from mid-line) says
+    # nothing about levels there; line up the remaining lines instead
+    first_trimmed = len(search_lines) > 1 and not _indent_of(search_lines[0]) and bool(_indent_of(matched_lines[0]))
+    text = _align_base(text, _base_indent(search_lines[1:] if first_trimmed else search_lines), first_trimmed)
+    same_shape = len(search_lines) == len(matched_lines)
+    if not same_shape:
+        # Line structure changed; only the first line's shift is trustworthy
+        search_lines, matched_lines = search_lines[:1], matched_lines[:1]
+
+    carried = {}
+    pairs = {}
+    for search_line, matched_line in zip(search_lines, matched_lines):
+        carried.setdefault(_normalize(search_line), _indent_of(matched_line))
+        pairs.setdefault(_indent_of(search_line), _indent_of(matched_line))
+    pairs = sorted(pairs.items(), key=lambda pair: -len(pair[0]))
+
+    lines = text.split("\n")
+    for index, line in enumerate(lines):
+        if not line.strip():
+            continue
+        key = _normalize(line)
+        if same_shape and key in carried:
+            lines[index] = carried[key] + line.lstrip()
+            continue
+        for source, target in pairs:
+            if line.startswith(source):
+                lines[index] = target + line[len(source):]
+                break
+    return "\n".join(lines)
+
+
+def _align_base(text: str, base: str, skip_first: bool = False) -> str:
+    """Shift text right so its shallowest non-blank line is indented by at least base"""
+    lines = text.split("\n")
+    first = next((index for index, line in enumerate(lines) if line.strip()), len(lines))
+    shifted = range(first + 1, len(lines)) if skip_first else range(len(lines))
+    current = _base_indent([lines[index] for index in shifted])
+    if len(current) >= len(base):
+        return text
+    extra = base[len(current):] if base.startswith(current) else base
+    for index in shifted:
+        if lines[index].strip():
+            lines[index] = extra + lines[index]
+    return "\n".join(lines)
+
+
+def _significant_tokens(text: str) -> List[str]:
+    return _SIGNIFICANT.findall(text)
+
+
+def _line_start(content: str, offset: int) -> int:
+    return content.rfind("\n", 0, offset) + 1
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> Optional[int]:
+    """Edit distance between a and b, or None once it must exceed max_distance (banded DP)"""
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    if len(a) > len(b):
+        a, b = b, a
+    if not a:
+        return len(b) if len(b) <= max_distance else None
+
+    big = max_distance + 1
+    previous = [j if j <= max_distance else big for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        low = max(1, i - max_distance)
+        high = min(len(b), i + max_distance)
+        current = [big] * (len(b) + 1)
+        current[0] = i if i <= max_distance else big
+        row_min = current[0]
+        char = a[i - 1]
+        for j in range(low, high + 1):
+            cost = 0 if char == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current[j] = value if value < big else big
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return None
+        previous = current
+    return previous[len(b)] if previous[len(b)] <= max_distance else None
+
+
+def _token_pattern(search: str, tolerate_quotes: bool) -> Optional[re.Pattern]:
+    tokens = search.split()
+    if not tokens:
+        return None
+    escaped = []
+    for token in tokens:
+        token = re.escape(token)
+        if tolerate_quotes:
+            token = re.sub(r"(?:\\)?[\"'`]", "[\"'`]", token)
+        escaped.append(token)
+    return re.compile(r"\s+".join(escaped))
+
+
+def _locate_exact(content: str, hunk: EditHunk, position: int) -> _Match:
+    end = position + len(hunk.search)
+    line_start = _line_start(content, position)
+    prefix = content[line_start:position]
+    if prefix.strip():
+        # Search starts mid-line: splice the replacement verbatim
+        return _Match(position, end, hunk.replace, "exact", 1.0)
+
+    # Search starts in (or at) the indentation: splice from the start of the line so
+    # a replacement dedented left of the search can be lined up with it. Only the
+    # first line was cut short; later lines already carry the file's indentation.
+    search = prefix + hunk.search
+    first_trimmed = bool(prefix) and "\n" in hunk.search.strip("\n")
+    search_lines = search.split("\n")
+    base = _base_indent(search_lines[1:] if first_trimmed else search_lines)
+    return _Match(line_start, end, _align_base(prefix + hunk.replace, base, first_trimmed), "exact", 1.0)
+
+
+def _locate_tokens(content: str, hunk: EditHunk, tolerate_quotes: bool) -> Optional[_Match]:
+    pattern = _token_pattern(hunk.search, tolerate_quotes)
+    if pattern is None:
+        return None
+    match = pattern.search(content)
+    if match is None:
+        return None
+
+    # The match starts at the first token, after the file's own indentation
+    matched = content[_line_start(content, match.start()):match.end()]
+    replacement = _reindent(hunk.replace.strip("\n"), hunk.search, matched).strip()
+    return _Match(
+        match.start(),
+        match.end(),
+        replacement,
+        "quotes" if tolerate_quotes else "whitespace",
+        0.95 if tolerate_quotes else 0.98,
+    )
+
+
+def _locate_fuzzy(content: str, hunk: EditHunk, min_confidence: float) -> Optional[_Match]:
+    lines = content.split("\n")
+    search_lines = [line for line in hunk.search.strip("\n").split("\n")]
+    search_keys = [_normalize(line) for line in search_lines]
+    # Drop blank edges so alignment keys off real code
+    while search_keys and not search_keys[0]:
+        search_keys.pop(0)
+        search_lines.pop(0)
+    while search_keys and not search_keys[-1]:
+        search_keys.pop()
+        search_lines.pop()
+    if not search_keys:
+        return None
+
+    target = " ".join(key for key in search_keys if key)
+    target_tokens = _significant_tokens(target)
+    line_keys = [_normalize(line) for line in lines]
+
+    # Anchor on the most distinctive (longest) search line
+    anchor_offset = max(range(len(search_keys)), key=lambda i: len(search_keys[i]))
+    anchor = search_keys[anchor_offset]
+    anchor_budget = max(1, int(len(anchor) * (1 - min_confidence)))
+    anchor_words = set(_WORD.findall(anchor))
+    candidates = []
+    for index, key in enumerate(line_keys):
+        if not key:
+            continue
+        # Cheap prefilter before the DP: most of the anchor's words must be on the line
+        if anchor_words and len(anchor_words & set(_WORD.findall(key))) < len(anchor_words) / 2:
+            continue
+        distance = bounded_levenshtein(anchor, key, anchor_budget)
+        if distance is not None:
+            candidates.append((distance, index))
+    candidates.sort()
+    candidates = candidates[:PATCH_FUZZY_MAX_CANDIDATES]
+
+    max_distance = max(1, int(len(target) * (1 - min_confidence)))
+    scored = {}
+    for _, anchor_line in candidates:
+        start = anchor_line - anchor_offset
+        if start < 0:
+            continue
+        expected_end = start + len(search_keys) - 1
+        for end in range(max(start, expected_end - PATCH_FUZZY_LINE_SLACK), min(len(lines) - 1, expected_end + PATCH_FUZZY_LINE_SLACK) + 1):
+            if (start, end) in scored:
+                continue
+            window = " ".join(key for key in line_keys[start:end + 1] if key)
+            # Single-line hunks are whole-line replacements only when they cover most of the line
+            if len(search_keys) == 1 and len(target) < len(window) * 0.8:
+                continue
+            # Never cross an identifier, literal or operator difference
+            if _significant_tokens(window) != target_tokens:
+                continue
+            distance = bounded_levenshtein(target, window, max_distance)
+            if distance is not None:
+                scored[(start, end)] = 1 - distance / max(len(target), 1)
+
+    if not scored:
+        return None
+    ranked = sorted(scored.items(), key=lambda item: (-item[1], item[0][1] - item[0][0]))
+    (start, end), confidence = ranked[0]
+    if confidence < min_confidence:
+        return None
+    for (other_start, other_end), other_confidence in ranked[1:]:
+        overlaps = other_start <= end and start <= other_end
+        if not overlaps and confidence - other_confidence <= PATCH_AMBIGUITY_MARGIN:
+            return None
+
+    start_offset = sum(len(line) + 1 for line in lines[:start])
+    end_offset = start_offset + sum(len(line) + 1 for line in lines[start:end + 1]) - 1
+    replacement = hunk.replace.strip("\n").rstrip()
+    replacement = _reindent(replacement, "\n".join(search_lines), "\n".join(lines[start:end + 1]))
+    return _Match(start_offset, end_offset, replacement, "fuzzy", confidence)
+
+
+def locate_hunk(content: str, hunk: EditHunk, min_confidence: float = PATCH_MIN_CONFIDENCE) -> Optional[_Match]:
+    if not hunk.search or not hunk.search.strip():
+        return None
+    position = content.find(hunk.search)
+    if position != -1:
+        return _locate_exact(content, hunk, position)
+    return (
+        _locate_tokens(content, hunk, tolerate_quotes=False)
+        or _locate_tokens(content, hunk, tolerate_quotes=True)
+        or _locate_fuzzy(content, hunk, min_confidence)
+    )
+
+
+def _splice(content: str, matches: List[Tuple[int, _Match]]) -> str:
+    parts = []
+    cursor = 0
+    for _, match in sorted(matches, key=lambda item: item[1].start):
+        parts.append(content[cursor:match.start])
+        parts.append(match.replacement)
+        cursor = match.end
+    parts.append(content[cursor:])
+    return "".join(parts)
+
+
+def _line_number(content: str, offset: int) -> int:
+    return content.count("\n", 0, offset) + 1
+
+
+def apply_hunks(content: str, hunks: List[EditHunk], min_confidence: float = PATCH_MIN_CONFIDENCE) -> Tuple[str, List[HunkResult]]:
+    """Apply search/replace hunks to content; returns (new content, one result per hunk)"""
+    results: List[Optional[HunkResult]] = [None] * len(hunks)
+    accepted: List[Tuple[int, _Match]] = []
+    deferred: List[int] = []
+
+    # Pass 1: locate everything against the original and splice once
+    for index, hunk in enumerate(hunks):
+        match = locate_hunk(content, hunk, min_confidence)
+        if match is None or any(match.start < other.end and other.start < match.end for _, other in accepted):
+            deferred.append(index)
+            continue
+        accepted.append((index, match))
+        results[index] = HunkResult(index, True, match.strategy, match.confidence, _line_number(content, match.start))
+    patched = _splice(content, accepted)
+
+    # Pass 2: overlapping hunks, or hunks that target text another hunk introduced
+    for index in deferred:
+        match = locate_hunk(patched, hunks[index], min_confidence)
+        if match is None:
+            results[index] = HunkResult(index, False, message="Search text not found")
+            continue
+        results[index] = HunkResult(index, True, match.strategy, match.confidence, _line_number(patched, match.start))
+        patched = _splice(patched, [(index, match)])
+
+    return patched, results
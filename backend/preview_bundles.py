@@ -0,0 +1,218 @@
+"""
+Preview Bundle Cache
+====================
+Prebuilt sandbox preview pages for /api/sandbox-preview.
+
+Building a preview means loading every file from S3 and precompiling the JSX,
+yet project content rarely changes between loads. Bundles are therefore built
+once per content hash (frontend files + project name + backend URL + builder
+version) and kept in two tiers:
+
+- bundles:  content hash -> built HTML, in memory (LRU) and on disk under
+            PREVIEW_BUNDLE_DIR/<project_slug>/<hash>.html so restarts don't rebuild
+- pointers: (project, user, backend URL) -> the project's current bundle, so a
+            repeat preview load is a single dict lookup with no S3 traffic
+
+Pointers are dropped by invalidate() whenever upload_project_to_s3() saves
+changed files (every editor, AI and auto-fix path writes through it), and
+expire after PREVIEW_BUNDLE_POINTER_TTL_SECONDS as a safety net for writes that
+bypass it. The content hash doubles as a strong ETag.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+PREVIEW_BUNDLE_DIR = Path(os.getenv(
+    "PREVIEW_BUNDLE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "preview_bundles"),
+))
+PREVIEW_BUNDLE_MEMORY_ENTRIES = int(os.getenv("PREVIEW_BUNDLE_MEMORY_ENTRIES", "64"))
+PREVIEW_BUNDLE_POINTER_TTL_SECONDS = int(os.getenv("PREVIEW_BUNDLE_POINTER_TTL_SECONDS", "3600"))
+PREVIEW_BUNDLE_MAX_PER_PROJECT = 3
+
+# Bump when generate_sandbox_html output changes shape, so old bundles are not served
+PREVIEW_BUNDLE_VERSION = "1"
+
+
+@dataclass
+class PreviewBundle:
+    project_slug: str
+    content_hash: str
+    html: bytes
+    built_at: float
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.content_hash}"'
+
+
+@dataclass
+class BundlePointer:
+    content_hash: str
+    created_at: float
+    # Orchestrator session that provided the backend URL, if any
+    session_id: Optional[str] = None
+
+
+def compute_content_hash(files_content: Dict[str, str], project_name: str, backend_url: str) -> str:
+    """Stable hash of everything generate_sandbox_html depends on"""
+    digest = hashlib.sha256()
+    digest.update(f"v{PREVIEW_BUNDLE_VERSION}\0{project_name}\0{backend_url}\0".encode("utf-8"))
+    for path in sorted(files_content):
+        content = files_content[path] or ""
+        digest.update(path.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(content.encode("utf-8") if isinstance(content, str) else content)
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+
+def _slug_dir(project_slug: str) -> Path:
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in project_slug.lower())
+    return PREVIEW_BUNDLE_DIR / safe
+
+
+class PreviewBundleCache:
+    def __init__(self, max_entries: int = PREVIEW_BUNDLE_MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self._bundles: "OrderedDict[str, PreviewBundle]" = OrderedDict()
+        self._pointers: Dict[Tuple[str, str, str], BundlePointer] = {}
+        self._building: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.builds = 0
+
+    @staticmethod
+    def _project_key(project_slug: str) -> str:
+        return project_slug.lower()
+
+    def lookup(self, project_slug: str, user_id: str, backend_url: str) -> Optional[Tuple[PreviewBundle, BundlePointer]]:
+        """Current bundle for this project/user/backend, without touching S3"""
+        key = (self._project_key(project_slug), user_id or "", backend_url or "")
+        pointer = self._pointers.get(key)
+        if pointer is None:
+            return None
+        if time.time() - pointer.created_at > PREVIEW_BUNDLE_POINTER_TTL_SECONDS:
+            self._pointers.pop(key, None)
+            return None
+        bundle = self._get_bundle(project_slug, pointer.content_hash)
+        if bundle is None:
+            self._pointers.pop(key, None)
+            return None
+        self.hits += 1
+        return bundle, pointer
+
+    def forget_pointer(self, project_slug: str, user_id: str, backend_url: str):
+        self._pointers.pop((self._project_key(project_slug), user_id or "", backend_url or ""), None)
+
+    async def get_or_build(
+        self,
+        project_slug: str,
+        user_id: str,
+        requested_backend_url: str,
+        files_content: Dict[str, str],
+        project_name: str,
+        backend_url: str,
+        build: Callable[[], Awaitable[str]],
+        session_id: Optional[str] = None,
+    ) -> PreviewBundle:
+        """Return the bundle for this exact content, building it at most once concurrently"""
+        content_hash = compute_content_hash(files_content, project_name, backend_url)
+        bundle = self._get_bundle(project_slug, content_hash)
+
+        if bundle is None:
+            in_flight = self._building.get(content_hash)
+            if in_flight is not None:
+                bundle = await asyncio.shield(in_flight)
+            else:
+                future = asyncio.get_running_loop().create_future()
+                self._building[content_hash] = future
+                try:
+                    html = await build()
+                    bundle = PreviewBundle(project_slug, content_hash, html.encode("utf-8"), time.time())
+                    self.builds += 1
+                    self._remember(bundle)
+                    await asyncio.to_thread(self._write_to_disk, bundle)
+                    future.set_result(bundle)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as e:
+                    future.set_exception(e)
+                    # Nobody else may be waiting; mark the exception as retrieved
+                    future.exception()
+                    raise
+                finally:
+                    self._building.pop(content_hash, None)
+
+        key = (self._project_key(project_slug), user_id or "", requested_backend_url or "")
+        self._pointers[key] = BundlePointer(content_hash, time.time(), session_id)
+        return bundle
+
+    def invalidate(self, project_slug: str):
+        """Drop the current-bundle pointers for a project after its files change"""
+        project_key = self._project_key(project_slug)
+        for key in [key for key in self._pointers if key[0] == project_key]:
+            del self._pointers[key]
+
+    def _remember(self, bundle: PreviewBundle):
+        self._bundles[bundle.content_hash] = bundle
+        self._bundles.move_to_end(bundle.content_hash)
+        while len(self._bundles) > self.max_entries:
+            self._bundles.popitem(last=False)
+
+    def _get_bundle(self, project_slug: str, content_hash: str) -> Optional[PreviewBundle]:
+        bundle = self._bundles.get(content_hash)
+        if bundle is not None:
+            self._bundles.move_to_end(content_hash)
+            return bundle
+        path = _slug_dir(project_slug) / f"{content_hash}.html"
+        try:
+            html = path.read_bytes()
+        except OSError:
+            return None
+        bundle = PreviewBundle(project_slug, content_hash, html, path.stat().st_mtime)
+        self._remember(bundle)
+        return bundle
+
+    def _write_to_disk(self, bundle: PreviewBundle):
+        directory = _slug_dir(bundle.project_slug)
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            target = directory / f"{bundle.content_hash}.html"
+            tmp = target.with_suffix(".tmp")
+            tmp.write_bytes(bundle.html)
+            os.replace(tmp, target)
+
+            # Keep only the newest few bundles per project on disk
+            old = sorted(directory.glob("*.html"), key=lambda p: p.stat().st_mtime, reverse=True)
+            for stale in old[PREVIEW_BUNDLE_MAX_PER_PROJECT:]:
+                stale.unlink(missing_ok=True)
+        except OSError as e:
+            print(f"⚠️ Could not persist preview bundle for {bundle.project_slug}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "bundles_in_memory": len(self._bundles),
+            "pointers": len(self._pointers),
+            "hits": self.hits,
+            "builds": self.builds,
+        }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 7232 If-None-Match check (strong comparison is fine for our opaque tags)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+# Global cache instance
+preview_bundle_cache = PreviewBundleCache()
@@ -397,6 +397,8 @@ class PreviewOrchestrator:
             host_url: Base URL for generated preview URLs
         """
         self._sessions: Dict[str, OrchestrationProgress] = {}
+        # project name -> session of its latest ready preview (hot update target)
+        self._project_sessions: Dict[str, str] = {}
         self._deployment_service = deployment_service
         self._host_url = host_url
         self._code_generator = BackendCodeGenerator()
@@ -430,6 +432,7 @@ class PreviewOrchestrator:
         try:
             # Execute the orchestration pipeline
             result = await self._execute_pipeline(request, progress)
+            self._project_sessions[request.project_name] = session_id
             return result
             
         except Exception as e:
@@ -448,6 +451,56 @@ class PreviewOrchestrator:
                 mock_mode=True  # Enable mocks as fallback
             )
     
+    async def hot_update_preview(
+        self,
+        project_name: str,
+        backend_files: Dict[str, str]
+    ) -> Optional[PreviewResponse]:
+        """
+        Update the project's running preview in place instead of starting a new one.
+        
+        Only backend files that changed are pushed into the live container, which
+        reloads itself; frontend-only edits leave the container untouched.
+        
+        Returns:
+            PreviewResponse for the existing session, or None when there is no
+            live session to update (caller should fall back to start_preview)
+        """
+        session_id = self._project_sessions.get(project_name)
+        progress = self._sessions.get(session_id) if session_id else None
+        if not progress or progress.stage != OrchestrationStage.READY or not self._deployment_service:
+            return None
+        
+        try:
+            update = await self._deployment_service.hot_update(session_id, backend_files)
+        except Exception as e:
+            logger.warning(f"Hot update failed for {session_id}, falling back to a fresh preview: {e}")
+            await self.cancel_preview(session_id)
+            self._project_sessions.pop(project_name, None)
+            return None
+        
+        if update is None:
+            return None
+        
+        progress.stage_times["hot_update"] = update["seconds"]
+        progress.message = (
+            f"Preview updated in place ({len(update['changed'])} changed, {len(update['removed'])} removed)"
+            if update["changed"] or update["removed"] else "Preview is up to date"
+        )
+        progress.updated_at = datetime.utcnow()
+        logger.info(f"[{session_id}] {progress.message} in {update['seconds']:.2f}s")
+        
+        return PreviewResponse(
+            success=True,
+            session_id=session_id,
+            status="ready",
+            backend_url=progress.backend_url,
+            frontend_preview_url=progress.frontend_preview_url,
+            message=progress.message,
+            mock_mode=False,
+            backend_config=progress.backend_config
+        )
+    
     async def _execute_pipeline(
         self,
         request: PreviewRequest,
@@ -0,0 +1,341 @@
+"""
+Process Supervisor
+==================
+Runs and tracks the subprocesses behind execute-command, dependency installs and
+the local run path, streaming their output to the project WebSocket as it happens.
+
+- Output: stdout/stderr are merged and read line by line. Lines are coalesced into
+  one terminal_output message per PROCESS_OUTPUT_FLUSH_SECONDS (or per
+  PROCESS_OUTPUT_BATCH_LINES lines) so a chatty npm install doesn't send one
+  WebSocket frame per line.
+- Memory: each process keeps only its last PROCESS_OUTPUT_MAX_LINES lines (ring
+  buffer), each clipped to PROCESS_OUTPUT_MAX_LINE_CHARS.
+- Limits: one-shot commands are killed after their timeout. On POSIX every process
+  gets its own process group (so shell children die with it) and optional
+  CPU-time / memory rlimits.
+- Tracking: processes are registered per project. An identical command that is
+  already running for a project is joined instead of started twice, and a named
+  long-running process (e.g. the dev server) is reused while it is alive.
+  stop_project() terminates everything a project owns.
+
+Usage:
+    from process_supervisor import process_supervisor
+
+    async def emit(message):
+        await manager.send_to_project(project_name, message)
+
+    result = await process_supervisor.run("my-app", "command", "npm test", cwd, emit=emit, shell=True)
+    server = await process_supervisor.spawn("my-app", "frontend", "npm run dev", cwd, emit=emit, shell=True)
+    await process_supervisor.stop_project("my-app")
+"""
+
+import asyncio
+import os
+import signal
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+try:
+    import resource
+    RESOURCE_LIMITS_AVAILABLE = True
+except ImportError:
+    # Windows - no rlimits / process groups
+    RESOURCE_LIMITS_AVAILABLE = False
+
+PROCESS_OUTPUT_MAX_LINES = int(os.getenv("PROCESS_OUTPUT_MAX_LINES", "2000"))
+PROCESS_OUTPUT_MAX_LINE_CHARS = 4000
+PROCESS_OUTPUT_FLUSH_SECONDS = float(os.getenv("PROCESS_OUTPUT_FLUSH_SECONDS", "0.1"))
+PROCESS_OUTPUT_BATCH_LINES = 50
+PROCESS_COMMAND_TIMEOUT_SECONDS = int(os.getenv("PROCESS_COMMAND_TIMEOUT_SECONDS", "300"))
+PROCESS_MAX_CPU_SECONDS = int(os.getenv("PROCESS_MAX_CPU_SECONDS", "600"))  # one-shot commands only
+PROCESS_MAX_MEMORY_MB = int(os.getenv("PROCESS_MAX_MEMORY_MB", "0"))  # 0 = unlimited (node reserves lots of address space)
+PROCESS_STOP_GRACE_SECONDS = 5
+
+Emitter = Callable[[dict], Awaitable[None]]
+LineCallback = Callable[[str], Awaitable[None]]
+
+
+@dataclass
+class ProcessResult:
+    returncode: Optional[int]
+    output: str
+    truncated: bool = False
+    timed_out: bool = False
+    cancelled: bool = False
+    seconds: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return self.returncode == 0 and not self.timed_out and not self.cancelled
+
+
+@dataclass
+class ManagedProcess:
+    id: str
+    project: str
+    name: str
+    command: str
+    cwd: str
+    long_running: bool
+    process: Optional[asyncio.subprocess.Process] = None
+    started_at: float = field(default_factory=time.time)
+    output: deque = field(default_factory=lambda: deque(maxlen=PROCESS_OUTPUT_MAX_LINES))
+    lines_seen: int = 0
+    stopped: bool = False
+    done: Optional[asyncio.Future] = None
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "project": self.project,
+            "name": self.name,
+            "command": self.command,
+            "pid": self.process.pid if self.process else None,
+            "running": self.running,
+            "returncode": self.process.returncode if self.process else None,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "lines": self.lines_seen,
+        }
+
+
+def _limit_resources(cpu_seconds: int, memory_mb: int):
+    """Build a preexec_fn applying rlimits in the child (POSIX only)"""
+    def apply():
+        if cpu_seconds:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+        if memory_mb:
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    return apply
+
+
+class ProcessSupervisor:
+    """Per-project registry of supervised subprocesses"""
+
+    def __init__(self):
+        self._processes: Dict[str, ManagedProcess] = {}
+        # Output pumps of long-running processes; referenced so they aren't garbage collected
+        self._watchers: set = set()
+
+    def _find(self, project: str, name: str, command: Optional[str] = None) -> Optional[ManagedProcess]:
+        for managed in self._processes.values():
+            if managed.project == project and managed.name == name and not managed.stopped and managed.running:
+                if command is None or managed.command == command:
+                    return managed
+        return None
+
+    def list_processes(self, project: Optional[str] = None) -> List[dict]:
+        return [m.to_dict() for m in self._processes.values() if project is None or m.project == project]
+
+    async def _start(
+        self,
+        managed: ManagedProcess,
+        args: Union[str, List[str]],
+        shell: bool,
+        env: Optional[dict],
+        cpu_seconds: int,
+    ):
+        kwargs = {
+            "cwd": managed.cwd,
+            "stdout": asyncio.subprocess.PIPE,
+            "stderr": asyncio.subprocess.STDOUT,
+            "env": {**os.environ, **(env or {})},
+        }
+        if RESOURCE_LIMITS_AVAILABLE:
+            kwargs["start_new_session"] = True
+            if cpu_seconds or PROCESS_MAX_MEMORY_MB:
+                kwargs["preexec_fn"] = _limit_resources(cpu_seconds, PROCESS_MAX_MEMORY_MB)
+        if shell:
+            managed.process = await asyncio.create_subprocess_shell(args, **kwargs)
+        else:
+            managed.process = await asyncio.create_subprocess_exec(*args, **kwargs)
+        self._processes[managed.id] = managed
+
+    async def _pump(self, managed: ManagedProcess, emit: Optional[Emitter], on_line: Optional[LineCallback]):
+        """Read output into the ring buffer, forwarding coalesced batches to emit"""
+        pending: List[str] = []
+        last_flush = time.monotonic()
+
+        async def flush():
+            nonlocal last_flush
+            last_flush = time.monotonic()
+            if pending and emit:
+                batch = "\n".join(pending)
+                pending.clear()
+                try:
+                    await emit({
+                        "type": "terminal_output",
+                        "message": batch,
+                        "level": "info",
+                        "process": managed.name,
+                    })
+                except Exception as e:
+                    print(f"⚠️ Could not stream output for {managed.project}/{managed.name}: {e}")
+            pending.clear()
+
+        stream = managed.process.stdout
+        while True:
+            try:
+                # Wake up periodically so a quiet process still flushes its last lines
+                raw = await asyncio.wait_for(stream.readuntil(b"\n"), timeout=PROCESS_OUTPUT_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                await flush()
+                continue
+            except asyncio.IncompleteReadError as e:
+                # EOF without a trailing newline
+                raw = e.partial
+                if not raw:
+                    break
+            except asyncio.LimitOverrunError as e:
+                # Line longer than the stream buffer - take it in pieces
+                raw = await stream.readexactly(e.consumed)
+            if not raw:
+                break
+            # Keep blank lines and indentation so output reads like the terminal's
+            line = raw.decode("utf-8", errors="replace")
+            if line.endswith("\n"):
+                line = line[:-2] if line.endswith("\r\n") else line[:-1]
+            if len(line) > PROCESS_OUTPUT_MAX_LINE_CHARS:
+                line = line[:PROCESS_OUTPUT_MAX_LINE_CHARS] + "…"
+            managed.output.append(line)
+            managed.lines_seen += 1
+            pending.append(line)
+            if on_line:
+                await on_line(line)
+            if len(pending) >= PROCESS_OUTPUT_BATCH_LINES or time.monotonic() - last_flush >= PROCESS_OUTPUT_FLUSH_SECONDS:
+                await flush()
+        await flush()
+
+    async def run(
+        self,
+        project: str,
+        name: str,
+        args: Union[str, List[str]],
+        cwd: Union[str, Path],
+        emit: Optional[Emitter] = None,
+        on_line: Optional[LineCallback] = None,
+        timeout: Optional[float] = PROCESS_COMMAND_TIMEOUT_SECONDS,
+        shell: bool = False,
+        env: Optional[dict] = None,
+    ) -> ProcessResult:
+        """Run a command to completion, streaming output; joins an identical in-flight run"""
+        command = args if isinstance(args, str) else " ".join(args)
+        existing = self._find(project, name, command)
+        if existing is not None and existing.done is not None:
+            print(f"🔁 Joining running '{command}' for {project}")
+            return await asyncio.shield(existing.done)
+
+        managed = ManagedProcess(str(uuid.uuid4()), project, name, command, str(cwd), long_running=False)
+        managed.done = asyncio.get_running_loop().create_future()
+        started = time.time()
+        timed_out = False
+        try:
+            await self._start(managed, args, shell, env, PROCESS_MAX_CPU_SECONDS)
+            try:
+                await asyncio.wait_for(self._pump(managed, emit, on_line), timeout=timeout)
+                await managed.process.wait()
+            except asyncio.TimeoutError:
+                timed_out = True
+                await self._terminate(managed, grace=0)
+                managed.output.append(f"Timed out after {timeout:.0f}s")
+            result = ProcessResult(
+                returncode=managed.process.returncode,
+                output="\n".join(managed.output),
+                truncated=managed.lines_seen > len(managed.output),
+                timed_out=timed_out,
+                cancelled=managed.stopped,
+                seconds=time.time() - started,
+            )
+            managed.done.set_result(result)
+            return result
+        except BaseException as e:
+            if managed.process is not None and managed.running:
+                await self._terminate(managed, grace=0)
+            if not managed.done.done():
+                managed.done.set_exception(e)
+                managed.done.exception()
+            raise
+        finally:
+            self._processes.pop(managed.id, None)
+
+    async def spawn(
+        self,
+        project: str,
+        name: str,
+        args: Union[str, List[str]],
+        cwd: Union[str, Path],
+        emit: Optional[Emitter] = None,
+        shell: bool = False,
+        env: Optional[dict] = None,
+    ) -> ManagedProcess:
+        """Start a long-running process (dev server); reuses the project's live one of the same name"""
+        existing = self._find(project, name)
+        if existing is not None:
+            print(f"♻️ {project}/{name} already running (pid {existing.process.pid})")
+            return existing
+
+        command = args if isinstance(args, str) else " ".join(args)
+        managed = ManagedProcess(str(uuid.uuid4()), project, name, command, str(cwd), long_running=True)
+        await self._start(managed, args, shell, env, cpu_seconds=0)
+
+        async def watch():
+            try:
+                await self._pump(managed, emit, None)
+                await managed.process.wait()
+            finally:
+                self._processes.pop(managed.id, None)
+
+        task = asyncio.create_task(watch())
+        self._watchers.add(task)
+        task.add_done_callback(self._watchers.discard)
+        return managed
+
+    async def _terminate(self, managed: ManagedProcess, grace: float = PROCESS_STOP_GRACE_SECONDS):
+        process = managed.process
+        if process is None or process.returncode is not None:
+            return
+
+        def send(sig):
+            try:
+                if RESOURCE_LIMITS_AVAILABLE:
+                    os.killpg(process.pid, sig)
+                elif sig == signal.SIGTERM:
+                    process.terminate()
+                else:
+                    process.kill()
+            except ProcessLookupError:
+                pass
+
+        if grace:
+            send(signal.SIGTERM)
+            try:
+                await asyncio.wait_for(process.wait(), timeout=grace)
+                return
+            except asyncio.TimeoutError:
+                pass
+        send(signal.SIGKILL if RESOURCE_LIMITS_AVAILABLE else signal.SIGTERM)
+        await process.wait()
+
+    async def stop_project(self, project: str) -> int:
+        """Terminate every process the project owns; returns how many were stopped"""
+        targets = [m for m in self._processes.values() if m.project == project and m.running]
+        for managed in targets:
+            managed.stopped = True
+        await asyncio.gather(*(self._terminate(m) for m in targets), return_exceptions=True)
+        return len(targets)
+
+    async def stop_all(self):
+        for project in {m.project for m in self._processes.values()}:
+            await self.stop_project(project)
+
+
+# Global supervisor instance
+process_supervisor = ProcessSupervisor()
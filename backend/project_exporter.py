@@ -15,14 +15,30 @@ import os
 import shutil
 import zipfile
 import tempfile
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterator, Iterable, List, Tuple, Union
 from datetime import datetime
 import json
 
 # Get the templates directory
 TEMPLATES_DIR = Path(__file__).parent / "docker-configs"
 
+# Streaming export tuning
+EXPORT_S3_CONCURRENCY = int(os.getenv("EXPORT_S3_CONCURRENCY", "8"))
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Already-compressed formats are stored as-is instead of deflated again
+STORED_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.ico', '.zip', '.gz', '.tgz',
+    '.woff', '.woff2', '.mp3', '.mp4', '.webm', '.ogg', '.pdf',
+}
+
+# Archive member content: whole text/bytes or an iterator of byte chunks
+MemberContent = Union[str, bytes, Iterable[bytes]]
+
 
 class ProjectExporter:
     """
@@ -66,21 +82,13 @@ class ProjectExporter:
         other_files = {}
         
         for filepath, content in project_files.items():
-            if filepath.startswith('frontend/') or filepath.startswith('src/'):
-                # Normalize frontend paths
-                if filepath.startswith('src/'):
-                    filepath = f"frontend/{filepath}"
-                frontend_files[filepath] = content
-            elif filepath.startswith('backend/'):
-                backend_files[filepath] = content
-            elif filepath.endswith(('.jsx', '.tsx', '.js', '.ts', '.css', '.html')) and not filepath.startswith('backend/'):
-                # Frontend files without prefix
-                frontend_files[f"frontend/src/{filepath}"] = content
-            elif filepath.endswith('.py'):
-                # Python files are backend
-                backend_files[f"backend/{filepath}"] = content
+            group, export_path = self._classify_path(filepath)
+            if group == "frontend":
+                frontend_files[export_path] = content
+            elif group == "backend":
+                backend_files[export_path] = content
             else:
-                other_files[filepath] = content
+                other_files[export_path] = content
         
         # Generate export package
         export_files = {}
@@ -127,6 +135,23 @@ class ProjectExporter:
             "size_bytes": os.path.getsize(zip_path) if os.path.exists(zip_path) else 0
         }
     
+    def _classify_path(self, filepath: str) -> Tuple[str, str]:
+        """Map a project file path to its export group and path inside the package."""
+        if filepath.startswith('frontend/') or filepath.startswith('src/'):
+            # Normalize frontend paths
+            if filepath.startswith('src/'):
+                filepath = f"frontend/{filepath}"
+            return "frontend", filepath
+        if filepath.startswith('backend/'):
+            return "backend", filepath
+        if filepath.endswith(('.jsx', '.tsx', '.js', '.ts', '.css', '.html')):
+            # Frontend files without prefix
+            return "frontend", f"frontend/src/{filepath}"
+        if filepath.endswith('.py'):
+            # Python files are backend
+            return "backend", f"backend/{filepath}"
+        return "other", filepath
+    
     def _slugify(self, name: str) -> str:
         """Convert name to filesystem-safe slug."""
         return "".join(c if c.isalnum() or c == '-' else '-' for c in name.lower()).strip('-')
@@ -510,6 +535,241 @@ pydantic[email]>=2.0.0
                 # Add project slug as root folder
                 archive_path = f"{project_slug}/{filepath}"
                 zf.writestr(archive_path, content)
+    
+    def iter_export_members(
+        self,
+        project_name: str,
+        source: "ProjectSource",
+        include_docker: bool = True,
+    ) -> Iterator[Tuple[str, MemberContent, Optional[int]]]:
+        """
+        Yield (export_path, content, size_hint) for every file of the export package.
+        
+        Same layout as export_project, but nothing is held beyond the current file:
+        frontend files stream straight from the source, backend files are cleaned
+        one at a time and the templated files are only generated when reached.
+        """
+        project_slug = self._slugify(project_name)
+        
+        frontend_paths = []
+        backend_paths = []
+        for source_path in source.list_paths():
+            group, export_path = self._classify_path(source_path)
+            if group == "frontend":
+                frontend_paths.append((source_path, export_path))
+            elif group == "backend":
+                backend_paths.append((source_path, export_path))
+        exported = {export_path for _, export_path in frontend_paths}
+        
+        # Backend entry point and templates (same rules as _generate_backend_files)
+        main_source = next((src for src, dst in backend_paths if dst == "backend/main.py"), None)
+        main_py = source.read_text(main_source) if main_source else ""
+        if "SANDBOX" in main_py or "sandbox" in main_py.lower() or not main_py:
+            template_path = self.templates_dir / "export_main.py"
+            main_py = template_path.read_text() if template_path.exists() else self._get_default_main_py()
+        yield "backend/main.py", main_py, None
+        
+        req_path = self.templates_dir / "export_requirements.txt"
+        yield "backend/requirements.txt", (req_path.read_text() if req_path.exists() else self._get_default_requirements()), None
+        generated_backend = {"backend/main.py", "backend/requirements.txt"}
+        
+        dockerfile_path = self.templates_dir / "export_backend.Dockerfile"
+        if dockerfile_path.exists():
+            yield "backend/Dockerfile", dockerfile_path.read_text(), None
+            generated_backend.add("backend/Dockerfile")
+        
+        # Project files, fetched with bounded read-ahead
+        remaining_backend = {src: dst for src, dst in backend_paths if dst not in generated_backend}
+        export_targets = dict(frontend_paths)
+        export_targets.update(remaining_backend)
+        for source_path, chunks, size in source.open_many(list(export_targets)):
+            export_path = export_targets[source_path]
+            if source_path in remaining_backend:
+                # Clean sandbox references (backend sources are small text files)
+                content = b"".join(chunks).decode("utf-8", errors="replace")
+                yield export_path, self._remove_sandbox_logic(content), None
+            else:
+                yield export_path, chunks, size
+        
+        # Templated files, generated lazily
+        if include_docker:
+            for export_path, content in self._generate_docker_files(project_slug).items():
+                yield export_path, content, None
+        
+        yield "README.md", self._generate_readme(project_name, project_slug), None
+        
+        if "frontend/package.json" not in exported:
+            yield "frontend/package.json", self._generate_package_json(project_name), None
+        
+        if "frontend/vite.config.js" not in exported:
+            yield "frontend/vite.config.js", self._generate_vite_config(), None
+        
+        yield ".gitignore", self._generate_gitignore(), None
+    
+    def stream_export(
+        self,
+        project_name: str,
+        source: "ProjectSource",
+        include_docker: bool = True,
+    ) -> Iterator[bytes]:
+        """
+        Build the export zip on the fly and yield it in chunks.
+        
+        No temp file and no in-memory copy of the project: each member is compressed
+        as it is read and the compressed bytes are handed out as soon as they exist.
+        """
+        project_slug = self._slugify(project_name)
+        output = _ZipOutputStream()
+        now = datetime.now().timetuple()[:6]
+        
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for export_path, content, size in self.iter_export_members(project_name, source, include_docker):
+                info = zipfile.ZipInfo(f"{project_slug}/{export_path}", date_time=now)
+                info.external_attr = 0o644 << 16
+                info.compress_type = (
+                    zipfile.ZIP_STORED if Path(export_path).suffix.lower() in STORED_EXTENSIONS
+                    else zipfile.ZIP_DEFLATED
+                )
+                if isinstance(content, str):
+                    content = content.encode("utf-8")
+                if isinstance(content, bytes):
+                    zf.writestr(info, content)
+                else:
+                    # Size hint lets zipfile pick zip64 headers for huge assets up front
+                    if size is not None:
+                        info.file_size = size
+                    with zf.open(info, 'w', force_zip64=size is None) as member:
+                        for chunk in content:
+                            member.write(chunk)
+                            yield from output.drain()
+                yield from output.drain()
+        
+        # Central directory
+        yield from output.drain()
+
+
+class _ZipOutputStream:
+    """Write-only, non-seekable sink for ZipFile; compressed bytes are drained as they are produced."""
+    
+    def __init__(self):
+        self._chunks = deque()
+        self._offset = 0
+    
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+            self._offset += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._offset
+    
+    def flush(self):
+        pass
+    
+    def drain(self) -> Iterator[bytes]:
+        while self._chunks:
+            yield self._chunks.popleft()
+
+
+class ProjectSource(ABC):
+    """Where an export reads project files from."""
+    
+    @abstractmethod
+    def list_paths(self) -> List[str]:
+        """Relative paths of every file in the project."""
+        pass
+    
+    @abstractmethod
+    def open_many(self, paths: List[str]) -> Iterator[Tuple[str, Iterator[bytes], Optional[int]]]:
+        """Yield (path, chunk_iterator, size) in order; consume each iterator before advancing."""
+        pass
+    
+    def read_text(self, path: str) -> str:
+        for _, chunks, _ in self.open_many([path]):
+            return b"".join(chunks).decode("utf-8", errors="replace")
+        return ""
+
+
+class DictProjectSource(ProjectSource):
+    """Project files already in memory (path -> content)."""
+    
+    def __init__(self, files: Dict[str, Union[str, bytes]]):
+        self.files = files
+    
+    def list_paths(self) -> List[str]:
+        return list(self.files)
+    
+    def open_many(self, paths: List[str]) -> Iterator[Tuple[str, Iterator[bytes], Optional[int]]]:
+        for path in paths:
+            content = self.files[path]
+            data = content.encode("utf-8") if isinstance(content, str) else content
+            yield path, iter((data,)), len(data)
+
+
+class S3ProjectSource(ProjectSource):
+    """
+    Project files under projects/{user_id}/{project_slug}/ in S3.
+    
+    Up to `concurrency` GetObject requests are in flight ahead of the file being
+    written, so request latency overlaps with compression. Bodies are read in
+    EXPORT_CHUNK_SIZE pieces, so memory does not grow with file or project size.
+    """
+    
+    METADATA_FILE = "project_metadata.json"
+    
+    def __init__(self, project_slug: str, user_id: str, concurrency: int = EXPORT_S3_CONCURRENCY):
+        from s3_storage import s3_client, S3_BUCKET_NAME
+        
+        if not S3_BUCKET_NAME:
+            raise ValueError("S3_BUCKET_NAME environment variable is not set")
+        self.client = s3_client
+        self.bucket = S3_BUCKET_NAME
+        self.prefix = f"projects/{user_id}/{project_slug}/"
+        self.concurrency = max(1, concurrency)
+        self._sizes: Optional[Dict[str, int]] = None
+    
+    def list_paths(self) -> List[str]:
+        if self._sizes is None:
+            sizes = {}
+            paginator = self.client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+                for obj in page.get('Contents', []):
+                    relative_path = obj['Key'][len(self.prefix):]
+                    if relative_path and relative_path != self.METADATA_FILE:
+                        sizes[relative_path] = obj['Size']
+            self._sizes = sizes
+        return list(self._sizes)
+    
+    def _get_object(self, path: str):
+        return self.client.get_object(Bucket=self.bucket, Key=f"{self.prefix}{path}")
+    
+    def open_many(self, paths: List[str]) -> Iterator[Tuple[str, Iterator[bytes], Optional[int]]]:
+        sizes = self._sizes or {}
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="export-s3") as pool:
+            queued = iter(paths)
+            try:
+                for path in queued:
+                    pending.append((path, pool.submit(self._get_object, path)))
+                    if len(pending) >= self.concurrency:
+                        break
+                while pending:
+                    path, future = pending.popleft()
+                    next_path = next(queued, None)
+                    if next_path is not None:
+                        pending.append((next_path, pool.submit(self._get_object, next_path)))
+                    body = future.result()['Body']
+                    try:
+                        yield path, body.iter_chunks(EXPORT_CHUNK_SIZE), sizes.get(path)
+                    finally:
+                        body.close()
+            finally:
+                # Export abandoned (client went away): release prefetched bodies
+                for _, future in pending:
+                    future.cancel()
+                    if future.done() and not future.cancelled() and future.exception() is None:
+                        future.result()['Body'].close()
 
 
 # Create global instance
@@ -546,12 +806,24 @@ def export_project(
 # FastAPI Integration
 # =============================================================================
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field
 from typing import List
 
 export_router = APIRouter(prefix="/api/export", tags=["Export"])
+security = HTTPBearer()
+
+
+async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
+    """User id (JWT sub) of the caller - S3 exports are only ever of the caller's own projects."""
+    from auth import verify_token
+    payload = verify_token(credentials.credentials)
+    user_id = payload.get("sub") if payload else None
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    return str(user_id)
 
 
 class ExportRequest(BaseModel):
@@ -602,6 +874,50 @@ async def create_export_package(request: ExportRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _zip_stream_response(project_name: str, source: ProjectSource, include_docker: bool) -> StreamingResponse:
+    """Stream the export zip; the sync generator runs in the threadpool, chunk by chunk."""
+    project_slug = project_exporter._slugify(project_name)
+    return StreamingResponse(
+        project_exporter.stream_export(project_name, source, include_docker),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{project_slug}-export.zip"'}
+    )
+
+
+@export_router.post("/package/stream")
+async def stream_export_package(request: ExportRequest):
+    """
+    Export the given project files as a zip streamed in the response body.
+    
+    Unlike /package, nothing is written to disk and there is no separate download step.
+    """
+    return _zip_stream_response(request.project_name, DictProjectSource(request.project_files), request.include_docker)
+
+
+@export_router.get("/stream/{project_slug}")
+async def stream_export_from_s3(project_slug: str, include_docker: bool = True, user_id: str = Depends(get_current_user_id)):
+    """
+    Export one of the caller's S3 projects as a zip streamed straight to the client.
+    
+    Files are fetched concurrently and compressed on the fly, so memory stays flat
+    regardless of project size and no temp file is created. Only the authenticated
+    user's own projects are looked up; anything else is a 404.
+    """
+    import asyncio
+    
+    try:
+        source = S3ProjectSource(project_slug, user_id)
+        paths = await asyncio.to_thread(source.list_paths)
+        if not paths:
+            raise HTTPException(status_code=404, detail=f"Project '{project_slug}' not found in cloud storage")
+        
+        return _zip_stream_response(project_slug, source, include_docker)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @export_router.get("/download/{filename}")
 async def download_export(filename: str):
     """Download an exported project package."""
@@ -0,0 +1,547 @@
+"""
+Project Version History
+=======================
+Content-addressed version store for project files kept in S3.
+
+The working tree under projects/{user_id}/{project_slug}/ stays exactly where
+every reader (previews, exports, the editor) expects it. Next to it each project
+gets a history under versions/{user_id}/{project_slug}/:
+
+    blobs/{sha256}              file contents, stored once per distinct content
+    manifests/{version}.json    tree for a version: path -> {hash, size}, plus
+                                parent, message and the paths it changed
+    HEAD.json                   {"version": n}
+
+upload_project_to_s3() asks the store which files actually changed, so
+unchanged files are neither re-uploaded to the working tree nor duplicated in
+history - a save costs one LIST of the working tree plus O(changed files). A
+file is only skipped when both HEAD and the working tree object's ETag (the
+content MD5) match, so the working tree is repaired even if it drifted from
+HEAD. Rollback writes a new version whose
+tree is an older one and restores the working tree with server-side copies from
+blobs (no file content passes through this process). Diffs compare manifests and
+only fetch blobs when a patch is requested.
+
+Projects created before history existed are imported as version 1 on their
+first save. A background collector prunes manifests beyond VERSION_RETENTION
+and deletes blobs no retained manifest references (after a grace period, so
+blobs of an in-flight save are never collected).
+
+Commits are serialized per project within a process. Across workers each
+manifest is written with If-None-Match, so two saves can never claim the same
+version: the loser rebases its changes onto the winner's manifest and retries.
+HEAD.json is only a hint and is followed forward past manifests it missed.
+"""
+
+import asyncio
+import difflib
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from botocore.exceptions import ClientError, ParamValidationError
+
+from s3_storage import s3_client, S3_BUCKET_NAME, get_content_type
+
+VERSION_RETENTION = int(os.getenv("VERSION_RETENTION", "100"))
+VERSION_GC_INTERVAL_SECONDS = int(os.getenv("VERSION_GC_INTERVAL_SECONDS", "3600"))
+VERSION_GC_GRACE_SECONDS = int(os.getenv("VERSION_GC_GRACE_SECONDS", "3600"))
+VERSION_S3_CONCURRENCY = int(os.getenv("VERSION_S3_CONCURRENCY", "8"))
+VERSION_MAX_CACHED_HEADS = 256
+VERSION_DIFF_MAX_BYTES = 200 * 1024
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _history_prefix(project_slug: str, user_id: str) -> str:
+    return f"versions/{user_id}/{project_slug}/"
+
+
+def _working_key(project_slug: str, user_id: str, path: str) -> str:
+    return f"projects/{user_id}/{project_slug}/{path}"
+
+
+def _etag_matches(obj: Dict[str, Any], content: str) -> bool:
+    """Single-part uploads have the content MD5 as ETag (multipart/KMS ETags never match)"""
+    return obj.get("ETag", "").strip('"') == hashlib.md5(content.encode("utf-8")).hexdigest()
+
+
+class VersionConflict(Exception):
+    """Another writer already stored a manifest for this version"""
+
+
+@dataclass
+class PendingCommit:
+    """Result of prepare(): what a save changes relative to the current head"""
+    project_slug: str
+    user_id: str
+    parent: Optional[Dict[str, Any]]
+    files: Dict[str, Dict[str, Any]]  # full new tree: path -> {hash, size}
+    changed_files: List[Dict[str, str]]  # {path, content} entries that differ from the head
+    blobs: Dict[str, str] = field(default_factory=dict)  # hash -> content still to store
+
+    @property
+    def changed_paths(self) -> List[str]:
+        return [f["path"] for f in self.changed_files]
+
+
+class ProjectVersionStore:
+    def __init__(self, bucket: Optional[str] = S3_BUCKET_NAME, client=s3_client):
+        self.bucket = bucket
+        self.client = client
+        self._heads: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._dirty: Set[Tuple[str, str]] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._conditional_writes = True
+
+    # --- S3 helpers -----------------------------------------------------------
+
+    def _lock(self, project_slug: str, user_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault((user_id, project_slug), threading.Lock())
+
+    def _get_json(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return None
+            raise
+        return json.loads(body)
+
+    def _put_json(self, key: str, data: Dict[str, Any], create_only: bool = False):
+        """Write a JSON object; create_only raises VersionConflict if the key already exists"""
+        kwargs = dict(
+            Bucket=self.bucket,
+            Key=key,
+            Body=json.dumps(data, separators=(",", ":")).encode("utf-8"),
+            ContentType="application/json",
+        )
+        if create_only and self._conditional_writes:
+            try:
+                self.client.put_object(IfNoneMatch="*", **kwargs)
+                return
+            except ParamValidationError:
+                # botocore predates S3 conditional writes: fall back to last-writer-wins
+                print("⚠️ S3 conditional writes unsupported by this botocore; version writes may race across workers")
+                self._conditional_writes = False
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") in ("PreconditionFailed", "ConditionalRequestConflict", "412"):
+                    raise VersionConflict(key)
+                raise
+        self.client.put_object(**kwargs)
+
+    def _list_keys(self, prefix: str) -> List[Dict[str, Any]]:
+        objects = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            objects.extend(page.get("Contents", []))
+        return objects
+
+    def _delete_keys(self, keys: List[str]):
+        for start in range(0, len(keys), 1000):
+            batch = keys[start:start + 1000]
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+
+    def _put_blobs(self, project_slug: str, user_id: str, blobs: Dict[str, str]):
+        prefix = _history_prefix(project_slug, user_id)
+
+        def put(item: Tuple[str, str]):
+            digest, content = item
+            self.client.put_object(Bucket=self.bucket, Key=f"{prefix}blobs/{digest}", Body=content.encode("utf-8"))
+
+        if len(blobs) <= 1:
+            for item in blobs.items():
+                put(item)
+            return
+        with ThreadPoolExecutor(max_workers=min(VERSION_S3_CONCURRENCY, len(blobs))) as pool:
+            list(pool.map(put, blobs.items()))
+
+    def read_blob(self, project_slug: str, user_id: str, digest: str) -> str:
+        key = f"{_history_prefix(project_slug, user_id)}blobs/{digest}"
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read().decode("utf-8")
+
+    # --- Manifests ------------------------------------------------------------
+
+    def _manifest_key(self, project_slug: str, user_id: str, version: int) -> str:
+        return f"{_history_prefix(project_slug, user_id)}manifests/{version:08d}.json"
+
+    def get_manifest(self, project_slug: str, user_id: str, version: int) -> Optional[Dict[str, Any]]:
+        head = self._heads.get((user_id, project_slug))
+        if head is not None and head["version"] == version:
+            return head
+        return self._get_json(self._manifest_key(project_slug, user_id, version))
+
+    def get_head(self, project_slug: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """Current manifest (one small GET for HEAD.json; the manifest itself is cached)"""
+        pointer = self._get_json(f"{_history_prefix(project_slug, user_id)}HEAD.json")
+        if pointer is None:
+            return None
+        cached = self._heads.get((user_id, project_slug))
+        if cached is not None and cached["version"] == pointer["version"]:
+            return cached
+        manifest = self._get_json(self._manifest_key(project_slug, user_id, pointer["version"]))
+        if manifest is not None:
+            self._remember_head(project_slug, user_id, manifest)
+        return manifest
+
+    def _latest_manifest(self, project_slug: str, user_id: str,
+                         known: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Follow manifests forward from `known` (HEAD.json may lag behind a racing writer)"""
+        latest = known
+        version = known["version"] if known else 0
+        while True:
+            manifest = self._get_json(self._manifest_key(project_slug, user_id, version + 1))
+            if manifest is None:
+                break
+            latest, version = manifest, version + 1
+        if latest is not None:
+            self._remember_head(project_slug, user_id, latest)
+        return latest
+
+    def _remember_head(self, project_slug: str, user_id: str, manifest: Dict[str, Any]):
+        self._heads[(user_id, project_slug)] = manifest
+        if len(self._heads) > VERSION_MAX_CACHED_HEADS:
+            self._heads.pop(next(iter(self._heads)))
+
+    def _write_manifest(self, project_slug: str, user_id: str, parent: Optional[Dict[str, Any]],
+                        files: Dict[str, Dict[str, Any]], message: str,
+                        changed: List[str], removed: List[str]) -> Dict[str, Any]:
+        version = (parent["version"] + 1) if parent else 1
+        manifest = {
+            "version": version,
+            "parent": parent["version"] if parent else None,
+            "created_at": datetime.utcnow().isoformat(),
+            "message": message,
+            "changed": changed,
+            "removed": removed,
+            "files": files,
+        }
+        self._put_json(self._manifest_key(project_slug, user_id, version), manifest, create_only=True)
+        self._put_json(f"{_history_prefix(project_slug, user_id)}HEAD.json", {"version": version})
+        self._remember_head(project_slug, user_id, manifest)
+        self._dirty.add((user_id, project_slug))
+        return manifest
+
+    def _import_working_tree(self, project_slug: str, user_id: str,
+                             objects: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Version 1 for a project saved before history existed (one-time full read)"""
+        prefix = _working_key(project_slug, user_id, "")
+        if not objects:
+            return None
+        print(f"🗂️ Importing {len(objects)} existing files into version history for {project_slug}")
+
+        def fetch(obj: Dict[str, Any]) -> Tuple[str, str]:
+            body = self.client.get_object(Bucket=self.bucket, Key=obj["Key"])["Body"].read()
+            return obj["Key"][len(prefix):], body.decode("utf-8", errors="replace")
+
+        with ThreadPoolExecutor(max_workers=VERSION_S3_CONCURRENCY) as pool:
+            contents = dict(pool.map(fetch, objects))
+
+        files = {}
+        blobs = {}
+        for path, content in contents.items():
+            digest = content_hash(content)
+            files[path] = {"hash": digest, "size": len(content)}
+            blobs[digest] = content
+        self._put_blobs(project_slug, user_id, blobs)
+        try:
+            return self._write_manifest(project_slug, user_id, None, files, "Imported existing project", sorted(files), [])
+        except VersionConflict:
+            # Another worker imported it first
+            return self._latest_manifest(project_slug, user_id, None)
+
+    # --- Saving ---------------------------------------------------------------
+
+    def prepare(self, project_slug: str, user_id: str, files: List[Dict[str, str]]) -> PendingCommit:
+        """Work out which of the given files differ from the current head or the working tree"""
+        prefix = _working_key(project_slug, user_id, "")
+        objects = self._list_keys(prefix)
+        working = {obj["Key"][len(prefix):]: obj for obj in objects}
+        parent = self.get_head(project_slug, user_id)
+        if parent is None:
+            parent = self._import_working_tree(project_slug, user_id, objects)
+        tree = dict(parent["files"]) if parent else {}
+
+        changed_files = []
+        blobs = {}
+        for file in files:
+            path = file.get("path", "")
+            content = file.get("content", "") or ""
+            digest = content_hash(content)
+            current = tree.get(path)
+            stored = working.get(path)
+            # HEAD alone is not proof the working tree holds this content (a racing save may have overwritten it)
+            if current is not None and current["hash"] == digest and stored is not None and _etag_matches(stored, content):
+                continue
+            tree[path] = {"hash": digest, "size": len(content)}
+            changed_files.append(file)
+            blobs[digest] = content
+        return PendingCommit(project_slug, user_id, parent, tree, changed_files, blobs)
+
+    def commit(self, pending: PendingCommit, message: str = "") -> Optional[Dict[str, Any]]:
+        """Store the changed blobs and a new manifest; returns None when nothing changed"""
+        if not pending.changed_files:
+            return pending.parent
+        with self._lock(pending.project_slug, pending.user_id):
+            self._put_blobs(pending.project_slug, pending.user_id, pending.blobs)
+            head = self.get_head(pending.project_slug, pending.user_id)
+            while True:
+                files = pending.files
+                if head is not None and (pending.parent is None or head["version"] != pending.parent["version"]):
+                    # Someone committed since prepare(): apply our changes on top of theirs
+                    files = dict(head["files"])
+                    for path in pending.changed_paths:
+                        files[path] = pending.files[path]
+                try:
+                    return self._write_manifest(
+                        pending.project_slug, pending.user_id, head, files,
+                        message or f"Updated {len(pending.changed_files)} file(s)",
+                        pending.changed_paths, [],
+                    )
+                except VersionConflict:
+                    head = self._latest_manifest(pending.project_slug, pending.user_id, head)
+
+    # --- History --------------------------------------------------------------
+
+    def list_versions(self, project_slug: str, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        prefix = f"{_history_prefix(project_slug, user_id)}manifests/"
+        keys = sorted((obj["Key"] for obj in self._list_keys(prefix)), reverse=True)[:limit]
+
+        def summary(key: str) -> Optional[Dict[str, Any]]:
+            manifest = self._get_json(key)
+            if manifest is None:
+                return None
+            return {
+                "version": manifest["version"],
+                "parent": manifest.get("parent"),
+                "created_at": manifest.get("created_at"),
+                "message": manifest.get("message", ""),
+                "changed": manifest.get("changed", []),
+                "removed": manifest.get("removed", []),
+                "file_count": len(manifest.get("files", {})),
+            }
+
+        with ThreadPoolExecutor(max_workers=VERSION_S3_CONCURRENCY) as pool:
+            return [item for item in pool.map(summary, keys) if item]
+
+    def diff(self, project_slug: str, user_id: str, from_version: int, to_version: int,
+             include_patch: bool = False) -> Dict[str, Any]:
+        old = self.get_manifest(project_slug, user_id, from_version)
+        new = self.get_manifest(project_slug, user_id, to_version)
+        if old is None or new is None:
+            raise KeyError(f"Unknown version: {from_version if old is None else to_version}")
+
+        old_files, new_files = old["files"], new["files"]
+        added = sorted(set(new_files) - set(old_files))
+        removed = sorted(set(old_files) - set(new_files))
+        modified = sorted(
+            path for path in set(old_files) & set(new_files)
+            if old_files[path]["hash"] != new_files[path]["hash"]
+        )
+        result: Dict[str, Any] = {
+            "from_version": from_version,
+            "to_version": to_version,
+            "added": added,
+            "removed": removed,
+            "modified": modified,
+        }
+        if include_patch:
+            def patch(path: str) -> Tuple[str, str]:
+                before = self.read_blob(project_slug, user_id, old_files[path]["hash"]) if path in old_files else ""
+                after = self.read_blob(project_slug, user_id, new_files[path]["hash"]) if path in new_files else ""
+                if len(before) + len(after) > VERSION_DIFF_MAX_BYTES:
+                    return path, "(file too large to diff)"
+                return path, "".join(difflib.unified_diff(
+                    before.splitlines(True), after.splitlines(True),
+                    fromfile=f"v{from_version}/{path}", tofile=f"v{to_version}/{path}",
+                ))
+
+            with ThreadPoolExecutor(max_workers=VERSION_S3_CONCURRENCY) as pool:
+                result["patches"] = dict(pool.map(patch, added + removed + modified))
+        return result
+
+    def rollback(self, project_slug: str, user_id: str, version: int) -> Dict[str, Any]:
+        """Restore the working tree to `version`, recorded as a new version on top of head"""
+        with self._lock(project_slug, user_id):
+            head = self.get_head(project_slug, user_id)
+            target = self.get_manifest(project_slug, user_id, version)
+            if head is None or target is None:
+                raise KeyError(f"Unknown version: {version}")
+            target_files = target["files"]
+            history = _history_prefix(project_slug, user_id)
+
+            def copy(path: str):
+                self.client.copy_object(
+                    Bucket=self.bucket,
+                    Key=_working_key(project_slug, user_id, path),
+                    CopySource={"Bucket": self.bucket, "Key": f"{history}blobs/{target_files[path]['hash']}"},
+                    ContentType=get_content_type(path),
+                    MetadataDirective="REPLACE",
+                    Metadata={
+                        "project_slug": project_slug,
+                        "user_id": user_id,
+                        "upload_time": datetime.utcnow().isoformat(),
+                    },
+                )
+
+            while True:
+                head_files = head["files"]
+                restore = [
+                    path for path, entry in target_files.items()
+                    if head_files.get(path, {}).get("hash") != entry["hash"]
+                ]
+                remove = [path for path in head_files if path not in target_files]
+
+                if restore:
+                    with ThreadPoolExecutor(max_workers=min(VERSION_S3_CONCURRENCY, len(restore))) as pool:
+                        list(pool.map(copy, restore))
+                if remove:
+                    self._delete_keys([_working_key(project_slug, user_id, path) for path in remove])
+
+                try:
+                    manifest = self._write_manifest(
+                        project_slug, user_id, head, dict(target_files),
+                        f"Rolled back to version {version}", sorted(restore), sorted(remove),
+                    )
+                    break
+                except VersionConflict:
+                    # A save landed meanwhile: restore again relative to the new head
+                    head = self._latest_manifest(project_slug, user_id, head)
+        return {"version": manifest["version"], "restored_from": version, "restored": sorted(restore), "removed": sorted(remove)}
+
+    def sync_local_tree(self, project_slug: str, user_id: str, result: Dict[str, Any],
+                        root: str) -> Dict[str, Optional[str]]:
+        """
+        Mirror a rollback/undo into the project's local folder (if it exists).
+
+        Returns path -> restored content (None for removed files) so callers can
+        refresh anything derived from the files, such as the code index.
+        """
+        target = self.get_manifest(project_slug, user_id, result["restored_from"])
+        if target is None:
+            raise KeyError(f"Unknown version: {result['restored_from']}")
+        base = os.path.realpath(root)
+        local = os.path.isdir(base)
+
+        def local_path(path: str) -> Optional[str]:
+            full = os.path.realpath(os.path.join(base, path))
+            return full if local and full.startswith(base + os.sep) else None
+
+        def restore(path: str) -> Tuple[str, str]:
+            content = self.read_blob(project_slug, user_id, target["files"][path]["hash"])
+            full = local_path(path)
+            if full:
+                os.makedirs(os.path.dirname(full), exist_ok=True)
+                with open(full, "w", encoding="utf-8") as f:
+                    f.write(content)
+            return path, content
+
+        changes: Dict[str, Optional[str]] = {}
+        if result["restored"]:
+            with ThreadPoolExecutor(max_workers=min(VERSION_S3_CONCURRENCY, len(result["restored"]))) as pool:
+                changes.update(pool.map(restore, result["restored"]))
+        for path in result["removed"]:
+            full = local_path(path)
+            if full and os.path.isfile(full):
+                os.remove(full)
+            changes[path] = None
+        return changes
+
+    def undo(self, project_slug: str, user_id: str) -> Dict[str, Any]:
+        """Roll back the most recent version"""
+        head = self.get_head(project_slug, user_id)
+        if head is None or head.get("parent") is None:
+            raise KeyError("Nothing to undo")
+        return self.rollback(project_slug, user_id, head["parent"])
+
+    def delete_history(self, project_slug: str, user_id: str):
+        keys = [obj["Key"] for obj in self._list_keys(_history_prefix(project_slug, user_id))]
+        if keys:
+            self._delete_keys(keys)
+        self._heads.pop((user_id, project_slug), None)
+        self._dirty.discard((user_id, project_slug))
+
+    # --- Garbage collection ---------------------------------------------------
+
+    def collect_garbage(self, project_slug: str, user_id: str) -> Dict[str, int]:
+        """Prune manifests beyond VERSION_RETENTION and blobs no kept manifest references"""
+        history = _history_prefix(project_slug, user_id)
+        with self._lock(project_slug, user_id):
+            manifest_keys = sorted(obj["Key"] for obj in self._list_keys(f"{history}manifests/"))
+            expired = manifest_keys[:-VERSION_RETENTION] if len(manifest_keys) > VERSION_RETENTION else []
+            kept = manifest_keys[len(expired):]
+
+            referenced: Set[str] = set()
+            for key in kept:
+                manifest = self._get_json(key)
+                if manifest:
+                    referenced.update(entry["hash"] for entry in manifest["files"].values())
+
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=VERSION_GC_GRACE_SECONDS)
+            unreferenced = [
+                obj["Key"] for obj in self._list_keys(f"{history}blobs/")
+                if obj["Key"].rsplit("/", 1)[-1] not in referenced and obj["LastModified"] < cutoff
+            ]
+            self._delete_keys(expired + unreferenced)
+        return {"manifests_deleted": len(expired), "blobs_deleted": len(unreferenced)}
+
+    def collect_all(self) -> Dict[str, int]:
+        totals = {"projects": 0, "manifests_deleted": 0, "blobs_deleted": 0}
+        dirty, self._dirty = self._dirty, set()
+        for user_id, project_slug in dirty:
+            try:
+                result = self.collect_garbage(project_slug, user_id)
+            except Exception as e:
+                print(f"⚠️ Version GC failed for {project_slug}: {e}")
+                self._dirty.add((user_id, project_slug))
+                continue
+            totals["projects"] += 1
+            totals["manifests_deleted"] += result["manifests_deleted"]
+            totals["blobs_deleted"] += result["blobs_deleted"]
+        return totals
+
+    async def start(self):
+        """Start the periodic garbage collection loop"""
+        if self._running or not self.bucket:
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._gc_loop())
+
+    async def stop(self):
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _gc_loop(self):
+        while self._running:
+            try:
+                await asyncio.sleep(VERSION_GC_INTERVAL_SECONDS)
+                result = await asyncio.to_thread(self.collect_all)
+                if result["manifests_deleted"] or result["blobs_deleted"]:
+                    print(f"🧹 Version GC removed {result['manifests_deleted']} manifests and {result['blobs_deleted']} blobs across {result['projects']} projects")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"⚠️ Version GC failed: {e}")
+
+
+# Global store instance
+version_store = ProjectVersionStore()
@@ -0,0 +1,284 @@
+"""
+Pattern Rule Engine
+===================
+Shared regex matcher for the pattern-based checks: AISecurityScanner._pattern_scan,
+SOC2CodeComplianceEngine.verify_generated_code and the project compliance endpoint.
+
+- Compile once: a RuleSet compiles every rule when it is built, and get_rule_set()
+  keeps one per distinct rule list for the life of the process.
+- Prefilter: most rules never match a given file, so a RuleSet first works out
+  which rules can match at all and only runs those. With the optional hyperscan
+  package this is one multi-pattern scan; otherwise each rule's required literals
+  (extracted from its parsed regex, e.g. "innerhtml" for innerHTML\s*=) are looked
+  up in a case-folded copy of the text. Results are the same as running
+  re.finditer per rule.
+
+  A single combined alternation regex was tried first, but CPython's re loses its
+  literal-prefix search on a big alternation and was ~10x slower than per-rule
+  scans on a large App.jsx.
+- Line numbers: LineIndex keeps newline offsets for a text (cached per content)
+  and resolves an offset to a line with a binary search.
+- Fixes: rules may carry a replacement template. apply_fixes() splices every fix
+  into the content in one pass instead of one re.sub per finding.
+
+Usage:
+    from rule_engine import Rule, get_rule_set, line_index
+
+    rules = get_rule_set([Rule("eval", r"eval\\s*\\(", data={"severity": "HIGH"})], name="example")
+    index = line_index(code)
+    for match in rules.scan(code):
+        print(match.rule.id, index.line_of(match.start), match.text)
+"""
+
+import hashlib
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:
+    # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+DEFAULT_RULE_FLAGS = re.IGNORECASE | re.MULTILINE
+LINE_INDEX_CACHE_SIZE = 64
+
+_NEWLINE = re.compile(r"\n")
+# Non-ASCII characters that re.IGNORECASE treats as equal to ASCII letters
+_CASE_FOLD = str.maketrans({"\u0131": "i", "\u017f": "s"})
+_REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, getattr(sre_constants, "POSSESSIVE_REPEAT", None))
+
+
+@dataclass(frozen=True)
+class Rule:
+    id: str
+    pattern: str
+    data: Any = None  # caller metadata, returned with each match
+    fix: Optional[str] = None  # re.sub-style replacement template
+
+
+@dataclass
+class RuleMatch:
+    rule: Rule
+    index: int  # position of the rule in its RuleSet
+    match: re.Match
+
+    @property
+    def start(self) -> int:
+        return self.match.start()
+
+    @property
+    def end(self) -> int:
+        return self.match.end()
+
+    @property
+    def text(self) -> str:
+        return self.match.group(0)
+
+
+class LineIndex:
+    """Offset -> line lookups for one text via bisect over newline positions"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self._starts = [0]
+        self._starts.extend(m.end() for m in _NEWLINE.finditer(text))
+
+    @property
+    def line_count(self) -> int:
+        return len(self._starts)
+
+    def line_of(self, offset: int) -> int:
+        """1-based line containing offset"""
+        return bisect_right(self._starts, offset)
+
+    def line_text(self, line: int) -> str:
+        """Text of a 1-based line, without its newline"""
+        if line < 1 or line > len(self._starts):
+            return ""
+        start = self._starts[line - 1]
+        end = self._starts[line] - 1 if line < len(self._starts) else len(self.text)
+        return self.text[start:end]
+
+
+@lru_cache(maxsize=LINE_INDEX_CACHE_SIZE)
+def line_index(text: str) -> LineIndex:
+    """Cached LineIndex, so every checker scanning the same content shares one"""
+    return LineIndex(text)
+
+
+def fold_case(text: str) -> str:
+    return text.lower().translate(_CASE_FOLD)
+
+
+def _required_in(items) -> Optional[List[str]]:
+    """Literal alternatives, one of which occurs in every match of items (None if unknown)"""
+    best = None
+    run = []
+
+    def consider(alternatives):
+        nonlocal best
+        if alternatives and (best is None or min(map(len, alternatives)) > min(map(len, best))):
+            best = alternatives
+
+    for op, av in items:
+        if op == sre_constants.LITERAL and av < 128:
+            run.append(chr(av).lower())
+            continue
+        consider(["".join(run)] if run else None)
+        run = []
+        if op == sre_constants.SUBPATTERN:
+            consider(_required_in(av[-1]))
+        elif op in _REPEATS and av[0] >= 1:
+            consider(_required_in(av[2]))
+        elif op == sre_constants.BRANCH:
+            alternatives = []
+            for branch in av[1]:
+                required = _required_in(branch)
+                if not required:
+                    alternatives = None
+                    break
+                alternatives.extend(required)
+            consider(alternatives)
+    consider(["".join(run)] if run else None)
+    return best
+
+
+def required_literals(pattern: str, flags: int = 0) -> Optional[List[str]]:
+    """Lower-cased literals of which at least one appears in any match of pattern
+
+    Used as a case-insensitive prefilter (valid whatever the rule's own flags).
+    Returns None when nothing can be said, e.g. for \\w+ style patterns.
+    """
+    try:
+        return _required_in(sre_parse.parse(pattern, flags))
+    except Exception:
+        return None
+
+
+def rules_version(rules: List[Rule], flags: int = DEFAULT_RULE_FLAGS) -> str:
+    """Short hash of a rule list - changes whenever a pattern, fix or its metadata does"""
+    digest = hashlib.sha256(str(flags).encode("utf-8"))
+    for rule in rules:
+        digest.update(f"\0{rule.id}\0{rule.pattern}\0{rule.fix or ''}\0{rule.data!r}".encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+class RuleSet:
+    """A list of rules compiled once and matched together"""
+
+    def __init__(self, rules: Iterable[Rule], flags: int = DEFAULT_RULE_FLAGS, name: str = "rules"):
+        self.name = name
+        self.flags = flags
+        self.rules: List[Rule] = []
+        self._compiled: List[re.Pattern] = []
+        for rule in rules:
+            try:
+                self._compiled.append(re.compile(rule.pattern, flags))
+            except re.error as e:
+                print(f"⚠️ Skipping invalid {name} pattern {rule.id!r}: {e}")
+                continue
+            self.rules.append(rule)
+
+        self.version = rules_version(self.rules, flags)
+
+        self._literals = [required_literals(rule.pattern, flags) for rule in self.rules]
+        self._hyperscan_db = self._build_hyperscan() if HYPERSCAN_AVAILABLE else None
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _build_hyperscan(self):
+        hs_flags = hyperscan.HS_FLAG_PREFILTER | hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_ALLOWEMPTY
+        if self.flags & re.IGNORECASE:
+            hs_flags |= hyperscan.HS_FLAG_CASELESS
+        if self.flags & re.MULTILINE:
+            hs_flags |= hyperscan.HS_FLAG_MULTILINE
+        try:
+            database = hyperscan.Database()
+            database.compile(
+                expressions=[rule.pattern.encode("utf-8") for rule in self.rules],
+                ids=list(range(len(self.rules))),
+                flags=[hs_flags] * len(self.rules),
+            )
+            return database
+        except Exception as e:
+            print(f"⚠️ Hyperscan prefilter unavailable for {self.name}: {e}")
+            return None
+
+    def _candidates(self, text: str) -> Optional[set]:
+        """Rule indexes that may match text, or None when there is no prefilter"""
+        if self._hyperscan_db is None:
+            return None
+        found = set()
+
+        def on_match(rule_index, start, end, flags, context):
+            found.add(rule_index)
+
+        try:
+            self._hyperscan_db.scan(text.encode("utf-8"), match_event_handler=on_match)
+        except Exception:
+            return None
+        return found
+
+    def scan(self, text: str) -> List[RuleMatch]:
+        """All matches, ordered by rule then position - same as re.finditer per rule"""
+        candidates = self._candidates(text)
+        if candidates is None:
+            folded = fold_case(text)
+            candidates = [
+                i for i, literals in enumerate(self._literals)
+                if literals is None or any(literal in folded for literal in literals)
+            ]
+        matches: List[RuleMatch] = []
+        for index in sorted(candidates):
+            rule = self.rules[index]
+            matches.extend(RuleMatch(rule, index, m) for m in self._compiled[index].finditer(text))
+        return matches
+
+    def apply_fixes(self, text: str, matches: Iterable[RuleMatch]) -> Tuple[str, List[RuleMatch]]:
+        """Splice every fixable match's replacement into text in one pass
+
+        Overlapping matches keep the first one (by position). Returns the fixed
+        text and the matches whose fix was applied.
+        """
+        fixable = sorted((m for m in matches if m.rule.fix is not None), key=lambda m: (m.start, m.index))
+        parts = []
+        applied = []
+        cursor = 0
+        for match in fixable:
+            if match.start < cursor:
+                continue
+            parts.append(text[cursor:match.start])
+            parts.append(match.match.expand(match.rule.fix))
+            cursor = match.end
+            applied.append(match)
+        if not applied:
+            return text, []
+        parts.append(text[cursor:])
+        return "".join(parts), applied
+
+
+_rule_sets: Dict[str, RuleSet] = {}
+
+
+def get_rule_set(rules: Iterable[Rule], flags: int = DEFAULT_RULE_FLAGS, name: str = "rules") -> RuleSet:
+    """RuleSet for rules, compiled once per process and shared by every later caller"""
+    rules = list(rules)
+    key = rules_version(rules, flags)
+    rule_set = _rule_sets.get(key)
+    if rule_set is None:
+        rule_set = _rule_sets[key] = RuleSet(rules, flags, name)
+        print(f"🧩 Compiled {len(rule_set)} {name} rules (version {rule_set.version})")
+    return rule_set
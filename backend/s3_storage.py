@@ -27,6 +27,9 @@ s3_client = boto3.client(
 
 S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
 
+# Keep content-addressed version history next to each project (see project_versions.py)
+PROJECT_VERSIONING_ENABLED = os.getenv('PROJECT_VERSIONING_ENABLED', 'true').lower() == 'true'
+
 # Cache to remember which user_id works for each project (avoids repeated lookups)
 # Format: {"project_slug": "working_user_id"}
 _project_user_cache: Dict[str, str] = {}
@@ -45,14 +48,18 @@ def cache_user_id_for_project(project_slug: str, user_id: str):
         for key in keys_to_remove:
             del _project_user_cache[key]
 
-def upload_project_to_s3(project_slug: str, files: List[Dict[str, str]], user_id: str = 'anonymous') -> Dict:
+def upload_project_to_s3(project_slug: str, files: List[Dict[str, str]], user_id: str = 'anonymous', message: Optional[str] = None) -> Dict:
     """
     Upload project files to S3
     
+    Files whose content matches the latest version are skipped, and the save is
+    recorded as a new version in the project's history.
+    
     Args:
         project_slug: Unique project identifier
         files: List of file objects with 'path' and 'content' keys
         user_id: User identifier for organization
+        message: Optional description stored with the version
         
     Returns:
         Dict with upload status and file URLs
@@ -61,9 +68,20 @@ def upload_project_to_s3(project_slug: str, files: List[Dict[str, str]], user_id
         raise ValueError("S3_BUCKET_NAME environment variable is not set")
     
     uploaded_files = []
+    pending = None
+    files_to_upload = files
+    
+    if PROJECT_VERSIONING_ENABLED:
+        try:
+            from project_versions import version_store
+            pending = version_store.prepare(project_slug, user_id, files)
+            files_to_upload = pending.changed_files
+        except Exception as e:
+            print(f"⚠️ Version history unavailable for {project_slug}, uploading all files: {e}")
+            pending = None
     
     try:
-        for file in files:
+        for file in files_to_upload:
             file_path = file.get('path', '')
             file_content = file.get('content', '')
             
@@ -89,15 +107,43 @@ def upload_project_to_s3(project_slug: str, files: List[Dict[str, str]], user_id
                 'size': len(file_content)
             })
         
-        return {
-            'success': True,
-            'project_slug': project_slug,
-            'files_uploaded': len(uploaded_files),
-            'files': uploaded_files
-        }
-        
     except ClientError as e:
         raise Exception(f"S3 upload failed: {str(e)}")
+    
+    version = None
+    manifest = None
+    if pending is not None:
+        try:
+            from project_versions import version_store
+            manifest = version_store.commit(pending, message or "")
+            version = manifest["version"] if manifest else None
+        except Exception as e:
+            # The working tree is already saved; only the history entry is missing
+            print(f"⚠️ Failed to record version for {project_slug}: {e}")
+    
+    if files_to_upload:
+        try:
+            # Every writer saves through here, so this is where the preview pointer goes stale
+            from preview_bundles import preview_bundle_cache
+            preview_bundle_cache.invalidate(project_slug)
+        except Exception as e:
+            print(f"⚠️ Could not invalidate preview bundle for {project_slug}: {e}")
+        
+        try:
+            # Recompute the stored SOC2 readiness assessment in the background
+            from soc2_readiness import readiness_service
+            readiness_service.schedule_refresh(project_slug, user_id, files_to_upload, manifest)
+        except Exception as e:
+            print(f"⚠️ Could not schedule SOC2 readiness refresh for {project_slug}: {e}")
+    
+    return {
+        'success': True,
+        'project_slug': project_slug,
+        'files_uploaded': len(uploaded_files),
+        'files_unchanged': len(files) - len(files_to_upload),
+        'version': version,
+        'files': uploaded_files
+    }
 
 
 def get_content_type(file_path: str) -> str:
@@ -272,6 +318,19 @@ def delete_project_from_s3(project_slug: str, user_id: str = 'anonymous') -> boo
             Delete={'Objects': objects_to_delete}
         )
         
+        try:
+            from preview_bundles import preview_bundle_cache
+            preview_bundle_cache.invalidate(project_slug)
+        except Exception as e:
+            print(f"⚠️ Could not invalidate preview bundle for {project_slug}: {e}")
+        
+        if PROJECT_VERSIONING_ENABLED:
+            try:
+                from project_versions import version_store
+                version_store.delete_history(project_slug, user_id)
+            except Exception as e:
+                print(f"⚠️ Failed to delete version history for {project_slug}: {e}")
+        
         return True
         
     except ClientError as e:
@@ -279,6 +338,32 @@ def delete_project_from_s3(project_slug: str, user_id: str = 'anonymous') -> boo
         return False
 
 
+def user_has_project(project_slug: str, user_id: str) -> bool:
+    """
+    Check whether a user's S3 folder holds the project
+    
+    Args:
+        project_slug: Unique project identifier
+        user_id: User identifier
+        
+    Returns:
+        True if the project exists under projects/{user_id}/, False otherwise
+    """
+    if not S3_BUCKET_NAME or not user_id or '/' in user_id or '/' in project_slug:
+        return False
+    
+    try:
+        response = s3_client.list_objects_v2(
+            Bucket=S3_BUCKET_NAME,
+            Prefix=f"projects/{user_id}/{project_slug}/",
+            MaxKeys=1
+        )
+        return 'Contents' in response
+    except ClientError as e:
+        print(f"Error checking project owner: {str(e)}")
+        return False
+
+
 def find_project_user_id(project_slug: str) -> Optional[str]:
     """
     Find the user_id for a project by searching across all users.
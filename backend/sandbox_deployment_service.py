@@ -61,6 +61,9 @@ class SandboxContainer:
     error_message: Optional[str] = None
     health_checks: int = 0
     last_health_check: Optional[datetime] = None
+    # Hashes of the files baked into /app, used to push only what changed on hot updates
+    file_hashes: Optional[Dict[str, str]] = None
+    hot_updates: int = 0
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -74,6 +77,7 @@ class SandboxContainer:
             "expires_at": self.expires_at.isoformat(),
             "ttl_seconds": max(0, int((self.expires_at - datetime.utcnow()).total_seconds())),
             "health_checks": self.health_checks,
+            "hot_updates": self.hot_updates,
             "error": self.error_message
         }
 
@@ -92,6 +96,8 @@ class SandboxDeploymentService:
     - Image caching to skip rebuilds when code matches
     - Exponential backoff for faster health checks
     - Parallel file operations during build
+    - Hot updates: changed files are copied into the running container and
+      uvicorn --reload restarts the app in place, no image rebuild
     """
     
     # Port range for sandbox containers
@@ -116,6 +122,12 @@ class SandboxDeploymentService:
     BASE_IMAGE = "altx-sandbox-base:latest"
     FALLBACK_IMAGE = "python:3.11-slim"
     
+    # Hot reload - run uvicorn with --reload so pushed files take effect in place
+    HOT_RELOAD_ENABLED = os.getenv("SANDBOX_HOT_RELOAD", "true").lower() == "true"
+    HOT_RELOAD_SETTLE_SECONDS = 0.3  # Let the reloader notice the change before health polling
+    # Changes to these need a real image build (dependencies / image layout)
+    REBUILD_TRIGGER_FILES = {"sandbox_requirements.txt", "requirements.txt", "sandbox.Dockerfile", ".dockerignore"}
+    
     def __init__(
         self,
         docker_configs_path: str = None,
@@ -154,6 +166,8 @@ class SandboxDeploymentService:
         
         # Image cache - maps content hash to image name for reuse
         self._image_cache: Dict[str, str] = {}
+        # Build context file hashes per content hash, so cached images can be hot updated too
+        self._context_hashes: Dict[str, Dict[str, str]] = {}
         
         # Track if base image is available
         self._base_image_available: Optional[bool] = None
@@ -210,6 +224,16 @@ class SandboxDeploymentService:
         content = "".join(f"{k}:{v}" for k, v in sorted(project_files.items()))
         return hashlib.md5(content.encode()).hexdigest()[:12]
     
+    def _hash_build_context(self, build_dir: str) -> Dict[str, str]:
+        """Hash every file in a prepared build context (relative path -> sha256)."""
+        import hashlib
+        hashes = {}
+        root = Path(build_dir)
+        for path in root.rglob("*"):
+            if path.is_file():
+                hashes[path.relative_to(root).as_posix()] = hashlib.sha256(path.read_bytes()).hexdigest()
+        return hashes
+    
     def _allocate_port(self) -> int:
         """Allocate an available port for a new container."""
         for port in range(self.PORT_RANGE_START, self.PORT_RANGE_END + 1):
@@ -625,6 +649,106 @@ def generate_id() -> str:
             logger.error(f"Failed to create sandbox {session_id}: {e}")
             raise
     
+    async def hot_update(
+        self,
+        session_id: str,
+        project_files: Dict[str, str]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Push changed files into a running sandbox instead of rebuilding it.
+        
+        The build context is prepared exactly as for a fresh build, diffed against
+        the hashes of what the container is running, and only the differing files
+        are copied into /app; uvicorn --reload then restarts the app in place.
+        
+        Args:
+            session_id: Session identifier of a running sandbox
+            project_files: Full set of backend files (filename -> content)
+        
+        Returns:
+            Dict with changed/removed files and timing, or None when the sandbox
+            can't be hot updated and needs a full create_sandbox
+        """
+        container = self._containers.get(session_id)
+        if (
+            not self.HOT_RELOAD_ENABLED
+            or not container
+            or container.status != SandboxStatus.HEALTHY
+            or container.file_hashes is None
+        ):
+            return None
+        
+        update_start = time.time()
+        build_dir = tempfile.mkdtemp(prefix="sandbox-hot-")
+        push_dir = tempfile.mkdtemp(prefix="sandbox-push-")
+        
+        try:
+            await self._prepare_build_context(build_dir, project_files)
+            new_hashes = self._hash_build_context(build_dir)
+            changed = sorted(p for p, h in new_hashes.items() if container.file_hashes.get(p) != h)
+            removed = sorted(p for p in container.file_hashes if p not in new_hashes)
+            
+            if self.REBUILD_TRIGGER_FILES.intersection(changed + removed):
+                logger.info(f"📦 Dependencies changed for {container.container_name} - full rebuild needed")
+                return None
+            
+            container.expires_at = max(
+                container.expires_at,
+                datetime.utcnow() + timedelta(minutes=self.DEFAULT_TTL_MINUTES)
+            )
+            if not changed and not removed:
+                return {"changed": [], "removed": [], "seconds": 0.0}
+            
+            for rel_path in changed:
+                dest = Path(push_dir) / rel_path
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy(Path(build_dir) / rel_path, dest)
+            
+            if changed:
+                cp_result = await asyncio.get_event_loop().run_in_executor(
+                    None,
+                    lambda: subprocess.run(
+                        ["docker", "cp", f"{push_dir}/.", f"{container.container_name}:/app/"],
+                        capture_output=True,
+                        text=True,
+                        encoding="utf-8",
+                        errors="replace",
+                        timeout=30
+                    )
+                )
+                if cp_result.returncode != 0:
+                    raise RuntimeError(f"docker cp failed: {cp_result.stderr[:500]}")
+            
+            if removed:
+                await asyncio.get_event_loop().run_in_executor(
+                    None,
+                    lambda: subprocess.run(
+                        ["docker", "exec", container.container_name, "rm", "-f",
+                         *[f"/app/{p}" for p in removed]],
+                        capture_output=True,
+                        timeout=30
+                    )
+                )
+            
+            container.file_hashes = new_hashes
+            container.hot_updates += 1
+            
+            # Reloader restarts the worker; poll until the new code answers
+            await asyncio.sleep(self.HOT_RELOAD_SETTLE_SECONDS)
+            container.status = SandboxStatus.RUNNING
+            await self._wait_for_healthy(container)
+            
+            elapsed = time.time() - update_start
+            logger.info(
+                f"🔥 Hot updated {container.container_name}: "
+                f"{len(changed)} changed, {len(removed)} removed in {elapsed:.2f}s"
+            )
+            return {"changed": changed, "removed": removed, "seconds": round(elapsed, 3)}
+        
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            shutil.rmtree(push_dir, ignore_errors=True)
+    
     async def _build_and_run(
         self,
         container: SandboxContainer,
@@ -648,6 +772,7 @@ def generate_id() -> str:
             if check_result.returncode == 0:
                 logger.info(f"♻️ Reusing cached image: {cached_image} (hash: {content_hash})")
                 container.image_name = cached_image
+                container.file_hashes = self._context_hashes.get(content_hash)
                 container.status = SandboxStatus.STARTING
                 await self._run_container(container)
                 logger.info(f"⚡ Container started in {time.time() - build_start:.2f}s (cached)")
@@ -660,6 +785,7 @@ def generate_id() -> str:
         try:
             # PARALLEL: Copy template files and write project files concurrently
             await self._prepare_build_context(build_dir, project_files)
+            container.file_hashes = self._hash_build_context(build_dir)
             
             # Build image with base image if available
             container.status = SandboxStatus.BUILDING
@@ -695,6 +821,7 @@ def generate_id() -> str:
             
             # Cache the successful image
             self._image_cache[content_hash] = container.image_name
+            self._context_hashes[content_hash] = container.file_hashes
             
             # Run container
             await self._run_container(container)
@@ -795,6 +922,15 @@ google-auth>=2.23.0
         container.status = SandboxStatus.STARTING
         logger.info(f"🚀 Starting container: {container.container_name} on port {container.port}")
         
+        # Override the image CMD so file pushes from hot_update restart the app in place
+        command = []
+        if self.HOT_RELOAD_ENABLED:
+            command = [
+                "python", "-m", "uvicorn", "main:app",
+                "--host", "0.0.0.0", "--port", "8000",
+                "--reload", "--reload-dir", "/app"
+            ]
+        
         run_result = await asyncio.get_event_loop().run_in_executor(
             None,
             lambda: subprocess.run(
@@ -809,7 +945,8 @@ google-auth>=2.23.0
                     "--memory", "256m",  # Reduced memory - sandbox doesn't need much
                     "--cpus", "0.5",
                     "--restart", "no",
-                    container.image_name
+                    container.image_name,
+                    *command
                 ],
                 capture_output=True,
                 text=True,
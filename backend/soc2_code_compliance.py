@@ -29,6 +29,9 @@ from typing import Dict, List, Optional, Any, Tuple
 from pathlib import Path
 from enum import Enum
 import logging
+import re
+
+from rule_engine import Rule, get_rule_set, line_index
 
 # Import SOC2 compliance components
 from soc2_rag_database import SOC2RAGDatabase, TrustServiceCriteria
@@ -184,6 +187,16 @@ class SOC2CodeComplianceEngine:
         # Auto-fix mappings
         self.auto_fixes = self._initialize_auto_fixes()
         
+        # Patterns compiled once; a fix is attached where its pattern is the detection pattern
+        self.security_rules = get_rule_set(
+            (Rule(pattern_def["pattern"], pattern_def["pattern"], data=(category, pattern_def),
+                  fix=self.auto_fixes.get(pattern_def["pattern"]))
+             for category, patterns in self.security_patterns.items()
+             for pattern_def in patterns),
+            flags=re.IGNORECASE,
+            name="SOC2 security",
+        )
+        
         logger.info("✅ SOC2 Code Compliance Engine initialized")
     
     def _initialize_security_patterns(self) -> Dict[SecurityCategory, List[Dict]]:
@@ -371,8 +384,6 @@ class SOC2CodeComplianceEngine:
         Returns:
             CodeComplianceResult with findings and fixes
         """
-        import re
-        
         logger.info(f"🔍 Starting SOC2 compliance verification for: {project_name}")
         
         # Initialize result
@@ -406,51 +417,49 @@ class SOC2CodeComplianceEngine:
             if self._is_binary_file(file_path):
                 continue
             
-            # Check against all security patterns
-            for category, patterns in self.security_patterns.items():
-                for pattern_def in patterns:
-                    pattern = pattern_def["pattern"]
-                    matches = list(re.finditer(pattern, content, re.IGNORECASE))
-                    
-                    for match in matches:
-                        # Calculate line number
-                        line_number = content[:match.start()].count('\n') + 1
-                        
-                        # Create finding
-                        finding = CodeSecurityFinding(
-                            finding_id=self._generate_finding_id(),
-                            category=category,
-                            severity=pattern_def["severity"],
-                            file_path=file_path,
-                            line_number=line_number,
-                            code_snippet=match.group(0)[:100],
-                            description=pattern_def["description"],
-                            remediation=pattern_def["remediation"],
-                            soc2_control=pattern_def["control"]
-                        )
-                        
-                        # Try auto-fix if enabled
-                        if auto_fix and pattern in self.auto_fixes:
-                            fix = self.auto_fixes[pattern]
-                            fixed_content = re.sub(pattern, fix, fixed_content, flags=re.IGNORECASE)
-                            finding.auto_fixed = True
-                            finding.fix_applied = fix
-                            result.auto_fixes_applied += 1
-                        else:
-                            result.manual_fixes_required += 1
-                        
-                        file_findings.append(finding)
-                        result.security_findings.append(finding)
-                        
-                        # Count by severity
-                        if pattern_def["severity"] == "CRITICAL":
-                            result.critical_findings += 1
-                        elif pattern_def["severity"] == "HIGH":
-                            result.high_findings += 1
-                        elif pattern_def["severity"] == "MEDIUM":
-                            result.medium_findings += 1
-                        else:
-                            result.low_findings += 1
+            # Check against all security patterns in one pass, then splice every fix at once
+            matches = self.security_rules.scan(content)
+            applied = set()
+            if auto_fix:
+                fixed_content, fixed = self.security_rules.apply_fixes(content, matches)
+                applied = {id(match) for match in fixed}
+            index = line_index(content)
+            
+            for match in matches:
+                category, pattern_def = match.rule.data
+                
+                # Create finding
+                finding = CodeSecurityFinding(
+                    finding_id=self._generate_finding_id(),
+                    category=category,
+                    severity=pattern_def["severity"],
+                    file_path=file_path,
+                    line_number=index.line_of(match.start),
+                    code_snippet=match.text[:100],
+                    description=pattern_def["description"],
+                    remediation=pattern_def["remediation"],
+                    soc2_control=pattern_def["control"]
+                )
+                
+                if id(match) in applied:
+                    finding.auto_fixed = True
+                    finding.fix_applied = match.rule.fix
+                    result.auto_fixes_applied += 1
+                else:
+                    result.manual_fixes_required += 1
+                
+                file_findings.append(finding)
+                result.security_findings.append(finding)
+                
+                # Count by severity
+                if pattern_def["severity"] == "CRITICAL":
+                    result.critical_findings += 1
+                elif pattern_def["severity"] == "HIGH":
+                    result.high_findings += 1
+                elif pattern_def["severity"] == "MEDIUM":
+                    result.medium_findings += 1
+                else:
+                    result.low_findings += 1
             
             if file_findings:
                 result.files_with_issues += 1
@@ -1,15 +1,37 @@
 """
 SOC2 Compliance RAG (Retrieval-Augmented Generation) Database
 Stores SOC2 Trust Services Criteria and Control Requirements in structured format
+
+Control search uses an inverted index built in _build_mappings: control names,
+descriptions and requirements are tokenized once, query terms also match as
+prefixes ("encrypt" finds "encryption"), and results are ranked with BM25. The
+index is rebuilt whenever a control is added after initialization; `version`
+(generate_hash) identifies the indexed state.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
+from bisect import bisect_left
 import json
+import math
+import re
 from datetime import datetime
 import hashlib
 
+# BM25 parameters and per-field term weights for control search
+SEARCH_BM25_K1 = 1.2
+SEARCH_BM25_B = 0.75
+SEARCH_FIELD_WEIGHTS = {"name": 3.0, "description": 1.0, "requirements": 1.0}
+# A query term that only matches as a prefix of an indexed term counts for less
+SEARCH_PREFIX_WEIGHT = 0.5
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
 class TrustServiceCriteria(Enum):
     """5 Trust Services Criteria for SOC2 Compliance"""
     SECURITY = "Security"
@@ -52,6 +74,11 @@ class SOC2RAGDatabase:
         self.controls: Dict[str, ControlRequirement] = {}
         self.tsc_mapping: Dict[str, List[str]] = {}
         self.cc_mapping: Dict[str, List[str]] = {}
+        self.version: Optional[str] = None  # generate_hash() of the indexed controls
+        self._postings: Dict[str, Dict[str, float]] = {}  # term -> control code -> weighted tf
+        self._vocabulary: List[str] = []  # sorted terms, for prefix lookups
+        self._doc_lengths: Dict[str, float] = {}
+        self._avg_doc_length = 0.0
         self._initialize_database()
     
     def _initialize_database(self):
@@ -506,9 +533,15 @@ class SOC2RAGDatabase:
     def _add_control(self, control: ControlRequirement):
         """Add control to database"""
         self.controls[control.code] = control
+        if self.version is not None:
+            # Added after initialization - the mappings and index are stale
+            self._build_mappings()
     
     def _build_mappings(self):
-        """Build Trust Service Criteria and Common Criteria mappings"""
+        """Build Trust Service Criteria and Common Criteria mappings and the search index"""
+        self.tsc_mapping = {}
+        self.cc_mapping = {}
+        common_criteria = {cc.value for cc in CommonCriteria}
         for code, control in self.controls.items():
             # Build TSC mapping
             tsc = control.trust_service
@@ -517,10 +550,55 @@ class SOC2RAGDatabase:
             self.tsc_mapping[tsc].append(code)
             
             # Build CC mapping for Common Criteria
-            if control.category in [cc.value for cc in CommonCriteria]:
+            if control.category in common_criteria:
                 if control.category not in self.cc_mapping:
                     self.cc_mapping[control.category] = []
                 self.cc_mapping[control.category].append(code)
+        
+        self._build_search_index()
+        self.version = self.generate_hash()
+    
+    def _build_search_index(self):
+        """Inverted index over control names, descriptions and requirements"""
+        postings: Dict[str, Dict[str, float]] = {}
+        doc_lengths: Dict[str, float] = {}
+        for code, control in self.controls.items():
+            fields = {
+                "name": tokenize(control.name),
+                "description": tokenize(control.description),
+                "requirements": [token for req in control.requirements for token in tokenize(req)],
+            }
+            length = 0.0
+            for field_name, tokens in fields.items():
+                weight = SEARCH_FIELD_WEIGHTS[field_name]
+                length += weight * len(tokens)
+                for token in tokens:
+                    term_postings = postings.setdefault(token, {})
+                    term_postings[code] = term_postings.get(code, 0.0) + weight
+            doc_lengths[code] = length
+        
+        self._postings = postings
+        self._vocabulary = sorted(postings)
+        self._doc_lengths = doc_lengths
+        self._avg_doc_length = (sum(doc_lengths.values()) / len(doc_lengths)) if doc_lengths else 0.0
+    
+    def _expand_term(self, term: str) -> List[Tuple[str, float]]:
+        """Indexed terms matching a query term: itself, then terms it is a prefix of"""
+        matches = []
+        start = bisect_left(self._vocabulary, term)
+        for candidate in self._vocabulary[start:]:
+            if not candidate.startswith(term):
+                break
+            matches.append((candidate, 1.0 if candidate == term else SEARCH_PREFIX_WEIGHT))
+        return matches
+    
+    def _bm25(self, term: str, code: str) -> float:
+        term_postings = self._postings[term]
+        tf = term_postings[code]
+        n = len(self._doc_lengths)
+        idf = math.log(1 + (n - len(term_postings) + 0.5) / (len(term_postings) + 0.5))
+        norm = 1 - SEARCH_BM25_B + SEARCH_BM25_B * self._doc_lengths[code] / (self._avg_doc_length or 1.0)
+        return idf * tf * (SEARCH_BM25_K1 + 1) / (tf + SEARCH_BM25_K1 * norm)
     
     def get_controls_by_tsc(self, tsc: str) -> List[ControlRequirement]:
         """Retrieve all controls for a Trust Service Criteria"""
@@ -536,16 +614,43 @@ class SOC2RAGDatabase:
         """Get specific control by code"""
         return self.controls.get(code)
     
-    def search_controls(self, keyword: str) -> List[ControlRequirement]:
-        """Search controls by keyword"""
-        results = []
-        keyword_lower = keyword.lower()
-        for control in self.controls.values():
-            if (keyword_lower in control.name.lower() or 
-                keyword_lower in control.description.lower() or
-                any(keyword_lower in req.lower() for req in control.requirements)):
-                results.append(control)
-        return results
+    def search_controls(self, keyword: str, limit: Optional[int] = None) -> List[ControlRequirement]:
+        """Search controls by keyword, best matches first
+        
+        Every query word must match a word in the control's name, description or
+        requirements, exactly or as a prefix.
+        """
+        terms = tokenize(keyword)
+        if not terms:
+            # Nothing indexable (e.g. punctuation only) - plain substring scan
+            keyword_lower = keyword.lower()
+            return [
+                control for control in self.controls.values()
+                if keyword_lower in control.name.lower()
+                or keyword_lower in control.description.lower()
+                or any(keyword_lower in req.lower() for req in control.requirements)
+            ]
+        
+        scores: Optional[Dict[str, float]] = None
+        for term in dict.fromkeys(terms):
+            # Best-scoring expansion per control, so one prefix can't add up many terms
+            term_scores: Dict[str, float] = {}
+            for indexed, weight in self._expand_term(term):
+                for code in self._postings[indexed]:
+                    score = weight * self._bm25(indexed, code)
+                    if score > term_scores.get(code, 0.0):
+                        term_scores[code] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {code: scores[code] + score for code, score in term_scores.items() if code in scores}
+            if not scores:
+                return []
+        
+        ranked = sorted(scores, key=lambda code: -scores[code])
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self.controls[code] for code in ranked]
     
     def get_all_controls(self) -> List[ControlRequirement]:
         """Get all controls in database"""
@@ -0,0 +1,566 @@
+"""
+SOC2 Readiness Assessments
+==========================
+Code-level SOC2 readiness scan behind GET /api/projects/{project_name}/compliance,
+with results persisted so the dashboard's polling doesn't re-download the project
+from S3 and re-run every pattern each time.
+
+- Keys: an assessment is stored per (project, tree hash, rule version). The tree
+  hash is built from the per-file content hashes in the project's version
+  manifest (project_versions.py), so checking for a cached result costs at most
+  one small HEAD.json read and no file downloads. Within
+  READINESS_HEAD_TTL_SECONDS of the last check not even that. (With
+  PROJECT_VERSIONING_ENABLED=false a check reads the working tree instead.)
+- Incremental: findings are also cached per file content hash. A new version only
+  scans (and only fetches blobs for) files whose content is new.
+- Saves: upload_project_to_s3() calls schedule_refresh(), which recomputes the
+  assessment on a background worker using the just-saved contents, so the next
+  dashboard poll is a cache hit.
+- Owners: which user's copy a requester's lookup resolved to is remembered in the
+  store, so the cross-user S3 search runs at most once per requester and project
+  instead of on every poll.
+
+Usage:
+    from soc2_readiness import readiness_service
+
+    found = readiness_service.get_assessment(project_slug, user_id)
+    if found:
+        result, etag = found
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from rule_engine import Rule, get_rule_set, line_index
+
+READINESS_CACHE_PATH = os.getenv(
+    "READINESS_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "readiness_cache.sqlite3"),
+)
+READINESS_HEAD_TTL_SECONDS = int(os.getenv("READINESS_HEAD_TTL_SECONDS", "30"))
+READINESS_MAX_FILE_ENTRIES = int(os.getenv("READINESS_MAX_FILE_ENTRIES", "20000"))
+READINESS_ASSESSMENTS_PER_PROJECT = 3
+READINESS_S3_CONCURRENCY = 8
+# Bump when the shape of the assessment changes so stored results are redone
+READINESS_FORMAT_VERSION = "1"
+
+READINESS_SKIPPED_EXTENSIONS = ('.md', '.json', '.lock', '.txt', '.svg', '.png', '.jpg', '.gif', '.ico')
+EMPTY_CONTENT_HASH = hashlib.sha256(b"").hexdigest()
+
+# STRICT Security Vulnerability Patterns - catches real issues
+SOC2_READINESS_VULNS = {
+    'secret_with_fallback': {
+        'pattern': r'(os\.getenv|os\.environ\.get|process\.env)[^,]*,\s*["\'"][^\"\'"]{4,}["\'"]',
+        'severity': 'CRITICAL', 'category': 'Secrets Management', 'control': 'CC6.1',
+        'description': 'Secret with hardcoded fallback - SOC2 violation',
+        'why': 'Default values mean secrets ARE in code. SOC2 requires no production secrets in code.',
+        'fix': 'Use os.environ["KEY"] to crash if missing, or use secrets manager'
+    },
+    'hardcoded_secret': {
+        'pattern': r'(password|secret|api_key|jwt_secret|secret_key|private_key)\s*[=:]\s*["\'"][^\"\'"]{8,}["\'"]',
+        'severity': 'CRITICAL', 'category': 'Secrets Management', 'control': 'CC6.1',
+        'description': 'Hardcoded secret in code',
+        'why': 'Can be extracted from repos, logs, or compiled binaries',
+        'fix': 'Move to environment variables or secrets manager'
+    },
+    'eval_exec': {
+        'pattern': r'\b(eval|exec)\s*\(',
+        'severity': 'CRITICAL', 'category': 'Code Injection', 'control': 'CC6.6',
+        'description': 'Dynamic code execution - allows arbitrary code injection',
+        'why': 'eval() is the most dangerous function in any language',
+        'fix': 'Remove eval/exec. Use JSON.parse() for data parsing'
+    },
+    'xss': {
+        'pattern': r'dangerouslySetInnerHTML|innerHTML\s*=',
+        'severity': 'HIGH', 'category': 'XSS', 'control': 'CC6.6',
+        'description': 'XSS vulnerability - direct HTML injection',
+        'why': 'Can steal sessions, credentials, execute malicious actions',
+        'fix': 'Use DOMPurify.sanitize() before rendering HTML'
+    },
+    'ssl_disabled': {
+        'pattern': r'verify\s*=\s*False|rejectUnauthorized\s*:\s*false',
+        'severity': 'CRITICAL', 'category': 'TLS', 'control': 'CC6.7',
+        'description': 'SSL/TLS verification disabled',
+        'why': 'Makes MITM attacks trivial',
+        'fix': 'Never disable certificate verification'
+    },
+    'http_plaintext': {
+        'pattern': r'["\'"]http://(?!localhost|127\.0\.0\.1)[^\s"\']+["\'"]',
+        'severity': 'HIGH', 'category': 'TLS', 'control': 'CC6.7',
+        'description': 'Plaintext HTTP URL',
+        'why': 'Data transmitted unencrypted',
+        'fix': 'Use HTTPS for all external communications'
+    },
+    'localstorage_auth': {
+        'pattern': r'localStorage\.(set|get)Item\([^)]*(?:token|auth|secret)',
+        'severity': 'HIGH', 'category': 'Data Protection', 'control': 'CC6.1',
+        'description': 'Auth tokens in localStorage',
+        'why': 'Any XSS vulnerability can steal localStorage data',
+        'fix': 'Use httpOnly cookies for auth tokens'
+    },
+    'empty_catch': {
+        'pattern': r'catch\s*\([^)]*\)\s*\{\s*\}|except:\s*pass',
+        'severity': 'MEDIUM', 'category': 'Error Handling', 'control': 'CC7.2',
+        'description': 'Swallowed errors - silent failure',
+        'why': 'Hides security incidents and bugs',
+        'fix': 'Log errors: catch(e) { logger.error(e); throw e; }'
+    },
+    'debug_code': {
+        'pattern': r'debugger;|console\.debug',
+        'severity': 'LOW', 'category': 'Code Quality', 'control': 'CC8.1',
+        'description': 'Debug code in codebase',
+        'why': 'Can expose internal state',
+        'fix': 'Remove before production deployment'
+    },
+}
+
+# Operational controls - CANNOT be verified from code alone
+SOC2_OPS_CONTROLS = {
+    'CC6.1': {'name': 'Access Control', 'needs': ['IAM policies', 'Access reviews', 'MFA config']},
+    'CC6.6': {'name': 'System Protection', 'needs': ['WAF config', 'Firewall rules']},
+    'CC6.7': {'name': 'Transmission Security', 'needs': ['TLS 1.2+ config', 'HSTS', 'Cert management']},
+    'CC7.1': {'name': 'Vulnerability Management', 'needs': ['Scan reports', 'Pen test results']},
+    'CC7.2': {'name': 'Security Monitoring', 'needs': ['SIEM config', 'Alerts', 'Log retention policy']},
+    'CC7.3': {'name': 'Incident Response', 'needs': ['IR plan', 'Postmortems', 'Communication procedures']},
+    'CC8.1': {'name': 'Change Management', 'needs': ['Change policy', 'Code review requirements']},
+    'CC9.1': {'name': 'Vendor Risk', 'needs': ['Vendor inventory', 'Security assessments']},
+}
+
+
+def readiness_rules():
+    return get_rule_set(
+        (Rule(vname, vinfo['pattern'], data=vinfo) for vname, vinfo in SOC2_READINESS_VULNS.items()),
+        name="SOC2 readiness",
+    )
+
+
+def readiness_version() -> str:
+    """Stored assessments are only reused while this is unchanged"""
+    return f"{readiness_rules().version}-{READINESS_FORMAT_VERSION}"
+
+
+def content_hash(content: str) -> str:
+    # Same digest as project_versions.content_hash, so manifest hashes can be used as-is
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def is_assessed(path: str, digest: str) -> bool:
+    return digest != EMPTY_CONTENT_HASH and not path.endswith(READINESS_SKIPPED_EXTENSIONS)
+
+
+def tree_hash(tree: Dict[str, str]) -> str:
+    """Hash of the assessed part of a project: path -> content hash"""
+    digest = hashlib.sha256()
+    for path in sorted(tree):
+        if is_assessed(path, tree[path]):
+            digest.update(f"{path}\0{tree[path]}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def scan_file(content: str) -> List[Dict[str, Any]]:
+    """Findings for one file's content (path-independent, so they cache by content hash)"""
+    index = line_index(content)
+    findings = []
+    for found in readiness_rules().scan(content):
+        vname, vinfo = found.rule.id, found.rule.data
+        line_num = index.line_of(found.start)
+        s = max(0, line_num - 3)
+        e = min(index.line_count, line_num + 3)
+        snippet_lines = []
+        for i in range(e - s):
+            actual_line = s + i + 1
+            marker = ">>>" if actual_line == line_num else "   "
+            snippet_lines.append(f"{actual_line:4d} {marker} {index.line_text(actual_line)}")
+
+        findings.append({
+            'type': vname,
+            'line': line_num,
+            'severity': vinfo['severity'],
+            'category': vinfo['category'],
+            'control': vinfo['control'],
+            'description': vinfo['description'],
+            'why_critical': vinfo['why'],
+            'remediation': vinfo['fix'],
+            'code_snippet': '\n'.join(snippet_lines),
+            'matched': found.text[:80]
+        })
+    return findings
+
+
+def build_assessment(file_findings: List[Tuple[str, List[Dict[str, Any]]]]) -> Dict[str, Any]:
+    """Readiness report from (path, findings) for every assessed file, in path order"""
+    issues = []
+    files_with_issues = set()
+    for path, findings in file_findings:
+        for finding in findings:
+            issues.append({
+                'id': f"VULN-{len(issues)+1:04d}",
+                'type': finding['type'],
+                'file': path,
+                **{key: value for key, value in finding.items() if key != 'type'},
+            })
+            files_with_issues.add(path)
+
+    # Calculate score (max 50 from code alone - code cannot prove compliance)
+    crit = len([i for i in issues if i['severity']=='CRITICAL'])
+    high = len([i for i in issues if i['severity']=='HIGH'])
+    med = len([i for i in issues if i['severity']=='MEDIUM'])
+    low = len([i for i in issues if i['severity']=='LOW'])
+
+    code_score = max(0, 50 - (crit*15 + high*8 + med*4 + low))
+    total = code_score  # No ops evidence = no additional points
+
+    level = 'NOT_READY'
+    if total >= 40: level = 'PARTIAL_READINESS'
+    elif total >= 25: level = 'EARLY_STAGE'
+
+    # Build controls assessment
+    ctrl_assess = {}
+    for cid, cinfo in SOC2_OPS_CONTROLS.items():
+        ctrl_issues = [i for i in issues if i['control']==cid]
+        ctrl_assess[cid] = {
+            'name': cinfo['name'],
+            'code_status': 'HAS_ISSUES' if ctrl_issues else 'NOT_VERIFIED',
+            'ops_status': 'MISSING',
+            'overall': 'FAILING' if ctrl_issues else 'NOT_VERIFIED',
+            'findings': len(ctrl_issues),
+            'required_evidence': cinfo['needs'],
+        }
+
+    secrets_issues = len([i for i in issues if i['category']=='Secrets Management'])
+
+    gaps = []
+    if secrets_issues > 0:
+        gaps.append({"priority": 1, "gap": "Secrets Management", "count": secrets_issues, "fix": "Use os.environ[] or secrets manager"})
+    gaps.append({"priority": 2, "gap": "Operational Evidence", "issue": "8 controls missing evidence", "fix": "Prepare IAM, monitoring, IR docs"})
+    gaps.append({"priority": 3, "gap": "TLS Enforcement", "issue": "No HSTS/TLS config evidence", "fix": "Configure TLS 1.2+, HSTS"})
+    gaps.append({"priority": 4, "gap": "Monitoring", "issue": "No SIEM/alerting detected", "fix": "Implement centralized logging"})
+
+    return {
+        "assessment_type": "SOC2_READINESS_SCAN",
+        "assessment_timestamp": datetime.utcnow().isoformat(),
+
+        "disclaimer": {
+            "title": "⚠️ READINESS Assessment - NOT Compliance Certification",
+            "text": "SOC2 is an operational trust framework requiring evidence artifacts, not just code scanning.",
+            "checks": ["Code vulnerabilities", "Hardcoded secrets (incl. fallback defaults)", "Dangerous patterns (eval, XSS, SQLi)"],
+            "cannot_verify": ["IAM policies", "TLS enforcement in prod", "Monitoring/alerting", "Incident response", "Change management"]
+        },
+
+        "readiness_score": round(total, 1),
+        "readiness_level": level,
+        "max_possible_score": 50,
+        "audit_ready": False,
+
+        "score_breakdown": {
+            "code_security": {"score": code_score, "max": 50, "deductions": f"Critical:-{crit*15} High:-{high*8} Med:-{med*4} Low:-{low}"},
+            "operational_evidence": {"score": 0, "max": 50, "reason": "No evidence artifacts provided - upload IAM, monitoring, IR docs"}
+        },
+
+        "findings_summary": {"critical": crit, "high": high, "medium": med, "low": low, "total": len(issues)},
+        "code_vulnerabilities": issues[:25],
+        "controls_assessment": ctrl_assess,
+        "critical_gaps": gaps,
+
+        "files_analyzed": len(file_findings),
+        "files_with_issues": len(files_with_issues),
+        "limitations": ["Cannot verify runtime behavior", "Cannot verify production configs", "Cannot verify operational procedures", "Pattern matching may have false positives"]
+    }
+
+
+class ReadinessStore:
+    """Assessments, per-file findings and resolved project owners (SQLite)"""
+
+    def __init__(self, path: str = READINESS_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS assessments ("
+                "project_key TEXT NOT NULL, tree_hash TEXT NOT NULL, rules_version TEXT NOT NULL, "
+                "etag TEXT NOT NULL, result TEXT NOT NULL, created_at REAL NOT NULL, "
+                "PRIMARY KEY (project_key, tree_hash, rules_version))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS file_findings ("
+                "content_hash TEXT NOT NULL, rules_version TEXT NOT NULL, findings TEXT NOT NULL, "
+                "created_at REAL NOT NULL, PRIMARY KEY (content_hash, rules_version))"
+            )
+            # Which owner's copy a requester's lookups resolved to, and its last known tree
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS resolved_projects ("
+                "project_slug TEXT NOT NULL, requester TEXT NOT NULL, owner TEXT NOT NULL, "
+                "tree_hash TEXT, checked_at REAL NOT NULL, PRIMARY KEY (project_slug, requester))"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_assessment(self, project_key: str, tree: str, version: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT result, etag FROM assessments WHERE project_key = ? AND tree_hash = ? AND rules_version = ?",
+                (project_key, tree, version),
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def put_assessment(self, project_key: str, tree: str, version: str, result: Dict[str, Any]) -> str:
+        etag = '"' + hashlib.sha256(f"{project_key}:{tree}:{version}".encode("utf-8")).hexdigest()[:32] + '"'
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO assessments (project_key, tree_hash, rules_version, etag, result, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (project_key, tree, version, etag, json.dumps(result), time.time()),
+            )
+            conn.execute(
+                "DELETE FROM assessments WHERE project_key = ? AND rowid NOT IN "
+                "(SELECT rowid FROM assessments WHERE project_key = ? ORDER BY created_at DESC LIMIT ?)",
+                (project_key, project_key, READINESS_ASSESSMENTS_PER_PROJECT),
+            )
+            conn.commit()
+        return etag
+
+    def get_file_findings(self, digests: Iterable[str], version: str) -> Dict[str, List[Dict[str, Any]]]:
+        digests = list(digests)
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(digests), 500):
+                chunk = digests[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT content_hash, findings FROM file_findings WHERE rules_version = ? "
+                    f"AND content_hash IN ({','.join('?' * len(chunk))})",
+                    [version, *chunk],
+                ).fetchall()
+                found.update({digest: json.loads(findings) for digest, findings in rows})
+        return found
+
+    def put_file_findings(self, findings: Dict[str, List[Dict[str, Any]]], version: str):
+        if not findings:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO file_findings (content_hash, rules_version, findings, created_at) VALUES (?, ?, ?, ?)",
+                [(digest, version, json.dumps(items), now) for digest, items in findings.items()],
+            )
+            self._writes += len(findings)
+            if self._writes >= 500:
+                self._writes = 0
+                conn.execute(
+                    "DELETE FROM file_findings WHERE rowid NOT IN "
+                    "(SELECT rowid FROM file_findings ORDER BY created_at DESC LIMIT ?)",
+                    (READINESS_MAX_FILE_ENTRIES,),
+                )
+            conn.commit()
+
+    def get_resolved(self, project_slug: str, requester: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT owner, tree_hash, checked_at FROM resolved_projects WHERE project_slug = ? AND requester = ?",
+                (project_slug, requester),
+            ).fetchone()
+        return {"owner": row[0], "tree_hash": row[1], "checked_at": row[2]} if row else None
+
+    def put_resolved(self, project_slug: str, requester: str, owner: str, tree: Optional[str]):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO resolved_projects (project_slug, requester, owner, tree_hash, checked_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (project_slug, requester, owner, tree, time.time()),
+            )
+            conn.commit()
+
+    def mark_changed(self, project_slug: str):
+        """The project was saved - make every requester re-check its tree"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("UPDATE resolved_projects SET checked_at = 0 WHERE project_slug = ?", (project_slug,))
+            conn.commit()
+
+
+def _contents_by_hash(files: Optional[List[Dict[str, Any]]]) -> Dict[str, str]:
+    contents = {}
+    for file in files or []:
+        content = file.get('content', '') or ''
+        contents[content_hash(content)] = content
+    return contents
+
+
+def _manifest_tree(manifest: Dict[str, Any]) -> Dict[str, str]:
+    return {path: entry["hash"] for path, entry in manifest["files"].items()}
+
+
+class ReadinessService:
+    """Serves stored assessments and recomputes them incrementally when a project changes"""
+
+    def __init__(self, store: ReadinessStore):
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="readiness")
+        self._project_locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._queued: Dict[Tuple[str, str], Dict[str, Any]] = {}  # (owner, slug) -> pending refresh
+
+    def _lock(self, project_key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._project_locks.setdefault(project_key, threading.Lock())
+
+    # --- Locating the project -------------------------------------------------
+
+    def _find_tree(self, project_slug: str, requester: str) -> Tuple[Optional[str], Optional[Dict[str, str]], Optional[List[Dict]]]:
+        """(owner, path -> content hash, downloaded files when no manifest was available)"""
+        from s3_storage import get_project_from_s3, get_cached_user_id_for_project, find_project_user_id, PROJECT_VERSIONING_ENABLED
+
+        resolved = self.store.get_resolved(project_slug, requester)
+        candidates = []
+        for candidate in (resolved and resolved["owner"], requester, 'anonymous', get_cached_user_id_for_project(project_slug)):
+            if candidate and candidate not in candidates:
+                candidates.append(candidate)
+
+        if PROJECT_VERSIONING_ENABLED:
+            from project_versions import version_store
+            for owner in candidates:
+                try:
+                    manifest = version_store.get_head(project_slug, owner)
+                except Exception as e:
+                    print(f"⚠️ Could not read version head for {project_slug}: {e}")
+                    manifest = None
+                if manifest is not None:
+                    return owner, _manifest_tree(manifest), None
+
+        # No history yet - read the working tree
+        owners = candidates
+        for attempt in range(2):
+            for owner in owners:
+                project_data = get_project_from_s3(project_slug=project_slug, user_id=owner)
+                if project_data and project_data.get('files'):
+                    files = project_data['files']
+                    tree = {f.get('path', ''): content_hash(f.get('content', '') or '') for f in files}
+                    return owner, tree, files
+            if attempt == 0:
+                # Last resort, once per requester: search every user's folder
+                found = find_project_user_id(project_slug)
+                owners = [found] if found and found not in candidates else []
+        return None, None, None
+
+    def _fetch_contents(self, project_slug: str, owner: str, digests: List[str]) -> Dict[str, str]:
+        from project_versions import version_store
+
+        def fetch(digest: str) -> Tuple[str, str]:
+            return digest, version_store.read_blob(project_slug, owner, digest)
+
+        if len(digests) <= 1:
+            return dict(fetch(digest) for digest in digests)
+        with ThreadPoolExecutor(max_workers=min(READINESS_S3_CONCURRENCY, len(digests))) as pool:
+            return dict(pool.map(fetch, digests))
+
+    # --- Assessing --------------------------------------------------------------
+
+    def _assess(self, project_slug: str, owner: str, tree: Dict[str, str], contents: Dict[str, str]) -> Tuple[Dict[str, Any], str]:
+        """Assessment for tree, scanning only content not seen before"""
+        project_key = f"{owner}/{project_slug}"
+        version = readiness_version()
+        tree_id = tree_hash(tree)
+        cached = self.store.get_assessment(project_key, tree_id, version)
+        if cached is not None:
+            return cached
+
+        assessed = {path: digest for path, digest in tree.items() if is_assessed(path, digest)}
+        findings = self.store.get_file_findings(set(assessed.values()), version)
+        missing = [digest for digest in set(assessed.values()) if digest not in findings]
+        unfetched = [digest for digest in missing if digest not in contents]
+        if unfetched:
+            contents = {**contents, **self._fetch_contents(project_slug, owner, unfetched)}
+        scanned = {digest: scan_file(contents[digest]) for digest in missing}
+        self.store.put_file_findings(scanned, version)
+        findings.update(scanned)
+
+        result = build_assessment([(path, findings[assessed[path]]) for path in sorted(assessed)])
+        etag = self.store.put_assessment(project_key, tree_id, version, result)
+        print(f"🛡️ SOC2 readiness for {project_slug}: scanned {len(missing)}/{len(assessed)} files")
+        return result, etag
+
+    def get_assessment(self, project_slug: str, requester: str = 'anonymous') -> Optional[Tuple[Dict[str, Any], str]]:
+        """(assessment, etag) for the project's current content, or None if it doesn't exist"""
+        resolved = self.store.get_resolved(project_slug, requester)
+        if resolved and resolved["tree_hash"] and time.time() - resolved["checked_at"] < READINESS_HEAD_TTL_SECONDS:
+            cached = self.store.get_assessment(f"{resolved['owner']}/{project_slug}", resolved["tree_hash"], readiness_version())
+            if cached is not None:
+                return cached
+
+        owner, tree, files = self._find_tree(project_slug, requester)
+        if owner is None:
+            return None
+        # Waits for an in-flight background refresh of the same project instead of duplicating it
+        with self._lock(f"{owner}/{project_slug}"):
+            assessment = self._assess(project_slug, owner, tree, _contents_by_hash(files))
+        self.store.put_resolved(project_slug, requester, owner, tree_hash(tree))
+        return assessment
+
+    # --- Background refresh after saves ---------------------------------------------
+
+    def schedule_refresh(self, project_slug: str, user_id: str, files: List[Dict[str, str]], manifest: Optional[Dict[str, Any]] = None):
+        """Recompute the assessment off the request path after a save
+
+        files are the contents just saved (they need no download); manifest is the
+        version the save produced, when history is enabled.
+        """
+        self.store.mark_changed(project_slug)
+        key = (user_id, project_slug)
+        with self._locks_guard:
+            queued = self._queued.get(key)
+            if queued is not None:
+                # Coalesce with the refresh that hasn't started yet
+                queued["contents"].update(_contents_by_hash(files))
+                queued["manifest"] = manifest or queued["manifest"]
+                return
+            self._queued[key] = {"contents": _contents_by_hash(files), "manifest": manifest}
+        self._executor.submit(self._refresh, project_slug, user_id)
+
+    def _refresh(self, project_slug: str, user_id: str):
+        with self._locks_guard:
+            queued = self._queued.pop((user_id, project_slug), None)
+        if queued is None:
+            return
+        try:
+            manifest = queued["manifest"]
+            if manifest is not None:
+                tree, files = _manifest_tree(manifest), None
+            else:
+                from s3_storage import get_project_from_s3
+                project_data = get_project_from_s3(project_slug=project_slug, user_id=user_id)
+                if not project_data or not project_data.get('files'):
+                    return
+                files = project_data['files']
+                tree = {f.get('path', ''): content_hash(f.get('content', '') or '') for f in files}
+            with self._lock(f"{user_id}/{project_slug}"):
+                self._assess(project_slug, user_id, tree, {**queued["contents"], **_contents_by_hash(files)})
+        except Exception as e:
+            print(f"⚠️ Background SOC2 readiness refresh failed for {project_slug}: {e}")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global readiness service instance
+readiness_service = ReadinessService(ReadinessStore())
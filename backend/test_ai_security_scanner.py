@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test per-file project scans
+
+Runs the pattern-only scanner (no Gemini key) against a temporary result
+cache to check that findings are cached per file, only changed files are
+rescanned, non-source files are skipped and every alert names its file.
+"""
+
+import asyncio
+import sys
+
+import pytest
+
+import ai_security_scanner
+from ai_security_scanner import AISecurityScanner, ScanResultCache, ScanType
+
+FILES = {
+    "src/App.jsx": "export default function App({ html }) {\n  el.innerHTML = html;\n}\n",
+    "src/util.js": "export const add = (a, b) => a + b;\n",
+    "README.md": "el.innerHTML = userInput;\n",
+    "public/logo.png": "",
+}
+
+
+@pytest.fixture(autouse=True)
+def result_cache(tmp_path, monkeypatch):
+    cache = ScanResultCache(str(tmp_path / "scans.db"))
+    monkeypatch.setattr(ai_security_scanner, "scan_result_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def scanner(monkeypatch):
+    scanner = AISecurityScanner(gemini_api_key=None)
+    scanned = []
+    pattern_scan = scanner._pattern_scan
+
+    def recording_pattern_scan(code, language):
+        scanned.append(code)
+        return pattern_scan(code, language)
+
+    monkeypatch.setattr(scanner, "_pattern_scan", recording_pattern_scan)
+    scanner.scanned = scanned
+    return scanner
+
+
+def _scan(scanner, files=FILES):
+    return asyncio.run(scanner.scan_project(files, ScanType.STANDARD, "shop"))
+
+
+def test_only_source_files_are_scanned(scanner):
+    result = _scan(scanner)
+    assert result.files == {"total": 2, "scanned": 2, "cached": 0}
+    assert len(scanner.scanned) == 2
+    assert result.alerts and {alert["file"] for alert in result.alerts} == {"src/App.jsx"}
+    assert all(alert["url"].startswith("src/App.jsx:line:") for alert in result.alerts)
+
+
+def test_rescan_uses_cached_findings(scanner):
+    first = _scan(scanner)
+    second = _scan(scanner)
+    assert second.files == {"total": 2, "scanned": 0, "cached": 2}
+    assert len(scanner.scanned) == 2
+    assert [alert["file"] for alert in second.alerts] == [alert["file"] for alert in first.alerts]
+
+
+def test_only_changed_files_are_rescanned(scanner):
+    _scan(scanner)
+    changed = {**FILES, "src/util.js": "export const run = (code) => eval(code);\n"}
+    result = _scan(scanner, changed)
+    assert result.files == {"total": 2, "scanned": 1, "cached": 1}
+    assert scanner.scanned[-1] == changed["src/util.js"]
+    assert {alert["file"] for alert in result.alerts} == {"src/App.jsx", "src/util.js"}
+
+
+def test_cache_keys_include_scan_configuration(result_cache):
+    scanner = AISecurityScanner(gemini_api_key=None)
+    content = FILES["src/App.jsx"]
+    assert scanner._file_cache_key(content, "javascript", ScanType.STANDARD) != \
+        scanner._file_cache_key(content, "javascript", ScanType.DEEP)
+
+    result_cache.put("key", [{"name": "XSS"}])
+    assert result_cache.get_many(["key", "missing"]) == {"key": [{"name": "XSS"}]}
+    assert result_cache.get_many([]) == {}
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test password hashing on the bounded bcrypt pool
+
+Uses the minimum bcrypt cost so the suite stays fast; checks hash/verify
+round trips, rehash detection, queue-full rejection and the per-account
+login cap.
+"""
+
+import asyncio
+import sys
+import threading
+
+import pytest
+
+import auth
+from auth import LoginThrottledError, PasswordHasher, PasswordHasherBusyError, needs_rehash
+
+
+@pytest.fixture(autouse=True)
+def cheap_bcrypt(monkeypatch):
+    monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 4)
+
+
+def test_hash_and_verify_run_on_the_pool():
+    hasher = PasswordHasher(workers=2, max_queue=4)
+
+    async def scenario():
+        hashed = await hasher.hash("correct horse")
+        return hashed, await hasher.verify("correct horse", hashed), await hasher.verify("wrong", hashed)
+
+    hashed, good, bad = asyncio.run(scenario())
+    assert good and not bad
+    stats = hasher.stats()
+    assert stats["completed"] == 3 and stats["in_flight"] == 0 and stats["queue_depth"] == 0
+
+
+def test_needs_rehash_compares_work_factor(monkeypatch):
+    weak = auth.hash_password("secret")
+    assert not needs_rehash(weak)
+    monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 5)
+    assert needs_rehash(weak)
+    assert not needs_rehash("not-a-bcrypt-hash")
+
+
+def test_full_queue_rejects_instead_of_piling_up():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    release = threading.Event()
+
+    def blocked(_):
+        release.wait(5)
+        return "done"
+
+    async def scenario():
+        running = [asyncio.ensure_future(hasher._run(blocked, i)) for i in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(PasswordHasherBusyError):
+            await hasher._run(blocked, 2)
+        release.set()
+        return await asyncio.gather(*running)
+
+    assert asyncio.run(scenario()) == ["done", "done"]
+    assert hasher.rejected == 1
+
+
+def test_concurrent_logins_are_capped_per_account(monkeypatch):
+    monkeypatch.setattr(auth, "LOGIN_MAX_CONCURRENT_PER_ACCOUNT", 2)
+    hasher = PasswordHasher(workers=1, max_queue=1)
+
+    async def scenario():
+        async with hasher.account_slot("Alice@example.com"):
+            async with hasher.account_slot("alice@example.com"):
+                with pytest.raises(LoginThrottledError):
+                    async with hasher.account_slot("ALICE@example.com"):
+                        pass
+                # Other accounts are unaffected
+                async with hasher.account_slot("bob@example.com"):
+                    pass
+
+    asyncio.run(scenario())
+    assert hasher.throttled == 1
+    assert hasher.stats()["accounts_in_flight"] == 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test the persisted chat history store
+
+Checks conversation ownership (list/get/ensure are scoped to the user who
+started the conversation) and the capped prompt window with its summary.
+"""
+
+import os
+import tempfile
+
+import chat_history_store as store_module
+from chat_history_store import ChatHistoryStore
+
+
+def _store(tmp: str) -> ChatHistoryStore:
+    return ChatHistoryStore(os.path.join(tmp, "chat.sqlite3"))
+
+
+def test_conversations_are_scoped_to_their_owner():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        alice = store.ensure_conversation(None, "demo", "alice")
+        store.append(alice, "user", "Alice's secret plan")
+
+        assert [c["conversation_id"] for c in store.list_conversations("demo", "alice")] == [alice]
+        assert store.list_conversations("demo", "bob") == []
+        assert store.get_conversation(alice, "bob") is None
+        assert store.get_conversation(alice, "alice")["turn_count"] == 1
+
+        # Another user (or an anonymous caller) presenting Alice's id gets a fresh conversation
+        assert store.ensure_conversation(alice, "demo", "bob") != alice
+        assert store.ensure_conversation(alice, "demo", None) != alice
+        assert store.ensure_conversation(alice, "other-project", "alice") != alice
+        assert store.ensure_conversation(alice, "demo", "alice") == alice
+        store.close()
+
+
+def test_prompt_context_is_capped_with_summary():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        conversation_id = store.create_conversation("demo", "alice")
+        total = store_module.CHAT_HISTORY_WINDOW + store_module.CHAT_SUMMARY_TRIGGER + 5
+        for i in range(total):
+            store.append(conversation_id, "user" if i % 2 == 0 else "assistant", f"Turn {i}. More detail here.")
+
+        summary, window = store.get_prompt_context(conversation_id)
+
+        assert len(window) == store_module.CHAT_HISTORY_WINDOW
+        assert window[-1]["content"].startswith(f"Turn {total - 1}.")
+        assert "- User: Turn 0." in summary
+        assert "More detail" not in summary
+        store.close()
+
+
+if __name__ == "__main__":
+    test_conversations_are_scoped_to_their_owner()
+    test_prompt_context_is_capped_with_summary()
+    print("✅ Chat history store tests passed")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test streaming /ws/chat replies
+
+A fake ai_assistant module stands in for the Gemini stream, so the checks cover
+delta/final framing, persistence of completed answers, and that cancellation,
+a disconnected socket or a failing model all stop the worker reading the stream.
+"""
+
+import asyncio
+import sys
+import threading
+import types
+
+import pytest
+
+from chat_stream import stream_chat_reply
+
+HEADING = "⚡ **Quick Analysis** (Fast Model)\n\n"
+
+
+class FakeModel:
+    """Yields the given chunks, optionally blocking until the reader cancels"""
+
+    def __init__(self, chunks, block=False, error=None):
+        self.chunks = chunks
+        self.block = block
+        self.error = error
+        self.cancel_event = None
+        self.finished = threading.Event()
+
+    def stream_chat_response(self, history, model_type='fast', cancel_event=None):
+        self.cancel_event = cancel_event
+        try:
+            yield HEADING
+            for chunk in self.chunks:
+                if cancel_event.is_set():
+                    return
+                yield chunk
+            if self.error:
+                raise self.error
+            if self.block:
+                cancel_event.wait(5)
+        finally:
+            self.finished.set()
+
+
+@pytest.fixture
+def model(monkeypatch):
+    def install(*args, **kwargs):
+        fake = FakeModel(*args, **kwargs)
+        module = types.ModuleType("ai_assistant")
+        module.stream_chat_response = fake.stream_chat_response
+        module.format_chat_response = lambda text: text.strip()
+        monkeypatch.setitem(sys.modules, "ai_assistant", module)
+        return fake
+    return install
+
+
+def _reply(sent, recorded, send=None):
+    async def default_send(message):
+        sent.append(message)
+    return stream_chat_reply(
+        send or default_send, [{"role": "user", "content": "hi"}], "hi", "req-1", "conv-1",
+        lambda *turn: recorded.append(turn)
+    )
+
+
+def test_deltas_then_final_response_with_the_model_heading(model):
+    model(["Hello", " world"])
+    sent, recorded = [], []
+    asyncio.run(_reply(sent, recorded))
+
+    assert [m["type"] for m in sent] == ["chat_typing", "chat_delta", "chat_delta", "chat_delta", "chat_response"]
+    assert "".join(m["delta"] for m in sent if m["type"] == "chat_delta") == HEADING + "Hello world"
+    final = sent[-1]
+    assert final["message"] == HEADING + "Hello world"
+    assert final["request_id"] == "req-1" and final["conversation_id"] == "conv-1"
+    assert recorded == [("conv-1", "hi", HEADING + "Hello world")]
+
+
+def test_cancel_stops_the_model_and_drops_the_answer(model):
+    fake = model(["partial"], block=True)
+    sent, recorded = [], []
+
+    async def scenario():
+        task = asyncio.create_task(_reply(sent, recorded))
+        while not any(m["type"] == "chat_delta" and m["delta"] == "partial" for m in sent):
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return task
+
+    task = asyncio.run(scenario())
+    assert task.cancelled()
+    assert fake.cancel_event.is_set() and fake.finished.wait(2)
+    assert "chat_response" not in [m["type"] for m in sent]
+    assert recorded == []
+
+
+def test_disconnected_socket_stops_the_model(model):
+    fake = model(["never delivered"], block=True)
+    recorded = []
+
+    async def gone(message):
+        if message["type"] == "chat_delta":
+            raise RuntimeError("socket closed")
+
+    asyncio.run(_reply([], recorded, send=gone))
+    assert fake.cancel_event.is_set() and fake.finished.wait(2)
+    assert recorded == []
+
+
+def test_model_failure_becomes_a_chat_error(model):
+    model(["half"], error=ValueError("stream broke"))
+    sent, recorded = [], []
+    asyncio.run(_reply(sent, recorded))
+
+    assert sent[-1]["type"] == "chat_error"
+    assert "stream broke" in sent[-1]["message"] and sent[-1]["request_id"] == "req-1"
+    assert recorded == []
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test the Chatterbox TTS utterance cache
+
+torch and torchaudio are replaced with small stand-ins (a fake model returns
+PCM samples, torchaudio.save writes a real WAV), so the checks cover the
+inference-thread offload, cache hits and shared in-flight synthesis, LRU
+eviction, and that in-flight renders never count towards the cache limit.
+"""
+
+import asyncio
+import contextlib
+import importlib
+import os
+import sys
+import threading
+import types
+import wave
+
+import pytest
+
+
+class FakeWav(list):
+    def cpu(self):
+        return self
+
+
+class FakeModel:
+    sr = 8000
+
+    def __init__(self):
+        self.calls = []
+        self.threads = set()
+
+    def generate(self, text, audio_prompt_path=None):
+        self.calls.append(text)
+        self.threads.add(threading.current_thread().name)
+        return FakeWav([len(text)] * 80)
+
+
+def _save(path, samples, sample_rate, format=None, encoding=None, bits_per_sample=16):
+    assert format == "wav"
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(bits_per_sample // 8)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(b"".join(int(s).to_bytes(2, "little", signed=True) for s in samples))
+
+
+@pytest.fixture
+def tts(tmp_path, monkeypatch):
+    torch = types.ModuleType("torch")
+    torch.cuda = types.SimpleNamespace(is_available=lambda: False)
+    torch.inference_mode = contextlib.nullcontext
+    torchaudio = types.ModuleType("torchaudio")
+    torchaudio.save = _save
+    monkeypatch.setitem(sys.modules, "torch", torch)
+    monkeypatch.setitem(sys.modules, "torchaudio", torchaudio)
+    monkeypatch.delitem(sys.modules, "chatterbox_tts", raising=False)
+    monkeypatch.chdir(tmp_path)
+
+    module = importlib.import_module("chatterbox_tts")
+    manager = module.ChatterboxTTSManager(device="cpu")
+    manager.english_model = FakeModel()
+    manager.sample_rate = FakeModel.sr
+    manager.is_initialized = True
+    yield module, manager
+    sys.modules.pop("chatterbox_tts", None)
+
+
+def _write_wav(path, size, mtime):
+    path.write_bytes(b"\0" * size)
+    os.utime(path, (mtime, mtime))
+
+
+def test_synthesis_runs_on_the_tts_thread_and_is_cached(tts):
+    _, manager = tts
+
+    async def scenario():
+        # Identical concurrent requests share one synthesis
+        first = await asyncio.gather(*(manager.generate_speech("Hello there.") for _ in range(3)))
+        again = await manager.generate_speech("Hello there.")
+        return first, again
+
+    first, again = asyncio.run(scenario())
+    model = manager.english_model
+    assert model.calls == ["Hello there."]
+    assert model.threads and all(name.startswith("tts") for name in model.threads)
+    assert len(set(first)) == 1 and again == first[0]
+    assert manager.get_cache_stats()["misses"] == 1 and manager.get_cache_stats()["hits"] == 3
+    with wave.open(again, "rb") as wav_file:
+        assert wav_file.getframerate() == FakeModel.sr and wav_file.getnframes() == 80
+    assert not list(manager.cache_dir.glob("*.part"))
+
+
+def test_cache_evicts_least_recently_used_first(tts, monkeypatch):
+    module, manager = tts
+    monkeypatch.setattr(module, "TTS_CACHE_MAX_BYTES", 250)
+    for age, name in enumerate(["newest", "middle", "oldest"]):
+        _write_wav(manager.cache_dir / f"{name}.wav", 100, 1_000_000 - age * 100)
+
+    assert manager.enforce_cache_limit() == 1
+    assert sorted(p.stem for p in manager.cache_dir.glob("*.wav")) == ["middle", "newest"]
+
+
+def test_in_flight_renders_are_not_counted_or_evicted(tts, monkeypatch):
+    module, manager = tts
+    monkeypatch.setattr(module, "TTS_CACHE_MAX_BYTES", 150)
+    _write_wav(manager.cache_dir / "done.wav", 100, 1_000_000)
+    rendering = manager.cache_dir / "next.wav.part"
+    _write_wav(rendering, 1000, 1)
+
+    assert manager.enforce_cache_limit() == 0
+    assert rendering.exists() and (manager.cache_dir / "done.wav").exists()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
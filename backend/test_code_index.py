@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Test the symbol-level project code index
+
+Builds a small JSX + FastAPI project on disk and checks chunking, BM25
+ranking/selection, per-file refresh on (mtime, size) changes and the
+update_file() override used for saves that only reach S3.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from code_index import CodeIndexRegistry, ProjectCodeIndex, format_chunks, parse_python, parse_script, tokenize
+
+APP_JSX = """import React, { useState } from 'react';
+import './App.css';
+
+// Shopping cart badge in the header
+function CartBadge({ count }) {
+  return <span className="badge">{count}</span>;
+}
+
+function LoginButton({ onLogin }) {
+  const handleLoginClick = () => {
+    onLogin();
+  };
+  return (
+    <button className="login-button" onClick={handleLoginClick}>
+      Log in
+    </button>
+  );
+}
+
+export default function App() {
+  const [count, setCount] = useState(0);
+  return (
+    <div>
+      <CartBadge count={count} />
+      <LoginButton onLogin={() => setCount(count + 1)} />
+    </div>
+  );
+}
+"""
+
+MAIN_PY = """from fastapi import FastAPI
+from pydantic import BaseModel
+
+app = FastAPI()
+
+
+class Product(BaseModel):
+    name: str
+    price: float
+
+
+@app.get("/api/products")
+def list_products():
+    return []
+
+
+@app.post("/api/orders")
+def create_order(order: dict):
+    return {"ok": True}
+"""
+
+
+def _write_project(root: Path):
+    (root / "frontend" / "src").mkdir(parents=True)
+    (root / "backend").mkdir()
+    (root / "frontend" / "src" / "App.jsx").write_text(APP_JSX)
+    (root / "backend" / "main.py").write_text(MAIN_PY)
+
+
+def _touch(path: Path, content: str):
+    """Rewrite a file and move its mtime forward so the change is always visible"""
+    previous = path.stat().st_mtime_ns
+    path.write_text(content)
+    os.utime(path, ns=(previous + 10**9, previous + 10**9))
+
+
+def test_tokenize_splits_identifiers():
+    terms = tokenize("handleLoginClick user_profile")
+    assert {"handleloginclick", "handle", "login", "click", "user", "profile"} <= set(terms)
+
+
+def test_parsers_produce_symbol_chunks():
+    script = {(c.kind, c.name) for c in parse_script("frontend/src/App.jsx", APP_JSX)}
+    assert {("component", "CartBadge"), ("component", "LoginButton"), ("component", "App"), ("module", "App.jsx")} <= script
+
+    python = {(c.kind, c.name) for c in parse_python("backend/main.py", MAIN_PY)}
+    assert {("model", "Product"), ("route", "list_products"), ("route", "create_order"), ("module", "main.py")} <= python
+
+    badge = next(c for c in parse_script("frontend/src/App.jsx", APP_JSX) if c.name == "CartBadge")
+    assert badge.text.startswith("// Shopping cart badge")
+
+
+def test_ranking_follows_the_request():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _write_project(root)
+        index = ProjectCodeIndex(root)
+        index.refresh()
+
+        assert index.select("make the login button bigger")[0].name == "LoginButton"
+        assert index.select("add a discount field to the product model")[0].name == "Product"
+        assert index.select("the orders endpoint should validate input")[0].name == "create_order"
+
+        # A vague request falls back to the entry component
+        assert index.select("make it nicer")[0].name == "App"
+
+
+def test_selection_respects_budget_and_formats_verbatim():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _write_project(root)
+        index = ProjectCodeIndex(root)
+        index.refresh()
+
+        selected = index.select("login button cart badge products orders", token_budget=60)
+        assert selected
+        assert sum(c.token_estimate for c in selected) <= 60
+
+        block = format_chunks(selected)
+        for chunk in selected:
+            assert chunk.text in block
+
+
+def test_refresh_only_reparses_changed_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _write_project(root)
+        index = ProjectCodeIndex(root)
+        index.refresh()
+        assert index.parses == 2
+
+        index.refresh()
+        assert index.parses == 2
+
+        _touch(root / "backend" / "main.py", MAIN_PY + "\n\n@app.delete('/api/orders/{order_id}')\ndef cancel_order(order_id: str):\n    return {}\n")
+        index.refresh()
+        assert index.parses == 3
+        assert index.select("cancel an order")[0].name == "cancel_order"
+
+        (root / "backend" / "main.py").unlink()
+        index.refresh()
+        assert all(c.file_path != "backend/main.py" for c in index.chunks())
+
+
+def test_update_file_overrides_until_disk_changes():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _write_project(root)
+        registry = CodeIndexRegistry()
+        registry.build_context("shop", root, "login")
+
+        # A save that only went to S3: the index must use it even though disk is unchanged
+        s3_content = APP_JSX.replace("function CartBadge", "function WishlistBadge")
+        registry.update_file("shop", "frontend/src/App.jsx", s3_content)
+        index = registry.get("shop", root)
+        index.refresh()
+        names = {c.name for c in index.chunks()}
+        assert "WishlistBadge" in names and "CartBadge" not in names
+
+        # S3-only files are kept across refreshes
+        registry.update_file("shop", "frontend/src/Extra.jsx", "export function PromoBanner() {\n  return null;\n}\n")
+        index.refresh()
+        assert "PromoBanner" in {c.name for c in index.chunks()}
+
+        # Once the disk copy changes again it wins
+        _touch(root / "frontend" / "src" / "App.jsx", APP_JSX)
+        index.refresh()
+        assert "CartBadge" in {c.name for c in index.chunks()}
+
+
+def test_registry_evicts_least_recently_used_projects():
+    registry = CodeIndexRegistry(max_projects=2)
+    first = registry.get("one", Path("/nonexistent/one"))
+    registry.get("two", Path("/nonexistent/two"))
+    registry.get("one")
+    registry.get("three", Path("/nonexistent/three"))
+
+    assert registry.stats()["projects"] == 2
+    assert registry.get("one") is first
+    # "two" was evicted, so it comes back as a fresh index at the default location
+    assert registry.get("two").root == Path("generated_projects") / "two"
+
+
+if __name__ == "__main__":
+    test_tokenize_splits_identifiers()
+    test_parsers_produce_symbol_chunks()
+    test_ranking_follows_the_request()
+    test_selection_respects_budget_and_formats_verbatim()
+    test_refresh_only_reparses_changed_files()
+    test_update_file_overrides_until_disk_changes()
+    test_registry_evicts_least_recently_used_projects()
+    print("✅ Code index tests passed")
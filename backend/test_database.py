@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test the authenticated-user cache
+
+Checks that cached users are copies, expire after their TTL, are evicted
+least-recently-used first, and are invalidated whenever UserModel updates
+the user (including deactivation).
+"""
+
+import sys
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+import database
+from database import MongoDB, UserModel, UserPrincipalCache
+
+USER_ID = str(ObjectId())
+
+
+def _user(**overrides):
+    return {"_id": USER_ID, "email": "alice@example.com", "is_active": True, "hashed_password": "$2b$12$x", **overrides}
+
+
+def test_cached_users_are_copies():
+    cache = UserPrincipalCache(ttl_seconds=30, max_size=10)
+    cache.put(USER_ID, _user())
+    user = cache.get(USER_ID)
+    user.pop("hashed_password")
+    assert cache.get(USER_ID)["hashed_password"] == "$2b$12$x"
+    assert cache.stats()["hits"] == 2
+
+
+def test_entries_expire(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(database.time, "monotonic", lambda: clock[0])
+    cache = UserPrincipalCache(ttl_seconds=30, max_size=10)
+    cache.put(USER_ID, _user())
+    clock[0] += 29
+    assert cache.get(USER_ID) is not None
+    clock[0] += 2
+    assert cache.get(USER_ID) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_is_evicted():
+    cache = UserPrincipalCache(ttl_seconds=30, max_size=2)
+    cache.put("a", {"_id": "a"})
+    cache.put("b", {"_id": "b"})
+    cache.get("a")
+    cache.put("c", {"_id": "c"})
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = UserPrincipalCache(ttl_seconds=0, max_size=10)
+    cache.put(USER_ID, _user())
+    assert cache.get(USER_ID) is None
+
+
+class FakeUsers:
+    def __init__(self):
+        self.updates = []
+        self.fail = False
+
+    def update_one(self, query, update):
+        if self.fail:
+            raise RuntimeError("connection reset")
+        self.updates.append((query, update))
+        return SimpleNamespace(modified_count=1)
+
+
+@pytest.fixture
+def fake_users(monkeypatch):
+    users = FakeUsers()
+    monkeypatch.setattr(MongoDB, "_db", SimpleNamespace(users=users))
+    return users
+
+
+def test_user_updates_invalidate_the_cache(fake_users, monkeypatch):
+    cache = UserPrincipalCache(ttl_seconds=30, max_size=10)
+    monkeypatch.setattr(database, "user_cache", cache)
+    cache.put(USER_ID, _user())
+
+    assert UserModel().deactivate_user(USER_ID)
+    assert cache.get(USER_ID) is None
+    assert fake_users.updates[0][1]["$set"]["is_active"] is False
+
+    # Invalidation also happens when the update itself fails
+    cache.put(USER_ID, _user())
+    fake_users.fail = True
+    assert not UserModel().update_user(USER_ID, {"username": "alice2"})
+    assert cache.get(USER_ID) is None
+
+    # ObjectId and string ids refer to the same entry
+    cache.put(USER_ID, _user())
+    cache.invalidate(ObjectId(USER_ID))
+    assert cache.get(USER_ID) is None
+    assert cache.stats()["invalidations"] == 3
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Test the shared dependency store
+
+npm and pip are replaced by fake install commands so the store logic runs for
+real: manifest hashing, building each dependency set once, hardlinking it into
+projects, recording pip wheel sets, failed builds and LRU pruning.
+"""
+
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+import dependency_store
+from dependency_store import DependencyStore, link_tree, normalize_requirements, npm_key, pip_key
+
+PACKAGE_JSON = json.dumps({"name": "shop", "version": "1.0.0", "dependencies": {"react": "^18.2.0"}})
+
+
+@pytest.fixture
+def fake_npm(monkeypatch):
+    """Record install commands; 'install' writes a tiny node_modules into its cwd"""
+    calls = []
+
+    async def stream_process(args, cwd, owner, emit=None, on_line=None):
+        calls.append(args)
+        if json.loads((cwd / "package.json").read_text()).get("dependencies", {}).get("broken"):
+            return 1, "npm ERR! 404 Not Found - broken"
+        package = cwd / "node_modules" / "react"
+        package.mkdir(parents=True)
+        (package / "index.js").write_text("module.exports = {};")
+        (cwd / "node_modules" / ".bin").mkdir()
+        os.symlink("../react/index.js", cwd / "node_modules" / ".bin" / "react")
+        return 0, ""
+
+    monkeypatch.setattr(dependency_store, "stream_process", stream_process)
+    return calls
+
+
+@pytest.fixture
+def fake_pip(monkeypatch):
+    """'pip wheel' drops one wheel per requirement into -w; 'pip install' fails while `broken` is set"""
+    state = {"calls": [], "broken": False}
+
+    async def stream_process(args, cwd, owner, emit=None, on_line=None):
+        state["calls"].append(args[3])
+        if args[3] == "install":
+            return (1, "ERROR: No matching distribution") if state["broken"] else (0, "")
+        wheel_dir = Path(args[args.index("-w") + 1])
+        for requirement in (cwd / "requirements.txt").read_text().split():
+            name, version = requirement.split("==")
+            (wheel_dir / f"{name}-{version}-py3-none-any.whl").write_text(requirement)
+        return 0, "Saved wheels (pip's log text is not parsed)"
+
+    monkeypatch.setattr(dependency_store, "stream_process", stream_process)
+    return state
+
+
+def _project(root, name, package_json=PACKAGE_JSON):
+    project = root / name
+    project.mkdir()
+    (project / "package.json").write_text(package_json)
+    return project
+
+
+def test_keys_ignore_formatting():
+    reordered = json.dumps({"dependencies": {"react": "^18.2.0"}, "version": "2.0.0", "name": "other"}, indent=2)
+    assert npm_key(PACKAGE_JSON) == npm_key(reordered)
+    assert npm_key(PACKAGE_JSON) != npm_key(PACKAGE_JSON, lockfile="{}")
+    assert npm_key(PACKAGE_JSON) != npm_key(json.dumps({"dependencies": {"react": "^17.0.0"}}))
+
+    assert normalize_requirements("FastAPI==0.110  # web\n\n# comment\nuvicorn\n") == ["fastapi==0.110", "uvicorn"]
+    assert pip_key("fastapi==0.110\nuvicorn") == pip_key("uvicorn\n\nFASTAPI==0.110  # api\n")
+
+
+def test_link_tree_hardlinks_files_and_keeps_symlinks(tmp_path):
+    source = tmp_path / "source"
+    (source / "pkg").mkdir(parents=True)
+    (source / "pkg" / "index.js").write_text("x")
+    (source / ".bin").mkdir()
+    os.symlink("../pkg/index.js", source / ".bin" / "pkg")
+
+    assert link_tree(source, tmp_path / "target") == 1
+    target = tmp_path / "target"
+    assert os.path.samefile(source / "pkg" / "index.js", target / "pkg" / "index.js")
+    assert os.readlink(target / ".bin" / "pkg") == "../pkg/index.js"
+
+
+def test_dependency_set_is_built_once_and_shared(tmp_path, fake_npm):
+    store = DependencyStore(tmp_path / "store")
+    first, second = _project(tmp_path, "one"), _project(tmp_path, "two")
+
+    built = asyncio.run(store.install_npm(first))
+    assert built.success and not built.cache_hit
+    shared = asyncio.run(store.install_npm(second))
+    assert shared.success and shared.cache_hit
+    assert len(fake_npm) == 1
+    assert os.path.samefile(first / "node_modules" / "react" / "index.js", second / "node_modules" / "react" / "index.js")
+
+    # Already materialized: the marker makes a repeat install a no-op
+    assert asyncio.run(store.install_npm(second)).cache_hit
+    assert store.stats()["npm_entries"] == 1 and store.stats()["builds"] == 1
+
+
+def test_failed_build_leaves_no_entry(tmp_path, fake_npm):
+    store = DependencyStore(tmp_path / "store")
+    project = _project(tmp_path, "broken", json.dumps({"dependencies": {"broken": "1.0.0"}}))
+
+    result = asyncio.run(store.install_npm(project))
+    assert not result.success and "404" in result.error
+    assert store.stats()["npm_entries"] == 0
+    assert not any(store.npm_dir.iterdir())
+
+
+def test_pip_set_is_recorded_from_the_built_wheels(tmp_path, fake_pip):
+    store = DependencyStore(tmp_path / "store")
+    first = tmp_path / "api"
+    first.mkdir()
+    (first / "requirements.txt").write_text("fastapi==0.110\nuvicorn==0.29\n")
+    second = tmp_path / "worker"
+    second.mkdir()
+    (second / "requirements.txt").write_text("uvicorn==0.29\n")
+
+    assert asyncio.run(store.install_pip(first)).success
+    assert asyncio.run(store.install_pip(second)).success
+    # The second set reuses a wheel that was already in the wheelhouse
+    recorded = {
+        json.loads(path.read_text())["key"]: json.loads(path.read_text())["wheels"]
+        for path in store.pip_sets_dir.glob("*.json")
+    }
+    assert sorted(recorded.values()) == [
+        ["fastapi-0.110-py3-none-any.whl", "uvicorn-0.29-py3-none-any.whl"],
+        ["uvicorn-0.29-py3-none-any.whl"],
+    ]
+    assert sorted(p.name for p in store.wheelhouse.iterdir()) == recorded[pip_key("fastapi==0.110\nuvicorn==0.29")]
+    assert not list(store.pip_sets_dir.glob(".build-*"))
+
+
+def test_failed_cached_pip_install_forgets_the_set(tmp_path, fake_pip):
+    store = DependencyStore(tmp_path / "store")
+    project = tmp_path / "api"
+    project.mkdir()
+    (project / "requirements.txt").write_text("fastapi==0.110\n")
+    assert asyncio.run(store.install_pip(project)).success
+
+    fake_pip["broken"] = True
+    result = asyncio.run(store.install_pip(project))
+    assert not result.success and result.cache_hit is False
+    assert store.stats()["pip_sets"] == 0
+
+    # The next install rebuilds the set instead of trusting it again
+    fake_pip["broken"] = False
+    fake_pip["calls"].clear()
+    result = asyncio.run(store.install_pip(project))
+    assert result.success and not result.cache_hit
+    assert fake_pip["calls"] == ["wheel", "install"]
+
+
+def test_prune_drops_least_recently_used_entries(tmp_path):
+    store = DependencyStore(tmp_path / "store")
+    for age, key in enumerate(["newest", "middle", "oldest"]):
+        entry = store.npm_dir / key
+        entry.mkdir(parents=True)
+        os.utime(entry, (1_000_000 - age * 100, 1_000_000 - age * 100))
+
+    store.prune(max_entries=2)
+    assert sorted(p.name for p in store.npm_dir.iterdir()) == ["middle", "newest"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
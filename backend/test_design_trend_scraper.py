@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test design trend cache access
+
+The live scrape is replaced by an empty result, so only the cache rules are
+exercised: stale-while-revalidate reads, and the sync/async entry points
+for a forced refresh.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+import design_trend_scraper
+from design_trend_scraper import design_scraper, get_latest_design_trends, get_latest_design_trends_async
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """No network scrapes; record background refreshes instead of starting them"""
+    async def no_live_trends():
+        return []
+
+    scheduled = []
+    monkeypatch.setattr(design_scraper, "scrape_live_design_data_async", no_live_trends)
+    monkeypatch.setattr(design_trend_scraper, "schedule_design_trends_refresh", scheduled.append)
+    return scheduled
+
+
+def _write_cache(path: str, age_hours: float):
+    trend = design_scraper._get_curated_2025_trends()[0]
+    updated_at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time() - age_hours * 3600))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"updated_at": updated_at, "trends": [dict(trend.__dict__, site_name="Cached")]}, f)
+
+
+def test_fresh_cache_is_served_without_refresh(offline):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "trends.json")
+        _write_cache(cache_file, age_hours=1)
+        trends = get_latest_design_trends(cache_file=cache_file)
+        assert [t.site_name for t in trends] == ["Cached"]
+        assert offline == []
+
+
+def test_stale_or_missing_cache_is_served_while_refreshing(offline):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "trends.json")
+        trends = get_latest_design_trends(cache_file=cache_file)
+        assert trends == design_scraper._get_curated_2025_trends()
+
+        _write_cache(cache_file, age_hours=design_trend_scraper.CACHE_MAX_AGE_HOURS + 1)
+        assert [t.site_name for t in get_latest_design_trends(cache_file=cache_file)] == ["Cached"]
+        assert offline == [cache_file, cache_file]
+
+
+def test_forced_refresh_from_sync_code_rewrites_the_cache(offline):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "trends.json")
+        trends = get_latest_design_trends(use_cache=False, cache_file=cache_file)
+        assert trends
+        with open(cache_file, encoding="utf-8") as f:
+            assert json.load(f)["trends_count"] == len(trends)
+
+
+def test_forced_refresh_from_async_code(offline):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "trends.json")
+
+        async def refresh():
+            # The sync entry point cannot start a nested loop...
+            with pytest.raises(RuntimeError, match="get_latest_design_trends_async"):
+                get_latest_design_trends(use_cache=False, cache_file=cache_file)
+            # ...the async one awaits the scrape on the running loop
+            return await get_latest_design_trends_async(use_cache=False, cache_file=cache_file)
+
+        assert asyncio.run(refresh())
+        assert os.path.exists(cache_file)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
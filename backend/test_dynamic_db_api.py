@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+"""
+Test the dynamic DB connection pool, collection registry and index advisor
+
+All collections share one tuned Motor client. The registry and the write
+endpoints run against a small in-memory stand-in for the Motor database:
+counts follow inserts/deletes, reconcile repairs drift, and a failing registry
+never fails a write that already committed. The index advisor is checked for
+ESR key order, creating an index only once a query shape recurs, its
+per-collection budget and exact-field text indexes. Keyset pagination is
+checked by walking get_items page by page.
+"""
+
+import asyncio
+import json
+import re
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+import dynamic_db_api
+from pymongo import ASCENDING, DESCENDING, TEXT
+
+from dynamic_db_api import (
+    CollectionRegistry, CreateItemRequest, DynamicDB, IndexAdvisor, REGISTRY_COLLECTION,
+    decode_page_token, encode_page_token, keyset_filter, parse_projection,
+)
+
+
+def _matches(doc, query):
+    for field, expected in query.items():
+        if isinstance(expected, dict) and "$ne" in expected:
+            if doc.get(field) == expected["$ne"]:
+                return False
+        elif isinstance(expected, dict) and "$in" in expected:
+            if doc.get(field) not in expected["$in"]:
+                return False
+        elif doc.get(field) != expected:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return [dict(doc) for doc in self.docs]
+
+
+class FakeCollection:
+    """The handful of async collection methods the registry and CRUD endpoints use"""
+
+    def __init__(self):
+        self.docs = []
+        self.fail = False
+
+    def _check(self):
+        if self.fail:
+            raise RuntimeError("registry unavailable")
+
+    async def create_index(self, keys):
+        self._check()
+
+    async def insert_one(self, doc):
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(dict(doc))
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        self._check()
+        doc = next((d for d in self.docs if _matches(d, query)), None)
+        if doc is None:
+            if not upsert:
+                return SimpleNamespace(modified_count=0)
+            doc = {"_id": query["_id"], **update.get("$setOnInsert", {})}
+            self.docs.append(doc)
+        for field, amount in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + amount
+        doc.update(update.get("$set", {}))
+        return SimpleNamespace(modified_count=1)
+
+    async def delete_one(self, query):
+        self._check()
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not _matches(d, query)]
+        return SimpleNamespace(deleted_count=before - len(self.docs))
+
+    async def delete_many(self, query):
+        self.docs = [d for d in self.docs if not _matches(d, query)]
+
+    async def count_documents(self, query):
+        return len(self.docs)
+
+    def find(self, query, projection=None):
+        self._check()
+        return FakeCursor([d for d in self.docs if _matches(d, query)])
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+    async def list_collection_names(self):
+        return list(self)
+
+    async def drop_collection(self, name):
+        self.pop(name, None)
+
+
+class FakeMotorClient(dict):
+    instances = []
+
+    def __init__(self, url, **options):
+        super().__init__()
+        self.options = options
+        self.closed = False
+        FakeMotorClient.instances.append(self)
+
+    def __missing__(self, name):
+        self[name] = FakeDatabase()
+        return self[name]
+
+    def close(self):
+        self.closed = True
+
+
+def test_collections_share_one_pooled_client(monkeypatch):
+    monkeypatch.setattr(dynamic_db_api, "AsyncIOMotorClient", FakeMotorClient)
+    monkeypatch.setattr(DynamicDB, "_client", None)
+    monkeypatch.setattr(DynamicDB, "_db", None)
+    FakeMotorClient.instances.clear()
+
+    products = DynamicDB.get_collection("shop", "products")
+    orders = DynamicDB.get_collection("shop", "orders")
+    assert len(FakeMotorClient.instances) == 1
+    [client] = FakeMotorClient.instances
+    assert client.options["maxPoolSize"] == dynamic_db_api.MAX_POOL_SIZE
+    assert client.options["waitQueueTimeoutMS"] == dynamic_db_api.WAIT_QUEUE_TIMEOUT_MS
+    assert products is DynamicDB.get_database()["shop_products"] and products is not orders
+
+    DynamicDB.close()
+    assert client.closed and DynamicDB._db is None
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(DynamicDB, "_db", db)
+    registry = CollectionRegistry()
+    monkeypatch.setattr(dynamic_db_api, "collection_registry", registry)
+    return db
+
+
+def test_counts_follow_inserts_and_deletes(fake_db):
+    async def scenario():
+        registry = dynamic_db_api.collection_registry
+        await registry.record_insert("shop", "products", 3)
+        await registry.record_insert("shop", "orders")
+        await registry.record_delete("shop", "products")
+        await registry.record_delete("shop", "orders", 5)
+        return await registry.get_project_counts("shop")
+
+    # Counts never go negative even if deletes outrun inserts
+    assert asyncio.run(scenario()) == {"products": 2, "orders": 0}
+
+
+def test_reconcile_repairs_drift(fake_db):
+    async def scenario():
+        registry = dynamic_db_api.collection_registry
+        fake_db["shop_products"].docs = [{"_id": 1}, {"_id": 2}]
+        fake_db["shop_reviews"].docs = [{"_id": 1}]
+        await registry.record_insert("shop", "products", 5)
+        await registry.record_insert("shop", "archived")
+        result = await registry.reconcile()
+        return result, await registry.get_project_counts("shop")
+
+    result, counts = asyncio.run(scenario())
+    assert counts == {"products": 2, "reviews": 1}
+    assert result["removed"] == 1
+
+
+def test_reconcile_ignores_collections_outside_the_api(fake_db):
+    async def scenario():
+        registry = dynamic_db_api.collection_registry
+        await registry.record_insert("shop", "products")
+        for name in ("shop_products", "shop_order_items", "audit_logs", "users", "_altx_other", "shop_system.x"):
+            fake_db[name].docs = [{"_id": 1}]
+        result = await registry.reconcile()
+        return result, await registry.get_project_counts("shop")
+
+    result, counts = asyncio.run(scenario())
+    assert counts == {"products": 1, "order_items": 1}
+    assert {doc["_id"] for doc in fake_db[REGISTRY_COLLECTION].docs} == {"shop_products", "shop_order_items"}
+    assert result["collections"] == 2
+
+
+def test_drop_collection_requires_the_project_owner(fake_db, monkeypatch):
+    import s3_storage
+    owners = {("shop", "alice")}
+    monkeypatch.setattr(s3_storage, "user_has_project", lambda project, user: (project, user) in owners)
+    fake_db["shop_products"].docs = [{"_id": 1}]
+    asyncio.run(dynamic_db_api.collection_registry.record_insert("shop", "products"))
+
+    def status(call):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(call)
+        return error.value.status_code
+
+    assert status(dynamic_db_api.require_project_owner("shop", "mallory")) == 404
+    assert status(dynamic_db_api.require_project_owner("_altx", "alice")) == 400
+    assert asyncio.run(dynamic_db_api.require_project_owner("shop", "alice")) == "alice"
+
+    # The registry and system collections can never be dropped through the API
+    assert status(dynamic_db_api.drop_collection("_altx", "collection_registry", "alice")) == 400
+    assert status(dynamic_db_api.drop_collection("shop", "system.profile", "alice")) == 400
+    assert REGISTRY_COLLECTION in fake_db
+
+    assert asyncio.run(dynamic_db_api.drop_collection("shop", "products", "alice"))["success"]
+    assert "shop_products" not in fake_db and fake_db[REGISTRY_COLLECTION].docs == []
+
+
+def test_registry_failure_does_not_fail_committed_writes(fake_db):
+    fake_db[REGISTRY_COLLECTION].fail = True
+
+    async def scenario():
+        created = await dynamic_db_api.create_item("shop", "products", CreateItemRequest(data={"name": "Mug"}))
+        deleted = await dynamic_db_api.delete_item("shop", "products", created["data"]["_id"])
+        return created, deleted
+
+    created, deleted = asyncio.run(scenario())
+    assert created["success"] and deleted["success"]
+    assert fake_db["shop_products"].docs == []
+
+
+class FakeIndexedCollection:
+    """Tracks indexes the way index_information() reports them"""
+
+    def __init__(self, name, indexes=None):
+        self.name = name
+        self.indexes = {"_id_": {"key": [("_id", ASCENDING)]}, **(indexes or {})}
+        self.created = []
+
+    async def index_information(self):
+        return {name: dict(spec) for name, spec in self.indexes.items()}
+
+    async def create_index(self, keys, name, background=False):
+        self.created.append(tuple(keys))
+        spec = {"key": list(keys)}
+        if any(direction == TEXT for _, direction in keys):
+            spec["weights"] = {field: 1 for field, _ in keys}
+        self.indexes[name] = spec
+
+    async def drop_index(self, name):
+        del self.indexes[name]
+
+
+def test_index_shapes_follow_esr_order():
+    keys = IndexAdvisor.shape_from_query(
+        {"status": "paid", "total": {"$gte": 10}, "customer": "c1", "$or": [{"a": 1}]},
+        sort=[("created_at", DESCENDING), ("status", ASCENDING)],
+    )
+    assert keys == (("customer", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("total", ASCENDING))
+    assert IndexAdvisor.shape_from_query() == ()
+
+
+def test_index_is_created_once_a_shape_recurs(monkeypatch):
+    monkeypatch.setattr(dynamic_db_api, "INDEX_ADVISOR_MIN_OBSERVATIONS", 2)
+    advisor = IndexAdvisor()
+    coll = FakeIndexedCollection("shop_orders")
+    shape = (("status", ASCENDING),)
+
+    async def scenario():
+        await advisor.observe(coll, {"status": "paid"})
+        await asyncio.sleep(0)
+        created_first = list(coll.created)
+        await advisor.observe(coll, {"status": "open"})
+        await advisor.observe(coll, {"status": "open"})
+        await asyncio.sleep(0)
+        return created_first
+
+    # The default keyset index comes first; the query's index only on recurrence
+    assert asyncio.run(scenario()) == [(("created_at", DESCENDING), ("_id", DESCENDING))]
+    assert coll.created[1:] == [shape]
+    assert advisor.observations["shop_orders"][shape] == 3
+
+
+def test_existing_and_over_budget_indexes_are_skipped(monkeypatch):
+    monkeypatch.setattr(dynamic_db_api, "INDEX_ADVISOR_MAX_INDEXES", 1)
+    advisor = IndexAdvisor()
+    coll = FakeIndexedCollection("shop_orders", {
+        "status_created": {"key": [("status", ASCENDING), ("created_at", DESCENDING)]},
+    })
+
+    async def scenario():
+        await advisor._load_existing(coll)
+        # Prefix of an existing index is already covered
+        advisor.ensure_index(coll, (("status", ASCENDING),))
+        # The collection is at its auto-index budget
+        advisor.ensure_index(coll, (("customer", ASCENDING),))
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert coll.created == []
+
+
+def test_text_index_covers_exactly_the_requested_fields(monkeypatch):
+    monkeypatch.setattr(dynamic_db_api, "INDEX_ADVISOR_MIN_OBSERVATIONS", 2)
+    advisor = IndexAdvisor()
+    coll = FakeIndexedCollection("shop_products")
+
+    async def ready(fields, times=1):
+        results = []
+        for _ in range(times):
+            results.append(await advisor.text_index_ready(coll, fields))
+            await asyncio.sleep(0)
+        return results
+
+    async def scenario():
+        # Built once the field set recurs; each miss falls back to a substring scan
+        assert await ready(["name", "description"], 3) == [False, False, True]
+        # A different field set never reuses the wider (or narrower) index
+        assert await ready(["name"], 3) == [False, False, False]
+        # ...and only replaces it once requested twice as often
+        assert await ready(["name"]) == [False]
+        assert await ready(["name"]) == [True]
+        # Too many fields never get an index
+        assert await ready(["a", "b", "c", "d", "e"], 5) == [False] * 5
+
+    asyncio.run(scenario())
+    assert coll.created == [(("description", TEXT), ("name", TEXT)), (("name", TEXT),)]
+    assert [name for name, spec in coll.indexes.items() if "weights" in spec] == ["altx_text_name"]
+
+
+def _after(doc, query):
+    """Evaluate the equality/$lt/$gt/$or/$regex filters pagination and search produce"""
+    for field, expected in query.items():
+        if field == "$or":
+            if not any(_after(doc, clause) for clause in expected):
+                return False
+        elif isinstance(expected, dict) and "$regex" in expected:
+            if not re.search(expected["$regex"], str(doc.get(field, "")), re.IGNORECASE):
+                return False
+        elif isinstance(expected, dict):
+            (op, value), = expected.items()
+            if not (doc[field] < value if op == "$lt" else doc[field] > value):
+                return False
+        elif doc[field] != expected:
+            return False
+    return True
+
+
+class FakePagedCursor:
+    def __init__(self, docs, projection):
+        self.docs = docs
+        self.projection = projection
+        self.position = 0
+        self.end = None
+
+    def sort(self, spec):
+        for field, direction in reversed(spec):
+            self.docs.sort(key=lambda doc: doc[field], reverse=direction == DESCENDING)
+        return self
+
+    def skip(self, count):
+        self.position = count
+        return self
+
+    def limit(self, count):
+        self.end = self.position + count
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    async def to_list(self, length=None):
+        end = len(self.docs) if self.end is None else self.end
+        batch = self.docs[self.position:min(end, self.position + length)]
+        self.position += len(batch)
+        if self.projection:
+            batch = [{k: v for k, v in doc.items() if k in self.projection or k == "_id"} for doc in batch]
+        return batch
+
+
+class FakePagedCollection(FakeIndexedCollection):
+    def __init__(self, name, docs):
+        super().__init__(name)
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return FakePagedCursor([dict(doc) for doc in self.docs if _after(doc, query)], projection)
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+
+@pytest.fixture
+def products(monkeypatch):
+    start = datetime(2024, 1, 1)
+    # Pairs of documents share a created_at so the _id tiebreaker matters
+    docs = [
+        {"_id": ObjectId(), "name": f"item {i}", "price": i, "created_at": start + timedelta(minutes=i // 2)}
+        for i in range(7)
+    ]
+    coll = FakePagedCollection("shop_products", docs)
+    monkeypatch.setattr(DynamicDB, "get_collection", classmethod(lambda cls, project, name: coll))
+    monkeypatch.setattr(dynamic_db_api, "index_advisor", IndexAdvisor())
+    return docs
+
+
+def _get_page(cursor=None, fields=None, format="json", sort_by=None, sort_order=-1, limit=3, skip=0):
+    async def scenario():
+        response = await dynamic_db_api.get_items(
+            "shop", "products", limit=limit, skip=skip, sort_by=sort_by, sort_order=sort_order,
+            cursor=cursor, fields=fields, format=format,
+        )
+        return b"".join([chunk async for chunk in response.body_iterator])
+
+    body = asyncio.run(scenario())
+    if format == "ndjson":
+        return [json.loads(line) for line in body.splitlines()]
+    return json.loads(body)
+
+
+def test_page_tokens_round_trip():
+    doc = {"_id": ObjectId(), "created_at": datetime(2024, 1, 1)}
+    state = decode_page_token(encode_page_token("created_at", -1, doc))
+    assert state == {"f": "created_at", "o": -1, "id": doc["_id"], "v": doc["created_at"]}
+    assert keyset_filter(state) == {"$or": [
+        {"created_at": {"$lt": doc["created_at"]}},
+        {"created_at": doc["created_at"], "_id": {"$lt": doc["_id"]}},
+    ]}
+    assert keyset_filter(decode_page_token(encode_page_token("_id", 1, doc))) == {"_id": {"$gt": doc["_id"]}}
+
+    for token in ("not-a-token", encode_page_token("price", 1, {"_id": 1, "price": 2})):
+        with pytest.raises(HTTPException) as error:
+            decode_page_token(token)
+        assert error.value.status_code == 400
+
+
+def test_projection_keeps_the_sort_field():
+    assert parse_projection(None, "created_at") is None
+    assert parse_projection("name, price,", "created_at") == {"name": 1, "price": 1, "created_at": 1}
+    with pytest.raises(HTTPException):
+        parse_projection("name,$where", "created_at")
+
+
+def test_keyset_pages_cover_every_item_once(products):
+    pages, cursor = [], None
+    while True:
+        page = _get_page(cursor, fields="name")
+        pages.append(page)
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    names = [item["name"] for page in pages for item in page["data"]]
+    expected = sorted(products, key=lambda doc: (doc["created_at"], doc["_id"]), reverse=True)
+    assert names == [doc["name"] for doc in expected]
+    assert [len(page["data"]) for page in pages] == [3, 3, 1]
+    assert all(page["total"] == 7 for page in pages)
+    assert set(pages[0]["data"][0]) == {"_id", "name", "created_at"}
+
+
+def test_cursor_must_match_the_sort(products):
+    cursor = _get_page()["next_cursor"]
+    with pytest.raises(HTTPException) as error:
+        _get_page(cursor, sort_order=1, sort_by="created_at")
+    assert error.value.status_code == 400
+    with pytest.raises(HTTPException):
+        _get_page(cursor, sort_by="price")
+    # Sorts outside the keyset fields still page with skip, without a token
+    assert _get_page(sort_by="price")["next_cursor"] is None
+
+
+def test_search_keeps_substring_matches_by_default(products, monkeypatch):
+    async def search(**params):
+        response = await dynamic_db_api.search_items("shop", "products", **params)
+        return json.loads(b"".join([chunk async for chunk in response.body_iterator]))
+
+    # An existing text index on the same fields must not hide partial-word matches
+    monkeypatch.setattr(dynamic_db_api.index_advisor, "_text_fields", {"shop_products": ("name",)})
+    monkeypatch.setattr(dynamic_db_api.index_advisor, "_index_keys", {"shop_products": set()})
+    result = asyncio.run(search(q="ite", fields="name", match="substring"))
+    assert result["search_mode"] == "regex" and len(result["data"]) == len(products)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(search(q="x", fields="name,$where", match="substring"))
+    assert error.value.status_code == 400
+
+
+def test_ndjson_export_streams_every_item(products, monkeypatch):
+    lines = _get_page(format="ndjson", limit=None)
+    assert len(lines) == len(products)
+
+    # skip and an explicit limit apply to the export like to a page
+    expected = [item["name"] for item in _get_page(skip=2, limit=3)["data"]]
+    assert [line["name"] for line in _get_page(format="ndjson", skip=2, limit=3)] == expected
+    assert len(_get_page(format="ndjson", skip=5, limit=None)) == 2
+
+    async def broken(self, length=None):
+        raise RuntimeError("query failed")
+
+    # Query errors surface before the response starts, not mid-stream
+    monkeypatch.setattr(FakePagedCursor, "to_list", broken)
+    with pytest.raises(HTTPException) as error:
+        _get_page(format="ndjson", limit=None)
+    assert error.value.status_code == 500
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
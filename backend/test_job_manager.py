@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test JobManager scheduling and the durable SQLite job store
+
+Covers write-through persistence on create, round-robin dispatch across
+users, the per-user running cap and recovery after a restart.
+"""
+
+import asyncio
+import os
+import tempfile
+
+from job_manager import JobManager, JobStatus, JobStore
+
+
+def _manager(path: str, max_per_user: int = 1) -> JobManager:
+    return JobManager(store=JobStore(path), workers=2, max_per_user=max_per_user)
+
+
+def test_create_job_persists_before_returning():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jobs.sqlite3")
+        manager = _manager(path)
+
+        job_id = asyncio.run(manager.create_job("project_generation", {"project_name": "demo"}, "a@example.com"))
+
+        stored = JobStore(path).load(job_id)
+        assert stored is not None
+        assert stored.status == JobStatus.PENDING
+        assert stored.params == {"project_name": "demo"}
+        assert manager.queue_position(job_id) == 0
+
+
+def test_dispatch_is_round_robin_and_capped_per_user():
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = _manager(os.path.join(tmp, "jobs.sqlite3"), max_per_user=1)
+
+        async def create_all():
+            return [
+                await manager.create_job("x", {}, "a@example.com"),
+                await manager.create_job("x", {}, "a@example.com"),
+                await manager.create_job("x", {}, "b@example.com"),
+            ]
+
+        a1, a2, b1 = asyncio.run(create_all())
+
+        first = manager._next_job()
+        second = manager._next_job()
+        assert [first.job_id, second.job_id] == [a1, b1]
+        # a@example.com is at its cap until its running job is released
+        assert manager._next_job() is None
+
+        manager._wakeup = asyncio.Event()
+        manager._release(first)
+        assert manager._next_job().job_id == a2
+
+
+def test_recovery_requeues_pending_and_fails_running_jobs():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jobs.sqlite3")
+        before = _manager(path)
+
+        async def create_both():
+            return (
+                await before.create_job("x", {}, "a@example.com"),
+                await before.create_job("x", {}, "b@example.com"),
+            )
+
+        pending_id, running_id = asyncio.run(create_both())
+        running = before.jobs[running_id]
+        running.status = JobStatus.RUNNING
+        before.store.save(running)
+        before.store.close()
+
+        after = _manager(path)
+        asyncio.run(after._recover_jobs())
+
+        assert after.queue_position(pending_id) == 0
+        interrupted = after.get_job(running_id)
+        assert interrupted.status == JobStatus.FAILED
+        assert "Interrupted" in interrupted.error
+        assert JobStore(path).load(running_id).status == JobStatus.FAILED
+
+
+if __name__ == "__main__":
+    test_create_job_persists_before_returning()
+    test_dispatch_is_round_robin_and_capped_per_user()
+    test_recovery_requeues_pending_and_fails_running_jobs()
+    print("✅ Job manager tests passed")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test the targeted edit patch engine
+
+One test per locating strategy (exact, whitespace, quotes, fuzzy), plus
+ambiguity rejection, near-miss identifiers/operators that must never match,
+re-indentation of replacements and multi-hunk application.
+"""
+
+from patch_engine import EditHunk, apply_hunks, bounded_levenshtein
+
+COUNTER_JSX = """function Counter() {
+  const [count, setCount] = useState(0);
+  const dec = () => setCount(count - 1);
+  return (
+    <div>
+      <p>Hii</p>
+      <button onClick={dec}>-</button>
+    </div>
+  );
+}
+"""
+
+PYTHON_SOURCE = """def handle(request):
+    if request.user:
+        audit(request)
+    return respond(request)
+"""
+
+
+def _apply_one(content, search, replace):
+    patched, results = apply_hunks(content, [EditHunk(search, replace)])
+    return patched, results[0]
+
+
+def test_bounded_levenshtein():
+    assert bounded_levenshtein("kitten", "sitting", 3) == 3
+    assert bounded_levenshtein("kitten", "sitting", 2) is None
+    assert bounded_levenshtein("", "abc", 3) == 3
+    assert bounded_levenshtein("same", "same", 0) == 0
+
+
+def test_exact_strategy():
+    patched, result = _apply_one(COUNTER_JSX, "<p>Hii</p>", "<p>Hello</p>")
+    assert result.applied and result.strategy == "exact" and result.confidence == 1.0
+    assert result.start_line == 6
+    assert "      <p>Hello</p>\n" in patched
+
+
+def test_whitespace_strategy_reindents_to_file():
+    search = "return (\n  <div>\n    <p>Hii</p>"
+    replace = "return (\n  <div>\n    <h1>Title</h1>\n    <p>Hii</p>"
+    patched, result = _apply_one(COUNTER_JSX, search, replace)
+    assert result.applied and result.strategy == "whitespace"
+    assert "    <div>\n      <h1>Title</h1>\n      <p>Hii</p>\n" in patched
+
+
+def test_quotes_strategy():
+    source = "import React from 'react';\nconst title = 'Shop';\n"
+    patched, result = _apply_one(source, 'const title = "Shop";', 'const title = "Store";')
+    assert result.applied and result.strategy == "quotes"
+    assert 'const title = "Store";' in patched
+
+
+def test_fuzzy_strategy_tolerates_punctuation_drift():
+    source = COUNTER_JSX.replace("count - 1);", "count - 1)")
+    patched, result = _apply_one(
+        source, "const dec = () => setCount(count - 1);", "const dec = () => setCount(count - 2);"
+    )
+    assert result.applied and result.strategy == "fuzzy"
+    assert 0.85 <= result.confidence < 1.0
+    assert "  const dec = () => setCount(count - 2);\n" in patched
+
+
+def test_fuzzy_never_crosses_identifier_differences():
+    # The file only has `dec`; an edit meant for `inc` must not land on it
+    patched, result = _apply_one(
+        COUNTER_JSX, "const inc = () => setCount(count + 1);", "const inc = () => setCount(count + 2);"
+    )
+    assert not result.applied
+    assert patched == COUNTER_JSX
+
+    patched, result = _apply_one(COUNTER_JSX, "const dec = () => setCounts(count - 1);", "removed")
+    assert not result.applied
+
+
+def test_fuzzy_never_crosses_operator_or_literal_differences():
+    patched, result = _apply_one(COUNTER_JSX, "const dec = () => setCount(count + 1);", "removed")
+    assert not result.applied
+    patched, result = _apply_one(COUNTER_JSX, "const dec = () => setCount(count - 2);", "removed")
+    assert not result.applied
+    assert patched == COUNTER_JSX
+
+
+def test_ambiguous_fuzzy_match_is_rejected():
+    source = "save(user)\nload()\n\nsave(user)\nload()\n"
+    patched, result = _apply_one(source, "save(user);\nload();", "persist(user);")
+    assert not result.applied
+    assert patched == source
+
+
+def test_replacement_dedented_below_search_keeps_file_indentation():
+    patched, result = _apply_one(COUNTER_JSX, "      <p>Hii</p>", "<p>Yo</p>")
+    assert result.applied
+    assert "      <p>Yo</p>\n" in patched
+
+    patched, _ = _apply_one(COUNTER_JSX, "  <p>Hii</p>", "<p>Yo</p>")
+    assert "      <p>Yo</p>\n" in patched
+
+
+def test_python_replacement_stays_valid_when_model_drops_indentation():
+    patched, result = _apply_one(
+        PYTHON_SOURCE,
+        "    if request.user:\n        audit(request)",
+        "if request.user:\n    audit(request)\n    notify(request)",
+    )
+    assert result.applied
+    assert "    if request.user:\n        audit(request)\n        notify(request)\n    return" in patched
+    compile(patched, "patched.py", "exec")
+
+    # Unwrapping a block keeps the outer level
+    patched, _ = _apply_one(PYTHON_SOURCE, "if request.user:\n        audit(request)", "audit(request)")
+    assert patched == "def handle(request):\n    audit(request)\n    return respond(request)\n"
+    compile(patched, "patched.py", "exec")
+
+
+def test_multiple_hunks_apply_in_one_pass_and_chain():
+    hunks = [
+        EditHunk("<p>Hii</p>", "<p>Hello</p>"),
+        EditHunk("useState(0)", "useState(10)"),
+        # Targets text introduced by the first hunk
+        EditHunk("<p>Hello</p>", "<p>Hello there</p>"),
+        EditHunk("does not exist anywhere", "x"),
+    ]
+    patched, results = apply_hunks(COUNTER_JSX, hunks)
+    assert [r.applied for r in results] == [True, True, True, False]
+    assert "useState(10)" in patched and "<p>Hello there</p>" in patched
+    assert results[3].message
+
+
+if __name__ == "__main__":
+    test_bounded_levenshtein()
+    test_exact_strategy()
+    test_whitespace_strategy_reindents_to_file()
+    test_quotes_strategy()
+    test_fuzzy_strategy_tolerates_punctuation_drift()
+    test_fuzzy_never_crosses_identifier_differences()
+    test_fuzzy_never_crosses_operator_or_literal_differences()
+    test_ambiguous_fuzzy_match_is_rejected()
+    test_replacement_dedented_below_search_keeps_file_indentation()
+    test_python_replacement_stays_valid_when_model_drops_indentation()
+    test_multiple_hunks_apply_in_one_pass_and_chain()
+    print("✅ Patch engine tests passed")
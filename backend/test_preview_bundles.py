@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test the sandbox preview bundle cache
+
+Checks that a bundle is built once per content hash (even for concurrent
+requests), served from the pointer/disk tiers afterwards, dropped on
+invalidate(), and that ETags compare per RFC 7232.
+"""
+
+import asyncio
+import sys
+
+import pytest
+
+import preview_bundles
+from preview_bundles import PreviewBundleCache, compute_content_hash, etag_matches
+
+FILES = {"src/App.jsx": "export default function App() { return <h1>Shop</h1>; }"}
+
+
+@pytest.fixture(autouse=True)
+def bundle_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(preview_bundles, "PREVIEW_BUNDLE_DIR", tmp_path)
+    return tmp_path
+
+
+def _builder(calls):
+    async def build():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return f"<html>build {len(calls)}</html>"
+    return build
+
+
+def _get(cache, build, files=FILES, user_id="alice"):
+    return cache.get_or_build("shop", user_id, "", files, "Shop", "http://api", build)
+
+
+def test_content_hash_covers_files_name_and_backend():
+    base = compute_content_hash(FILES, "Shop", "http://api")
+    assert base == compute_content_hash(dict(FILES), "Shop", "http://api")
+    assert base != compute_content_hash({**FILES, "src/index.css": "body {}"}, "Shop", "http://api")
+    assert base != compute_content_hash(FILES, "Store", "http://api")
+    assert base != compute_content_hash(FILES, "Shop", "http://other")
+
+
+def test_concurrent_requests_build_once():
+    cache = PreviewBundleCache()
+    calls = []
+
+    async def scenario():
+        return await asyncio.gather(*(_get(cache, _builder(calls)) for _ in range(5)))
+
+    bundles = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert {bundle.html for bundle in bundles} == {b"<html>build 1</html>"}
+    assert cache.stats()["builds"] == 1
+
+
+def test_pointer_lookup_and_invalidate():
+    cache = PreviewBundleCache()
+    calls = []
+    bundle = asyncio.run(_get(cache, _builder(calls)))
+
+    found, pointer = cache.lookup("Shop", "alice", "")
+    assert found is bundle and pointer.content_hash == bundle.content_hash
+    assert cache.lookup("shop", "bob", "") is None
+
+    cache.invalidate("shop")
+    assert cache.lookup("shop", "alice", "") is None
+    # Unchanged content after a save still reuses the built bundle
+    assert asyncio.run(_get(cache, _builder(calls))) is bundle
+    assert len(calls) == 1
+
+
+def test_bundles_survive_a_restart_via_disk(bundle_dir):
+    calls = []
+    first = asyncio.run(_get(PreviewBundleCache(), _builder(calls)))
+    assert (bundle_dir / "shop" / f"{first.content_hash}.html").exists()
+
+    restarted = PreviewBundleCache()
+    again = asyncio.run(_get(restarted, _builder(calls)))
+    assert len(calls) == 1
+    assert again.html == first.html and again.etag == first.etag
+
+
+def test_failed_build_is_not_cached():
+    cache = PreviewBundleCache()
+
+    async def broken():
+        raise RuntimeError("jsx compile failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(_get(cache, broken))
+    assert cache.lookup("shop", "alice", "") is None
+    assert asyncio.run(_get(cache, _builder([]))).html == b"<html>build 1</html>"
+
+
+def test_etag_matches():
+    etag = '"abc123"'
+    assert etag_matches('"abc123"', etag)
+    assert etag_matches('W/"abc123"', etag)
+    assert etag_matches('"other", "abc123"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test the process supervisor
+
+Runs small Python subprocesses to check batched output streaming, the
+output ring buffer, timeouts, joining identical runs, and reuse/stop of
+long-running processes.
+"""
+
+import asyncio
+import sys
+
+import pytest
+
+import process_supervisor as supervisor_module
+from process_supervisor import ProcessSupervisor
+
+
+def _python(code: str):
+    return [sys.executable, "-c", code]
+
+
+def test_run_streams_batched_output(tmp_path):
+    supervisor = ProcessSupervisor()
+    messages = []
+    lines = []
+
+    async def emit(message):
+        messages.append(message)
+
+    async def on_line(line):
+        lines.append(line)
+
+    result = asyncio.run(supervisor.run(
+        "shop", "command", _python("for i in range(5): print('line', i)"), tmp_path, emit=emit, on_line=on_line,
+    ))
+    assert result.success and result.returncode == 0
+    assert result.output.splitlines() == [f"line {i}" for i in range(5)]
+    assert lines == result.output.splitlines()
+    # Output arrives coalesced, not one frame per line
+    assert len(messages) < 5
+    assert "\n".join(m["message"] for m in messages) == result.output
+    assert all(m["type"] == "terminal_output" and m["process"] == "command" for m in messages)
+    assert supervisor.list_processes() == []
+
+
+def test_output_keeps_blank_lines_and_whitespace(tmp_path):
+    code = "import sys; sys.stdout.write('first\\n\\n  indented  \\r\\nlast')"
+    result = asyncio.run(ProcessSupervisor().run("shop", "command", _python(code), tmp_path))
+    assert result.output.split("\n") == ["first", "", "  indented  ", "last"]
+
+
+def test_output_is_kept_in_a_ring_buffer(tmp_path, monkeypatch):
+    monkeypatch.setattr(supervisor_module, "PROCESS_OUTPUT_MAX_LINES", 3)
+    result = asyncio.run(ProcessSupervisor().run("shop", "command", _python("for i in range(10): print(i)"), tmp_path))
+    assert result.output.splitlines() == ["7", "8", "9"]
+    assert result.truncated
+
+
+def test_timeout_kills_the_process(tmp_path):
+    result = asyncio.run(ProcessSupervisor().run(
+        "shop", "command", _python("import time; print('started', flush=True); time.sleep(30)"), tmp_path, timeout=1,
+    ))
+    assert result.timed_out and not result.success
+    assert result.output.splitlines()[-1] == "Timed out after 1s"
+    assert result.seconds < 10
+
+
+def test_identical_runs_are_joined(tmp_path):
+    supervisor = ProcessSupervisor()
+    marker = tmp_path / "runs.txt"
+    code = f"import time; open({str(marker)!r}, 'a').write('run\\n'); time.sleep(0.5); print('done')"
+
+    async def scenario():
+        first = asyncio.ensure_future(supervisor.run("shop", "install", _python(code), tmp_path))
+        await asyncio.sleep(0.2)
+        second = await supervisor.run("shop", "install", _python(code), tmp_path)
+        return await first, second
+
+    first, second = asyncio.run(scenario())
+    assert first is second
+    assert marker.read_text() == "run\n"
+
+
+def test_long_running_process_is_reused_and_stopped(tmp_path):
+    supervisor = ProcessSupervisor()
+    server = _python("import time; print('listening', flush=True); time.sleep(30)")
+
+    async def scenario():
+        first = await supervisor.spawn("shop", "frontend", server, tmp_path)
+        again = await supervisor.spawn("shop", "frontend", server, tmp_path)
+        assert again is first
+        assert [p["name"] for p in supervisor.list_processes("shop")] == ["frontend"]
+
+        assert await supervisor.stop_project("shop") == 1
+        await asyncio.sleep(0.1)
+        return first
+
+    managed = asyncio.run(scenario())
+    assert not managed.running
+    assert supervisor.list_processes() == []
+    assert not supervisor._watchers
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test streamed project exports
+
+Builds export zips from in-memory and (fake) S3 sources and checks that the
+S3 stream endpoint only ever exports the authenticated user's own project.
+"""
+
+import asyncio
+import io
+import sys
+import types
+import zipfile
+
+import pytest
+from fastapi import HTTPException
+
+from project_exporter import DictProjectSource, project_exporter, stream_export_from_s3
+
+
+class FakeBody:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def iter_chunks(self, size):
+        for start in range(0, len(self._data), size):
+            yield self._data[start:start + size]
+
+    def close(self):
+        pass
+
+
+class FakeS3:
+    """Just enough of the boto3 client for S3ProjectSource"""
+
+    def __init__(self, objects):
+        self.objects = objects
+
+    def get_paginator(self, name):
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        yield {"Contents": [
+            {"Key": key, "Size": len(data)} for key, data in self.objects.items() if key.startswith(Prefix)
+        ]}
+
+    def get_object(self, Bucket, Key):
+        return {"Body": FakeBody(self.objects[Key])}
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    objects = {
+        "projects/alice/todo-app/frontend/src/App.jsx": b"export default function App() { return null }",
+        "projects/alice/todo-app/frontend/package.json": b'{"name": "todo-app"}',
+    }
+    module = types.ModuleType("s3_storage")
+    module.s3_client = FakeS3(objects)
+    module.S3_BUCKET_NAME = "test-bucket"
+    monkeypatch.setitem(sys.modules, "s3_storage", module)
+    return objects
+
+
+def _collect(body_iterator) -> zipfile.ZipFile:
+    return zipfile.ZipFile(io.BytesIO(b"".join(body_iterator)))
+
+
+def test_stream_export_builds_a_valid_zip():
+    source = DictProjectSource({"frontend/src/App.jsx": "export default () => null", "frontend/public/logo.png": b"\x89PNG"})
+    archive = _collect(project_exporter.stream_export("My App", source, include_docker=False))
+
+    names = archive.namelist()
+    assert "my-app/frontend/src/App.jsx" in names
+    assert archive.read("my-app/frontend/public/logo.png") == b"\x89PNG"
+    assert archive.testzip() is None
+
+
+def test_s3_stream_exports_the_callers_own_project(fake_s3):
+    async def export():
+        response = await stream_export_from_s3("todo-app", include_docker=False, user_id="alice")
+        return b"".join([chunk async for chunk in response.body_iterator])
+
+    archive = zipfile.ZipFile(io.BytesIO(asyncio.run(export())))
+    assert archive.read("todo-app/frontend/src/App.jsx").startswith(b"export default")
+
+
+def test_s3_stream_does_not_export_other_users_projects(fake_s3):
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(stream_export_from_s3("todo-app", include_docker=False, user_id="mallory"))
+    assert exc_info.value.status_code == 404
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
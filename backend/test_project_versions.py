@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Test the content-addressed project version store
+
+Saves go through upload_project_to_s3() against an in-memory S3, so the
+working tree under projects/ and the history under versions/ can be checked
+together: unchanged files are skipped, rollback/undo restore the tree, racing
+writers never lose a version or a file, and saves that change files drop the
+project's cached preview.
+"""
+
+import hashlib
+import sys
+import types
+from datetime import datetime, timezone
+
+import pytest
+from botocore.exceptions import ClientError
+
+import project_versions
+import s3_storage
+from project_versions import ProjectVersionStore
+
+
+class FakeBody:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def read(self):
+        return self._data
+
+
+class FakeS3:
+    """Just enough of the boto3 client for uploads and version history"""
+
+    def __init__(self):
+        self.objects = {}
+        self.puts = []
+
+    def put_object(self, Bucket, Key, Body, IfNoneMatch=None, **kwargs):
+        if IfNoneMatch == "*" and Key in self.objects:
+            raise ClientError({"Error": {"Code": "PreconditionFailed"}}, "PutObject")
+        self.objects[Key] = Body
+        self.puts.append(Key)
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return {"Body": FakeBody(self.objects[Key])}
+
+    def copy_object(self, Bucket, Key, CopySource, **kwargs):
+        self.objects[Key] = self.objects[CopySource["Key"]]
+
+    def delete_objects(self, Bucket, Delete):
+        for item in Delete["Objects"]:
+            self.objects.pop(item["Key"], None)
+
+    def get_paginator(self, name):
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        now = datetime.now(timezone.utc)
+        yield {"Contents": [
+            {"Key": key, "Size": len(data), "LastModified": now, "ETag": f'"{hashlib.md5(data).hexdigest()}"'}
+            for key, data in sorted(self.objects.items()) if key.startswith(Prefix)
+        ]}
+
+
+@pytest.fixture
+def invalidated(monkeypatch):
+    import preview_bundles
+    slugs = []
+    monkeypatch.setattr(preview_bundles, "preview_bundle_cache", types.SimpleNamespace(invalidate=slugs.append))
+    return slugs
+
+
+@pytest.fixture
+def fake_s3(monkeypatch, invalidated):
+    client = FakeS3()
+    monkeypatch.setattr(s3_storage, "s3_client", client)
+    monkeypatch.setattr(s3_storage, "S3_BUCKET_NAME", "test-bucket")
+    monkeypatch.setattr(s3_storage, "PROJECT_VERSIONING_ENABLED", True)
+    monkeypatch.setattr(project_versions, "version_store", ProjectVersionStore("test-bucket", client))
+    # Readiness refreshes are not under test here
+    readiness = types.ModuleType("soc2_readiness")
+    readiness.readiness_service = types.SimpleNamespace(schedule_refresh=lambda *args, **kwargs: None)
+    monkeypatch.setitem(sys.modules, "soc2_readiness", readiness)
+    return client
+
+
+def _save(files, message=None):
+    return s3_storage.upload_project_to_s3(
+        "shop", [{"path": path, "content": content} for path, content in files.items()], "alice", message
+    )
+
+
+def _working_tree(client):
+    prefix = "projects/alice/shop/"
+    return {key[len(prefix):]: data.decode("utf-8") for key, data in client.objects.items() if key.startswith(prefix)}
+
+
+def test_unchanged_files_are_not_reuploaded(fake_s3):
+    first = _save({"src/App.jsx": "v1", "src/index.css": "body {}"})
+    assert first["version"] == 1 and first["files_uploaded"] == 2
+
+    fake_s3.puts.clear()
+    second = _save({"src/App.jsx": "v2", "src/index.css": "body {}"})
+    assert second["version"] == 2
+    assert second["files_uploaded"] == 1 and second["files_unchanged"] == 1
+    assert "projects/alice/shop/src/index.css" not in fake_s3.puts
+
+    # A save with nothing new records no version
+    assert _save({"src/App.jsx": "v2"})["version"] == 2
+
+
+def test_auto_fix_saves_are_versioned_and_can_be_undone(fake_s3):
+    _save({"src/App.jsx": "broken"})
+    # Auto-fix writers save through upload_project_to_s3 like every other writer
+    _save({"src/App.jsx": "fixed"}, "Auto-fixed src/App.jsx")
+
+    # Saving the pre-fix content again is a real change, not skipped as "same as head"
+    result = _save({"src/App.jsx": "broken"})
+    assert result["files_uploaded"] == 1
+    assert _working_tree(fake_s3)["src/App.jsx"] == "broken"
+
+    store = project_versions.version_store
+    undone = store.undo("shop", "alice")
+    assert undone["restored_from"] == 2
+    assert _working_tree(fake_s3)["src/App.jsx"] == "fixed"
+    assert store.get_head("shop", "alice")["message"] == "Rolled back to version 2"
+
+
+def test_rollback_restores_and_removes_files(fake_s3):
+    _save({"src/App.jsx": "v1"})
+    _save({"src/App.jsx": "v2", "src/New.jsx": "new"})
+
+    store = project_versions.version_store
+    result = store.rollback("shop", "alice", 1)
+    assert result["restored"] == ["src/App.jsx"] and result["removed"] == ["src/New.jsx"]
+    assert _working_tree(fake_s3) == {"src/App.jsx": "v1"}
+
+    diff = store.diff("shop", "alice", 2, 3, include_patch=True)
+    assert diff["modified"] == ["src/App.jsx"] and diff["removed"] == ["src/New.jsx"]
+    assert "-v2" in diff["patches"]["src/App.jsx"]
+
+    with pytest.raises(KeyError):
+        store.rollback("shop", "alice", 99)
+
+
+def test_existing_project_is_imported_on_first_save(fake_s3):
+    fake_s3.objects["projects/alice/shop/src/App.jsx"] = b"legacy"
+    fake_s3.objects["projects/alice/shop/src/index.css"] = b"body {}"
+
+    result = _save({"src/App.jsx": "legacy", "src/index.css": "body { margin: 0 }"})
+    assert result["version"] == 2 and result["files_uploaded"] == 1
+
+    versions = project_versions.version_store.list_versions("shop", "alice")
+    assert [v["version"] for v in versions] == [2, 1]
+    assert versions[-1]["message"] == "Imported existing project"
+
+
+def test_racing_writers_keep_every_version(fake_s3):
+    _save({"src/App.jsx": "v1"})
+    store = project_versions.version_store
+    # Two workers prepare against version 1; each has its own head cache
+    other = ProjectVersionStore("test-bucket", fake_s3)
+    ours = store.prepare("shop", "alice", [{"path": "src/App.jsx", "content": "ours"}])
+    theirs = other.prepare("shop", "alice", [{"path": "src/index.css", "content": "body {}"}])
+
+    assert other.commit(theirs)["version"] == 2
+    fake_s3.objects["versions/alice/shop/HEAD.json"] = b'{"version":1}'  # their HEAD write is delayed
+    manifest = store.commit(ours)
+    assert manifest["version"] == 3 and manifest["parent"] == 2
+    assert set(manifest["files"]) == {"src/App.jsx", "src/index.css"}
+
+
+def test_working_tree_drift_is_repaired(fake_s3):
+    _save({"src/App.jsx": "v2"})
+    # A racing save overwrote the working tree after HEAD recorded "v2"
+    fake_s3.objects["projects/alice/shop/src/App.jsx"] = b"stale"
+
+    result = _save({"src/App.jsx": "v2"})
+    assert result["files_uploaded"] == 1
+    assert _working_tree(fake_s3)["src/App.jsx"] == "v2"
+
+
+def test_rollback_is_mirrored_into_the_local_folder(fake_s3, tmp_path):
+    _save({"src/App.jsx": "v1"})
+    _save({"src/App.jsx": "v2", "src/New.jsx": "new"})
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "App.jsx").write_text("v2")
+    (tmp_path / "src" / "New.jsx").write_text("new")
+
+    store = project_versions.version_store
+    result = store.rollback("shop", "alice", 1)
+    changes = store.sync_local_tree("shop", "alice", result, str(tmp_path))
+
+    assert changes == {"src/App.jsx": "v1", "src/New.jsx": None}
+    assert (tmp_path / "src" / "App.jsx").read_text() == "v1"
+    assert not (tmp_path / "src" / "New.jsx").exists()
+
+
+def test_saves_invalidate_the_preview_bundle(fake_s3, invalidated):
+    _save({"src/App.jsx": "v1"})
+    assert invalidated == ["shop"]
+
+    # Nothing changed, so the cached preview is still current
+    _save({"src/App.jsx": "v1"})
+    assert invalidated == ["shop"]
+
+    _save({"src/App.jsx": "v2"}, "AI edit")
+    assert invalidated == ["shop", "shop"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
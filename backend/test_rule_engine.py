@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test the shared pattern rule engine
+
+The prefiltered RuleSet.scan() must return exactly what re.finditer per rule
+would, including for the scanner's real vulnerability patterns. Also covers
+literal extraction, line lookups, one-pass fixes and rule set sharing.
+"""
+
+import re
+
+from ai_security_scanner import AISecurityScanner
+from rule_engine import DEFAULT_RULE_FLAGS, LineIndex, Rule, RuleSet, get_rule_set, required_literals
+
+VULNERABLE_JSX = """import React from 'react';
+const API_KEY = "sk-live-1234567890abcdef";
+
+export default function Comments({ html, query }) {
+  const el = document.getElementById('out');
+  el.innerHTML = html;
+  eval(query);
+  fetch('http://api.example.com/comments?q=' + query);
+  localStorage.setItem('token', API_KEY);
+  return <div dangerouslySetInnerHTML={{ __html: html }} />;
+}
+"""
+
+
+def _naive_scan(rules, text, flags=DEFAULT_RULE_FLAGS):
+    return [
+        (index, m.start(), m.group(0))
+        for index, rule in enumerate(rules)
+        for m in re.finditer(rule.pattern, text, flags)
+    ]
+
+
+def _scan(rule_set, text):
+    return [(m.index, m.start, m.text) for m in rule_set.scan(text)]
+
+
+def test_required_literals():
+    assert required_literals(r"innerHTML\s*=") == ["innerhtml"]
+    assert sorted(required_literals(r"(?:md5|sha1)\(")) == ["md5", "sha1"]
+    assert required_literals(r"\w+") is None
+    # An optional group contributes nothing required
+    assert required_literals(r"(?:unsafe)?eval\(") == ["eval("]
+
+
+def test_scan_matches_per_rule_finditer():
+    rules = [
+        Rule("eval", r"eval\s*\("),
+        Rule("inner", r"InnerHTML\s*="),
+        Rule("secret", r"(?:api_key|secret)\s*=\s*['\"][^'\"]+['\"]"),
+        Rule("words", r"\bconst\s+\w+"),
+        Rule("absent", r"pickle\.loads"),
+    ]
+    rule_set = RuleSet(rules)
+    assert _scan(rule_set, VULNERABLE_JSX) == _naive_scan(rules, VULNERABLE_JSX)
+
+
+def test_scan_matches_for_scanner_patterns():
+    rules = [
+        Rule(vuln_type, pattern)
+        for vuln_type, info in AISecurityScanner.VULNERABILITY_PATTERNS.items()
+        for pattern in info["patterns"]
+    ]
+    rule_set = RuleSet(rules)
+    expected = _naive_scan(rule_set.rules, VULNERABLE_JSX)
+    assert expected
+    assert _scan(rule_set, VULNERABLE_JSX) == expected
+
+
+def test_line_index():
+    index = LineIndex("first\nsecond\n\nfourth")
+    assert index.line_count == 4
+    assert index.line_of(0) == 1 and index.line_of(6) == 2 and index.line_of(14) == 4
+    assert index.line_text(2) == "second" and index.line_text(3) == "" and index.line_text(4) == "fourth"
+    assert index.line_text(9) == ""
+
+
+def test_apply_fixes_in_one_pass():
+    rule_set = RuleSet([
+        Rule("http", r"http://", fix="https://"),
+        Rule("md5", r"md5\((\w+)\)", fix=r"sha256(\1)"),
+        Rule("report-only", r"eval\("),
+    ])
+    text = "fetch('http://a'); md5(data); eval(x); fetch('http://b')"
+    fixed, applied = rule_set.apply_fixes(text, rule_set.scan(text))
+    assert fixed == "fetch('https://a'); sha256(data); eval(x); fetch('https://b')"
+    assert [m.rule.id for m in applied] == ["http", "md5", "http"]
+
+
+def test_rule_sets_are_shared_and_skip_invalid_patterns():
+    rules = [Rule("ok", r"eval\("), Rule("broken", r"(unclosed")]
+    first = get_rule_set(rules, name="test")
+    assert get_rule_set(list(rules), name="test") is first
+    assert [rule.id for rule in first.rules] == ["ok"]
+    assert get_rule_set([Rule("ok", r"eval\(", fix="safe(")], name="test") is not first
+
+
+if __name__ == "__main__":
+    test_required_literals()
+    test_scan_matches_per_rule_finditer()
+    test_scan_matches_for_scanner_patterns()
+    test_line_index()
+    test_apply_fixes_in_one_pass()
+    test_rule_sets_are_shared_and_skip_invalid_patterns()
+    print("✅ Rule engine tests passed")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test hot updates of running sandbox previews
+
+Docker is replaced by a recorder, so only the update logic runs: unchanged
+content is a no-op, only changed files are pushed into the container,
+dependency changes fall back to a rebuild, and the orchestrator reuses the
+project's live session.
+"""
+
+import asyncio
+import subprocess
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+import sandbox_deployment_service
+from preview_orchestrator import OrchestrationProgress, OrchestrationStage, PreviewOrchestrator
+from sandbox_deployment_service import SandboxContainer, SandboxDeploymentService, SandboxStatus
+
+MAIN_PY = """from fastapi import FastAPI
+
+app = FastAPI()
+
+
+@app.get("/api/health")
+def health():
+    return {"status": "ok"}
+"""
+
+
+@pytest.fixture
+def docker(monkeypatch):
+    """Record docker invocations instead of running them"""
+    calls = []
+
+    def run(args, **kwargs):
+        calls.append(args)
+        return subprocess.CompletedProcess(args, 0, stdout="", stderr="")
+
+    monkeypatch.setattr(sandbox_deployment_service.subprocess, "run", run)
+    return calls
+
+
+@pytest.fixture
+def service(docker, monkeypatch):
+    service = SandboxDeploymentService()
+    monkeypatch.setattr(service, "HOT_RELOAD_SETTLE_SECONDS", 0)
+
+    async def healthy(container):
+        container.status = SandboxStatus.HEALTHY
+
+    monkeypatch.setattr(service, "_wait_for_healthy", healthy)
+    return service
+
+
+def _running_container(service, files):
+    async def build_hashes():
+        with tempfile.TemporaryDirectory() as build_dir:
+            await service._prepare_build_context(build_dir, files)
+            return service._hash_build_context(build_dir)
+
+    now = datetime.utcnow()
+    container = SandboxContainer(
+        id=str(uuid.uuid4()), session_id="session-1", container_name="sandbox-shop", image_name="sandbox-shop:latest",
+        port=9001, status=SandboxStatus.HEALTHY, created_at=now, expires_at=now + timedelta(minutes=1),
+        base_url="http://localhost:9001", file_hashes=asyncio.run(build_hashes()),
+    )
+    service._containers["session-1"] = container
+    return container
+
+
+def _docker_cp_calls(docker):
+    return [args for args in docker if args[:2] == ["docker", "cp"]]
+
+
+def test_unchanged_files_are_a_no_op(service, docker):
+    container = _running_container(service, {"main.py": MAIN_PY})
+    result = asyncio.run(service.hot_update("session-1", {"main.py": MAIN_PY}))
+    assert result == {"changed": [], "removed": [], "seconds": 0.0}
+    assert _docker_cp_calls(docker) == []
+    # Using the preview extends its lifetime
+    assert container.expires_at > datetime.utcnow() + timedelta(minutes=5)
+
+
+def test_only_changed_files_are_pushed(service, docker):
+    container = _running_container(service, {"main.py": MAIN_PY, "models.py": "ITEMS = []\n"})
+    updated = MAIN_PY + "\n\n@app.get('/api/items')\ndef items():\n    return []\n"
+
+    result = asyncio.run(service.hot_update("session-1", {"main.py": updated}))
+    assert result["changed"] == ["main.py"] and result["removed"] == ["models.py"]
+    [copy] = _docker_cp_calls(docker)
+    assert copy[3] == "sandbox-shop:/app/"
+    assert docker[-1][:3] == ["docker", "exec", "sandbox-shop"] and "/app/models.py" in docker[-1]
+    assert container.hot_updates == 1 and container.status == SandboxStatus.HEALTHY
+
+
+def test_dependency_changes_need_a_rebuild(service, docker):
+    _running_container(service, {"main.py": MAIN_PY})
+    with_stripe = "import stripe\n" + MAIN_PY
+    assert asyncio.run(service.hot_update("session-1", {"main.py": with_stripe})) is None
+    assert _docker_cp_calls(docker) == []
+
+
+def test_only_healthy_sandboxes_are_hot_updated(service):
+    container = _running_container(service, {"main.py": MAIN_PY})
+    container.status = SandboxStatus.UNHEALTHY
+    assert asyncio.run(service.hot_update("session-1", {"main.py": MAIN_PY})) is None
+    assert asyncio.run(service.hot_update("unknown-session", {"main.py": MAIN_PY})) is None
+
+
+class FakeDeploymentService:
+    def __init__(self, update=None, error=None):
+        self.update = update
+        self.error = error
+        self.destroyed = []
+
+    async def hot_update(self, session_id, files):
+        if self.error:
+            raise self.error
+        return self.update
+
+    async def destroy_sandbox(self, session_id):
+        self.destroyed.append(session_id)
+
+
+def _orchestrator(deployment_service):
+    orchestrator = PreviewOrchestrator(deployment_service)
+    progress = OrchestrationProgress("session-1", OrchestrationStage.READY, backend_url="http://localhost:9001")
+    orchestrator._sessions["session-1"] = progress
+    orchestrator._project_sessions["shop"] = "session-1"
+    return orchestrator
+
+
+def test_orchestrator_updates_the_live_session():
+    orchestrator = _orchestrator(FakeDeploymentService({"changed": ["main.py"], "removed": [], "seconds": 0.4}))
+    response = asyncio.run(orchestrator.hot_update_preview("shop", {"main.py": MAIN_PY}))
+    assert response.session_id == "session-1" and response.backend_url == "http://localhost:9001"
+    assert "1 changed" in response.message
+    assert asyncio.run(orchestrator.hot_update_preview("other-project", {})) is None
+
+
+def test_orchestrator_drops_a_session_whose_update_failed():
+    deployment = FakeDeploymentService(error=RuntimeError("docker cp failed"))
+    orchestrator = _orchestrator(deployment)
+    assert asyncio.run(orchestrator.hot_update_preview("shop", {"main.py": MAIN_PY})) is None
+    assert deployment.destroyed == ["session-1"]
+    assert "shop" not in orchestrator._project_sessions
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test SOC2 control search and the compliance framework version
+
+The indexed search must find the same controls as the old substring scan for
+single words (ranked, with names weighted highest), require every word of a
+multi-word query, and pick up controls added after initialization.
+"""
+
+from compliance_framework import ComplianceFramework, compliance_framework, get_compliance_code_patterns
+from soc2_rag_database import ControlRequirement, SOC2RAGDatabase
+
+
+def _substring_scan(db, keyword):
+    keyword = keyword.lower()
+    return {
+        control.code for control in db.controls.values()
+        if keyword in control.name.lower()
+        or keyword in control.description.lower()
+        or any(keyword in req.lower() for req in control.requirements)
+    }
+
+
+def test_single_words_find_the_same_controls_as_a_substring_scan():
+    db = SOC2RAGDatabase()
+    for word in ("encrypt", "access", "monitor", "backup", "risk", "incident"):
+        assert {c.code for c in db.search_controls(word)} == _substring_scan(db, word), word
+
+
+def test_results_are_ranked_and_limited():
+    db = SOC2RAGDatabase()
+    # Name matches outrank mentions in descriptions/requirements
+    assert db.search_controls("risk")[0].code == "CC3.1"
+    assert db.search_controls("access")[0].code == "CC6.1"
+    assert len(db.search_controls("monitor", limit=2)) == 2
+
+
+def test_every_query_word_must_match():
+    db = SOC2RAGDatabase()
+    both = {c.code for c in db.search_controls("risk monitor")}
+    assert both and both <= _substring_scan(db, "risk") & _substring_scan(db, "monitor")
+    assert db.search_controls("risk nonexistentword") == []
+    # Queries with nothing indexable fall back to the substring scan
+    assert {c.code for c in db.search_controls("&")} == _substring_scan(db, "&")
+
+
+def test_controls_added_later_are_searchable():
+    db = SOC2RAGDatabase()
+    version = db.version
+    db._add_control(ControlRequirement(
+        code="CC6.9",
+        name="Vendor Key Rotation",
+        description="Third-party credentials are rotated on a schedule",
+        trust_service="Security",
+        category="Logical and Physical Access Controls",
+        requirements=["Rotate vendor API keys every 90 days"],
+        implementation_tips=[],
+        audit_considerations=[],
+    ))
+    assert [c.code for c in db.search_controls("vendor")] == ["CC6.9"]
+    assert "CC6.9" in db.cc_mapping["Logical and Physical Access Controls"]
+    assert db.version != version
+
+
+def test_compliance_framework_version_is_stable():
+    assert ComplianceFramework().version == compliance_framework.version
+    assert get_compliance_code_patterns() is compliance_framework.code_patterns
+
+
+if __name__ == "__main__":
+    test_single_words_find_the_same_controls_as_a_substring_scan()
+    test_results_are_ranked_and_limited()
+    test_every_query_word_must_match()
+    test_controls_added_later_are_searchable()
+    test_compliance_framework_version_is_stable()
+    print("✅ SOC2 control search tests passed")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test stored SOC2 readiness assessments
+
+Checks per-file findings, that an assessment is only recomputed for content
+it hasn't seen, that polling within the TTL is served from the store, and
+that a save's background refresh makes the next poll a cache hit.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+import soc2_readiness
+from soc2_readiness import ReadinessService, ReadinessStore, content_hash, scan_file, tree_hash
+
+APP_JSX = """export default function App({ html }) {
+  const run = (code) => eval(code);
+  return <div dangerouslySetInnerHTML={{ __html: html }} />;
+}
+"""
+
+CONFIG_PY = """import os
+SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-value")
+"""
+
+
+@pytest.fixture
+def service():
+    with tempfile.TemporaryDirectory() as tmp:
+        service = ReadinessService(ReadinessStore(os.path.join(tmp, "readiness.sqlite3")))
+        yield service
+        service.shutdown()
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    """Record which file contents get pattern-scanned"""
+    scanned = []
+
+    def counting_scan(content):
+        scanned.append(content)
+        return scan_file(content)
+
+    monkeypatch.setattr(soc2_readiness, "scan_file", counting_scan)
+    return scanned
+
+
+def _tree(files):
+    return {path: content_hash(content) for path, content in files.items()}
+
+
+def _contents(files):
+    return {content_hash(content): content for content in files.values()}
+
+
+def test_scan_file_reports_lines_and_snippets():
+    findings = scan_file(APP_JSX)
+    eval_finding = next(f for f in findings if f["type"] == "eval_exec")
+    assert eval_finding["line"] == 2 and eval_finding["severity"] == "CRITICAL"
+    assert "   2 >>>   const run = (code) => eval(code);" in eval_finding["code_snippet"]
+    assert any(f["category"] == "Secrets Management" for f in scan_file(CONFIG_PY))
+
+
+def test_tree_hash_ignores_unassessed_files():
+    tree = _tree({"src/App.jsx": APP_JSX})
+    assert tree_hash(tree) == tree_hash({**tree, "README.md": content_hash("docs"), "empty.js": content_hash("")})
+    assert tree_hash(tree) != tree_hash(_tree({"src/App.jsx": APP_JSX + "\n"}))
+
+
+def test_only_new_content_is_scanned(service, scans):
+    files = {"src/App.jsx": APP_JSX, "backend/config.py": CONFIG_PY, "README.md": "# Shop"}
+    result, etag = service._assess("shop", "alice", _tree(files), _contents(files))
+    assert len(scans) == 2
+    assert result["files_analyzed"] == 2 and result["findings_summary"]["critical"] >= 2
+
+    # Same tree: the stored assessment is returned as-is
+    assert service._assess("shop", "alice", _tree(files), {}) == (result, etag)
+    assert len(scans) == 2
+
+    # One edited file: only its new content is scanned, the rest comes from the findings cache
+    files["src/App.jsx"] = "export default function App() { return null; }\n"
+    updated, new_etag = service._assess("shop", "alice", _tree(files), _contents(files))
+    assert scans[2:] == [files["src/App.jsx"]]
+    assert new_etag != etag
+    assert updated["files_with_issues"] == 1
+
+
+def test_polls_within_ttl_skip_the_project_lookup(service, scans, monkeypatch):
+    files = {"src/App.jsx": APP_JSX}
+    lookups = []
+
+    def find_tree(project_slug, requester):
+        lookups.append(project_slug)
+        if project_slug != "shop":
+            return None, None, None
+        return "alice", _tree(files), [{"path": path, "content": content} for path, content in files.items()]
+
+    monkeypatch.setattr(service, "_find_tree", find_tree)
+    first = service.get_assessment("shop", "alice")
+    assert service.get_assessment("shop", "alice") == first
+    assert lookups == ["shop"]
+    assert service.get_assessment("missing-project", "alice") is None
+
+
+def test_background_refresh_after_save(service, scans, monkeypatch):
+    files = {"src/App.jsx": APP_JSX}
+    manifest = {"version": 2, "files": {path: {"hash": content_hash(c), "size": len(c)} for path, c in files.items()}}
+    service.schedule_refresh("shop", "alice", [{"path": p, "content": c} for p, c in files.items()], manifest)
+    service._executor.submit(lambda: None).result(timeout=5)
+    assert scans == [APP_JSX]
+
+    # The dashboard's next poll finds the stored assessment without scanning again
+    monkeypatch.setattr(service, "_find_tree", lambda slug, requester: ("alice", _tree(files), None))
+    result, _ = service.get_assessment("shop", "alice")
+    assert result["files_analyzed"] == 1
+    assert scans == [APP_JSX]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
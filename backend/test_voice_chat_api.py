@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test voice chat document ingestion and the documentation context store
+
+google.generativeai is replaced with a stub so the module imports without
+credentials. Uploads are fed through a fake UploadFile to check the streaming
+size cap, text truncation and duplicate detection; the context store is checked
+for LRU order, TTL expiry and the total-size bound.
+"""
+
+import asyncio
+import io
+import sys
+import types
+
+import pytest
+
+
+class FakeUpload:
+    """Minimal UploadFile: chunked async reads over in-memory bytes"""
+
+    def __init__(self, filename, data, content_type="text/plain"):
+        self.filename = filename
+        self.content_type = content_type
+        self.file = io.BytesIO(data)
+        self.reads = []
+
+    async def read(self, size=-1):
+        chunk = self.file.read(size)
+        self.reads.append(len(chunk))
+        return chunk
+
+    async def seek(self, offset):
+        self.file.seek(offset)
+
+
+@pytest.fixture
+def voice(monkeypatch):
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = lambda **kwargs: None
+    genai.GenerativeModel = lambda *args, **kwargs: types.SimpleNamespace()
+    google = types.ModuleType("google")
+    google.generativeai = genai
+    monkeypatch.setitem(sys.modules, "google", google)
+    monkeypatch.setitem(sys.modules, "google.generativeai", genai)
+    monkeypatch.delitem(sys.modules, "voice_chat_api", raising=False)
+
+    import voice_chat_api
+    monkeypatch.setattr(voice_chat_api, "UPLOAD_READ_CHUNK", 1024)
+    voice_chat_api._extraction_cache.clear()
+    yield voice_chat_api
+    sys.modules.pop("voice_chat_api", None)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_upload_is_hashed_in_full_but_only_partly_kept(voice):
+    upload = FakeUpload("notes.txt", b"x" * 5000)
+    content_hash, kept, total = asyncio.run(voice._read_upload(upload, keep_bytes=1500))
+
+    assert total == 5000 and kept == b"x" * 1500
+    assert content_hash == voice.hashlib.sha256(b"x" * 5000).hexdigest()
+    assert max(upload.reads) <= 1024
+
+
+def test_upload_over_the_size_cap_is_rejected(voice, monkeypatch):
+    monkeypatch.setattr(voice, "MAX_UPLOAD_BYTES", 3000)
+    upload = FakeUpload("huge.txt", b"x" * 10_000)
+
+    with pytest.raises(ValueError, match="upload limit"):
+        asyncio.run(voice._read_upload(upload, keep_bytes=0))
+    # Reading stops at the first chunk past the cap
+    assert sum(upload.reads) <= 3000 + 1024
+
+
+def test_text_uploads_are_truncated_and_deduplicated(voice, monkeypatch):
+    monkeypatch.setattr(voice, "MAX_TEXT_FILE_CHARS", 100)
+    long_text = ("é" * 300).encode("utf-8")
+    files = [
+        FakeUpload("spec.md", long_text),
+        FakeUpload("copy.md", long_text),
+        FakeUpload("short.txt", b"Build a todo app"),
+    ]
+
+    context = asyncio.run(voice.process_uploaded_files(files))
+    assert "**File: spec.md**\n" + "é" * 100 + "\n[... content truncated ...]" in context
+    assert "**File: copy.md** [Duplicate of spec.md]" in context
+    assert "**File: short.txt**\nBuild a todo app" in context
+    assert context.startswith("\n\n=== USER PROVIDED DOCUMENTATION ===")
+
+
+def test_context_store_evicts_least_recently_used(voice):
+    store = voice.DocumentationContextStore(max_entries=2)
+    store.set("a", "first")
+    store.set("b", "second")
+    assert store.get("a") == "first"
+
+    store.set("c", "third")
+    assert "b" not in store
+    assert store.get("a") == "first" and store.get("c") == "third"
+
+
+def test_context_store_expires_idle_entries(voice, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(voice.time, "monotonic", clock)
+    store = voice.DocumentationContextStore(ttl_seconds=60)
+    store.set("idle", "old")
+    store.set("busy", "used")
+
+    clock.now += 50
+    assert store.get("busy") == "used"
+    clock.now += 20
+    assert store.get("idle") is None
+    assert store.get("busy") == "used"
+
+
+def test_context_store_bounds_total_size(voice):
+    store = voice.DocumentationContextStore(max_total_chars=10)
+    store.set("a", "12345")
+    store.set("b", "12345")
+    store.set("c", "123")
+
+    assert store.get("a") is None
+    assert store.get("b") == "12345" and store.get("c") == "123"
+    store.pop("b")
+    assert store._total_chars == 3
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
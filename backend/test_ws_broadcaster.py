@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Test the WebSocket fan-out broadcaster
+
+Uses a fake socket to check that frames arrive in send order, that
+coalescing and dropping only kick in once a connection's queue is full, and
+that dropping a stuck client never stalls delivery to everyone else.
+"""
+
+import asyncio
+import json
+
+from starlette.websockets import WebSocketState
+
+import ws_broadcaster
+from ws_broadcaster import ConnectionManager, classify_message
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.client_state = WebSocketState.CONNECTED
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self):
+        self.client_state = WebSocketState.CONNECTED
+
+    async def send_text(self, payload: str):
+        self.sent.append(json.loads(payload))
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+        self.client_state = WebSocketState.DISCONNECTED
+
+
+def _status(phase: str) -> dict:
+    return {"type": "status", "phase": phase, "message": phase}
+
+
+async def _broadcast(messages, queue_size=None):
+    """Queue every message before the writer runs, then let it drain"""
+    manager = ConnectionManager()
+    await manager.start()
+    websocket = FakeWebSocket()
+    await manager.connect(websocket, "conn-1", "demo")
+    original_size = ws_broadcaster.WS_SEND_QUEUE_SIZE
+    if queue_size is not None:
+        ws_broadcaster.WS_SEND_QUEUE_SIZE = queue_size
+    try:
+        for message in messages:
+            await manager.send_to_project("demo", message)
+    finally:
+        ws_broadcaster.WS_SEND_QUEUE_SIZE = original_size
+    for _ in range(10):
+        await asyncio.sleep(0)
+    await manager.stop()
+    return websocket, manager
+
+
+def test_status_phases_keep_their_order():
+    messages = [
+        _status("create"),
+        _status("install"),
+        {"type": "preview_ready", "url": "http://localhost:5173"},
+        _status("ready"),
+    ]
+    websocket, _ = asyncio.run(_broadcast(messages))
+    assert websocket.sent == messages
+
+
+def test_no_coalescing_below_queue_limit():
+    messages = [
+        {"type": "job_progress", "job": {"job_id": "j1", "progress": progress}}
+        for progress in (10, 40, 60)
+    ]
+    websocket, manager = asyncio.run(_broadcast(messages))
+    assert [m["job"]["progress"] for m in websocket.sent] == [10, 40, 60]
+    assert manager.stats()["coalesced_frames"] == 0
+
+
+def test_coalesced_frame_moves_to_tail_under_backpressure():
+    messages = [
+        {"type": "job_progress", "job": {"job_id": "j1", "progress": 10}},
+        {"type": "chat", "text": "hello"},
+        {"type": "job_progress", "job": {"job_id": "j1", "progress": 40}},
+    ]
+    websocket, _ = asyncio.run(_broadcast(messages, queue_size=2))
+    # The stale progress frame is gone and the newer one arrives after the chat frame
+    assert websocket.sent == [messages[1], messages[2]]
+
+
+def test_droppable_frames_go_first_and_critical_overflow_disconnects():
+    messages = [
+        {"type": "terminal_output", "data": "line 1"},
+        {"type": "chat", "text": "one"},
+        {"type": "chat", "text": "two"},
+        {"type": "chat", "text": "three"},
+    ]
+    websocket, manager = asyncio.run(_broadcast(messages, queue_size=2))
+    assert manager.slow_disconnects == 1
+    assert websocket.closed_with == 1013
+    assert {"type": "terminal_output", "data": "line 1"} not in websocket.sent
+
+
+class StuckWebSocket(FakeWebSocket):
+    """Never finishes a send or a close handshake"""
+
+    async def send_text(self, payload: str):
+        await asyncio.Event().wait()
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+        await asyncio.Event().wait()
+
+
+def test_stuck_client_does_not_stall_the_fan_out():
+    async def scenario():
+        manager = ConnectionManager()
+        await manager.start()
+        stuck, healthy = StuckWebSocket(), FakeWebSocket()
+        await manager.connect(stuck, "stuck", "demo")
+        await manager.connect(healthy, "healthy", "demo")
+        original_size = ws_broadcaster.WS_SEND_QUEUE_SIZE
+        ws_broadcaster.WS_SEND_QUEUE_SIZE = 2
+        try:
+            for text in ("one", "two", "three", "four"):
+                # The stuck socket's close must not hold up this broadcast
+                await asyncio.wait_for(manager.send_to_project("demo", {"type": "chat", "text": text}), timeout=1)
+                await asyncio.sleep(0)
+        finally:
+            ws_broadcaster.WS_SEND_QUEUE_SIZE = original_size
+        for _ in range(10):
+            await asyncio.sleep(0)
+        closers = len(manager._closers)
+        await manager.stop()
+        return stuck, healthy, manager, closers
+
+    stuck, healthy, manager, closers = asyncio.run(scenario())
+    assert [m["text"] for m in healthy.sent] == ["one", "two", "three", "four"]
+    assert manager.slow_disconnects == 1 and stuck.closed_with == 1013
+    assert not manager.is_connected("stuck") and closers == 1
+
+
+def test_direct_frames_share_the_broadcast_order_and_flush():
+    async def scenario():
+        manager = ConnectionManager()
+        await manager.start()
+        websocket = FakeWebSocket()
+        await manager.connect(websocket, "conn-1", "chat_demo")
+        await manager.send_to_connection("conn-1", {"type": "chat_connected"})
+        await manager.send_to_project("chat_demo", _status("install"))
+        await manager.send_to_connection("conn-1", {"type": "pong"})
+        flushed = await manager.flush("conn-1", timeout=1)
+        await manager.stop()
+        return websocket, flushed, await manager.flush("conn-1", timeout=1)
+
+    websocket, flushed, after_stop = asyncio.run(scenario())
+    assert [m["type"] for m in websocket.sent] == ["chat_connected", "status", "pong"]
+    assert flushed and not after_stop
+
+
+def test_status_keys_are_scoped_by_phase_and_job():
+    assert classify_message(_status("install")) != classify_message(_status("ready"))
+    assert classify_message(_status("install")) == classify_message(_status("install"))
+    first = classify_message({"type": "job_progress", "job": {"job_id": "a"}})
+    second = classify_message({"type": "job_progress", "job": {"job_id": "b"}})
+    assert first != second
+    assert classify_message({"type": "terminal_output"}) == (None, True)
+
+
+if __name__ == "__main__":
+    test_status_phases_keep_their_order()
+    test_no_coalescing_below_queue_limit()
+    test_coalesced_frame_moves_to_tail_under_backpressure()
+    test_droppable_frames_go_first_and_critical_overflow_disconnects()
+    test_stuck_client_does_not_stall_the_fan_out()
+    test_direct_frames_share_the_broadcast_order_and_flush()
+    test_status_keys_are_scoped_by_phase_and_job()
+    print("✅ WebSocket broadcaster tests passed")
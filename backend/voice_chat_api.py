@@ -8,12 +8,14 @@ import asyncio
 import time
 import base64
 import io
+import hashlib
+from collections import OrderedDict
 from pathlib import Path
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import google.generativeai as genai
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union, BinaryIO
 
 # Try to import PDF processing
 try:
@@ -69,26 +71,66 @@ class ProjectSpec(BaseModel):
     target_audience: str
 
 # Helper functions for file processing
-def extract_text_from_pdf(file_content: bytes) -> str:
-    """Extract text content from a PDF file."""
+
+# Ingestion limits: per-document character budget, bytes read per upload,
+# and how many uploads are processed at once
+MAX_DOCUMENT_CHARS = 15000
+MAX_TEXT_FILE_CHARS = 10000
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "25")) * 1024 * 1024
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+UPLOAD_READ_CHUNK = 1024 * 1024
+
+# Extracted text keyed by content hash, so re-uploading the same file is free
+_EXTRACTION_CACHE_SIZE = 128
+_extraction_cache: "OrderedDict[str, str]" = OrderedDict()
+
+
+def _cache_extraction(content_hash: str, extracted: str) -> str:
+    _extraction_cache[content_hash] = extracted
+    _extraction_cache.move_to_end(content_hash)
+    while len(_extraction_cache) > _EXTRACTION_CACHE_SIZE:
+        _extraction_cache.popitem(last=False)
+    return extracted
+
+
+def extract_text_from_pdf(file_content: Union[bytes, BinaryIO], max_chars: int = MAX_DOCUMENT_CHARS) -> str:
+    """
+    Extract text content from a PDF file.
+    
+    Pages are extracted lazily and extraction stops once `max_chars` is
+    reached, so a 200-page PDF costs no more than the pages that fit the budget.
+    Accepts raw bytes or a seekable binary file object.
+    """
     if not PDF_AVAILABLE:
         return "[PDF processing not available - please describe your requirements in text]"
     
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+        stream = io.BytesIO(file_content) if isinstance(file_content, (bytes, bytearray)) else file_content
+        pdf_reader = PyPDF2.PdfReader(stream)
+        total_pages = len(pdf_reader.pages)
         text_content = []
+        used_chars = 0
+        pages_read = 0
         
-        for page_num, page in enumerate(pdf_reader.pages):
-            page_text = page.extract_text()
-            if page_text:
-                text_content.append(f"--- Page {page_num + 1} ---\n{page_text}")
+        for page_num in range(total_pages):
+            page_text = pdf_reader.pages[page_num].extract_text()
+            pages_read += 1
+            if not page_text:
+                continue
+            chunk = f"--- Page {page_num + 1} ---\n{page_text}"
+            remaining = max_chars - used_chars
+            if len(chunk) >= remaining:
+                text_content.append(chunk[:remaining])
+                used_chars = max_chars
+                break
+            text_content.append(chunk)
+            used_chars += len(chunk) + 2
         
         extracted_text = "\n\n".join(text_content)
         
         # Limit text length to prevent token overflow
-        max_chars = 15000
-        if len(extracted_text) > max_chars:
-            extracted_text = extracted_text[:max_chars] + f"\n\n[... Document truncated. Showing first {max_chars} characters of {len(extracted_text)} total ...]"
+        if used_chars >= max_chars:
+            extracted_text += f"\n\n[... Document truncated. Showing first {max_chars} characters (pages 1-{pages_read} of {total_pages}) ...]"
         
         return extracted_text if extracted_text else "[PDF contained no extractable text]"
     except Exception as e:
@@ -127,57 +169,168 @@ Provide a detailed description that would help an AI generate code for a similar
         print(f"❌ Image analysis error: {e}")
         return f"[Error analyzing image: {str(e)}]"
 
+async def _read_upload(file: UploadFile, keep_bytes: Optional[int]) -> Tuple[str, bytes, int]:
+    """
+    Stream an upload in chunks, hashing all of it but keeping at most
+    `keep_bytes` in memory (None keeps everything up to MAX_UPLOAD_BYTES).
+    Returns (sha256, kept bytes, total size).
+    """
+    digest = hashlib.sha256()
+    kept = bytearray()
+    total = 0
+    while True:
+        chunk = await file.read(UPLOAD_READ_CHUNK)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > MAX_UPLOAD_BYTES:
+            raise ValueError(f"File exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB upload limit")
+        digest.update(chunk)
+        if keep_bytes is None or len(kept) < keep_bytes:
+            kept.extend(chunk if keep_bytes is None else chunk[:keep_bytes - len(kept)])
+    return digest.hexdigest(), bytes(kept), total
+
+
+async def _ingest_file(file: UploadFile, seen_hashes: Dict[str, str]) -> str:
+    """Extract documentation context from one upload (runs concurrently with the others)"""
+    filename = file.filename or "unnamed_file"
+    content_type = file.content_type or ""
+    is_pdf = content_type == "application/pdf" or filename.lower().endswith('.pdf')
+    is_image = content_type.startswith("image/")
+    
+    try:
+        if is_pdf:
+            # PyPDF2 reads from the spooled upload file directly; only hash it here
+            content_hash, _, size = await _read_upload(file, keep_bytes=0)
+        elif is_image:
+            content_hash, content, size = await _read_upload(file, keep_bytes=None)
+        else:
+            # Text: UTF-8 is at most 4 bytes per char, keep just enough for the budget
+            content_hash, content, size = await _read_upload(file, keep_bytes=MAX_TEXT_FILE_CHARS * 4)
+        
+        print(f"📄 Processing uploaded file: {filename} ({content_type}, {size} bytes)")
+        
+        if content_hash in seen_hashes:
+            return f"\n📎 **File: {filename}** [Duplicate of {seen_hashes[content_hash]}]"
+        seen_hashes[content_hash] = filename
+        
+        cached = _extraction_cache.get(content_hash)
+        if cached is None:
+            if is_pdf:
+                await file.seek(0)
+                cached = await asyncio.to_thread(extract_text_from_pdf, file.file)
+            elif is_image:
+                cached = await asyncio.to_thread(describe_image_with_gemini, content, content_type)
+            else:
+                truncated = size > len(content)
+                # A truncated read may end mid-character: allow dropping up to 3 bytes
+                for cut in range(4 if truncated else 1):
+                    try:
+                        text_content = content[:len(content) - cut].decode('utf-8')
+                    except UnicodeDecodeError:
+                        continue
+                    if truncated or len(text_content) > MAX_TEXT_FILE_CHARS:
+                        text_content = text_content[:MAX_TEXT_FILE_CHARS] + "\n[... content truncated ...]"
+                    cached = text_content
+                    break
+            if cached is not None:
+                _cache_extraction(content_hash, cached)
+        
+        if is_pdf:
+            return f"\n📄 **Document: {filename}**\n{cached}"
+        if is_image:
+            return f"\n🖼️ **Image: {filename}**\n{cached}"
+        if cached is None:
+            return f"\n📎 **File: {filename}** [Binary file - content not extractable]"
+        return f"\n📝 **File: {filename}**\n{cached}"
+        
+    except Exception as e:
+        print(f"❌ Error processing file {filename}: {e}")
+        return f"\n❌ **File: {filename}** [Error: {str(e)}]"
+
+
 async def process_uploaded_files(files: List[UploadFile]) -> str:
-    """Process uploaded files and extract documentation context."""
+    """
+    Process uploaded files and extract documentation context.
+    
+    Files are ingested concurrently (bounded by INGEST_CONCURRENCY), read in
+    chunks rather than all at once, and deduplicated by content hash.
+    """
     if not files:
         return ""
     
-    documentation_parts = []
+    semaphore = asyncio.Semaphore(INGEST_CONCURRENCY)
+    seen_hashes: Dict[str, str] = {}
     
-    for file in files:
-        try:
-            content = await file.read()
-            filename = file.filename or "unnamed_file"
-            content_type = file.content_type or ""
-            
-            print(f"📄 Processing uploaded file: {filename} ({content_type}, {len(content)} bytes)")
-            
-            if content_type == "application/pdf" or filename.lower().endswith('.pdf'):
-                # Extract text from PDF
-                extracted = extract_text_from_pdf(content)
-                documentation_parts.append(f"\n📄 **Document: {filename}**\n{extracted}")
-                
-            elif content_type.startswith("image/"):
-                # Analyze image with Gemini vision
-                extracted = describe_image_with_gemini(content, content_type)
-                documentation_parts.append(f"\n🖼️ **Image: {filename}**\n{extracted}")
-                
-            else:
-                # Try to read as text
-                try:
-                    text_content = content.decode('utf-8')
-                    if len(text_content) > 10000:
-                        text_content = text_content[:10000] + "\n[... content truncated ...]"
-                    documentation_parts.append(f"\n📝 **File: {filename}**\n{text_content}")
-                except:
-                    documentation_parts.append(f"\n📎 **File: {filename}** [Binary file - content not extractable]")
-                    
-        except Exception as e:
-            print(f"❌ Error processing file {file.filename}: {e}")
-            documentation_parts.append(f"\n❌ **File: {file.filename}** [Error: {str(e)}]")
+    async def bounded(file: UploadFile) -> str:
+        async with semaphore:
+            return await _ingest_file(file, seen_hashes)
+    
+    documentation_parts = await asyncio.gather(*(bounded(file) for file in files))
     
     if documentation_parts:
         return "\n\n=== USER PROVIDED DOCUMENTATION ===\n" + "\n".join(documentation_parts) + "\n=== END DOCUMENTATION ===\n"
     
     return ""
 
+class DocumentationContextStore:
+    """Session -> documentation context, an LRU bounded by entry count, idle TTL and total size"""
+    
+    def __init__(self, max_entries: int = 256, ttl_seconds: int = 3600, max_total_chars: int = 20_000_000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_total_chars = max_total_chars
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._total_chars = 0
+    
+    def _evict(self):
+        now = time.monotonic()
+        # Entries are kept in insertion/access order, so expired ones sit at the front
+        while self._entries:
+            session_id, (stored_at, context) = next(iter(self._entries.items()))
+            if (now - stored_at <= self.ttl_seconds
+                    and len(self._entries) <= self.max_entries
+                    and self._total_chars <= self.max_total_chars):
+                break
+            self._entries.popitem(last=False)
+            self._total_chars -= len(context)
+    
+    def set(self, session_id: str, context: str):
+        self.pop(session_id)
+        self._entries[session_id] = (time.monotonic(), context)
+        self._total_chars += len(context)
+        self._evict()
+    
+    def get(self, session_id: str) -> Optional[str]:
+        self._evict()
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return None
+        # Reading counts as use: restamp and move to the back of the eviction order
+        self._entries[session_id] = (time.monotonic(), entry[1])
+        self._entries.move_to_end(session_id)
+        return entry[1]
+    
+    def pop(self, session_id: str) -> Optional[str]:
+        entry = self._entries.pop(session_id, None)
+        if entry:
+            self._total_chars -= len(entry[1])
+            return entry[1]
+        return None
+    
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
 # Store documentation context for project generation (keyed by session/user)
-_documentation_context_store: Dict[str, str] = {}
+_documentation_context_store = DocumentationContextStore(
+    max_entries=int(os.getenv("DOC_CONTEXT_MAX_SESSIONS", "256")),
+    ttl_seconds=int(os.getenv("DOC_CONTEXT_TTL_SECONDS", "3600"))
+)
 
 def store_documentation_context(session_id: str, context: str):
     """Store documentation context for later use in project generation."""
     if context:
-        _documentation_context_store[session_id] = context
+        _documentation_context_store.set(session_id, context)
         print(f"📚 Stored documentation context for session {session_id} ({len(context)} chars)")
 
 def get_documentation_context(session_id: str) -> Optional[str]:
@@ -186,8 +339,7 @@ def get_documentation_context(session_id: str) -> Optional[str]:
 
 def clear_documentation_context(session_id: str):
     """Clear documentation context after project generation."""
-    if session_id in _documentation_context_store:
-        del _documentation_context_store[session_id]
+    if _documentation_context_store.pop(session_id) is not None:
         print(f"🧹 Cleared documentation context for session {session_id}")
 
 # Initialize Gemini for conversation
@@ -1135,11 +1287,10 @@ async def synthesize_chatterbox_speech(request: ChatterboxTTSRequest):
             raise HTTPException(status_code=500, detail="Generated audio file not found")
         
         # Return audio file
-        with open(audio_file_path, "rb") as audio_file:
-            audio_content = audio_file.read()
+        audio_content = await asyncio.to_thread(audio_file_path.read_bytes)
         
         # Detect watermark
-        watermark_score = detect_watermark(str(audio_file_path))
+        watermark_score = await asyncio.to_thread(detect_watermark, str(audio_file_path))
         
         return Response(
             content=audio_content,
@@ -1168,6 +1319,37 @@ async def synthesize_chatterbox_speech(request: ChatterboxTTSRequest):
             detail=f"Enhanced TTS failed: {str(e)}"
         )
 
+@router.post("/synthesize-chatterbox/stream")
+async def stream_chatterbox_speech(request: ChatterboxTTSRequest):
+    """Stream Chatterbox TTS as a WAV that starts playing after the first sentence"""
+    
+    if not CHATTERBOX_AVAILABLE:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "error": "Advanced TTS not available",
+                "message": "Please install chatterbox-tts for enhanced voice synthesis"
+            }
+        )
+    
+    if not tts_manager.is_initialized:
+        await tts_manager.initialize_models()
+    if not tts_manager.is_initialized:
+        raise HTTPException(status_code=503, detail="TTS service not available. Please install chatterbox-tts.")
+    
+    return StreamingResponse(
+        tts_manager.stream_speech(
+            text=request.text,
+            language=request.language,
+            voice_prompt_path=request.voice_prompt_path
+        ),
+        media_type="audio/wav",
+        headers={
+            "X-TTS-Engine": "Chatterbox",
+            "X-Language": request.language
+        }
+    )
+
 @router.post("/voice-clone")
 async def clone_voice(
     text: str,
@@ -0,0 +1,347 @@
+"""
+WebSocket Fan-out Broadcaster
+=============================
+Project-scoped broadcast for the /ws/project and /ws/chat sockets.
+
+Each message is serialized once and appended to a bounded per-connection send
+queue that is drained by that connection's own writer task, so a slow client
+only ever delays itself. Frames are always delivered in the order they were
+sent; only when a queue is full:
+- progress frames (job_progress per job, status per phase) are coalesced - the
+  pending frame with the same key is removed and the newer one queued at the tail
+- best-effort frames (terminal_output, echo) are dropped oldest-first
+- if nothing can be dropped the client is disconnected so it can reconnect and
+  resync instead of holding everyone's memory hostage
+
+Messages travel through a pluggable pub/sub backend so every uvicorn worker
+delivers to its own sockets. The default is in-process; set WS_PUBSUB_URL to a
+redis:// URL (requires `pip install redis`) to fan out across workers. The Redis
+adapter also accepts any redis.asyncio-compatible client (e.g. fakeredis) for
+local testing.
+
+Usage:
+    from ws_broadcaster import ConnectionManager, create_pubsub_backend
+
+    manager = ConnectionManager(create_pubsub_backend())
+    await manager.start()
+    await manager.connect(websocket, connection_id, project_name)
+    await manager.send_to_project(project_name, {"type": "status", ...})
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+
+from fastapi import WebSocket
+from starlette.websockets import WebSocketState
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    aioredis = None
+    REDIS_AVAILABLE = False
+
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "10"))
+WS_PUBSUB_URL = os.getenv("WS_PUBSUB_URL", "")
+WS_PUBSUB_CHANNEL = os.getenv("WS_PUBSUB_CHANNEL", "altx:ws:broadcast")
+
+# Frames where only the latest one matters to the client
+COALESCE_TYPES = {"job_progress", "status"}
+# Frames a lagging client can lose without breaking its state
+DROPPABLE_TYPES = {"terminal_output", "echo"}
+
+# (coalesce_key, droppable, payload)
+Frame = Tuple[Optional[str], bool, str]
+DeliverCallback = Callable[[str, str, Optional[str], bool], Awaitable[None]]
+
+
+def classify_message(message: Dict[str, Any]) -> Tuple[Optional[str], bool]:
+    """Return (coalesce_key, droppable) for a broadcast message"""
+    message_type = message.get("type")
+    if message_type in COALESCE_TYPES:
+        # Only repeats of the same job's progress / the same status phase may merge
+        job = message.get("job")
+        scope = job.get("job_id", "") if isinstance(job, dict) else ""
+        return f"{message_type}:{scope}:{message.get('phase', '')}", True
+    return None, message_type in DROPPABLE_TYPES
+
+
+class InProcessPubSub:
+    """Default backend: deliver straight to this process's connections"""
+
+    def __init__(self):
+        self._deliver: Optional[DeliverCallback] = None
+
+    async def start(self, deliver: DeliverCallback):
+        self._deliver = deliver
+
+    async def stop(self):
+        self._deliver = None
+
+    async def publish(self, channel: str, payload: str, coalesce_key: Optional[str], droppable: bool):
+        if self._deliver:
+            await self._deliver(channel, payload, coalesce_key, droppable)
+
+
+class RedisPubSub:
+    """Redis PUBLISH/SUBSCRIBE backend so broadcasts reach sockets held by other workers"""
+
+    def __init__(self, url: Optional[str] = None, client: Any = None, channel: str = WS_PUBSUB_CHANNEL):
+        if client is None:
+            if not REDIS_AVAILABLE:
+                raise RuntimeError("redis package is not installed (pip install redis)")
+            client = aioredis.from_url(url)
+        self.client = client
+        self.channel = channel
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._deliver: Optional[DeliverCallback] = None
+
+    async def start(self, deliver: DeliverCallback):
+        self._deliver = deliver
+        self._pubsub = self.client.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.unsubscribe(self.channel)
+                close = getattr(self._pubsub, "aclose", None) or self._pubsub.close
+                await close()
+            except Exception as e:
+                print(f"⚠️ Error closing Redis pub/sub: {e}")
+            self._pubsub = None
+
+    async def publish(self, channel: str, payload: str, coalesce_key: Optional[str], droppable: bool):
+        envelope = json.dumps({"c": channel, "p": payload, "k": coalesce_key, "d": droppable})
+        await self.client.publish(self.channel, envelope)
+
+    async def _listen(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                data = message.get("data")
+                if isinstance(data, bytes):
+                    data = data.decode("utf-8")
+                envelope = json.loads(data)
+                if self._deliver:
+                    await self._deliver(envelope["c"], envelope["p"], envelope.get("k"), envelope.get("d", False))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Redis pub/sub listener error: {e}")
+                await asyncio.sleep(1)
+
+
+def create_pubsub_backend():
+    """Pick the pub/sub backend from WS_PUBSUB_URL (in-process when unset)"""
+    if WS_PUBSUB_URL:
+        try:
+            backend = RedisPubSub(url=WS_PUBSUB_URL)
+            print(f"📡 WebSocket broadcasts via Redis pub/sub ({WS_PUBSUB_CHANNEL})")
+            return backend
+        except Exception as e:
+            print(f"⚠️ Redis pub/sub unavailable, using in-process broadcasts: {e}")
+    return InProcessPubSub()
+
+
+class Connection:
+    """One registered socket with its bounded send queue and writer task"""
+
+    def __init__(self, manager: "ConnectionManager", websocket: WebSocket, connection_id: str, project_name: str):
+        self.manager = manager
+        self.websocket = websocket
+        self.connection_id = connection_id
+        self.project_name = project_name
+        self.frames: Deque[Frame] = deque()
+        self.ready = asyncio.Event()
+        # Set whenever every queued frame has been written
+        self.drained = asyncio.Event()
+        self.drained.set()
+        self.closed = False
+        self.dropped = 0
+        self.coalesced = 0
+        self.writer: Optional[asyncio.Task] = None
+
+    def enqueue(self, payload: str, coalesce_key: Optional[str], droppable: bool) -> bool:
+        """Queue a serialized frame; returns False when the client is too slow to keep"""
+        if self.closed:
+            return True
+
+        if len(self.frames) >= WS_SEND_QUEUE_SIZE:
+            if self._coalesce(coalesce_key):
+                pass
+            elif droppable and coalesce_key is None:
+                # Best-effort frame and no room: lose this one
+                self.dropped += 1
+                return True
+            else:
+                for index, (_, frame_droppable, _) in enumerate(self.frames):
+                    if frame_droppable:
+                        del self.frames[index]
+                        self.dropped += 1
+                        break
+                else:
+                    return False
+
+        self.frames.append((coalesce_key, droppable, payload))
+        self.drained.clear()
+        self.ready.set()
+        return True
+
+    def _coalesce(self, coalesce_key: Optional[str]) -> bool:
+        """Remove the pending frame superseded by a newer one with the same key"""
+        if coalesce_key is None:
+            return False
+        for index, (key, _, _) in enumerate(self.frames):
+            if key == coalesce_key:
+                # The newer frame goes to the tail, keeping it after everything sent before it
+                del self.frames[index]
+                self.coalesced += 1
+                return True
+        return False
+
+    async def run_writer(self):
+        try:
+            while True:
+                await self.ready.wait()
+                while self.frames:
+                    _, _, payload = self.frames.popleft()
+                    if self.websocket.client_state != WebSocketState.CONNECTED:
+                        return
+                    await asyncio.wait_for(self.websocket.send_text(payload), timeout=WS_SEND_TIMEOUT_SECONDS)
+                self.ready.clear()
+                self.drained.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Send failed or timed out - the socket is gone or hopelessly behind
+            pass
+        finally:
+            self.manager.disconnect(self.connection_id, self.project_name)
+
+
+class ConnectionManager:
+    def __init__(self, backend=None):
+        self.backend = backend or InProcessPubSub()
+        self._connections: Dict[str, Connection] = {}
+        self._project_connections: Dict[str, Set[str]] = {}
+        self._started = False
+        self._closers: Set[asyncio.Task] = set()
+        self.slow_disconnects = 0
+
+    async def start(self):
+        if not self._started:
+            await self.backend.start(self._deliver_local)
+            self._started = True
+
+    async def stop(self):
+        if self._started:
+            await self.backend.stop()
+            self._started = False
+        for connection_id, connection in list(self._connections.items()):
+            self.disconnect(connection_id, connection.project_name)
+
+    async def connect(self, websocket: WebSocket, connection_id: Optional[str] = None, project_name: str = "") -> str:
+        """Accept the socket (if needed) and subscribe it to a project's broadcasts"""
+        if websocket.client_state == WebSocketState.CONNECTING:
+            await websocket.accept()
+        connection_id = connection_id or str(uuid.uuid4())
+        connection = Connection(self, websocket, connection_id, project_name)
+        self._connections[connection_id] = connection
+        self._project_connections.setdefault(project_name, set()).add(connection_id)
+        connection.writer = asyncio.create_task(connection.run_writer())
+        return connection_id
+
+    def disconnect(self, connection_id: str, project_name: str):
+        connection = self._connections.pop(connection_id, None)
+        if connection is not None:
+            connection.closed = True
+            connection.frames.clear()
+            connection.drained.set()
+            if connection.writer and connection.writer is not asyncio.current_task() and not connection.writer.done():
+                connection.writer.cancel()
+
+        if project_name in self._project_connections:
+            self._project_connections[project_name].discard(connection_id)
+            if not self._project_connections[project_name]:
+                del self._project_connections[project_name]
+
+    def is_connected(self, connection_id: str) -> bool:
+        return connection_id in self._connections
+
+    def connection_count(self, project_name: Optional[str] = None) -> int:
+        if project_name is None:
+            return len(self._connections)
+        return len(self._project_connections.get(project_name, ()))
+
+    async def send_to_project(self, project_name: str, message: dict):
+        """Send message to all connections for a specific project (all workers)"""
+        payload = json.dumps(message, default=str)
+        coalesce_key, droppable = classify_message(message)
+        await self.backend.publish(project_name, payload, coalesce_key, droppable)
+
+    async def send_to_connection(self, connection_id: str, message: dict):
+        """Queue a message for one socket, ordered with its broadcasts"""
+        connection = self._connections.get(connection_id)
+        if connection is not None:
+            coalesce_key, droppable = classify_message(message)
+            if not connection.enqueue(json.dumps(message, default=str), coalesce_key, droppable):
+                self._drop_slow_consumer(connection)
+
+    async def flush(self, connection_id: str, timeout: float = WS_SEND_TIMEOUT_SECONDS) -> bool:
+        """Wait until everything queued for one socket is written (e.g. before closing it)"""
+        connection = self._connections.get(connection_id)
+        if connection is None:
+            return False
+        try:
+            await asyncio.wait_for(connection.drained.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return not connection.closed
+
+    async def _deliver_local(self, project_name: str, payload: str, coalesce_key: Optional[str], droppable: bool):
+        """Fan a serialized frame out to this process's subscribers without awaiting any socket"""
+        for connection_id in list(self._project_connections.get(project_name, ())):
+            connection = self._connections.get(connection_id)
+            if connection is not None and not connection.enqueue(payload, coalesce_key, droppable):
+                self._drop_slow_consumer(connection)
+
+    def _drop_slow_consumer(self, connection: Connection):
+        """Unsubscribe a lagging socket now; closing it happens off the fan-out path"""
+        self.slow_disconnects += 1
+        print(f"⚠️ Dropping slow WebSocket consumer {connection.connection_id} ({connection.project_name})")
+        self.disconnect(connection.connection_id, connection.project_name)
+        closer = asyncio.create_task(self._close_slow_consumer(connection.websocket))
+        self._closers.add(closer)
+        closer.add_done_callback(self._closers.discard)
+
+    async def _close_slow_consumer(self, websocket: WebSocket):
+        try:
+            # 1013 = try again later; the client reconnects and resyncs
+            await asyncio.wait_for(websocket.close(code=1013), timeout=WS_SEND_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__,
+            "connections": len(self._connections),
+            "projects": len(self._project_connections),
+            "queued_frames": sum(len(c.frames) for c in self._connections.values()),
+            "dropped_frames": sum(c.dropped for c in self._connections.values()),
+            "coalesced_frames": sum(c.coalesced for c in self._connections.values()),
+            "slow_disconnects": self.slow_disconnects,
+        }